@@ -1,3 +1,23 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import DailyKirimRollup, DailyChiqimRollup, DailySotuvRollup
+
+
+@admin.register(DailyKirimRollup)
+class DailyKirimRollupAdmin(admin.ModelAdmin):
+    list_display   = ('sana', 'summa', 'summa_usd', 'soni')
+    date_hierarchy = 'sana'
+
+
+@admin.register(DailyChiqimRollup)
+class DailyChiqimRollupAdmin(admin.ModelAdmin):
+    list_display   = ('sana', 'kategoriya', 'summa', 'summa_usd', 'soni')
+    list_filter    = ('kategoriya',)
+    date_hierarchy = 'sana'
+
+
+@admin.register(DailySotuvRollup)
+class DailySotuvRollupAdmin(admin.ModelAdmin):
+    list_display   = ('sana', 'tolov_holati', 'yakuniy_summa', 'tolangan_summa', 'soni')
+    list_filter    = ('tolov_holati',)
+    date_hierarchy = 'sana'
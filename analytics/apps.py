@@ -1,6 +1,22 @@
+import logging
+
 from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
 
 
 class AnalyticsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'analytics'
+
+    def ready(self):
+        import analytics.signals  # noqa — rollup signallarini ulash
+        from . import checks, kesh  # noqa — kesh_backend_tekshiruvi ro'yxatga olinadi
+
+        # gunicorn system check'larni ishga tushirmaydi — production'da log orqali
+        if not settings.DEBUG and settings.ANALYTICS_KESH and not kesh.umumiy_kesh():
+            logger.warning(
+                "Analytics keshi o'chirildi: CACHES['default'] jarayon ichidagi backend (%s)",
+                settings.CACHES['default']['BACKEND'],
+            )
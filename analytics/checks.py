@@ -0,0 +1,24 @@
+# analytics/checks.py
+"""
+Ishga tushishdagi tekshiruvlar (manage.py check / runserver / migrate).
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from . import kesh
+
+
+@register(Tags.caches)
+def kesh_backend_tekshiruvi(app_configs, **kwargs):
+    if not settings.ANALYTICS_KESH or kesh.umumiy_kesh():
+        return []
+    return [Warning(
+        "Analytics keshi o'chirildi: CACHES['default'] jarayon ichidagi backend "
+        f"({settings.CACHES['default']['BACKEND']}).",
+        hint=(
+            "Bir nechta worker bilan eskirtirish faqat bitta worker'ga yetadi. "
+            "CACHE_BACKEND=django.core.cache.backends.redis.RedisCache va "
+            "CACHE_LOCATION=redis://... bering yoki ANALYTICS_KESH=False qiling."
+        ),
+        id='analytics.W001',
+    )]
@@ -0,0 +1,103 @@
+# analytics/kesh.py
+"""
+Analytics dashboard konteksti uchun kesh kalitlari va invalidatsiya.
+
+Ikki versiya hisoblagichi ishlatiladi:
+  * 'tarix' — bugundan oldingi sanaga tegishli ma'lumot o'zgarganda oshadi
+  * 'joriy' — har qanday o'zgarishda oshadi
+
+Yopilgan davr (date_to < bugun, masalan last_month) kaliti faqat 'tarix'
+versiyasiga bog'liq — bugungi sotuv/kirimlar uni eskirtirmaydi, amalda
+abadiy keshlanadi. Bugunni o'z ichiga olgan davrlar ikkala versiyaga bog'liq
+va faqat ma'lumot o'zgarganda qayta hisoblanadi.
+
+Invalidatsiya: analytics/signals.py → kesh_eskirtirish(...)
+
+Versiya hisoblagichi barcha worker'lar uchun bitta bo'lishi shart — shuning
+uchun kesh faqat umumiy backend'da (Redis / Memcached / fayl / DB) yoqiladi. Jarayon
+ichidagi backend'da (LocMemCache) bir worker'dagi yozuv boshqalarining
+keshini eskirtirmaydi: kesh o'chadi va ishga tushishda ogohlantirish chiqadi
+(analytics/checks.py).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+PREFIX = 'analytics'
+
+# Yopilgan davrlar — muddatsiz; ochiq davrlar kaliti kunga bog'liq, 1 kun yetarli
+YOPIQ_TIMEOUT = None
+OCHIQ_TIMEOUT = 60 * 60 * 24
+BUGUN_TIMEOUT = 60 * 60 * 24
+
+# Har bir jarayon o'z nusxasiga ega bo'lgan backend'lar
+MAHALLIY_BACKENDLAR = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def umumiy_kesh():
+    """CACHES['default'] barcha worker'lar uchun umumiymi (Redis / Memcached / fayl / DB)"""
+    return settings.CACHES['default']['BACKEND'] not in MAHALLIY_BACKENDLAR
+
+
+def yoqilgan():
+    return settings.ANALYTICS_KESH and umumiy_kesh()
+
+
+def keshdan(kalit, hisobla, timeout):
+    """
+    kalit() bo'yicha keshdan o'qiydi, yo'q bo'lsa hisobla() natijasini yozadi.
+    Kesh o'chiq bo'lsa — har safar hisoblaydi (kalit ham hisoblanmaydi).
+    """
+    if not yoqilgan():
+        return hisobla()
+    kalit = kalit()
+    natija = cache.get(kalit)
+    if natija is None:
+        natija = hisobla()
+        cache.set(kalit, natija, timeout)
+    return natija
+
+
+def _versiya(nomi):
+    return cache.get_or_set(f'{PREFIX}:v:{nomi}', 1, None)
+
+
+def _oshir(nomi):
+    kalit = f'{PREFIX}:v:{nomi}'
+    try:
+        cache.incr(kalit)
+    except ValueError:
+        # Kalit yo'q (kesh tozalangan / LRU chiqarib yuborgan)
+        cache.set(kalit, 2, None)
+
+
+def davr_kaliti(today, preset, date_from, date_to, blok='ctx'):
+    """blok — 'ctx' (KPI kartalari) yoki chart bloki nomi"""
+    kalit = f'{PREFIX}:{blok}:{preset}:{date_from.isoformat()}:{date_to.isoformat()}:t{_versiya("tarix")}'
+    if date_to < today:
+        return kalit
+    return f'{kalit}:j{_versiya("joriy")}:{today.isoformat()}'
+
+
+def davr_timeout(today, date_to):
+    return YOPIQ_TIMEOUT if date_to < today else OCHIQ_TIMEOUT
+
+
+def bugun_kaliti(today):
+    return f'{PREFIX}:bugun:{today.isoformat()}:t{_versiya("tarix")}:j{_versiya("joriy")}'
+
+
+def kesh_eskirtirish(*kunlar):
+    """
+    Ma'lumot o'zgardi — tegishli kalitlarni eskirtiradi.
+    kunlar: o'zgargan yozuv(lar) sanasi; None — sana noma'lum (tarix ham eskiradi).
+    """
+    if not yoqilgan():
+        return
+    today = timezone.localdate()
+    _oshir('joriy')
+    if not kunlar or any(k is None or k < today for k in kunlar):
+        _oshir('tarix')
@@ -0,0 +1,41 @@
+# analytics/management/commands/rebuild_rollups.py
+"""
+Kunlik yig'ma jadvallarni (DailyKirimRollup / DailyChiqimRollup / DailySotuvRollup)
+manba jadvallardan qayta quradi.
+
+    python manage.py rebuild_rollups
+    python manage.py rebuild_rollups --from 2025-01-01 --to 2025-12-31
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.rollups import rollup_qayta_qurish
+
+
+def _sana(val):
+    if not val:
+        return None
+    try:
+        return date.fromisoformat(val)
+    except ValueError:
+        raise CommandError(f"Noto'g'ri sana: {val} (YYYY-MM-DD kutilgan)")
+
+
+class Command(BaseCommand):
+    help = "Analytics kunlik yig'ma jadvallarini qayta quradi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help="Boshlanish sanasi (YYYY-MM-DD)")
+        parser.add_argument('--to', dest='date_to', help="Tugash sanasi (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        date_from = _sana(options['date_from'])
+        date_to   = _sana(options['date_to'])
+
+        natija = rollup_qayta_qurish(date_from=date_from, date_to=date_to)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Yig'malar qayta qurildi: kirim={natija['kirim']}, "
+            f"chiqim={natija['chiqim']}, sotuv={natija['sotuv']} qator"
+        ))
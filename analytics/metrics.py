@@ -0,0 +1,95 @@
+# analytics/metrics.py
+"""
+KPI "metrika" spetsifikatsiyalari.
+
+Bir model uchun barcha ko'rsatkichlar (davr / oldingi davr / bugun / jami,
+holatlar bo'yicha sonlar) bitta aggregate() ichida filter=Q(...) bilan
+hisoblanadi — har bir karta uchun alohida so'rov yuborilmaydi.
+
+    natija = hisobla(Kirim.objects.all(), [
+        Metrika('bugun', 'summa', davr('sana__date', today, today)),
+        Metrika('jami',  'summa'),
+        Metrika('soni',  tur='count'),
+    ])
+    natija['bugun'], natija['jami'], natija['soni']
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+
+class Metrika:
+    """Bitta KPI: natijadagi nomi, maydon, shart (Q) va agregat turi"""
+
+    TURLAR = ('sum', 'count')
+
+    def __init__(self, nomi, field='id', q=None, tur='sum'):
+        if tur not in self.TURLAR:
+            raise ValueError(f"Noma'lum metrika turi: {tur}")
+        self.nomi  = nomi
+        self.field = field
+        self.q     = q
+        self.tur   = tur
+
+    def ifoda(self):
+        if self.tur == 'count':
+            return Count(self.field, filter=self.q)
+        return Sum(self.field, filter=self.q, default=Decimal('0'))
+
+    def __repr__(self):
+        return f"<Metrika {self.nomi}: {self.tur}({self.field})>"
+
+
+def kun_boshi(sana):
+    """Sana → o'sha kun boshlanishi (joriy vaqt zonasida, aware datetime)"""
+    return timezone.make_aware(datetime.combine(sana, time.min))
+
+
+def davr(field, date_from=None, date_to=None):
+    """
+    Sana oralig'i sharti. DateTimeField uchun field='sana__date' berilsin.
+    Chegara berilmasa — Q() (shartsiz).
+
+    '__date' shartlari [kun boshi, keyingi kun boshi) oralig'iga aylantiriladi:
+    ustunga funksiya qo'llanmaydi, shuning uchun (sana, ...) indekslari ishlaydi.
+    """
+    q = Q()
+    if field.endswith('__date'):
+        ustun = field[:-len('__date')]
+        if date_from is not None:
+            q &= Q(**{f'{ustun}__gte': kun_boshi(date_from)})
+        if date_to is not None:
+            q &= Q(**{f'{ustun}__lt': kun_boshi(date_to + timedelta(days=1))})
+        return q
+    if date_from is not None:
+        q &= Q(**{f'{field}__gte': date_from})
+    if date_to is not None:
+        q &= Q(**{f'{field}__lte': date_to})
+    return q
+
+
+def davr_metrikalari(field, qiymat, davrlar, tur='sum'):
+    """
+    {nomi: (date_from, date_to)} → har bir davr uchun Metrika.
+    Masalan: davr_metrikalari('sana', 'summa', {'bugun': (t, t), 'jami': (None, None)})
+    """
+    return [
+        Metrika(nomi, qiymat, davr(field, df, dt), tur=tur)
+        for nomi, (df, dt) in davrlar.items()
+    ]
+
+
+def holat_metrikalari(holatlar, field='tolov_holati', qiymat='id', tur='count', q=None, prefix=''):
+    """Har bir holat qiymati uchun (ixtiyoriy umumiy shart q bilan) Metrika"""
+    q = q or Q()
+    return [
+        Metrika(f'{prefix}{h}', qiymat, q & Q(**{field: h}), tur=tur)
+        for h in holatlar
+    ]
+
+
+def hisobla(queryset, metrikalar):
+    """Barcha metrikalarni bitta aggregate() bilan hisoblaydi → {nomi: qiymat}"""
+    return queryset.aggregate(**{mt.nomi: mt.ifoda() for mt in metrikalar})
@@ -1,3 +1,73 @@
+# analytics/models.py
+"""
+Kunlik yig'ma (rollup) jadvallar.
+
+Dashboard har safar yillar davomidagi tranzaksiyalarni skan qilmasligi uchun
+Kirim / Chiqim / Sotuv summalari kun (va kategoriya) bo'yicha oldindan
+yig'ib qo'yiladi. Yangilanish: analytics/signals.py (har bir save/delete
+faqat o'z kunini qayta hisoblaydi). To'liq qayta qurish:
+    python manage.py rebuild_rollups
+"""
+from decimal import Decimal
+
 from django.db import models
 
-# Create your models here.
+
+class DailyKirimRollup(models.Model):
+    """Kun bo'yicha to'lovlar (Kirim) yig'masi"""
+    sana      = models.DateField(unique=True, verbose_name="Sana")
+    summa     = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'), verbose_name="Summa (so'm)")
+    summa_usd = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'), verbose_name="Summa (USD)")
+    soni      = models.PositiveIntegerField(default=0, verbose_name="Soni")
+
+    class Meta:
+        verbose_name        = "Kunlik kirim yig'masi"
+        verbose_name_plural = "Kunlik kirim yig'malari"
+        ordering            = ['-sana']
+
+    def __str__(self):
+        return f"{self.sana} | {self.summa:,.0f} so'm"
+
+
+class DailyChiqimRollup(models.Model):
+    """Kun va chiqim turi bo'yicha xarajatlar yig'masi"""
+    sana       = models.DateField(verbose_name="Sana")
+    kategoriya = models.ForeignKey(
+        'crm.ChiqimTuri', on_delete=models.CASCADE,
+        null=True, blank=True, related_name='+',
+        verbose_name="Chiqim turi"
+    )
+    summa      = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'), verbose_name="Summa (so'm)")
+    summa_usd  = models.DecimalField(max_digits=20, decimal_places=4, default=Decimal('0'), verbose_name="Summa (USD)")
+    soni       = models.PositiveIntegerField(default=0, verbose_name="Soni")
+
+    class Meta:
+        verbose_name        = "Kunlik chiqim yig'masi"
+        verbose_name_plural = "Kunlik chiqim yig'malari"
+        ordering            = ['-sana']
+        constraints = [
+            models.UniqueConstraint(fields=['sana', 'kategoriya'], name='uniq_chiqim_rollup_sana_kategoriya'),
+        ]
+
+    def __str__(self):
+        return f"{self.sana} | {self.kategoriya or 'Boshqa'} | {self.summa:,.0f} so'm"
+
+
+class DailySotuvRollup(models.Model):
+    """Kun va to'lov holati bo'yicha sotuvlar yig'masi"""
+    sana           = models.DateField(verbose_name="Sana")
+    tolov_holati   = models.CharField(max_length=20, verbose_name="To'lov holati")
+    yakuniy_summa  = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'), verbose_name="Yakuniy summa (so'm)")
+    tolangan_summa = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal('0'), verbose_name="To'langan summa (so'm)")
+    soni           = models.PositiveIntegerField(default=0, verbose_name="Soni")
+
+    class Meta:
+        verbose_name        = "Kunlik sotuv yig'masi"
+        verbose_name_plural = "Kunlik sotuv yig'malari"
+        ordering            = ['-sana']
+        constraints = [
+            models.UniqueConstraint(fields=['sana', 'tolov_holati'], name='uniq_sotuv_rollup_sana_holat'),
+        ]
+
+    def __str__(self):
+        return f"{self.sana} | {self.tolov_holati} | {self.yakuniy_summa:,.0f} so'm"
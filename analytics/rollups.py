@@ -0,0 +1,185 @@
+# analytics/rollups.py
+"""
+Kunlik yig'ma jadvallarni yangilash.
+
+  * *_kunini_yangilash(sana)  — bitta kunni manba jadvaldan qayta hisoblaydi
+    (signal orqali har bir save/delete'da chaqiriladi, faqat o'sha kun skan qilinadi)
+  * rollup_qayta_qurish()      — barcha (yoki berilgan davr) kunlarni noldan quradi
+
+O'qish: analytics/metrics.py orqali (AnalyticsView).
+"""
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .metrics import davr
+from .models import DailyKirimRollup, DailyChiqimRollup, DailySotuvRollup
+
+D0 = Value(Decimal('0'))
+
+
+def kun(val):
+    """DateTimeField / DateField qiymati → mahalliy sana (date) yoki None"""
+    if val is None:
+        return None
+    if isinstance(val, datetime):
+        if timezone.is_aware(val):
+            return timezone.localdate(val)
+        return val.date()
+    if isinstance(val, date):
+        return val
+    return None
+
+
+# ─────────────────────────────────────────────────────────────────
+# BITTA KUNNI QAYTA HISOBLASH
+# ─────────────────────────────────────────────────────────────────
+
+def kirim_kunini_yangilash(sana):
+    from crm.models import Kirim
+
+    if sana is None:
+        return
+    agg = Kirim.objects.filter(davr('sana__date', sana, sana)).aggregate(
+        summa=Coalesce(Sum('summa'), D0),
+        summa_usd=Coalesce(Sum('summa_usd'), D0),
+        soni=Count('id'),
+    )
+    if agg['soni']:
+        DailyKirimRollup.objects.update_or_create(sana=sana, defaults=agg)
+    else:
+        DailyKirimRollup.objects.filter(sana=sana).delete()
+
+
+def chiqim_kunini_yangilash(sana):
+    from crm.models import Chiqim
+
+    if sana is None:
+        return
+    rows = (
+        Chiqim.objects.filter(created=sana)
+        .values('category')
+        .annotate(
+            summa=Coalesce(Sum('price'), D0),
+            summa_usd=Coalesce(Sum('price_usd'), D0),
+            soni=Count('id'),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        DailyChiqimRollup.objects.filter(sana=sana).delete()
+        DailyChiqimRollup.objects.bulk_create([
+            DailyChiqimRollup(
+                sana=sana, kategoriya_id=r['category'],
+                summa=r['summa'], summa_usd=r['summa_usd'], soni=r['soni'],
+            )
+            for r in rows
+        ])
+
+
+def sotuv_kunini_yangilash(sana):
+    from crm.models import Sotuv
+
+    if sana is None:
+        return
+    rows = (
+        Sotuv.objects.filter(davr('sana__date', sana, sana))
+        .values('tolov_holati')
+        .annotate(
+            yakuniy=Coalesce(Sum('yakuniy_summa'), D0),
+            tolangan=Coalesce(Sum('tolangan_summa'), D0),
+            soni=Count('id'),
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        DailySotuvRollup.objects.filter(sana=sana).delete()
+        DailySotuvRollup.objects.bulk_create([
+            DailySotuvRollup(
+                sana=sana, tolov_holati=r['tolov_holati'],
+                yakuniy_summa=r['yakuniy'], tolangan_summa=r['tolangan'], soni=r['soni'],
+            )
+            for r in rows
+        ])
+
+
+# ─────────────────────────────────────────────────────────────────
+# TO'LIQ QAYTA QURISH
+# ─────────────────────────────────────────────────────────────────
+
+@transaction.atomic
+def rollup_qayta_qurish(date_from=None, date_to=None):
+    """
+    Yig'ma jadvallarni manba jadvallardan noldan quradi.
+    date_from/date_to berilsa — faqat shu davr qayta quriladi.
+    Natija: {'kirim': n, 'chiqim': n, 'sotuv': n} — yaratilgan qatorlar soni.
+    """
+    from crm.models import Kirim, Chiqim, Sotuv
+
+    def _davr(qs, field):
+        return qs.filter(davr(field, date_from or None, date_to or None))
+
+    # ── Kirim ──
+    _davr(DailyKirimRollup.objects.all(), 'sana').delete()
+    kirim_rows = (
+        _davr(Kirim.objects.all(), 'sana__date')
+        .annotate(kun=TruncDate('sana'))
+        .values('kun')
+        .annotate(
+            summa=Coalesce(Sum('summa'), D0),
+            summa_usd=Coalesce(Sum('summa_usd'), D0),
+            soni=Count('id'),
+        )
+        .order_by()
+    )
+    kirim_objs = DailyKirimRollup.objects.bulk_create([
+        DailyKirimRollup(sana=r['kun'], summa=r['summa'], summa_usd=r['summa_usd'], soni=r['soni'])
+        for r in kirim_rows
+    ], batch_size=500)
+
+    # ── Chiqim ──
+    _davr(DailyChiqimRollup.objects.all(), 'sana').delete()
+    chiqim_rows = (
+        _davr(Chiqim.objects.all(), 'created')
+        .values('created', 'category')
+        .annotate(
+            summa=Coalesce(Sum('price'), D0),
+            summa_usd=Coalesce(Sum('price_usd'), D0),
+            soni=Count('id'),
+        )
+        .order_by()
+    )
+    chiqim_objs = DailyChiqimRollup.objects.bulk_create([
+        DailyChiqimRollup(
+            sana=r['created'], kategoriya_id=r['category'],
+            summa=r['summa'], summa_usd=r['summa_usd'], soni=r['soni'],
+        )
+        for r in chiqim_rows
+    ], batch_size=500)
+
+    # ── Sotuv ──
+    _davr(DailySotuvRollup.objects.all(), 'sana').delete()
+    sotuv_rows = (
+        _davr(Sotuv.objects.all(), 'sana__date')
+        .annotate(kun=TruncDate('sana'))
+        .values('kun', 'tolov_holati')
+        .annotate(
+            yakuniy=Coalesce(Sum('yakuniy_summa'), D0),
+            tolangan=Coalesce(Sum('tolangan_summa'), D0),
+            soni=Count('id'),
+        )
+        .order_by()
+    )
+    sotuv_objs = DailySotuvRollup.objects.bulk_create([
+        DailySotuvRollup(
+            sana=r['kun'], tolov_holati=r['tolov_holati'],
+            yakuniy_summa=r['yakuniy'], tolangan_summa=r['tolangan'], soni=r['soni'],
+        )
+        for r in sotuv_rows
+    ], batch_size=500)
+
+    return {'kirim': len(kirim_objs), 'chiqim': len(chiqim_objs), 'sotuv': len(sotuv_objs)}
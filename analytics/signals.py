@@ -0,0 +1,103 @@
+# analytics/signals.py
+"""
+Manba jadvallar o'zgarganda:
+  1. Kunlik yig'ma jadvallarni yangilaydi (Kirim / Chiqim / Sotuv) — faqat
+     o'zgargan kun (sana o'zgargan bo'lsa — eski kun ham) qayta hisoblanadi.
+  2. Dashboard keshini eskirtiradi (analytics/kesh.py).
+Ikkalasi ham commit'dan keyin, tranzaksiyadagi barcha kunlar uchun bir marta.
+
+Ulanish: analytics/apps.py → AnalyticsConfig.ready() ichida import qilinadi.
+"""
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import pre_save, post_save, post_delete
+
+from crm.navbat import commitdan_keyin
+
+from . import kesh, rollups
+
+# model → sana maydoni (eski sanani eslab qolish uchun)
+SANA_MAYDONLARI = {
+    'crm.Kirim'                : 'sana',
+    'crm.Chiqim'               : 'created',
+    'crm.Sotuv'                : 'sana',
+    'xomashyo.XomashyoHarakat' : 'sana',
+}
+
+# model → kunni yangilovchi funksiya
+ROLLUP_YANGILASH = {
+    'crm.Kirim'  : rollups.kirim_kunini_yangilash,
+    'crm.Chiqim' : rollups.chiqim_kunini_yangilash,
+    'crm.Sotuv'  : rollups.sotuv_kunini_yangilash,
+}
+
+
+def _ota_kuni(instance, fk, field):
+    """Bog'langan (ota) yozuv sanasi; ota o'chirilgan bo'lsa — None"""
+    try:
+        ota = getattr(instance, fk)
+    except ObjectDoesNotExist:
+        return None
+    return rollups.kun(getattr(ota, field, None)) if ota else None
+
+
+def _kunlar(sender, instance, created=False):
+    """O'zgarish tegishli bo'lgan sanalar (yangi va — agar o'zgargan bo'lsa — eski)"""
+    label = sender._meta.label
+
+    if label in SANA_MAYDONLARI:
+        yangi = rollups.kun(getattr(instance, SANA_MAYDONLARI[label]))
+    elif label == 'crm.SotuvItem':
+        yangi = _ota_kuni(instance, 'sotuv', 'sana')
+    elif label == 'crm.ChiqimItem':
+        yangi = _ota_kuni(instance, 'chiqim', 'created')
+    elif created:
+        # Yangi xaridor — faqat o'sish grafigining bugungi nuqtasiga ta'sir qiladi
+        yangi = rollups.kun(instance.created_at)
+    else:
+        # Xaridor tahriri/o'chirilishi — ism/telefon tarixiy jadvallarda ham ko'rinadi
+        yangi = None
+
+    eski = getattr(instance, '_analytics_eski_kun', None)
+    return yangi, eski
+
+
+def eski_kunni_eslab_qolish(sender, instance, update_fields=None, **kwargs):
+    """Sana o'zgarsa eski kun ham qayta hisoblanishi uchun eski qiymatni saqlaydi"""
+    field = SANA_MAYDONLARI[sender._meta.label]
+    instance._analytics_eski_kun = None
+    if not instance.pk:
+        return
+    # update_fields ichida sana yo'q bo'lsa — kun o'zgarmagan, qo'shimcha so'rov shart emas
+    if update_fields is not None and field not in update_fields:
+        return
+    eski = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    instance._analytics_eski_kun = rollups.kun(eski)
+
+
+def _kunlarni_yangilash(yangilash):
+    def _bajarish(kunlar):
+        for k in kunlar:
+            if k is not None:
+                yangilash(k)
+    return _bajarish
+
+
+def malumot_ozgardi(sender, instance, created=False, **kwargs):
+    yangi, eski = _kunlar(sender, instance, created)
+    kunlar = {yangi, eski} if eski and eski != yangi else {yangi}
+
+    # Bitta sotuvning qatorlari (SotuvItem → update_summa → Sotuv.save) bitta
+    # tranzaksiyada — yig'ma va kesh commit'dan keyin bir marta (crm/navbat.py)
+    label = sender._meta.label
+    yangilash = ROLLUP_YANGILASH.get(label)
+    if yangilash:
+        commitdan_keyin(f'analytics_rollup_{label}', _kunlarni_yangilash(yangilash), kunlar)
+    commitdan_keyin('analytics_kesh', lambda k: kesh.kesh_eskirtirish(*k), kunlar)
+
+
+for _label in SANA_MAYDONLARI:
+    pre_save.connect(eski_kunni_eslab_qolish, sender=_label, dispatch_uid=f'analytics_pre_{_label}')
+
+for _label in (*SANA_MAYDONLARI, 'crm.SotuvItem', 'crm.ChiqimItem', 'crm.Xaridor'):
+    post_save.connect(malumot_ozgardi, sender=_label, dispatch_uid=f'analytics_save_{_label}')
+    post_delete.connect(malumot_ozgardi, sender=_label, dispatch_uid=f'analytics_delete_{_label}')
@@ -0,0 +1,112 @@
+# analytics/trend.py
+"""
+Zich (bo'shliqsiz) trend seriyalari — kunlik / haftalik / oylik.
+
+Davr bir marta "o'q" (TrendOqi) ga aylantiriladi: har bir sana o'z
+bo'lagining indeksiga arifmetik yo'l bilan tushadi, qiymatlar array('d')
+ga bir o'tishda yig'iladi. Ma'lumot bo'lmagan kunlar/haftalar/oylar 0 bo'lib
+qoladi; strftime kalitlari, set birlashtirish va qayta parse qilish yo'q.
+
+    oq = TrendOqi(date_from, date_to)             # davriylik avtomatik
+    kirim = oq.qator(rollup.values_list('sana', 'summa'))
+    oq.labels(), list(kirim)
+"""
+from array import array
+from datetime import date, datetime, timedelta
+
+KUNLIK   = 'kunlik'
+HAFTALIK = 'haftalik'
+OYLIK    = 'oylik'
+
+# Davr uzunligi (kun) → davriylik
+KUNLIK_CHEGARA   = 31
+HAFTALIK_CHEGARA = 180
+
+OY = ['', 'Yan', 'Fev', 'Mar', 'Apr', 'May', 'Iyn', 'Iyl', 'Avg', 'Sen', 'Okt', 'Noy', 'Dek']
+
+
+def davriylik_tanlash(date_from, date_to):
+    """31 kungacha — kunlik, 180 kungacha — haftalik, undan uzun — oylik"""
+    kunlar = (date_to - date_from).days + 1
+    if kunlar <= KUNLIK_CHEGARA:
+        return KUNLIK
+    if kunlar <= HAFTALIK_CHEGARA:
+        return HAFTALIK
+    return OYLIK
+
+
+def _oy_raqami(d):
+    return d.year * 12 + d.month - 1
+
+
+class TrendOqi:
+    """Davrning zich vaqt o'qi: bo'laklar boshlari, indekslash va qatorlar"""
+
+    def __init__(self, date_from, date_to, davriylik=None):
+        self.davriylik = davriylik or davriylik_tanlash(date_from, date_to)
+        self.date_from = date_from
+        self.date_to   = date_to
+
+        if self.davriylik == KUNLIK:
+            self._bosh = date_from
+            self.soni  = max((date_to - date_from).days + 1, 0)
+        elif self.davriylik == HAFTALIK:
+            self._bosh = date_from - timedelta(days=date_from.weekday())
+            self.soni  = max((date_to - self._bosh).days // 7 + 1, 0)
+        elif self.davriylik == OYLIK:
+            self._bosh = _oy_raqami(date_from)
+            self.soni  = max(_oy_raqami(date_to) - self._bosh + 1, 0)
+        else:
+            raise ValueError(f"Noma'lum davriylik: {self.davriylik}")
+
+    def indeks(self, d):
+        """Sana → bo'lak indeksi (davrdan tashqarida bo'lsa None)"""
+        if isinstance(d, datetime):
+            d = d.date()
+        if d < self.date_from or d > self.date_to:
+            return None
+        if self.davriylik == KUNLIK:
+            return (d - self._bosh).days
+        if self.davriylik == HAFTALIK:
+            return (d - self._bosh).days // 7
+        return _oy_raqami(d) - self._bosh
+
+    def bosh_qator(self):
+        return array('d', bytes(8 * self.soni))
+
+    def qator(self, rows):
+        """(sana, qiymat) juftliklari → zich array('d'); bir bo'lakdagi qiymatlar qo'shiladi"""
+        natija = self.bosh_qator()
+        for sana, qiymat in rows:
+            i = self.indeks(sana)
+            if i is not None and qiymat:
+                natija[i] += float(qiymat)
+        return natija
+
+    def boshlar(self):
+        """Har bir bo'lakning boshlanish sanasi"""
+        if self.davriylik == KUNLIK:
+            return [self._bosh + timedelta(days=i) for i in range(self.soni)]
+        if self.davriylik == HAFTALIK:
+            return [self._bosh + timedelta(days=7 * i) for i in range(self.soni)]
+        return [date(n // 12, n % 12 + 1, 1) for n in range(self._bosh, self._bosh + self.soni)]
+
+    def labels(self):
+        if self.davriylik == OYLIK:
+            return [f"{OY[d.month]} {str(d.year)[2:]}" for d in self.boshlar()]
+        return [f"{d.day:02d}/{d.month:02d}" for d in self.boshlar()]
+
+
+def ayirma(a, b, yaxlit=0):
+    """Ikki qator farqi (masalan, foyda = kirim - chiqim)"""
+    return array('d', (round(x - y, yaxlit) for x, y in zip(a, b)))
+
+
+def jamlanma(a, yaxlit=0):
+    """Kumulyativ yig'indi qatori"""
+    natija = array('d', bytes(8 * len(a)))
+    s = 0.0
+    for i, x in enumerate(a):
+        s += x
+        natija[i] = round(s, yaxlit)
+    return natija
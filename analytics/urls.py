@@ -7,4 +7,5 @@ app_name = 'analytics'
 
 urlpatterns  = [
     path("",views.AnalyticsView.as_view(), name="analytics"),
+    path("blok/<slug:blok>/", views.AnalyticsBlokView.as_view(), name="analytics_blok"),
 ]
\ No newline at end of file
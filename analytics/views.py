@@ -1,16 +1,23 @@
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Sum, Count, F, Value
-from django.db.models.functions import TruncMonth, TruncDay, Coalesce
+from django.db.models import Sum, Count, F, Q, Min, DateTimeField
+from django.http import JsonResponse
+from django.urls import reverse
+from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from datetime import timedelta, date
-from decimal import Decimal
-from collections import OrderedDict
 import json
 
+from config.routers import FaqatOqishMixin
+
 import crm.models as crm
 import xomashyo.models as xom
 
+from . import kesh
+from .metrics import Metrika, davr, davr_metrikalari, holat_metrikalari, hisobla
+from .models import DailyKirimRollup, DailyChiqimRollup, DailySotuvRollup
+from .trend import OY, TrendOqi, ayirma
+
 
 # ── Helpers ────────────────────────────────────────────────────────────────
 
@@ -21,8 +28,6 @@ def j(val):
     return float(val)
 
 
-OY = ['', 'Yan', 'Fev', 'Mar', 'Apr', 'May', 'Iyn', 'Iyl', 'Avg', 'Sen', 'Okt', 'Noy', 'Dek']
-
 PRESET_CHOICES = [
     ('today',        'Bugun'),
     ('yesterday',    'Kecha'),
@@ -38,13 +43,8 @@ PRESET_CHOICES = [
     ('custom',       'Maxsus'),
 ]
 
-
-def monthly_map(qs, date_field='oy', val_field='jami'):
-    result = OrderedDict()
-    for row in qs:
-        mo = row[date_field]
-        result[f"{mo.year}-{mo.month:02d}"] = j(row[val_field])
-    return result
+SOTUV_HOLATLARI     = ('tolandi', 'qisman', 'tolanmadi')
+XOM_TOLOV_HOLATLARI = ('tolanmagan', 'qisman', 'toliq')
 
 
 def growth(current, prev):
@@ -126,13 +126,196 @@ def resolve_dates(preset, date_from_str, date_to_str, today):
     return df, dt, label
 
 
-class AnalyticsView(LoginRequiredMixin, TemplateView):
-    template_name = 'analytics/analytics.html'
+def _is_datetime(model, field_name):
+    """DateTimeField → __date__ lookup kerak; DateField → to'g'ridan-to'g'ri __gte / __lte"""
+    try:
+        return isinstance(model._meta.get_field(field_name), DateTimeField)
+    except Exception:
+        return False
+
+
+def _sotuv_davr(date_from, date_to):
+    return crm.Sotuv.objects.filter(davr('sana__date', date_from, date_to))
+
+
+# ── Chart bloklari (JSON) ──────────────────────────────────────────────────
+# Har bir blok (date_from, date_to) → JSON-ga tayyor dict qaytaradi.
+# Sahifa KPI kartalari bilan darhol chiziladi, bloklar esa parallel fetch qilinadi.
+
+def blok_trend(date_from, date_to):
+    """Kirim / Chiqim / Foyda trendi — zich kunlik / haftalik / oylik seriya"""
+    kirim_roll  = DailyKirimRollup.objects.filter(sana__gte=date_from, sana__lte=date_to)
+    chiqim_roll = DailyChiqimRollup.objects.filter(sana__gte=date_from, sana__lte=date_to)
+
+    # 'all_time' kabi davrlar 2000-yildan boshlanadi — birinchi yozuvdan oldingi
+    # bo'sh bo'laklarni chizmaslik uchun boshlanishni ma'lumot boshiga suramiz
+    birinchi = [
+        x for x in (
+            kirim_roll.aggregate(m=Min('sana'))['m'],
+            chiqim_roll.aggregate(m=Min('sana'))['m'],
+        ) if x
+    ]
+    if birinchi:
+        date_from = max(date_from, min(birinchi))
+
+    oq     = TrendOqi(date_from, date_to)
+    kirim  = oq.qator(kirim_roll.values_list('sana', 'summa'))
+    chiqim = oq.qator(chiqim_roll.values_list('sana', 'summa'))
+
+    return {
+        'davriylik' : oq.davriylik,
+        'labels'    : oq.labels(),
+        'kirim'     : kirim.tolist(),
+        'chiqim'    : chiqim.tolist(),
+        'foyda'     : ayirma(kirim, chiqim).tolist(),
+    }
+
+
+def blok_mahsulotlar(date_from, date_to):
+    """Top mahsulotlar — summa bo'yicha"""
+    top_mahsulotlar = (
+        crm.SotuvItem.objects
+        .filter(davr('sotuv__sana__date', date_from, date_to))
+        .values('mahsulot__nomi')
+        .annotate(jami_miqdor=Sum('miqdor'), jami_summa=Sum('jami'))
+        .order_by('-jami_summa')[:8]
+    )
+    rows = [
+        {'nomi': x['mahsulot__nomi'], 'jami_miqdor': x['jami_miqdor'] or 0, 'jami_summa': j(x['jami_summa'])}
+        for x in top_mahsulotlar
+    ]
+    return {
+        'labels' : [r['nomi'] for r in rows],
+        'vals'   : [r['jami_summa'] for r in rows],
+        'rows'   : rows,
+    }
+
+
+def blok_xaridorlar(date_from, date_to):
+    """Top xaridorlar va qarzli xaridorlar jadvallari"""
+    sq_period = _sotuv_davr(date_from, date_to)
+
+    top_xaridorlar = (
+        sq_period
+        .values('xaridor__id', 'xaridor__ism', 'xaridor__telefon')
+        .annotate(
+            jami_xarid=Sum('yakuniy_summa'),
+            jami_tolangan=Sum('tolangan_summa'),
+            sotuv_soni=Count('id'),
+        )
+        .order_by('-jami_xarid')[:8]
+    )
+
+    qarzli_xaridorlar = (
+        sq_period
+        .exclude(tolov_holati='tolandi')
+        .values('xaridor__id', 'xaridor__ism', 'xaridor__telefon')
+        .annotate(
+            umumiy_qarz=Sum(F('yakuniy_summa') - F('tolangan_summa')),
+            qarzli_sotuv_soni=Count('id'),
+        )
+        .filter(umumiy_qarz__gt=0)
+        .order_by('-umumiy_qarz')[:6]
+    )
+
+    def _xaridor(x):
+        return {
+            'id'      : x['xaridor__id'],
+            'ism'     : x['xaridor__ism'],
+            'telefon' : x['xaridor__telefon'] or '',
+            'url'     : reverse('main:xaridor_detail', args=[x['xaridor__id']]),
+        }
+
+    return {
+        'top': [
+            {
+                **_xaridor(x),
+                'sotuv_soni' : x['sotuv_soni'],
+                'jami_xarid' : j(x['jami_xarid']),
+                'qarz_bor'   : j(x['jami_tolangan']) < j(x['jami_xarid']),
+            }
+            for x in top_xaridorlar
+        ],
+        'qarzli': [
+            {
+                **_xaridor(x),
+                'sotuv_soni'  : x['qarzli_sotuv_soni'],
+                'umumiy_qarz' : j(x['umumiy_qarz']),
+            }
+            for x in qarzli_xaridorlar
+        ],
+    }
+
+
+def blok_xaridor_osish(date_from, date_to):
+    """Yangi xaridorlar — oylik"""
+    if _is_datetime(crm.Xaridor, 'created_at'):
+        _xaridor_filter = {'created_at__date__gte': date_from, 'created_at__date__lte': date_to}
+    else:
+        _xaridor_filter = {'created_at__gte': date_from, 'created_at__lte': date_to}
+
+    xaridor_monthly_qs = (
+        crm.Xaridor.objects
+        .filter(**_xaridor_filter)
+        .annotate(oy=TruncMonth('created_at'))
+        .values('oy').annotate(soni=Count('id')).order_by('oy')
+    )
+    xaridor_labels = []
+    xaridor_vals   = []
+    for r in xaridor_monthly_qs:
+        xaridor_labels.append(f"{OY[r['oy'].month]} {str(r['oy'].year)[2:]}")
+        xaridor_vals.append(r['soni'])
+    return {'labels': xaridor_labels, 'vals': xaridor_vals}
+
+
+def blok_chiqim_turlari(date_from, date_to):
+    """Chiqim kategoriyalar donut (kunlik yig'ma jadvaldan)"""
+    chiqim_cats = (
+        DailyChiqimRollup.objects
+        .filter(sana__gte=date_from, sana__lte=date_to)
+        .values('kategoriya__name')
+        .annotate(jami=Sum('summa'))
+        .order_by('-jami')[:6]
+    )
+    return {
+        'labels' : [x['kategoriya__name'] or 'Boshqa' for x in chiqim_cats],
+        'vals'   : [j(x['jami']) for x in chiqim_cats],
+    }
+
+
+def blok_xomashyo_kategoriya(date_from, date_to):
+    """Xomashyo kategoriyalari — joriy qoldiq, davrga bog'liq emas"""
+    xom_cat_qs = (
+        xom.Xomashyo.objects
+        .values('category__name')
+        .annotate(jami_miqdor=Sum('miqdori'), dona_soni=Count('id'))
+        .order_by('-dona_soni')[:6]
+    )
+    return {
+        'labels' : [x['category__name'] for x in xom_cat_qs],
+        'vals'   : [j(x['jami_miqdor']) for x in xom_cat_qs],
+    }
+
+
+BLOKLAR = {
+    'trend'               : blok_trend,
+    'mahsulotlar'         : blok_mahsulotlar,
+    'xaridorlar'          : blok_xaridorlar,
+    'xaridor-osish'       : blok_xaridor_osish,
+    'chiqim-turlari'      : blok_chiqim_turlari,
+    'xomashyo-kategoriya' : blok_xomashyo_kategoriya,
+}
+
+# Davrga bog'liq bo'lmagan (joriy qoldiq) bloklar keshlanmaydi
+KESHLANMAYDIGAN_BLOKLAR = {'xomashyo-kategoriya'}
+
+
+class AnalyticsRangeMixin(LoginRequiredMixin):
     login_url = 'account_login'
 
     # ── request parsing ────────────────────────────────────────
     def _get_range(self):
-        today = timezone.now().date()
+        today = timezone.localdate()
         preset = self.request.GET.get('preset', 'this_month')
         date_from_str = self.request.GET.get('date_from', '')
         date_to_str   = self.request.GET.get('date_to', '')
@@ -146,285 +329,144 @@ class AnalyticsView(LoginRequiredMixin, TemplateView):
         )
         return today, date_from, date_to, range_label, preset
 
+
+class AnalyticsView(FaqatOqishMixin, AnalyticsRangeMixin, TemplateView):
+    """KPI kartalari server tomonda; chartlar AnalyticsBlokView orqali yuklanadi"""
+    template_name = 'analytics/analytics.html'
+
     # ── main context ───────────────────────────────────────────
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         today, date_from, date_to, range_label, preset = self._get_range()
 
-        D0 = Value(Decimal('0'))
+        # Davr ko'rsatkichlari — (preset, date_from, date_to) bo'yicha keshdan
+        ctx.update(kesh.keshdan(
+            lambda: kesh.davr_kaliti(today, preset, date_from, date_to),
+            lambda: self._davr_konteksti(date_from, date_to),
+            kesh.davr_timeout(today, date_to),
+        ))
+
+        # Bugun / jami kartalari — faqat ma'lumot o'zgarganda qayta hisoblanadi
+        ctx.update(kesh.keshdan(
+            lambda: kesh.bugun_kaliti(today),
+            lambda: self._bugun_konteksti(today),
+            kesh.BUGUN_TIMEOUT,
+        ))
+
+        ctx.update({
+            # Filter state
+            'preset'          : preset,
+            'preset_choices'  : PRESET_CHOICES,
+            'date_from'       : date_from,
+            'date_to'         : date_to,
+            'date_from_str'   : date_from.isoformat(),
+            'date_to_str'     : date_to.isoformat(),
+            'range_label'     : range_label,
+
+            # Chart bloklari uchun so'rov parametrlari
+            'blok_qs'         : self.request.GET.urlencode(),
 
+            'today'       : today,
+        })
+        return ctx
+
+    def _bugun_konteksti(self, today):
+        """Bugungi va umumiy (barcha vaqt) kirim/chiqim — tanlangan davrga bog'liq emas"""
+        davrlar = {'bugun': (today, today), 'jami': (None, None)}
+        kirim_agg  = hisobla(DailyKirimRollup.objects.all(), davr_metrikalari('sana', 'summa', davrlar))
+        chiqim_agg = hisobla(DailyChiqimRollup.objects.all(), davr_metrikalari('sana', 'summa', davrlar))
+        return {
+            'kirim_bugun'  : kirim_agg['bugun'],
+            'kirim_jami'   : kirim_agg['jami'],
+            'chiqim_bugun' : chiqim_agg['bugun'],
+            'chiqim_jami'  : chiqim_agg['jami'],
+        }
+
+    def _davr_konteksti(self, date_from, date_to):
+        """
+        Tanlangan davr bo'yicha KPI kartalari.
+        Natija keshlanadi — shuning uchun querysetlar list() ga aylantiriladi.
+        """
         # Period length — taqqoslash uchun
         delta_days  = (date_to - date_from).days + 1
         prev_to     = date_from - timedelta(days=1)
         prev_from   = prev_to - timedelta(days=delta_days - 1)
 
-        # ── field type detection ─────────────────────────────────────
-        # DateTimeField → __date__ lookup kerak
-        # DateField     → to'g'ridan-to'g'ri __gte / __lte
-        from django.db.models import DateTimeField as DTF
-
-        def _is_datetime(model, field_name):
-            try:
-                return isinstance(model._meta.get_field(field_name), DTF)
-            except Exception:
-                return False
-
-        # ── 1. KIRIMLAR ─────────────────────────────────────────────
-        kq = crm.Kirim.objects.all()
-
-        # Kirim.sana — DateTimeField yoki DateField?
-        if _is_datetime(crm.Kirim, 'sana'):
-            kirim_period  = kq.filter(sana__date__gte=date_from, sana__date__lte=date_to)
-            kirim_prev_qs = kq.filter(sana__date__gte=prev_from, sana__date__lte=prev_to)
-            kirim_bugun   = kq.filter(sana__date=today).aggregate(s=Coalesce(Sum('summa'), D0))['s']
-        else:
-            kirim_period  = kq.filter(sana__gte=date_from, sana__lte=date_to)
-            kirim_prev_qs = kq.filter(sana__gte=prev_from, sana__lte=prev_to)
-            kirim_bugun   = kq.filter(sana=today).aggregate(s=Coalesce(Sum('summa'), D0))['s']
-
-        kirim_summa   = kirim_period.aggregate(s=Coalesce(Sum('summa'), D0))['s']
-        kirim_usd     = kirim_period.aggregate(s=Coalesce(Sum('summa_usd'), D0))['s']
-        kirim_prev    = kirim_prev_qs.aggregate(s=Coalesce(Sum('summa'), D0))['s']
-        kirim_jami    = kq.aggregate(s=Coalesce(Sum('summa'), D0))['s']
-
-        # ── 2. SOTUVLAR ─────────────────────────────────────────────
-        sq = crm.Sotuv.objects.all()
-
-        # Sotuv date field nomini aniqlash
-        _sotuv_date_field = None
-        for _fn in ('sana', 'created_at', 'created', 'date'):
-            try:
-                crm.Sotuv._meta.get_field(_fn)
-                _sotuv_date_field = _fn
-                break
-            except Exception:
-                pass
-
-        if _sotuv_date_field and _is_datetime(crm.Sotuv, _sotuv_date_field):
-            sq_period = sq.filter(**{
-                f'{_sotuv_date_field}__date__gte': date_from,
-                f'{_sotuv_date_field}__date__lte': date_to,
-            })
-        elif _sotuv_date_field:
-            sq_period = sq.filter(**{
-                f'{_sotuv_date_field}__gte': date_from,
-                f'{_sotuv_date_field}__lte': date_to,
-            })
-        else:
-            sq_period = sq
-
-        sotuv_jami_summa = sq_period.aggregate(s=Coalesce(Sum('yakuniy_summa'), D0))['s']
-        sotuv_tolangan   = sq_period.aggregate(s=Coalesce(Sum('tolangan_summa'), D0))['s']
-        sotuv_qarz       = j(sotuv_jami_summa) - j(sotuv_tolangan)
-        sotuv_holat = {
-            'tolandi'   : sq_period.filter(tolov_holati='tolandi').count(),
-            'qisman'    : sq_period.filter(tolov_holati='qisman').count(),
-            'tolanmadi' : sq_period.filter(tolov_holati='tolanmadi').count(),
+        # Har bir model uchun davr / oldingi davr — bitta aggregate()
+        davrlar = {
+            'davr'  : (date_from, date_to),
+            'prev'  : (prev_from, prev_to),
         }
 
-        # ── 3. CHIQIMLAR ────────────────────────────────────────────
-        cq = crm.Chiqim.objects.all()
-
-        # Chiqim date field: 'created' DateField yoki DateTimeField?
-        _chiqim_dt = _is_datetime(crm.Chiqim, 'created')
-        if _chiqim_dt:
-            chiqim_period  = cq.filter(created__date__gte=date_from, created__date__lte=date_to)
-            chiqim_prev_qs = cq.filter(created__date__gte=prev_from, created__date__lte=prev_to)
-            chiqim_bugun   = cq.filter(created__date=today).aggregate(s=Coalesce(Sum('price'), D0))['s']
-            _chiqim_item_filter = {'chiqim__created__date__gte': date_from, 'chiqim__created__date__lte': date_to}
-        else:
-            chiqim_period  = cq.filter(created__gte=date_from, created__lte=date_to)
-            chiqim_prev_qs = cq.filter(created__gte=prev_from, created__lte=prev_to)
-            chiqim_bugun   = cq.filter(created=today).aggregate(s=Coalesce(Sum('price'), D0))['s']
-            _chiqim_item_filter = {'chiqim__created__gte': date_from, 'chiqim__created__lte': date_to}
-
-        chiqim_summa  = chiqim_period.aggregate(s=Coalesce(Sum('price'), D0))['s']
-        chiqim_prev   = chiqim_prev_qs.aggregate(s=Coalesce(Sum('price'), D0))['s']
-        chiqim_jami   = cq.aggregate(s=Coalesce(Sum('price'), D0))['s']
-
-        # Chiqim kategoriyalar donut
-        chiqim_cats = (
-            crm.ChiqimItem.objects
-            .filter(**_chiqim_item_filter)
-            .values('chiqim__category__name')
-            .annotate(jami=Sum('price_uzs'))
-            .order_by('-jami')[:6]
+        # ── 1. KIRIMLAR (kunlik yig'ma jadvaldan) ───────────────────
+        kirim_agg = hisobla(DailyKirimRollup.objects.all(), [
+            *davr_metrikalari('sana', 'summa', davrlar),
+            Metrika('usd', 'summa_usd', davr('sana', date_from, date_to)),
+        ])
+        kirim_summa   = kirim_agg['davr']
+        kirim_usd     = kirim_agg['usd']
+        kirim_prev    = kirim_agg['prev']
+
+        # ── 2. SOTUVLAR (kunlik yig'ma jadvaldan) ───────────────────
+        sotuv_agg = hisobla(
+            DailySotuvRollup.objects.filter(davr('sana', date_from, date_to)),
+            [
+                Metrika('yakuniy', 'yakuniy_summa'),
+                Metrika('tolangan', 'tolangan_summa'),
+                *holat_metrikalari(SOTUV_HOLATLARI, qiymat='soni', tur='sum'),
+            ],
         )
-        chiqim_tur_labels = [x['chiqim__category__name'] or 'Boshqa' for x in chiqim_cats]
-        chiqim_tur_vals   = [j(x['jami']) for x in chiqim_cats]
-
-        # ── 4. XOMASHYO KIRIM ───────────────────────────────────────
-        hq = xom.XomashyoHarakat.objects.filter(harakat_turi='kirim')
+        sotuv_jami_summa = sotuv_agg['yakuniy']
+        sotuv_tolangan   = sotuv_agg['tolangan']
+        sotuv_qarz       = j(sotuv_jami_summa) - j(sotuv_tolangan)
+        sotuv_holat      = {h: int(sotuv_agg[h]) for h in SOTUV_HOLATLARI}
 
-        _xom_dt = _is_datetime(xom.XomashyoHarakat, 'sana')
-        if _xom_dt:
-            hq_period  = hq.filter(sana__date__gte=date_from, sana__date__lte=date_to)
-            _xom_qarz_filter = {'harakat_turi': 'kirim', 'sana__date__gte': date_from, 'sana__date__lte': date_to}
-        else:
-            hq_period  = hq.filter(sana__gte=date_from, sana__lte=date_to)
-            _xom_qarz_filter = {'harakat_turi': 'kirim', 'sana__gte': date_from, 'sana__lte': date_to}
+        # ── 3. CHIQIMLAR (kunlik yig'ma jadvaldan) ──────────────────
+        chiqim_agg = hisobla(DailyChiqimRollup.objects.all(), davr_metrikalari('sana', 'summa', davrlar))
+        chiqim_summa  = chiqim_agg['davr']
+        chiqim_prev   = chiqim_agg['prev']
 
-        xom_kirim_uzs = hq_period.aggregate(s=Coalesce(Sum('jami_narx_uzs'), D0))['s']
-        xom_tolangan  = hq_period.aggregate(s=Coalesce(Sum('tolangan_uzs'),  D0))['s']
+        # ── 4. XOMASHYO KIRIM ───────────────────────────────────────
+        _xom_sana = 'sana__date' if _is_datetime(xom.XomashyoHarakat, 'sana') else 'sana'
+        _xom_davr = Q(harakat_turi='kirim') & davr(_xom_sana, date_from, date_to)
+
+        xom_agg = hisobla(
+            xom.XomashyoHarakat.objects.filter(_xom_davr),
+            [
+                Metrika('uzs', 'jami_narx_uzs'),
+                Metrika('usd', 'jami_narx_usd'),
+                Metrika('tolangan', 'tolangan_uzs'),
+                *holat_metrikalari(XOM_TOLOV_HOLATLARI),
+            ],
+        )
+        xom_kirim_uzs = xom_agg['uzs']
+        xom_tolangan  = xom_agg['tolangan']
         xom_qarz      = j(xom_kirim_uzs) - j(xom_tolangan)
-        xom_kirim_usd = hq_period.aggregate(s=Coalesce(Sum('jami_narx_usd'), D0))['s']
-        xom_tolov_holat = {
-            'tolanmagan' : hq_period.filter(tolov_holati='tolanmagan').count(),
-            'qisman'     : hq_period.filter(tolov_holati='qisman').count(),
-            'toliq'      : hq_period.filter(tolov_holati='toliq').count(),
-        }
+        xom_kirim_usd = xom_agg['usd']
+        xom_tolov_holat = {h: xom_agg[h] for h in XOM_TOLOV_HOLATLARI}
 
         # ── 5. NET FOYDA ────────────────────────────────────────────
         net_foyda     = j(kirim_summa) - j(chiqim_summa)
         net_foyda_prev = j(kirim_prev) - j(chiqim_prev)
 
-        # ── 6. TREND CHART (period ichida oylik yoki kunlik) ─────────
-        # 90 kundan ko'p bo'lsa → oylik; kamroq bo'lsa → kunlik
-        use_monthly_trend = delta_days > 90
-
-        if use_monthly_trend:
-            kirim_monthly = monthly_map(
-                kirim_period
-                  .annotate(oy=TruncMonth('sana'))
-                  .values('oy').annotate(jami=Sum('summa')).order_by('oy')
-            )
-            chiqim_monthly = monthly_map(
-                chiqim_period
-                  .annotate(oy=TruncMonth('created'))
-                  .values('oy').annotate(jami=Sum('price')).order_by('oy')
-            )
-            all_months = sorted(set(list(kirim_monthly.keys()) + list(chiqim_monthly.keys())))
-            trend_labels, trend_kirim, trend_chiqim, trend_foyda = [], [], [], []
-            for m in all_months:
-                y, mo = int(m[:4]), int(m[5:])
-                trend_labels.append(f"{OY[mo]} {str(y)[2:]}")
-                k = kirim_monthly.get(m, 0)
-                c = chiqim_monthly.get(m, 0)
-                trend_kirim.append(k)
-                trend_chiqim.append(c)
-                trend_foyda.append(round(k - c, 0))
-        else:
-            # Kunlik
-            kirim_daily_qs = (
-                kirim_period
-                  .annotate(kun=TruncDay('sana'))
-                  .values('kun').annotate(jami=Sum('summa')).order_by('kun')
-            )
-            chiqim_daily_qs = (
-                chiqim_period
-                  .annotate(kun=TruncDay('created'))
-                  .values('kun').annotate(jami=Sum('price')).order_by('kun')
-            )
-            kirim_d  = {r['kun'].strftime('%Y-%m-%d'): j(r['jami']) for r in kirim_daily_qs}
-            chiqim_d = {r['kun'].strftime('%Y-%m-%d'): j(r['jami']) for r in chiqim_daily_qs}
-            all_days = sorted(set(list(kirim_d.keys()) + list(chiqim_d.keys())))
-            trend_labels, trend_kirim, trend_chiqim, trend_foyda = [], [], [], []
-            for d_str in all_days:
-                d_obj = date.fromisoformat(d_str)
-                trend_labels.append(d_obj.strftime('%d/%m'))
-                k = kirim_d.get(d_str, 0)
-                c = chiqim_d.get(d_str, 0)
-                trend_kirim.append(k)
-                trend_chiqim.append(c)
-                trend_foyda.append(round(k - c, 0))
-
-        # ── 7. TOP MAHSULOTLAR ──────────────────────────────────────
-        top_mahsulotlar = (
-            crm.SotuvItem.objects
-            .filter(sotuv__in=sq_period)
-            .values('mahsulot__nomi')
-            .annotate(jami_miqdor=Sum('miqdor'), jami_summa=Sum('jami'))
-            .order_by('-jami_summa')[:8]
-        )
-        mahsulot_labels = [x['mahsulot__nomi'] for x in top_mahsulotlar]
-        mahsulot_vals   = [j(x['jami_summa']) for x in top_mahsulotlar]
-
-        # ── 8. TOP XARIDORLAR ───────────────────────────────────────
-        top_xaridorlar = (
-            sq_period
-            .values('xaridor__id', 'xaridor__ism', 'xaridor__telefon')
-            .annotate(
-                jami_xarid=Sum('yakuniy_summa'),
-                jami_tolangan=Sum('tolangan_summa'),
-                sotuv_soni=Count('id'),
-            )
-            .order_by('-jami_xarid')[:8]
-        )
-
-        # ── 9. QARZLI XARIDORLAR ────────────────────────────────────
-        qarzli_xaridorlar = (
-            sq_period
-            .exclude(tolov_holati='tolandi')
-            .values('xaridor__id', 'xaridor__ism', 'xaridor__telefon')
-            .annotate(
-                umumiy_qarz=Sum(F('yakuniy_summa') - F('tolangan_summa')),
-                qarzli_sotuv_soni=Count('id'),
-            )
-            .filter(umumiy_qarz__gt=0)
-            .order_by('-umumiy_qarz')[:6]
-        )
-
-        # ── 10. XOMASHYO TO'LANMAGAN ─────────────────────────────────
+        # ── 6. XOMASHYO TO'LANMAGAN ─────────────────────────────────
         xom_qarzlar = (
             xom.XomashyoHarakat.objects
-            .filter(**_xom_qarz_filter)
+            .filter(_xom_davr)
             .exclude(tolov_holati__in=['toliq', 'kerak_emas'])
             .select_related('xomashyo', 'yetkazib_beruvchi')
             .order_by('-sana')[:8]
         )
 
-        # ── 11. XOMASHYO KATEGORIYA ──────────────────────────────────
-        xom_cat_qs = (
-            xom.Xomashyo.objects
-            .values('category__name')
-            .annotate(jami_miqdor=Sum('miqdori'), dona_soni=Count('id'))
-            .order_by('-dona_soni')[:6]
-        )
-        xom_cat_labels = [x['category__name'] for x in xom_cat_qs]
-        xom_cat_vals   = [j(x['jami_miqdor']) for x in xom_cat_qs]
-
-        # ── 12. XARIDOR O'SISH ───────────────────────────────────────
-        _xaridor_dt = _is_datetime(crm.Xaridor, 'created_at')
-        if _xaridor_dt:
-            _xaridor_filter = {'created_at__date__gte': date_from, 'created_at__date__lte': date_to}
-        else:
-            _xaridor_filter = {'created_at__gte': date_from, 'created_at__lte': date_to}
-
-        xaridor_monthly_qs = (
-            crm.Xaridor.objects
-            .filter(**_xaridor_filter)
-            .annotate(oy=TruncMonth('created_at'))
-            .values('oy').annotate(soni=Count('id')).order_by('oy')
-        )
-        xaridor_labels = []
-        xaridor_vals   = []
-        for r in xaridor_monthly_qs:
-            xaridor_labels.append(f"{OY[r['oy'].month]} {str(r['oy'].year)[2:]}")
-            xaridor_vals.append(r['soni'])
-
         # ── Context ─────────────────────────────────────────────────
-        ctx.update({
-            # Filter state
-            'preset'          : preset,
-            'preset_choices'  : PRESET_CHOICES,
-            'date_from'       : date_from,
-            'date_to'         : date_to,
-            'date_from_str'   : date_from.isoformat(),
-            'date_to_str'     : date_to.isoformat(),
-            'range_label'     : range_label,
-            'use_monthly_trend': use_monthly_trend,
-
+        return {
             # Kartalar — kirim
             'kirim_summa'    : kirim_summa,
-            'kirim_bugun'    : kirim_bugun,
-            'kirim_jami'     : kirim_jami,
             'kirim_usd'      : kirim_usd,
             'kirim_osish'    : growth(kirim_summa, kirim_prev),
 
             # Kartalar — chiqim
             'chiqim_summa'   : chiqim_summa,
-            'chiqim_bugun'   : chiqim_bugun,
-            'chiqim_jami'    : chiqim_jami,
             'chiqim_osish'   : growth(chiqim_summa, chiqim_prev),
 
             # Foyda
@@ -436,6 +478,7 @@ class AnalyticsView(LoginRequiredMixin, TemplateView):
             'sotuv_tolangan'   : sotuv_tolangan,
             'sotuv_qarz'       : sotuv_qarz,
             'sotuv_holat'      : sotuv_holat,
+            'sotuv_holat_json' : json.dumps(sotuv_holat),
 
             # Xomashyo
             'xom_kirim_uzs'   : xom_kirim_uzs,
@@ -443,29 +486,30 @@ class AnalyticsView(LoginRequiredMixin, TemplateView):
             'xom_tolangan'    : xom_tolangan,
             'xom_qarz'        : xom_qarz,
             'xom_tolov_holat' : xom_tolov_holat,
-            'xom_cat_qs'      : xom_cat_qs,
-
-            # Jadvallar
-            'top_xaridorlar'    : top_xaridorlar,
-            'top_mahsulotlar'   : top_mahsulotlar,
-            'qarzli_xaridorlar' : qarzli_xaridorlar,
-            'xom_qarzlar'       : xom_qarzlar,
-
-            # JSON — chartlar
-            'trend_labels'      : json.dumps(trend_labels),
-            'trend_kirim'       : json.dumps(trend_kirim),
-            'trend_chiqim'      : json.dumps(trend_chiqim),
-            'trend_foyda'       : json.dumps(trend_foyda),
-            'mahsulot_labels'   : json.dumps(mahsulot_labels),
-            'mahsulot_vals'     : json.dumps(mahsulot_vals),
-            'xom_cat_labels'    : json.dumps(xom_cat_labels),
-            'xom_cat_vals'      : json.dumps(xom_cat_vals),
-            'chiqim_tur_labels' : json.dumps(chiqim_tur_labels),
-            'chiqim_tur_vals'   : json.dumps(chiqim_tur_vals),
-            'xaridor_labels'    : json.dumps(xaridor_labels),
-            'xaridor_vals'      : json.dumps(xaridor_vals),
-            'sotuv_holat_json'  : json.dumps(sotuv_holat),
+            'xom_qarzlar'     : list(xom_qarzlar),
+        }
 
-            'today'       : today,
-        })
-        return ctx
\ No newline at end of file
+
+class AnalyticsBlokView(FaqatOqishMixin, AnalyticsRangeMixin, View):
+    """
+    Bitta chart bloki uchun JSON: /analytics/blok/<blok>/?preset=...
+    Davr parametrlari AnalyticsView bilan bir xil; natija blok nomi bilan keshlanadi.
+    """
+
+    def get(self, request, blok):
+        hisobla_blok = BLOKLAR.get(blok)
+        if hisobla_blok is None:
+            return JsonResponse({'success': False, 'message': f"Noma'lum blok: {blok}"}, status=404)
+
+        today, date_from, date_to, range_label, preset = self._get_range()
+
+        if blok in KESHLANMAYDIGAN_BLOKLAR:
+            data = hisobla_blok(date_from, date_to)
+        else:
+            data = kesh.keshdan(
+                lambda: kesh.davr_kaliti(today, preset, date_from, date_to, blok=blok),
+                lambda: hisobla_blok(date_from, date_to),
+                kesh.davr_timeout(today, date_to),
+            )
+
+        return JsonResponse({'success': True, 'blok': blok, **data})
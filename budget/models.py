@@ -62,6 +62,51 @@ class Tranzaksiya(models.Model):
     def __str__(self):
         return f"{self.sana} | {self.nomi} | {self.summa_uzs:,.0f} so'm"
 
+    @staticmethod
+    def chiqim_maydonlari(instance, ishchi=None, foydalanuvchi=None):
+        """
+        Chiqim → Tranzaksiya maydonlari (chiqim'dan tashqari). Yagona xarita:
+        budget/signals.py (save) va bulk_create qiluvchilar (oylik yopish, demo)
+        shu yerdan oladi. ishchi / foydalanuvchi — chiqimda bo'lmasa, tashqaridan.
+        """
+        # Kategoriya nomini olish (agar mavjud bo'lsa)
+        kategoriya = ''
+        if getattr(instance, 'category', None):
+            kategoriya = str(instance.category)
+        elif getattr(instance, 'tur', None):
+            kategoriya = str(instance.tur)
+
+        # Summa — modelga qarab field nomi
+        summa_uzs = (
+            getattr(instance, 'summa', None) or getattr(instance, 'summa_uzs', None)
+            or getattr(instance, 'price', None) or getattr(instance, 'price_uzs', None) or 0
+        )
+        summa_usd = getattr(instance, 'summa_usd', None) or getattr(instance, 'price_usd', None)
+
+        # Sana
+        sana = getattr(instance, 'sana', None) or getattr(instance, 'created_at', None) or getattr(instance, 'created', None)
+        if hasattr(sana, 'date'):
+            sana = sana.date()
+
+        # Nomi/tavsif
+        nomi = (
+            getattr(instance, 'nomi', None)
+            or getattr(instance, 'tavsif', None)
+            or getattr(instance, 'izoh', None)
+            or str(instance)
+        )
+
+        return dict(
+            manba='chiqim',
+            ishchi=ishchi or getattr(instance, 'ishchi', None),
+            foydalanuvchi=foydalanuvchi or getattr(instance, 'yaratgan', None) or getattr(instance, 'foydalanuvchi', None),
+            summa_uzs=summa_uzs,
+            summa_usd=summa_usd,
+            nomi=nomi[:500],
+            kategoriya=kategoriya[:200],
+            sana=sana,
+        )
+
 
 class Byudjet(models.Model):
     """
@@ -21,47 +21,9 @@ def chiqim_tranzaksiya_sync(sender, instance, created, **kwargs):
     """
     from .models import Tranzaksiya
 
-    # Kategoriya nomini olish (agar mavjud bo'lsa)
-    kategoriya = ''
-    if hasattr(instance, 'category') and instance.category:
-        kategoriya = str(instance.category)
-    elif hasattr(instance, 'tur') and instance.tur:
-        kategoriya = str(instance.tur)
-
-    # Ishchi (agar mavjud bo'lsa)
-    ishchi = getattr(instance, 'ishchi', None)
-
-    # Summa — modelingizga qarab field nomini to'g'rilang
-    summa_uzs = getattr(instance, 'summa', None) or getattr(instance, 'summa_uzs', 0) or getattr(instance,'price',None) or getattr(instance,'price_uzs')
-    summa_usd = getattr(instance, 'summa_usd', None) or getattr(instance,'price_usd',None) or getattr(instance,'price_usd')
-
-    # Sana
-    sana = getattr(instance, 'sana', None) or getattr(instance, 'created_at', None) or getattr(instance,'created',None)
-    if hasattr(sana, 'date'):
-        sana = sana.date()
-
-    # Nomi/tavsif
-    nomi = (
-        getattr(instance, 'nomi', None)
-        or getattr(instance, 'tavsif', None)
-        or getattr(instance, 'izoh', None)
-        or str(instance)
-    )
-
-    defaults = dict(
-        manba='chiqim',
-        ishchi=ishchi,
-        foydalanuvchi=getattr(instance, 'yaratgan', None) or getattr(instance, 'foydalanuvchi', None),
-        summa_uzs=summa_uzs,
-        summa_usd=summa_usd,
-        nomi=nomi[:500],
-        kategoriya=kategoriya[:200],
-        sana=sana,
-    )
-
     Tranzaksiya.objects.update_or_create(
         chiqim=instance,
-        defaults=defaults,
+        defaults=Tranzaksiya.chiqim_maydonlari(instance),
     )
 
 
@@ -6,13 +6,14 @@ from django.shortcuts import get_object_or_404, redirect
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Sum, Q
-from django.db.models.functions import TruncDay
 from decimal import Decimal
-from datetime import timedelta
+from array import array
 import json
 
 from .models import Byudjet, ByudjetLimit, Tranzaksiya
 import crm.models as crm
+from analytics.trend import KUNLIK, TrendOqi, jamlanma
+from config.routers import FaqatOqishMixin
 
 
 def _j(v):
@@ -41,7 +42,7 @@ class ByudjetListView(LoginRequiredMixin, ListView):
 
 
 # ── Detail ────────────────────────────────────────────────────────
-class ByudjetDetailView(LoginRequiredMixin, DetailView):
+class ByudjetDetailView(FaqatOqishMixin, LoginRequiredMixin, DetailView):
     model = Byudjet
     template_name = 'budget/detail.html'
     context_object_name = 'b'
@@ -73,36 +74,17 @@ class ByudjetDetailView(LoginRequiredMixin, DetailView):
             if b.umumiy_summa > 0 else 0.0
         )
 
-        # ── Kunlik trend ─────────────────────────────────────────
-        daily_qs = (
-            tranz_qs
-            .annotate(kun=TruncDay('sana'))
-            .values('kun', 'manba')
-            .annotate(s=Sum('summa_uzs'))
-            .order_by('kun', 'manba')
-        )
+        # ── Kunlik trend (zich, bo'sh kunlar 0) ──────────────────
+        oq = TrendOqi(b.davr_boshi, min(b.davr_oxiri, today), davriylik=KUNLIK)
+        kun_manba = tranz_qs.values_list('sana', 'manba').annotate(s=Sum('summa_uzs')).order_by()
+        kun_manba = list(kun_manba)
+        c_arr = oq.qator((sana, s) for sana, manba, s in kun_manba if manba == 'chiqim')
+        x_arr = oq.qator((sana, s) for sana, manba, s in kun_manba if manba != 'chiqim')
 
-        ck, xk = {}, {}
-        for r in daily_qs:
-            d = r['kun'].date() if hasattr(r['kun'], 'date') else r['kun']
-            if r['manba'] == 'chiqim':
-                ck[d] = _j(r['s'])
-            else:
-                xk[d] = _j(r['s'])
-
-        labels, c_vals, x_vals, cum_vals = [], [], [], []
-        cum = 0.0
-        cur = b.davr_boshi
-        end = min(b.davr_oxiri, today)
-        while cur <= end:
-            c = ck.get(cur, 0.0)
-            x = xk.get(cur, 0.0)
-            cum += c + x
-            labels.append(cur.strftime('%d/%m'))
-            c_vals.append(c)
-            x_vals.append(x)
-            cum_vals.append(round(cum, 0))
-            cur += timedelta(days=1)
+        labels   = oq.labels()
+        c_vals   = c_arr.tolist()
+        x_vals   = x_arr.tolist()
+        cum_vals = jamlanma(array('d', (c + x for c, x in zip(c_arr, x_arr)))).tolist()
 
         # ── Kategoriya breakdown ──────────────────────────────────
         cats = list(b.sarflar_by_kategoriya())
@@ -115,18 +97,29 @@ class ByudjetDetailView(LoginRequiredMixin, DetailView):
         ishchi_sarflar = list(b.sarflar_by_ishchi())
 
         # ── Limitlar — N+1 muammosiz ─────────────────────────────
-        # Limit uchun barcha tranzaksiyalarni bitta query bilan olamiz,
-        # keyin Python'da filter qilamiz (limit soni ko'p bo'lmaydi)
-        limitlar_raw = list(b.limitlar.all())
+        # (manba, kategoriya) bo'yicha yig'indilar bitta query bilan olinadi,
+        # har bir limit sarfi shu jadvaldan Python'da yig'iladi
+        guruhlar = list(
+            tranz_qs.values_list('manba', 'kategoriya')
+            .annotate(s=Sum('summa_uzs')).order_by()
+        )
         limitlar_data = []
-        for lim in limitlar_raw:
-            sarfi  = lim.haqiqiy_sarfi   # har biri bitta query — limit soni ko'p bo'lmaydi
-            foiz   = lim.foiz
+        for lim in b.limitlar.all():
+            sarfi = sum(
+                (s or Decimal('0') for manba, kategoriya, s in guruhlar
+                 if (not lim.manba or manba == lim.manba)
+                 and (not lim.kategoriya or kategoriya == lim.kategoriya)),
+                Decimal('0'),
+            )
+            foiz = (
+                min(round(float(sarfi / lim.limit_summa * 100), 1), 100)
+                if lim.limit_summa > 0 else 0.0
+            )
             limitlar_data.append({
                 'obj'   : lim,
                 'sarfi' : sarfi,
                 'foiz'  : foiz,
-                'holat' : lim.holat,
+                'holat' : _holat(foiz),
                 'qoldiq': max(lim.limit_summa - sarfi, Decimal('0')),
             })
 
@@ -235,7 +228,7 @@ def limit_ochirish(request, pk):
 
 
 # ── Tranzaksiya ro'yxati (filter bilan) ──────────────────────────
-class TranzaksiyaListView(LoginRequiredMixin, ListView):
+class TranzaksiyaListView(FaqatOqishMixin, LoginRequiredMixin, ListView):
     model = Tranzaksiya
     template_name = 'budget/tranzaksiyalar.html'
     context_object_name = 'tranzaksiyalar'
@@ -5,10 +5,11 @@ views.py ga qo'shish kerak bo'lgan kod:
 
 import io
 from decimal import Decimal
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.decorators import login_required
 from django.http import HttpResponse, HttpResponseBadRequest
 from django.views import View
 from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django.db.models import Sum
 
 from reportlab.lib.pagesizes import A4
@@ -26,6 +27,8 @@ from datetime import date, datetime
 
 # models import — o'z loyihangizga moslang
 from crm import models as m
+from crm.asinxron import pdf_tayyorlash
+from config.routers import FaqatOqishMixin
 
 def mkstyle(name, **kw):
     return ParagraphStyle(name, **kw)
@@ -52,16 +55,20 @@ def format_sum(val):
         return "0"
 
 
-class XaridorUmumiyChekView(LoginRequiredMixin, View):
+class XaridorUmumiyChekView(FaqatOqishMixin, View):
     """
     Xaridor sahifasidan tanlangan sotuvlar bo'yicha umumiy PDF chek.
 
     URL: /xaridorlar/<pk>/umumiy-chek/
     POST params: sotuv_ids = "1,2,3"  (vergul bilan ajratilgan)
+    Async: so'rovlar va render PDF pool'ida (crm/asinxron.py).
     """
-    login_url = 'account_login'
 
-    def post(self, request, pk):
+    @method_decorator(login_required(login_url='account_login'))
+    async def post(self, request, pk):
+        return await pdf_tayyorlash(self._chek, request, pk)
+
+    def _chek(self, request, pk):
         xaridor = get_object_or_404(m.Xaridor, pk=pk)
 
         # Tanlangan sotuv IDlarini olish
@@ -456,10 +463,14 @@ class XaridorUmumiyChekView(LoginRequiredMixin, View):
         doc.build(story)
         return buffer
     
-class IshchiChekView(LoginRequiredMixin, View):
-    login_url = 'account_login'
- 
-    def get(self, request, pk):
+class IshchiChekView(FaqatOqishMixin, View):
+    """Ishchi cheki (PDF) — async, render PDF pool'ida (crm/asinxron.py)"""
+
+    @method_decorator(login_required(login_url='account_login'))
+    async def get(self, request, pk):
+        return await pdf_tayyorlash(self._chek, request, pk)
+
+    def _chek(self, request, pk):
         ishchi = get_object_or_404(m.Ishchi, pk=pk)
  
         ishlar   = list(ishchi.ishlar.filter(status='yangi')
@@ -0,0 +1,60 @@
+# config/gunicorn.conf.py
+"""
+Production runtime:  gunicorn -c config/gunicorn.conf.py
+
+GUNICORN_WORKER_CLASS:
+  gthread (default) — WSGI (config.wsgi), har worker'da GUNICORN_THREADS oqim.
+  uvicorn           — ASGI (config.asgi), uvicorn.workers.UvicornWorker. Async
+                      view'lar uchun; sync view'lar ASGI'da worker boshiga bitta
+                      oqimda ketma-ket ishlaydi, shuning uchun default — gthread.
+
+Worker soni: GUNICORN_WORKERS, default 2. SQLite profilida yozishlar baribir
+ketma-ket — 2-4 worker yetarli, qolgani qulf kutadi; parallellik worker ichidagi
+oqimlardan (GUNICORN_THREADS) keladi.
+
+Har worker alohida jarayon — jarayon ichidagi keshlar (USD kursi, ishbay narx
+matritsasi) worker'lar o'rtasida bo'lishilmaydi; ularning versiyasi CACHES['default']
+da. Default fayl keshi (BASE_DIR/.kesh) bitta serverdagi worker'lar uchun umumiy;
+bir nechta serverda Redis bering:
+    CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+    CACHE_LOCATION=redis://redis:6379/1
+LocMemCache berilsa analytics keshi o'chadi (analytics.W001).
+
+preload_app: Django va ilovalar master'da bir marta yuklanadi, worker'lar
+fork bilan xotirani copy-on-write bo'lishadi. Preload bilan HUP kodni qayta
+yuklamaydi — yangi kodga graceful o'tish:
+    kill -USR2 <master>     # yangi master + yangi worker'lar
+    kill -WINCH <eski>      # eski worker'lar joriy request'ni tugatib chiqadi
+    kill -QUIT <eski>
+"""
+import os
+
+from decouple import config
+
+_ASGI = config('GUNICORN_WORKER_CLASS', default='gthread') == 'uvicorn'
+
+wsgi_app            = 'config.asgi:application' if _ASGI else 'config.wsgi:application'
+worker_class        = 'uvicorn.workers.UvicornWorker' if _ASGI else 'gthread'
+bind                = config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers             = config('GUNICORN_WORKERS', default=2, cast=int)
+threads             = config('GUNICORN_THREADS', default=4, cast=int)
+preload_app         = config('GUNICORN_PRELOAD', default=True, cast=bool)
+timeout             = config('GUNICORN_TIMEOUT', default=60, cast=int)
+graceful_timeout    = 30
+keepalive           = 5
+
+# Xotira sizib chiqishidan himoya: har worker N request'dan keyin almashtiriladi
+max_requests        = config('GUNICORN_MAX_REQUESTS', default=2000, cast=int)
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog  = '-'
+
+# Heartbeat fayli xotirada (Docker overlayfs'da disk sekin)
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def post_fork(server, worker):
+    # preload paytida ochilgan DB ulanishlari worker'lar o'rtasida bo'lishilmasin
+    from django.db import connections
+    connections.close_all()
@@ -0,0 +1,117 @@
+# config/routers.py
+"""
+Replika router'i (settings: DB_REPLIKA_HOST yoki DB_SNAPSHOT_PATH, REPLIKA_ILOVALAR).
+
+'replika' alias — PostgreSQL replikasi yoki bitta serverli o'rnatishda
+davriy yangilanadigan SQLite nusxa (manage.py snapshot_yangilash).
+
+O'qish ikki yo'l bilan replikaga ketadi:
+
+  * REPLIKA_ILOVALAR modellari — har doim (kunlik yig'ma jadvallar: ularni
+    faqat hisobot o'qiydi, yozishdan oldin hech kim o'qimaydi);
+  * faqat_oqish / FaqatOqishMixin bilan belgilangan view ichidagi barcha
+    o'qishlar (sessiya / auth jadvallaridan tashqari).
+
+Read-your-writes: POST (va boshqa yozuvchi method) dan keyin
+crm.middleware.ReplikaMiddleware REPLIKA_KUTISH soniyalik cookie qo'yadi —
+shu vaqt ichida foydalanuvchining barcha o'qishlari default bazadan.
+Yozish va migratsiya — har doim default.
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from inspect import isawaitable
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+REPLIKA = 'replika'
+KUTISH_COOKIE = 'replika_kutish'
+
+# Belgilangan view ichida ham har doim default'dan o'qiladi (login, sessiya)
+DEFAULT_ILOVALAR = frozenset({'auth', 'sessions', 'contenttypes', 'admin', 'account', 'socialaccount'})
+
+# None — view belgilanmagan; aks holda shu request o'qiydigan alias
+_oqish_bazasi = ContextVar('oqish_bazasi', default=None)
+
+
+def replika_tayyor():
+    """Replika sozlanganmi va (snapshot bo'lsa) fayl mavjudmi"""
+    if REPLIKA not in settings.DATABASES:
+        return False
+    snapshot = getattr(settings, 'DB_SNAPSHOT_PATH', '')
+    return not snapshot or os.path.exists(snapshot)
+
+
+def oqish_bazasi(request):
+    """Request uchun o'qish alias'i: yaqinda yozgan bo'lsa yoki replika yo'q — default"""
+    if request.COOKIES.get(KUTISH_COOKIE) or not replika_tayyor():
+        return 'default'
+    return REPLIKA
+
+
+@contextmanager
+def oqish_rejimi(request):
+    request._faqat_oqish = True
+    token = _oqish_bazasi.set(oqish_bazasi(request))
+    try:
+        yield
+    finally:
+        _oqish_bazasi.reset(token)
+
+
+def faqat_oqish(view):
+    """Funksiya view uchun: ichidagi o'qishlar replikadan (yaqinda yozmagan bo'lsa)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            with oqish_rejimi(request):
+                return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with oqish_rejimi(request):
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class FaqatOqishMixin:
+    """Class view uchun faqat_oqish; MRO'da birinchi turishi kerak"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._async_dispatch(request, *args, **kwargs)
+        with oqish_rejimi(request):
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _async_dispatch(self, request, *args, **kwargs):
+        # dispatch korutina qaytaradi — rejim korutina bajarilguncha turishi kerak
+        with oqish_rejimi(request):
+            javob = super().dispatch(request, *args, **kwargs)
+            if isawaitable(javob):
+                javob = await javob
+            return javob
+
+
+class ReplikaRouter:
+
+    def db_for_read(self, model, **hints):
+        app_label = model._meta.app_label
+        alias = _oqish_bazasi.get()
+        if alias is not None:
+            return None if app_label in DEFAULT_ILOVALAR else alias
+        if app_label in settings.REPLIKA_ILOVALAR and replika_tayyor():
+            return REPLIKA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replika — default'ning nusxasi, bog'lanishlar bir xil ma'lumotga
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -1,5 +1,5 @@
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
 import os
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -80,7 +80,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'allauth.account.middleware.AccountMiddleware'
+    'allauth.account.middleware.AccountMiddleware',
+    'crm.middleware.SqlProfilMiddleware',
+    'crm.middleware.ReplikaMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -117,13 +119,133 @@ WSGI_APPLICATION = 'config.wsgi.application'
 #     }
 # }
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Ma'lumotlar bazasi profili:
+#   DB_PROFIL=sqlite (default) — bitta server. WAL (o'qishlar yozishni kutmaydi),
+#     busy_timeout = DB_SQLITE_TIMEOUT soniya va BEGIN IMMEDIATE — tranzaksiya yozish
+#     qulfini boshida oladi, o'rtada "database is locked" bilan yiqilmaydi.
+#   DB_PROFIL=postgres — DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT (psycopg 3).
+#     DB_CONN_MAX_AGE soniya doimiy ulanish (har request boshida health check);
+#     DB_POOL=True — psycopg_pool ichki pooli (DB_POOL_MIN / DB_POOL_MAX), doimiy ulanish o'rniga;
+#     DB_PGBOUNCER=True — pgbouncer (transaction pooling) orqasida: server-side cursor'siz.
+#     DB_REPLIKA_HOST — hisobot o'qishlari uchun replika (config/routers.py).
+#   SQLite'da replika o'rniga DB_SNAPSHOT_PATH — davriy nusxa (manage.py snapshot_yangilash --har 60).
+DB_PROFIL = config('DB_PROFIL', default='sqlite')
+
+if DB_PROFIL == 'postgres':
+    DB_POOL = config('DB_POOL', default=False, cast=bool)
+    DB_OPTIONS = {}
+    if DB_POOL:
+        DB_OPTIONS['pool'] = {
+            'min_size': config('DB_POOL_MIN', default=2, cast=int),
+            'max_size': config('DB_POOL_MAX', default=10, cast=int),
+            'timeout':  config('DB_POOL_TIMEOUT', default=10, cast=int),
+        }
+
+    DATABASES = {
+        'default': {
+            'ENGINE':   'django.db.backends.postgresql',
+            'NAME':     config('DB_NAME', default='ish'),
+            'USER':     config('DB_USER', default='ish'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST':     config('DB_HOST', default='db'),
+            'PORT':     config('DB_PORT', default='5432'),
+            # Pool bilan doimiy ulanish mumkin emas — ulanishni pool ushlab turadi
+            'CONN_MAX_AGE':       0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
+            'OPTIONS':  DB_OPTIONS,
+        }
     }
+
+    DB_REPLIKA_HOST = config('DB_REPLIKA_HOST', default='')
+    if DB_REPLIKA_HOST:
+        DATABASES['replika'] = {
+            **DATABASES['default'],
+            'HOST': DB_REPLIKA_HOST,
+            'PORT': config('DB_REPLIKA_PORT', default=DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_SQLITE_PATH', default=str(BASE_DIR / 'db.sqlite3')),
+            'OPTIONS': {
+                'timeout':          config('DB_SQLITE_TIMEOUT', default=20, cast=int),
+                'transaction_mode': 'IMMEDIATE',
+                'init_command':     'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL',
+            },
+        }
     }
 
+    DB_SNAPSHOT_PATH = config('DB_SNAPSHOT_PATH', default='')
+    if DB_SNAPSHOT_PATH:
+        DATABASES['replika'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': f'file:{DB_SNAPSHOT_PATH}?mode=ro',
+            'TEST': {'MIRROR': 'default'},
+        }
+
+# Replika bo'lsa (config/routers.py): REPLIKA_ILOVALAR modellari (kunlik yig'malar —
+# analytics dashboard manbasi) har doim, faqat_oqish / FaqatOqishMixin bilan belgilangan
+# hisobot view'lari esa to'liq replikadan o'qiydi. Yozuvchi request'dan keyin
+# REPLIKA_KUTISH soniya shu foydalanuvchi o'qishlari default'dan (read-your-writes).
+# Snapshot daqiqalab eskiradi — u bilan ilovalar bo'yicha yo'naltirish o'chiq.
+REPLIKA_ILOVALAR = config(
+    'REPLIKA_ILOVALAR', default='analytics' if DB_PROFIL == 'postgres' else '', cast=Csv(),
+)
+REPLIKA_KUTISH = config('REPLIKA_KUTISH', default=10 if DB_PROFIL == 'postgres' else 300, cast=int)
+if 'replika' in DATABASES:
+    DATABASE_ROUTERS = ['config.routers.ReplikaRouter']
+
+# Kesh (analytics dashboard, ishbay narxlar versiyasi va h.k.)
+# Default — fayl keshi: bitta serverdagi barcha gunicorn worker'lar uchun umumiy,
+# qo'shimcha servis talab qilmaydi. Bir nechta server yoki og'ir yuklamada Redis:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://redis:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / '.kesh')),
+    }
+}
+# Dashboard keshi — faqat umumiy backend'da ishlaydi; LocMemCache'da
+# avtomatik o'chadi va analytics.W001 ogohlantirishi chiqadi (analytics/kesh.py)
+ANALYTICS_KESH = config('ANALYTICS_KESH', default=True, cast=bool)
+
+# USD kursi (crm/utils.py) — kurs ValyutaKurs jadvalidan o'qiladi,
+# jadval `python manage.py usd_kurs_yangilash` bilan yangilanadi.
+# Internetsiz muhit: USD_KURS_PROVIDER=crm.utils.StubKursProvider, USD_KURS_STUB=12650
+USD_KURS_PROVIDER = config('USD_KURS_PROVIDER', default='crm.utils.CbuKursProvider')
+USD_KURS_STUB = config('USD_KURS_STUB', default='12500')
+USD_KURS_TTL = config('USD_KURS_TTL', default=600, cast=int)
+USD_KURS_FON_YANGILASH = config('USD_KURS_FON_YANGILASH', default=True, cast=bool)
+# Provayder xatosi takrorlanmaydigan vaqt (s) va jadval bo'sh bo'lgandagi kurs
+USD_KURS_XATO_TTL = config('USD_KURS_XATO_TTL', default=60, cast=int)
+USD_KURS_ZAXIRA = config('USD_KURS_ZAXIRA', default='0')
+
+# PDF cheklar (crm/asinxron.py): render shuncha oqimli alohida pool'da — chek
+# yuklab olish to'lqini kassa request'larini to'xtatib qo'ymaydi
+PDF_OQIMLAR = config('PDF_OQIMLAR', default=2, cast=int)
+
+# Ishbay narx matritsasi (crm/narxlar.py): eskirtirish umumiy keshdagi versiya
+# orqali; TTL — versiya kaliti yo'qolsa yoki kesh LocMemCache bo'lsa zaxira
+NARX_KESH_TTL = config('NARX_KESH_TTL', default=30, cast=int)
+
+# Xaridor / sotuv qidiruv indeksi (crm/qidiruv.py): SQLite — FTS5, PostgreSQL — pg_trgm.
+# O'chirilsa qidiruv oddiy icontains bilan ishlaydi.
+QIDIRUV_INDEKS = config('QIDIRUV_INDEKS', default=True, cast=bool)
+
+# SQL profillash (crm/profil.py): SQL_PROFIL=True — har bir request, aks holda faqat
+# staff foydalanuvchining 'X-Sql-Profil: 1' header'li request'lari. Natija —
+# Server-Timing header, 'crm.profil' logger (sekin request'lar) va admin'dagi
+# "SQL profillari" (view bo'yicha top-N so'rovlar, oxirgi N soat).
+SQL_PROFIL = config('SQL_PROFIL', default=False, cast=bool)
+SQL_PROFIL_SEKIN_MS = config('SQL_PROFIL_SEKIN_MS', default=500, cast=int)
+SQL_PROFIL_TOP = config('SQL_PROFIL_TOP', default=20, cast=int)
+SQL_PROFIL_OYNA_SOAT = config('SQL_PROFIL_OYNA_SOAT', default=24, cast=int)
+SQL_PROFIL_FLUSH = config('SQL_PROFIL_FLUSH', default=30, cast=int)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -156,6 +278,18 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / 'static'
 
+# Statik fayllarni gunicorn / uvicorn worker'ining o'zi beradi (WhiteNoise): siqilgan
+# (gzip / brotli) va hash'langan nomlar, uzoq keshlanadi. collectstatic kerak.
+# whitenoise paketi o'rnatilgan bo'lsagina yoqing: WHITENOISE=True.
+WHITENOISE = config('WHITENOISE', default=False, cast=bool)
+if WHITENOISE:
+    MIDDLEWARE.insert(MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,
+                      'whitenoise.middleware.WhiteNoiseMiddleware')
+    STORAGES = {
+        'default':     {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+    }
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / "media"
 
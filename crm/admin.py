@@ -6,7 +6,7 @@ from import_export.admin import ExportMixin
 from django.contrib.humanize.templatetags.humanize import intcomma
 from .models import (
     Category, Product, ProductVariant, IshchiCategory, Ishchi,
-    Oyliklar, EskiIsh, Ish, ChiqimTuri, Chiqim, Xaridor, Sotuv, Kirim,IshXomashyo,Feature,Avans,TeriSarfi,SotuvItem,ChiqimItem
+    Oyliklar, EskiIsh, Ish, ChiqimTuri, Chiqim, Xaridor, Sotuv, Kirim,IshXomashyo,Feature,Avans,TeriSarfi,SotuvItem,ChiqimItem,ValyutaKurs,SorovProfili,ProductRate,PayrollRun
 )
 
 from resources import IshchiResource,ProductResource,ProductVariantResource,IshResource,ChiqimResource,SotuvResource,SotuvItemResource,AvansResource
@@ -18,6 +18,13 @@ class ProductVariantInline(admin.TabularInline):
     readonly_fields = ('sku', 'barcode')
     
 
+class ProductRateInline(admin.TabularInline):
+    """Ishbay narx tarixi — yangi narx yangi valid_from bilan qo'shiladi"""
+    model = ProductRate
+    extra = 0
+    ordering = ('ishchi_category', '-valid_from')
+
+
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug', 'description')
@@ -27,7 +34,7 @@ class CategoryAdmin(admin.ModelAdmin):
 
 @admin.register(Product)
 class ProductAdmin(ImportExportModelAdmin):
-    inlines = [ProductVariantInline]
+    inlines = [ProductVariantInline, ProductRateInline]
     resource_class = ProductResource
     list_display = ('nomi', 'category', 'narxi', 'status', 'created_at','avg_profit')
     list_filter = ('category', 'status', 'created_at')
@@ -49,6 +56,15 @@ class ProductAdmin(ImportExportModelAdmin):
     )
     list_per_page = 20
          
+@admin.register(ProductRate)
+class ProductRateAdmin(admin.ModelAdmin):
+    list_display = ('product', 'ishchi_category', 'narx', 'valid_from')
+    list_filter = ('ishchi_category', 'valid_from')
+    search_fields = ('product__nomi',)
+    autocomplete_fields = ['product']
+    list_select_related = ('product', 'ishchi_category')
+    list_per_page = 50
+
 @admin.register(ProductVariant)
 class ProductVariantAdmin(ImportExportModelAdmin):
     resource_class = ProductVariantResource
@@ -69,10 +85,10 @@ class IshchiAdmin(ImportExportModelAdmin):
     resource_class = IshchiResource
     search_fields = ['ism', 'telefon']
 
-    list_display = ('ism', 'familiya', 'turi', 'maosh', 'telefon', 'is_active')
+    list_display = ('ism', 'familiya', 'turi', 'maosh', 'telefon', 'joriy_hisob', 'joriy_avans', 'is_active')
     list_filter = ('turi', 'is_active', 'is_oylik_open')
     search_fields = ('ism', 'familiya', 'telefon')
-    readonly_fields = ('oylik_yopilgan_sana',)
+    readonly_fields = ('oylik_yopilgan_sana', 'joriy_hisob', 'joriy_soni', 'joriy_avans', 'jami_tolangan')
     list_per_page = 20
 
 @admin.register(Oyliklar)
@@ -95,6 +111,25 @@ class OyliklarAdmin(admin.ModelAdmin):
     class Media:
         js = ("js/money_mask.js",)
 
+class OyliklarInline(admin.TabularInline):
+    model = Oyliklar
+    extra = 0
+    fields = ('ishchi', 'hisoblangan', 'oylik', 'sana')
+    readonly_fields = fields
+    can_delete = False
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    """Oylik yopish partiyalari — faqat ko'rish (crm/oylik_xizmati.py yaratadi)"""
+    inlines = [OyliklarInline]
+    list_display = ('sana', 'ishchilar_soni', 'jami_hisoblangan', 'jami_avans', 'jami_berilgan', 'created_by', 'created_at')
+    list_filter = ('sana',)
+    readonly_fields = ('sana', 'created_at', 'created_by', 'ishchilar_soni', 'jami_hisoblangan', 'jami_avans', 'jami_berilgan')
+    list_per_page = 20
+
+    def has_add_permission(self, request):
+        return False
+
 @admin.register(EskiIsh)
 class EskiIshAdmin(admin.ModelAdmin):
     list_display = ('ishchi', 'mahsulot', 'sana', 'narxi', 'soni')
@@ -108,6 +143,7 @@ class IshAdmin(ImportExportModelAdmin):
     list_display = ('mahsulot', 'ishchi', 'sana', 'soni', 'narxi','status')
     list_filter = (Last15DaysFilter, 'ishchi__turi','ishchi__ism','status')
     search_fields = ('mahsulot__nomi', 'ishchi__ism')
+    raw_id_fields = ('variant',)
     list_per_page = 20
 
 
@@ -158,8 +194,9 @@ class ChiqimAdmin(ExportMixin,admin.ModelAdmin):
 
 @admin.register(Xaridor)
 class XaridorAdmin(admin.ModelAdmin):
-    list_display = ('ism', 'telefon', 'manzil', 'created_at')
+    list_display = ('ism', 'telefon', 'manzil', 'xaridlar_soni', 'jami_xarid', 'jami_qarz', 'oxirgi_xarid_sana', 'created_at')
     search_fields = ('ism', 'telefon')
+    readonly_fields = ('xaridlar_soni', 'jami_xarid', 'jami_qarz', 'oxirgi_xarid_sana')
     list_per_page = 20
 
 class SotuvItemInline(admin.TabularInline):
@@ -261,6 +298,43 @@ class IshXomashyoAdmin(admin.ModelAdmin):
 admin.site.register(Feature)
 admin.site.register(TeriSarfi)
 
+
+@admin.register(ValyutaKurs)
+class ValyutaKursAdmin(admin.ModelAdmin):
+    list_display = ('sana', 'valyuta', 'rate', 'manba', 'yangilangan')
+    list_filter = ('valyuta', 'manba')
+    date_hierarchy = 'sana'
+    list_per_page = 30
+
+
+@admin.register(SorovProfili)
+class SorovProfiliAdmin(admin.ModelAdmin):
+    """View bo'yicha issiq so'rovlar — crm/profil.py yig'adi, qo'lda o'zgartirilmaydi"""
+    list_display = ('view', 'qisqa_sql', 'soni', 'takror', 'jami', 'ortacha', 'max_ms', 'joy', 'oxirgi')
+    list_filter = ('view',)
+    search_fields = ('view', 'sql', 'joy')
+    readonly_fields = [f.name for f in SorovProfili._meta.fields]
+    list_per_page = 50
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="SQL")
+    def qisqa_sql(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description="Jami (ms)", ordering='jami_ms')
+    def jami(self, obj):
+        return f"{obj.jami_ms:,.1f}"
+
+    @admin.display(description="O'rtacha (ms)")
+    def ortacha(self, obj):
+        return f"{obj.ortacha_ms:,.2f}"
+
+
 # Admin sahifasini sozlash
 admin.site.site_header = "CRM Tizimi"
 admin.site.site_title = "CRM Admin"
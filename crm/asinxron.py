@@ -0,0 +1,50 @@
+# crm/asinxron.py
+"""
+Og'ir sync ishni (ReportLab PDF) async view'dan chiqarish.
+
+Chek / PDF view'lari sync tanasini (so'rovlar + render) PDF_OQIMLAR ta
+oqimli alohida pool'da bajaradi. Pool cheklangan: chek yuklab olish
+to'lqinida ortiqcha so'rovlar event loop'da await bilan navbat kutadi,
+kassa request'lari ishlaydigan asgiref oqimi esa bo'sh qoladi.
+
+Oqimga contextvars nusxasi o'tadi (faqat_oqish replika yo'nalishi saqlanadi),
+DB ulanishlari har ishdan oldin / keyin request boshidagi kabi
+close_old_connections bilan tekshiriladi (CONN_MAX_AGE hisobga olinadi).
+
+WSGI (gthread) ostida ham ishlaydi — Django async view'ni async_to_sync bilan chaqiradi.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pdf_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PDF_OQIMLAR', 2), thread_name_prefix='pdf',
+            )
+    return _pool
+
+
+def _ulanishlar_bilan(fn, *args):
+    close_old_connections()
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+async def pdf_tayyorlash(fn, *args):
+    """fn(*args) ni PDF pool'da bajaradi → fn natijasi (HttpResponse)"""
+    ctx = contextvars.copy_context()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(pdf_pool(), ctx.run, _ulanishlar_bilan, fn, *args)
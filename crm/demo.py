@@ -0,0 +1,670 @@
+# crm/demo.py
+"""
+Sintetik (demo) ma'lumotlar — benchmark, so'rov rejasi va budjet tekshiruvlari uchun.
+
+Hammasi bulk_create bilan yoziladi; signal'lar ishlamagani uchun hosila
+ma'lumotlar (xaridor statistikasi, mahsulot soni, ishbay narxlar, kunlik
+yig'malar, qidiruv indeksi, budjet tranzaksiyalari) oxirida bir martada quriladi.
+
+Ma'lumot izchil — IshQoshishView va to'lov view'lari yozadigan yozuvlar bilan bir xil:
+
+    partiya:  kroy/rezak (TeriSarfi + teri/astar IshXomashyo) → kroy jarayon
+              → zakatovka → zakatovka jarayon
+              → kosib (padoj) → ProductVariant.stock → pardoz
+    ombor:    xomashyo.miqdori = Σ kirim − Σ chiqim − Σ IshXomashyo (real)
+              jarayon miqdori  = ishlab chiqarilgan − keyingi bosqichda ishlatilgan
+              variant.stock    = kosib ishlab chiqargan − sotilgan
+    to'lov:   Sotuv.tolangan_summa = Σ Kirim (qisman to'lovlar bir nechta Kirim)
+              XomashyoHarakat.tolangan_uzs = Σ ChiqimItem (xomashyo to'lovi)
+
+Sanalar ketma-ketligi taxminiy (kirim ishlatilishdan oldin bo'lishi shart emas),
+lekin yig'indilar to'liq mos keladi — DemoYaratuvchi.tekshirish() buni tekshiradi.
+
+    natija = demo_yaratish(scale=1)   # ~1000 sotuv, ~2000 ish, ~1000 harakat
+    natija['sotuv'], natija['kirim'], ...
+
+Bir xil seed — bir xil ma'lumot (taqqoslanadigan o'lchovlar uchun). Qayta
+ishga tushirilganda nomlar (mahsulot, kategoriya) raqam bilan farqlanadi.
+"""
+import random
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+ISHCHI_TURLARI = ['kosib', 'zakatovka', 'kroy', 'rezak', 'pardoz']
+ISMLAR = [
+    'Abdulla', 'Bobur', 'Dilshod', 'Gulnora', "G'ayrat", 'Javlon', 'Kamola',
+    'Laziz', 'Malika', 'Nodir', "O'tkir", 'Rustam', 'Sardor', 'Shahnoza', 'Zarina',
+]
+FAMILIYALAR = ['Karimov', 'Rahimov', 'Tursunov', 'Yusupov', 'Aliyev', 'Nazarov', "Qo'chqorov"]
+RANGLAR  = ['qora', 'jigarrang', 'oq', "ko'k"]
+RAZMERLAR = ['39', '40', '41', '42', '43']
+CHIQIM_TURLARI  = ['Ijara', 'Kommunal', 'Transport', 'Boshqa']
+XOMASHYO_TOLOVI = "Xomashyo to'lovi"
+
+# Real xomashyo: kategoriya → (ulush, o'lchov birligi, narx oralig'i — ming so'm)
+REAL_XOMASHYO = {
+    'teri'  : (0.6, 'dm',   (8, 30)),
+    'astar' : (0.2, 'dm',   (3, 8)),
+    'padoj' : (0.2, 'dona', (15, 40)),
+}
+# Jarayon xomashyo → (uni chiqaradigan ishchi turlari, ishlatadigan ishchi turlari)
+JARAYON = {
+    'kroy'      : ({'kroy', 'rezak'}, {'zakatovka'}),
+    'zakatovka' : ({'zakatovka'},     {'kosib'}),
+    'kosib'     : ({'kosib'},         set()),
+}
+
+# scale=1 dagi qatorlar soni
+HAJM = {
+    'xaridor'  : 200,
+    'mahsulot' : 30,
+    'ishchi'   : 25,
+    'sotuv'    : 1000,
+    'ish'      : 2000,
+    'xomashyo' : 40,
+    'harakat'  : 1000,
+    'chiqim'   : 300,
+}
+
+
+def _d(x, n=2):
+    return Decimal(str(round(x, n)))
+
+
+def _q(x):
+    return x.quantize(Decimal('0.01'))
+
+
+def _bolish(jami, qismlar):
+    """jami → 1 yoki 2 bo'lak; yig'indi aynan jami"""
+    if qismlar == 1:
+        return [jami]
+    birinchi = _q(jami * Decimal('0.6'))
+    return [birinchi, jami - birinchi]
+
+
+class DemoYaratuvchi:
+    """Bitta demo to'plam: kunlar davomida taqsimlangan, seed bilan takrorlanadigan"""
+
+    def __init__(self, scale=1, kunlar=365, seed=0):
+        self.scale  = max(scale, 1)
+        self.kunlar = kunlar
+        self.rnd    = random.Random(seed)
+        self.bugun  = timezone.localdate()
+        self.natija = {}
+
+    def soni(self, nomi):
+        return HAJM[nomi] * self.scale
+
+    def sana(self):
+        return self.bugun - timedelta(days=self.rnd.randrange(self.kunlar))
+
+    def keyin(self, sana, kun):
+        """sana + [0, kun) kun, bugundan oshmasdan"""
+        return min(sana + timedelta(days=self.rnd.randrange(kun)), self.bugun)
+
+    def vaqt(self, sana):
+        soat = time(self.rnd.randrange(8, 20), self.rnd.randrange(60))
+        return timezone.make_aware(datetime.combine(sana, soat))
+
+    def kurs(self, sana):
+        # Sekin o'suvchi kurs: kunlar bo'yicha 12 300 → 12 900 atrofida
+        return _d(12300 + 600 * (self.kunlar - (self.bugun - sana).days) / self.kunlar)
+
+    def ism(self):
+        return f"{self.rnd.choice(ISMLAR)} {self.rnd.choice(FAMILIYALAR)}"
+
+    def telefon(self):
+        return f"+9989{self.rnd.randrange(10 ** 7, 10 ** 8)}"
+
+    # ── Ma'lumotnomalar ──────────────────────────────────────────
+
+    def valyuta_kurslari(self):
+        from .models import ValyutaKurs
+
+        kurslar = [
+            ValyutaKurs(valyuta='USD', sana=sana, rate=self.kurs(sana), manba='demo')
+            for sana in (self.bugun - timedelta(days=i) for i in range(self.kunlar))
+        ]
+        ValyutaKurs.objects.bulk_create(kurslar, batch_size=500, ignore_conflicts=True)
+
+    @staticmethod
+    def _slug(nechanchi, i):
+        return f"demo-{i}" if nechanchi == 1 else f"demo{nechanchi}-{i}"
+
+    def mahsulotlar(self):
+        from .models import Category, Product, ProductVariant
+
+        # Qayta ishga tushirish: Category.slug va Product.nomi unique — raqam qo'shiladi
+        nechanchi = 1
+        while Category.objects.filter(slug=self._slug(nechanchi, 0)).exists():
+            nechanchi += 1
+        belgi = '' if nechanchi == 1 else f" #{nechanchi}"
+
+        kategoriyalar = Category.objects.bulk_create([
+            Category(name=f"Demo {nomi}{belgi}", slug=self._slug(nechanchi, i))
+            for i, nomi in enumerate(['Etik', 'Tufli', 'Krossovka'])
+        ])
+        self.productlar = Product.objects.bulk_create([
+            Product(
+                category=kategoriyalar[i % len(kategoriyalar)],
+                nomi=f"Demo model {i + 1:03d}{belgi}",
+                description='Demo', image='products/demo.jpg',
+                narxi=_d(self.rnd.randrange(250, 900) * 1000),
+                narx_kosib=self.rnd.randrange(20, 40) * 1000,
+                narx_zakatovka=self.rnd.randrange(10, 25) * 1000,
+                narx_kroy=self.rnd.randrange(8, 15) * 1000,
+                narx_rezak=self.rnd.randrange(5, 10) * 1000,
+                narx_pardoz=self.rnd.randrange(5, 10) * 1000,
+                teri_sarfi=_d(self.rnd.uniform(8, 20), 1),
+                astar_sarfi=_d(self.rnd.uniform(3, 8), 1),
+            )
+            for i in range(self.soni('mahsulot'))
+        ])
+        # Variantlar sotuvlar rejalangandan keyin, yakuniy stock bilan yoziladi (bulk_update'siz);
+        # ungacha ro'yxatdagi tartib raqami bilan ishlatiladi
+        self.variantlar = [
+            ProductVariant(product=p, rang=rang, razmer=self.rnd.choice(RAZMERLAR), price=p.narxi, stock=0)
+            for p in self.productlar
+            for rang in RANGLAR
+        ]
+        self.mahsulot_variantlari = defaultdict(list)
+        for i, v in enumerate(self.variantlar):
+            self.mahsulot_variantlari[v.product.pk].append(i)
+
+    def ishchilar(self):
+        from .models import Ishchi, IshchiCategory
+
+        turlar = {t.nomi: t for t in IshchiCategory.objects.all()}
+        yangi = [IshchiCategory(nomi=n) for n in ISHCHI_TURLARI if n not in turlar]
+        for t in IshchiCategory.objects.bulk_create(yangi):
+            turlar[t.nomi] = t
+
+        self.ishchilar_royxati = Ishchi.objects.bulk_create([
+            Ishchi(
+                ism=self.rnd.choice(ISMLAR), familiya=self.rnd.choice(FAMILIYALAR),
+                maosh=0, telefon=self.telefon(), turi=turlar[ISHCHI_TURLARI[i % len(ISHCHI_TURLARI)]],
+            )
+            for i in range(max(self.soni('ishchi'), len(ISHCHI_TURLARI)))
+        ])
+        self.turi_boyicha = defaultdict(list)
+        for ishchi in self.ishchilar_royxati:
+            self.turi_boyicha[ishchi.turi.nomi].append(ishchi)
+
+    def xaridorlar(self):
+        from .models import Xaridor
+
+        self.xaridorlar_royxati = Xaridor.objects.bulk_create([
+            Xaridor(ism=self.ism(), telefon=self.telefon(), manzil=self.rnd.choice(['Toshkent', 'Samarqand', 'Andijon']))
+            for _ in range(self.soni('xaridor'))
+        ], batch_size=500)
+
+    def chiqim_turlari(self):
+        from .models import ChiqimTuri
+
+        nomlar = [*CHIQIM_TURLARI, XOMASHYO_TOLOVI]
+        turlar = {t.name: t for t in ChiqimTuri.objects.filter(name__in=nomlar)}
+        for t in ChiqimTuri.objects.bulk_create([ChiqimTuri(name=n) for n in nomlar if n not in turlar]):
+            turlar[t.name] = t
+        self.chiqim_turi = turlar
+
+    def xomashyolar(self):
+        """Yetkazib beruvchilar, real xomashyo (miqdori keyin hisoblanadi) va mahsulot jarayon xomashyolari"""
+        from xomashyo.models import Xomashyo, XomashyoCategory, YetkazibBeruvchi
+
+        def kategoriya(nomi, turi):
+            # IshQoshishView kategoriyani nomi bo'yicha (iexact) qidiradi
+            return (
+                XomashyoCategory.objects.filter(name__iexact=nomi).first()
+                or XomashyoCategory.objects.create(name=nomi, turi=turi)
+            )
+
+        self.ybs = YetkazibBeruvchi.objects.bulk_create([
+            YetkazibBeruvchi(nomi=f"Demo ta'minotchi {i + 1}", telefon=self.telefon(), manzil='Toshkent')
+            for i in range(max(3, self.soni('xomashyo') // 8))
+        ])
+
+        self.real = {}
+        for tur, (ulush, olchov, (past, yuqori)) in REAL_XOMASHYO.items():
+            kat = kategoriya(tur, 'real')
+            self.real[tur] = [
+                Xomashyo(
+                    nomi=f"Demo {tur} {i + 1:03d}", category=kat, olchov_birligi=olchov,
+                    miqdori=0, narxi=_d(self.rnd.randrange(past, yuqori) * 1000),
+                    yetkazib_beruvchi=self.rnd.choice(self.ybs), holati='active',
+                )
+                for i in range(max(1, int(self.soni('xomashyo') * ulush)))
+            ]
+        Xomashyo.objects.bulk_create([x for royxat in self.real.values() for x in royxat], batch_size=500)
+
+        # ish_xizmati.jarayon_qoshish bilan bir xil: mahsulot + jarayon kategoriyasi, 'dona'
+        self.jarayon = {}
+        for nomi in JARAYON:
+            kat = kategoriya(nomi, 'process')
+            for p in self.productlar:
+                self.jarayon[(p.pk, nomi)] = Xomashyo(
+                    mahsulot=p, category=kat, nomi=f"{p.nomi} - {nomi.title()}",
+                    miqdori=0, olchov_birligi='dona', holati='active',
+                )
+        Xomashyo.objects.bulk_create(list(self.jarayon.values()), batch_size=500)
+
+        # Real xomashyo sarfi (IshXomashyo) — kirimlar shunga qarab o'lchanadi
+        self.sarf = defaultdict(Decimal)
+
+    # ── Ishlab chiqarish ─────────────────────────────────────────
+
+    def ishlar(self):
+        """Partiyalar: kroy/rezak → zakatovka → kosib → pardoz; oxirgi kunlardagilari chala qoladi"""
+        from .models import Ish, IshXomashyo, TeriSarfi
+
+        ishlar, sarflar = [], []   # sarflar: (ish, TeriSarfi | IshXomashyo)
+        self.ishlab_chiqarilgan = defaultdict(int)   # variant tartib raqami → kosib soni
+        self.birinchi_kosib     = {}                 # variant tartib raqami → eng erta kosib sanasi
+
+        def ish(turi, mahsulot, soni, sana):
+            obj = Ish(
+                ishchi=self.rnd.choice(self.turi_boyicha[turi]), mahsulot=mahsulot, soni=soni, sana=sana,
+                narxi=getattr(mahsulot, f'narx_{turi}') * soni,
+                # Oxirgi oy ishlari hali yopilmagan
+                status='yangi' if (self.bugun - sana).days < 30 else 'yopilgan',
+            )
+            ishlar.append(obj)
+            return obj
+
+        def xomashyo_sarfi(obj, xomashyo, miqdor):
+            sarflar.append((obj, IshXomashyo(xomashyo=xomashyo, miqdor=miqdor, birlik_narx=xomashyo.narxi)))
+            if xomashyo.category.turi == 'real':
+                self.sarf[xomashyo.pk] += miqdor
+            elif obj.ishchi.turi.nomi in JARAYON[xomashyo.category.name.lower()][0]:
+                xomashyo.miqdori += miqdor
+            else:
+                xomashyo.miqdori -= miqdor
+
+        while len(ishlar) < self.soni('ish'):
+            mahsulot = self.rnd.choice(self.productlar)
+            soni     = self.rnd.randrange(10, 40)
+            sana     = self.sana()
+            # Yaqinda boshlangan partiyalar hali tugamagan — jarayon omborida qoladi
+            bosqich  = 4 if (self.bugun - sana).days >= 10 else self.rnd.randrange(1, 5)
+            kroy      = self.jarayon[(mahsulot.pk, 'kroy')]
+            zakatovka = self.jarayon[(mahsulot.pk, 'zakatovka')]
+
+            # Kroy / rezak: bir yoki ikki xil teri + ixtiyoriy astar
+            k = ish(self.rnd.choice(['kroy', 'kroy', 'rezak']), mahsulot, soni, sana)
+            terilar = self.rnd.sample(self.real['teri'], min(len(self.real['teri']), self.rnd.choice([1, 1, 2])))
+            for teri in terilar:
+                miqdor = _q(mahsulot.teri_sarfi / len(terilar) * soni)
+                sarflar.append((k, TeriSarfi(ishchi=k.ishchi, xomashyo=teri, miqdor=miqdor, sana=self.vaqt(sana))))
+                xomashyo_sarfi(k, teri, miqdor)
+            if self.rnd.random() < 0.7:
+                xomashyo_sarfi(k, self.rnd.choice(self.real['astar']), _q(mahsulot.astar_sarfi * soni))
+            xomashyo_sarfi(k, kroy, Decimal(soni))
+            if bosqich < 2:
+                continue
+
+            sana = self.keyin(sana, 3)
+            z = ish('zakatovka', mahsulot, soni, sana)
+            xomashyo_sarfi(z, kroy, Decimal(soni))
+            xomashyo_sarfi(z, zakatovka, Decimal(soni))
+            if bosqich < 3:
+                continue
+
+            sana = self.keyin(sana, 5)
+            kosib = ish('kosib', mahsulot, soni, sana)
+            xomashyo_sarfi(kosib, zakatovka, Decimal(soni))
+            xomashyo_sarfi(kosib, self.rnd.choice(self.real['padoj']), Decimal(soni))
+            xomashyo_sarfi(kosib, self.jarayon[(mahsulot.pk, 'kosib')], Decimal(soni))
+            variant = self.rnd.choice(self.mahsulot_variantlari[mahsulot.pk])
+            self.ishlab_chiqarilgan[variant] += soni
+            self.birinchi_kosib[variant] = min(sana, self.birinchi_kosib.get(variant, sana))
+            if bosqich < 4 or self.rnd.random() < 0.5:
+                continue
+
+            ish('pardoz', mahsulot, soni, self.keyin(sana, 3))
+
+        Ish.objects.bulk_create(ishlar, batch_size=1000)
+        for obj, sarf in sarflar:
+            sarf.ish = obj
+        teri_sarflari = [s for _, s in sarflar if isinstance(s, TeriSarfi)]
+        ish_xomashyolar = [s for _, s in sarflar if isinstance(s, IshXomashyo)]
+        TeriSarfi.objects.bulk_create(teri_sarflari, batch_size=1000)
+        IshXomashyo.objects.bulk_create(ish_xomashyolar, batch_size=1000)
+
+        self.natija.update({
+            'ish'          : len(ishlar),
+            'teri_sarfi'   : len(teri_sarflari),
+            'ish_xomashyo' : len(ish_xomashyolar),
+        })
+
+    # ── Xomashyo harakatlari va yetkazib beruvchi to'lovlari ─────
+
+    def xomashyo_harakatlari(self):
+        """Kirim/chiqim harakatlari: har bir xomashyo kirimi sarf + chiqimdan ko'p, qoldiq musbat"""
+        from xomashyo.models import Xomashyo, XomashyoHarakat
+
+        reallar = [x for royxat in self.real.values() for x in royxat]
+        kirimlar, chiqimlar = defaultdict(list), defaultdict(list)
+        for _ in range(self.soni('harakat')):
+            xom = self.rnd.choice(reallar)
+            if self.rnd.random() < 0.7:
+                kirimlar[xom.pk].append(_d(self.rnd.randrange(50, 500)))
+            else:
+                chiqimlar[xom.pk].append(_d(self.rnd.randrange(1, 20)))
+
+        harakatlar = []
+        for xom in reallar:
+            kirim  = kirimlar[xom.pk] or [Decimal('0')]
+            chiqim = chiqimlar[xom.pk]
+            # Birinchi kirim yetishmovchilikni qoplaydi (katta boshlang'ich xarid)
+            yetishmaydi = self.sarf[xom.pk] + sum(chiqim) + self.rnd.randrange(20, 200) - sum(kirim)
+            if yetishmaydi > 0:
+                kirim[0] += yetishmaydi
+            xom.miqdori = sum(kirim) - sum(chiqim) - self.sarf[xom.pk]
+
+            for miqdor in kirim:
+                sana = self.sana()
+                kurs = self.kurs(sana)
+                jami = miqdor * xom.narxi
+                harakatlar.append(XomashyoHarakat(
+                    xomashyo=xom, harakat_turi='kirim', miqdori=miqdor, sana=sana,
+                    birlik_narx_uzs=xom.narxi, jami_narx_uzs=jami,
+                    birlik_narx_usd=_d(xom.narxi / kurs, 4), jami_narx_usd=_d(jami / kurs, 4), usd_kurs=kurs,
+                    tolov_holati='tolanmagan', tolangan_uzs=0, tolangan_usd=0,
+                    yetkazib_beruvchi=xom.yetkazib_beruvchi,
+                ))
+            for miqdor in chiqim:
+                harakatlar.append(XomashyoHarakat(
+                    xomashyo=xom, harakat_turi='chiqim', miqdori=miqdor, sana=self.sana(),
+                    birlik_narx_uzs=xom.narxi, jami_narx_uzs=miqdor * xom.narxi, tolov_holati='kerak_emas',
+                ))
+
+        # To'lovlar harakatlar yozilishidan oldin rejalanadi — tolangan_uzs / holat bulk_update'siz
+        self.tolov_itemlari = []
+        for h in harakatlar:
+            if h.harakat_turi == 'kirim':
+                self.tolov_itemlari += self._tolovlar(h)
+
+        XomashyoHarakat.objects.bulk_create(harakatlar, batch_size=1000)
+        Xomashyo.objects.bulk_update(reallar + list(self.jarayon.values()), ['miqdori'], batch_size=500)
+
+        self.kirim_harakatlari = [h for h in harakatlar if h.harakat_turi == 'kirim']
+        self.natija['harakat'] = len(harakatlar)
+
+    def _tolovlar(self, h):
+        """Kirim harakati uchun 0–2 ta to'lov (ChiqimItem + o'z Chiqim'i); harakat to'lov maydonlari to'ldiriladi"""
+        from .models import Chiqim, ChiqimItem
+
+        holat = self.rnd.choice(['toliq', 'toliq', 'qisman', 'tolanmagan'])
+        if holat == 'tolanmagan':
+            return []
+        jami = h.jami_narx_uzs if holat == 'toliq' else _q(h.jami_narx_uzs / 2)
+        itemlar = []
+        for summa in _bolish(jami, self.rnd.choice([1, 2])):
+            sana = self.keyin(h.sana, 30)
+            kurs = self.kurs(sana)
+            usd  = _d(summa / kurs, 4)
+            yb   = h.yetkazib_beruvchi
+            # xomashyo/views.py yb_tolov bilan bir xil nom va izoh
+            chiqim = Chiqim(
+                name=f"{XOMASHYO_TOLOVI} — {yb.nomi} — {sana:%d.%m.%Y}",
+                category=self.chiqim_turi[XOMASHYO_TOLOVI],
+                price=summa, price_usd=usd, usd_kurs=kurs, created=sana,
+                izoh=f"{h.xomashyo.nomi} ({h.sana:%d.%m.%Y}) — {summa:,.0f} so'm",
+            )
+            itemlar.append(ChiqimItem(
+                chiqim=chiqim, item_turi='xomashyo', name=f"{h.xomashyo.nomi} to'lovi — {h.sana:%d.%m.%Y}",
+                price_uzs=summa, price_usd=usd, tolov_kursi=kurs,
+                xomashyo_harakat=h, yetkazib_beruvchi=yb,
+            ))
+            # XomashyoHarakat.tolov_yangilash() bilan bir xil natija
+            h.tolangan_uzs += summa
+            h.tolangan_usd += usd
+        h.tolov_holati = 'toliq' if h.tolangan_uzs >= h.jami_narx_uzs else 'qisman'
+        return itemlar
+
+    def yetkazib_tolovlari(self):
+        """Rejalangan xomashyo to'lovlari: Chiqim + ChiqimItem(item_turi='xomashyo') + Tranzaksiya"""
+        from .models import Chiqim, ChiqimItem
+
+        chiqimlar = [item.chiqim for item in self.tolov_itemlari]
+        Chiqim.objects.bulk_create(chiqimlar, batch_size=1000)
+        ChiqimItem.objects.bulk_create(self.tolov_itemlari, batch_size=1000)
+        self._tranzaksiyalar(chiqimlar)
+        self.natija['xomashyo_tolov'] = len(self.tolov_itemlari)
+
+    # ── Sotuv va to'lovlar ───────────────────────────────────────
+
+    def sotuvlar(self):
+        """Ko'p qatorli sotuvlar — faqat kosib chiqargan qoldiqdan; qisman to'lovlar bir nechta Kirim"""
+        from .models import Kirim, ProductVariant, Sotuv, SotuvItem
+
+        qoldiq = dict(self.ishlab_chiqarilgan)
+        bor = sorted(qoldiq)
+        rejalar = []
+        for _ in range(self.soni('sotuv')):
+            if not bor:
+                break
+            tanlangan = self.rnd.sample(bor, min(len(bor), self.rnd.randrange(1, 4)))
+            # Sotuv sanasi — tanlangan variantlar ishlab chiqarilgandan keyin
+            boshi = max(self.birinchi_kosib[i] for i in tanlangan)
+            sana = self.keyin(boshi, (self.bugun - boshi).days + 1)
+            kurs = self.kurs(sana)
+            qatorlar = []
+            for i in tanlangan:
+                miqdor = min(self.rnd.randrange(1, 8), qoldiq[i])
+                qoldiq[i] -= miqdor
+                if not qoldiq[i]:
+                    bor.remove(i)
+                variant = self.variantlar[i]
+                item = SotuvItem(
+                    mahsulot=variant.product, variant=variant, miqdor=miqdor,
+                    narx=variant.price, narx_turi='uzs',
+                )
+                item.narxni_ogirish(kurs)
+                item.jami_hisoblash(kurs)
+                qatorlar.append(item)
+
+            jami = sum(i.jami for i in qatorlar)
+            ulush = self.rnd.choice([1, 1, 1, 0.5, 0])
+            tolangan = _d(float(jami) * ulush)
+            sotuv = Sotuv(
+                xaridor=self.rnd.choice(self.xaridorlar_royxati),
+                jami_summa=jami, yakuniy_summa=jami, chegirma=0,
+                usd_kurs=kurs, jami_summa_usd=_d(jami / kurs, 4), yakuniy_summa_usd=_d(jami / kurs, 4),
+                tolangan_summa=tolangan,
+                tolov_holati='tolandi' if ulush == 1 else ('qisman' if ulush else 'tolanmadi'),
+                sana=self.vaqt(sana),
+            )
+            rejalar.append((sotuv, qatorlar))
+
+        # Qoldiq: kosib chiqargani − sotilgani
+        for i, variant in enumerate(self.variantlar):
+            variant.stock = qoldiq.get(i, 0)
+        ProductVariant.objects.bulk_create(self.variantlar, batch_size=500)
+        Sotuv.objects.bulk_create([s for s, _ in rejalar], batch_size=500)
+
+        items, kirimlar = [], []
+        for sotuv, qatorlar in rejalar:
+            for item in qatorlar:
+                item.sotuv = sotuv
+                items.append(item)
+            if not sotuv.tolangan_summa:
+                continue
+            for summa in _bolish(sotuv.tolangan_summa, self.rnd.choice([1, 1, 2])):
+                kirimlar.append(Kirim(
+                    sotuv=sotuv, xaridor=sotuv.xaridor, summa=summa,
+                    summa_usd=_d(summa / sotuv.usd_kurs, 4), usd_kurs=sotuv.usd_kurs,
+                    valyuta='uzs', sana=sotuv.sana + timedelta(hours=self.rnd.randrange(0, 48)),
+                ))
+        SotuvItem.objects.bulk_create(items, batch_size=1000)
+        Kirim.objects.bulk_create(kirimlar, batch_size=1000)
+
+        self.natija.update({'sotuv': len(rejalar), 'sotuv_item': len(items), 'kirim': len(kirimlar)})
+
+    # ── Xarajatlar ───────────────────────────────────────────────
+
+    def _tranzaksiyalar(self, chiqimlar):
+        """budget/signals.py bilan bir xil xarita (Tranzaksiya.chiqim_maydonlari)"""
+        from budget.models import Tranzaksiya
+
+        Tranzaksiya.objects.bulk_create([
+            Tranzaksiya(chiqim=c, **Tranzaksiya.chiqim_maydonlari(c))
+            for c in chiqimlar
+        ], batch_size=1000)
+
+    def chiqimlar(self):
+        from budget.models import Byudjet, ByudjetLimit
+
+        from .models import Chiqim
+
+        turlar = [self.chiqim_turi[n] for n in CHIQIM_TURLARI]
+        chiqimlar = []
+        for _ in range(self.soni('chiqim')):
+            sana = self.sana()
+            kurs = self.kurs(sana)
+            price = _d(self.rnd.randrange(50, 3000) * 1000)
+            chiqimlar.append(Chiqim(
+                name=f"Demo xarajat {sana:%d.%m}", category=self.rnd.choice(turlar),
+                price=price, price_usd=_d(price / kurs, 4), usd_kurs=kurs, created=sana,
+            ))
+        Chiqim.objects.bulk_create(chiqimlar, batch_size=1000)
+        self._tranzaksiyalar(chiqimlar)
+
+        byudjet = Byudjet.objects.create(
+            nomi='Demo byudjet', davr_boshi=self.bugun.replace(day=1),
+            davr_oxiri=self.bugun.replace(day=1) + timedelta(days=31), umumiy_summa=_d(50_000_000),
+        )
+        ByudjetLimit.objects.bulk_create([
+            ByudjetLimit(byudjet=byudjet, nomi=t.name, manba='chiqim', kategoriya=t.name, limit_summa=_d(5_000_000))
+            for t in turlar
+        ])
+        self.natija['chiqim'] = len(chiqimlar)
+
+    # ── Hosila ma'lumotlar ───────────────────────────────────────
+
+    def hosilalar(self):
+        from analytics.rollups import rollup_qayta_qurish
+
+        from . import narxlar, qidiruv
+        from .models import Ishchi, Product, Xaridor
+
+        Product.update_total_quantities([p.pk for p in self.productlar])
+        Ishchi.hisobni_yangilash([i.pk for i in self.ishchilar_royxati])
+        # Ish.narxi yuqorida Product.narx_* bilan — ishbay narx tarixi shu qiymatlardan
+        narxlar.boshlangich_narxlar([p.pk for p in self.productlar])
+        Xaridor.statistikani_yangilash([x.pk for x in self.xaridorlar_royxati])
+        rollup_qayta_qurish()
+        qidiruv.qayta_qurish()
+
+    @transaction.atomic
+    def yaratish(self):
+        self.valyuta_kurslari()
+        self.mahsulotlar()
+        self.ishchilar()
+        self.xaridorlar()
+        self.chiqim_turlari()
+        self.xomashyolar()
+        self.ishlar()
+        self.xomashyo_harakatlari()
+        self.yetkazib_tolovlari()
+        self.sotuvlar()
+        self.chiqimlar()
+        self.hosilalar()
+        return self.natija
+
+    # ── Izchillik tekshiruvi ─────────────────────────────────────
+
+    def tekshirish(self):
+        """Yaratilgan to'plam qoldiq va balanslarini bazadan qayta hisoblaydi → xatolar ro'yxati"""
+        from xomashyo.models import Xomashyo, XomashyoHarakat
+
+        from .models import Chiqim, Ish, Ishchi, IshXomashyo, Product, Sotuv, SotuvItem, Xaridor
+
+        xatolar = []
+
+        def solishtir(nomi, kutilgan, haqiqiy):
+            if kutilgan != haqiqiy:
+                xatolar.append(f"{nomi}: kutilgan {kutilgan}, bazada {haqiqiy}")
+
+        def yigindi(qs, maydon, guruh):
+            return {r[guruh]: r['s'] for r in qs.values(guruh).annotate(s=Sum(maydon)).order_by()}
+
+        # Real xomashyo: Σ kirim − Σ chiqim − Σ IshXomashyo
+        real_ids = [x.pk for royxat in self.real.values() for x in royxat]
+        harakat = XomashyoHarakat.objects.filter(xomashyo_id__in=real_ids)
+        kirim  = yigindi(harakat.filter(harakat_turi='kirim'), 'miqdori', 'xomashyo')
+        chiqim = yigindi(harakat.filter(harakat_turi='chiqim'), 'miqdori', 'xomashyo')
+        sarf   = yigindi(IshXomashyo.objects.filter(xomashyo_id__in=real_ids), 'miqdor', 'xomashyo')
+        for pk, miqdori in Xomashyo.objects.filter(pk__in=real_ids).values_list('pk', 'miqdori'):
+            solishtir(f"xomashyo #{pk} qoldig'i", kirim.get(pk, 0) - chiqim.get(pk, 0) - sarf.get(pk, 0), miqdori)
+            if miqdori < 0:
+                xatolar.append(f"xomashyo #{pk} qoldig'i manfiy: {miqdori}")
+
+        # Jarayon xomashyo: chiqargan bosqich (+) − ishlatgan bosqich (−)
+        jarayon_ids = [x.pk for x in self.jarayon.values()]
+        kutilgan = defaultdict(Decimal)
+        for r in (
+            IshXomashyo.objects.filter(xomashyo_id__in=jarayon_ids)
+            .values('xomashyo', 'xomashyo__category__name', 'ish__ishchi__turi__nomi')
+            .annotate(s=Sum('miqdor')).order_by()
+        ):
+            chiqaradi, _ = JARAYON[r['xomashyo__category__name'].lower()]
+            kutilgan[r['xomashyo']] += r['s'] if r['ish__ishchi__turi__nomi'] in chiqaradi else -r['s']
+        for pk, miqdori in Xomashyo.objects.filter(pk__in=jarayon_ids).values_list('pk', 'miqdori'):
+            solishtir(f"jarayon #{pk} qoldig'i", kutilgan[pk], miqdori)
+            if miqdori < 0:
+                xatolar.append(f"jarayon #{pk} qoldig'i manfiy: {miqdori}")
+
+        # Mahsulot: Σ kosib − Σ sotilgan = Product.soni (= Σ variant.stock)
+        product_ids = [p.pk for p in self.productlar]
+        kosib = yigindi(Ish.objects.filter(mahsulot_id__in=product_ids, ishchi__turi__nomi='kosib'), 'soni', 'mahsulot')
+        sotilgan = yigindi(SotuvItem.objects.filter(mahsulot_id__in=product_ids), 'miqdor', 'mahsulot')
+        for pk, soni in Product.objects.filter(pk__in=product_ids).values_list('pk', 'soni'):
+            solishtir(f"mahsulot #{pk} soni", kosib.get(pk, 0) - sotilgan.get(pk, 0), soni)
+
+        # Ishchi hisobi = Σ ochiq ishlar
+        ishchi_ids = [i.pk for i in self.ishchilar_royxati]
+        ochiq = Ish.objects.filter(ishchi_id__in=ishchi_ids, status='yangi')
+        narx_jami, soni_jami = yigindi(ochiq, 'narxi', 'ishchi'), yigindi(ochiq, 'soni', 'ishchi')
+        for pk, hisob, soni in Ishchi.objects.filter(pk__in=ishchi_ids).values_list('pk', 'joriy_hisob', 'joriy_soni'):
+            solishtir(f"ishchi #{pk} hisobi", narx_jami.get(pk, 0), hisob)
+            solishtir(f"ishchi #{pk} ishlar soni", soni_jami.get(pk, 0), soni)
+
+        # Sotuv: qatorlar jami va Kirim to'lovlari
+        sotuvlar = Sotuv.objects.filter(xaridor_id__in=[x.pk for x in self.xaridorlar_royxati])
+        qator_jami = yigindi(sotuvlar, 'items__jami', 'pk')
+        tolovlar   = yigindi(sotuvlar, 'kirimlar__summa', 'pk')
+        for pk, yakuniy, tolangan in sotuvlar.values_list('pk', 'yakuniy_summa', 'tolangan_summa'):
+            solishtir(f"sotuv #{pk} jami", qator_jami.get(pk), yakuniy)
+            solishtir(f"sotuv #{pk} to'langan", tolovlar.get(pk) or 0, tolangan)
+
+        # Xaridor qarzi = Σ (yakuniy − to'langan)
+        for x in Xaridor.objects.filter(pk__in=[x.pk for x in self.xaridorlar_royxati]).prefetch_related('sotuvlar'):
+            qarz = sum((max(s.yakuniy_summa - s.tolangan_summa, 0) for s in x.sotuvlar.all()), Decimal('0'))
+            solishtir(f"xaridor #{x.pk} qarzi", qarz, x.jami_qarz)
+
+        # Yetkazib beruvchi: harakat.tolangan_uzs = Σ ChiqimItem, holat mos
+        kirimlar = XomashyoHarakat.objects.filter(pk__in=[h.pk for h in self.kirim_harakatlari])
+        item_jami = yigindi(kirimlar, 'tolovlar__price_uzs', 'pk')
+        for pk, jami, tolangan, holat in kirimlar.values_list('pk', 'jami_narx_uzs', 'tolangan_uzs', 'tolov_holati'):
+            solishtir(f"harakat #{pk} to'langan", item_jami.get(pk) or 0, tolangan)
+            holat_kerak = 'toliq' if tolangan >= jami else ('qisman' if tolangan > 0 else 'tolanmagan')
+            solishtir(f"harakat #{pk} holati", holat_kerak, holat)
+
+        # To'lov chiqimlari: Chiqim.price = Σ itemlar
+        tolov_chiqimlari = Chiqim.objects.filter(itemlar__xomashyo_harakat__in=kirimlar).values('pk')
+        item_jami = yigindi(Chiqim.objects.filter(pk__in=tolov_chiqimlari), 'itemlar__price_uzs', 'pk')
+        for pk, price in Chiqim.objects.filter(pk__in=tolov_chiqimlari).values_list('pk', 'price'):
+            solishtir(f"chiqim #{pk} summasi", item_jami.get(pk), price)
+
+        return xatolar
+
+
+def demo_yaratish(scale=1, kunlar=365, seed=0):
+    """Demo to'plamni yaratadi → {'sotuv': n, 'kirim': n, 'ish': n, ...}"""
+    return DemoYaratuvchi(scale=scale, kunlar=kunlar, seed=seed).yaratish()
@@ -9,12 +9,10 @@ import io
 import json
 import logging
 from datetime import datetime
-from decimal import Decimal, InvalidOperation
 
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import HttpResponse, JsonResponse,FileResponse
 from django.shortcuts import get_object_or_404,render
-from django.utils import timezone
 from django.db import transaction
 from django.views.decorators.http import require_http_methods
 import urllib.parse
@@ -22,7 +20,8 @@ import urllib.parse
 import openpyxl
 
 import crm.models as m
-from xomashyo.models import Xomashyo, XomashyoVariant, XomashyoCategory
+from crm.ish_xizmati import ish_qoshish
+from xomashyo.models import Xomashyo, XomashyoVariant
 
 logger = logging.getLogger(__name__)
 
@@ -584,137 +583,43 @@ def _validate_kosib_row(vals, computed, xatolar, ogohlantirishlar):
 
 
 # ══════════════════════════════════════════════════════════════════
-# SATR SAQLASH (mavjud IshQoshishView logikasiga mos)
+# SATR SAQLASH (IshQoshishView bilan umumiy servis — crm/ish_xizmati.py)
 # ══════════════════════════════════════════════════════════════════
 def _satr_saqlash(satr, ishchi, turi, xomashyo_map):
-    """Bitta tasdiqlangan satrni saqlash — IshQoshishView POST ga mos logika"""
-    from xomashyo.models import IshXomashyo
-
+    """Bitta tasdiqlangan satrni saqlash — IshQoshishView POST bilan bir xil servis"""
     c = satr['computed']
     mahsulot = m.Product.objects.get(id=c['mahsulot_id'])
     soni     = int(c['soni'])
     sana     = datetime.strptime(c['ish_sanasi'], '%Y-%m-%d').date()
 
-    ish = m.Ish.objects.create(
-        ishchi  = ishchi,
-        mahsulot= mahsulot,
-        soni    = soni,
-        status  = 'yangi',
-        sana    = sana,
-    )
-
     if turi in ('kroy', 'rezak'):
-        _saqlash_kroy(ish, ishchi, mahsulot, soni, sana, c, xomashyo_map)
-
+        tanlov = {
+            'terilar': [{
+                'xomashyo_id': c.get('teri_id') or xomashyo_map.get(f"{mahsulot.nomi}:teri"),
+                'variant_id' : c.get('teri_variant_id'),
+                'sarf'       : c.get('teri_sarfi'),
+            }],
+            'astar': {
+                'xomashyo_id': c.get('astar_id') or xomashyo_map.get(f"{mahsulot.nomi}:astar"),
+                'sarf'       : c.get('astar_sarfi'),
+            },
+        }
     elif turi == 'zakatovka':
-        _saqlash_zakatovka(ish, mahsulot, soni, c)
-
+        # Kroy topilmagan (ogohlantirish) satr — mustaqil ish sifatida saqlanadi
+        tanlov = {
+            'kroy_id' : c.get('kroy_id'),
+            'mustaqil': c.get('mustaqil_ish', False) or not c.get('kroy_id'),
+        }
     elif turi == 'kosib':
-        _saqlash_kosib(ish, ishchi, mahsulot, soni, c)
-
-
-def _get_or_create_jarayon(mahsulot, category_name, miqdor):
-    """IshQoshishView._get_or_create_jarayon_xomashyo bilan bir xil"""
-    category, _ = XomashyoCategory.objects.get_or_create(
-        name=category_name, defaults={'turi': 'process'}
-    )
-    xom = Xomashyo.objects.filter(
-        mahsulot=mahsulot, category=category, olchov_birligi='dona'
-    ).first()
-    if xom:
-        xom.miqdori += Decimal(str(miqdor))
-        xom.save(update_fields=['miqdori', 'updated_at'])
-    else:
-        xom = Xomashyo.objects.create(
-            mahsulot=mahsulot, category=category,
-            nomi=f"{mahsulot.nomi} - {category_name.title()}",
-            miqdori=Decimal(str(miqdor)), olchov_birligi='dona',
-            holati='active',
-        )
-    return xom
-
-
-def _saqlash_kroy(ish, ishchi, mahsulot, soni, sana, c, xomashyo_map):
-    from xomashyo.models import IshXomashyo
-
-    # Teri sarfi (TeriSarfi + IshXomashyo)
-    teri_id      = c.get('teri_id') or xomashyo_map.get(f"{mahsulot.nomi}:teri")
-    teri         = Xomashyo.objects.get(id=teri_id)
-    teri_variant = None
-    if c.get('teri_variant_id'):
-        teri_variant = XomashyoVariant.objects.get(id=c['teri_variant_id'])
-
-    teri_sarfi = Decimal(str(c.get('teri_sarfi', mahsulot.teri_sarfi)))
-    teri_jami  = teri_sarfi * soni
-
-    m.TeriSarfi.objects.create(
-        ish=ish, ishchi=ishchi, xomashyo=teri,
-        variant=teri_variant, miqdor=teri_jami, sana=timezone.now()
-    )
-    IshXomashyo.objects.create(ish=ish, xomashyo=teri, variant=teri_variant, miqdor=teri_jami)
-
-    # Astar (ixtiyoriy)
-    astar_id = c.get('astar_id') or xomashyo_map.get(f"{mahsulot.nomi}:astar")
-    if astar_id:
-        astar       = Xomashyo.objects.get(id=astar_id)
-        astar_sarfi = Decimal(str(c.get('astar_sarfi', mahsulot.astar_sarfi)))
-        astar_jami  = astar_sarfi * soni
-        if astar_jami > 0:
-            IshXomashyo.objects.create(ish=ish, xomashyo=astar, miqdor=astar_jami)
-
-    # Kroy jarayon
-    kroy_xom = _get_or_create_jarayon(mahsulot, 'kroy', soni)
-    IshXomashyo.objects.create(ish=ish, xomashyo=kroy_xom, miqdor=Decimal(str(soni)))
-
-
-def _saqlash_zakatovka(ish, mahsulot, soni, c):
-    from xomashyo.models import IshXomashyo
-
-    mustaqil = c.get('mustaqil_ish', False)
-
-    if not mustaqil and c.get('kroy_id'):
-        kroy = Xomashyo.objects.get(id=c['kroy_id'])
-        kroy.miqdori -= Decimal(str(soni))
-        kroy.save(update_fields=['miqdori', 'updated_at'])
-        IshXomashyo.objects.create(ish=ish, xomashyo=kroy, miqdor=Decimal(str(soni)))
-
-    zak_xom = _get_or_create_jarayon(mahsulot, 'zakatovka', soni)
-    IshXomashyo.objects.create(ish=ish, xomashyo=zak_xom, miqdor=Decimal(str(soni)))
-
-
-def _saqlash_kosib(ish, ishchi, mahsulot, soni, c):
-    from xomashyo.models import IshXomashyo
-
-    mustaqil = c.get('mustaqil_ish', False)
-
-    # Padoj
-    padoj = Xomashyo.objects.get(id=c['padoj_id'])
-    if c.get('padoj_variant_id'):
-        pv = XomashyoVariant.objects.get(id=c['padoj_variant_id'])
-        pv.miqdori -= Decimal(str(soni)); pv.save()
-        IshXomashyo.objects.create(ish=ish, xomashyo=padoj, variant=pv, miqdor=Decimal(str(soni)))
+        tanlov = {
+            'padoj_id'        : c.get('padoj_id'),
+            'padoj_variant_id': c.get('padoj_variant_id'),
+            'zakatovka_id'    : c.get('zakatovka_id'),
+            'mustaqil'        : c.get('mustaqil_ish', False) or not c.get('zakatovka_id'),
+            'variant_rang'    : c.get('variant_rang', ''),
+            'variant_razmer'  : c.get('variant_razmer', ''),
+        }
     else:
-        padoj.miqdori -= Decimal(str(soni))
-        padoj.save(update_fields=['miqdori', 'updated_at'])
-        IshXomashyo.objects.create(ish=ish, xomashyo=padoj, miqdor=Decimal(str(soni)))
-
-    # Zakatovka (mustaqil emas bo'lsa)
-    if not mustaqil and c.get('zakatovka_id'):
-        zak = Xomashyo.objects.get(id=c['zakatovka_id'])
-        zak.miqdori -= Decimal(str(soni)); zak.save(update_fields=['miqdori', 'updated_at'])
-        IshXomashyo.objects.create(ish=ish, xomashyo=zak, miqdor=Decimal(str(soni)))
-
-    # Mahsulot variant
-    rang   = c.get('variant_rang', '')
-    razmer = c.get('variant_razmer', '')
-    variant, created = m.ProductVariant.objects.get_or_create(
-        product=mahsulot, rang=rang, razmer=razmer,
-        defaults={'stock': soni, 'price': mahsulot.narxi}
-    )
-    if not created:
-        variant.stock += soni; variant.save()
+        tanlov = {}
 
-    # Kosib jarayon
-    kosib_xom = _get_or_create_jarayon(mahsulot, 'kosib', soni)
-    IshXomashyo.objects.create(ish=ish, xomashyo=kosib_xom, miqdor=Decimal(str(soni)))
-    mahsulot.refresh_from_db()
\ No newline at end of file
+    return ish_qoshish(ishchi, mahsulot, soni, sana, tanlov)
@@ -0,0 +1,329 @@
+# crm/ish_xizmati.py
+"""
+Ishchiga ish biriktirish — IshQoshishView va Excel import (crm/excel) uchun umumiy.
+
+Oldin kroy/rezak ishida har bir teri uchun alohida Xomashyo.get va
+XomashyoVariant.get, TeriSarfi / IshXomashyo bittadan create qilinardi
+(IshXomashyo.save esa har safar xomashyoni qayta saqlardi). Bu yerda:
+
+    1. ishda qatnashadigan barcha xomashyolar bitta in_bulk (category bilan),
+       variantlar ham bitta in_bulk
+    2. tur / holat / qoldiq xotirada tekshiriladi (bir teri bir necha
+       qatorda bo'lsa — jami)
+    3. Ish yaratiladi, TeriSarfi va IshXomashyo — bittadan bulk_create
+    4. qoldiq shartli UPDATE ... F() bilan kamaytiriladi (WHERE miqdori >= n —
+       parallel ish qoldiqni manfiy qilolmaydi), jarayon ombori F() bilan oshiriladi
+
+    natija = ish_qoshish(ishchi, mahsulot, soni, sana, {
+        'terilar':  [{'xomashyo_id': 5, 'variant_id': None, 'sarf': None}],
+        'astar':    {'xomashyo_id': 7, 'variant_id': 2, 'sarf': '1.5'},
+        'kroy_id':  None,            # zakatovka
+        'padoj_id': 9, ...           # kosib
+        'mustaqil': False,
+    })
+
+Qoldiq yoki tanlov noto'g'ri bo'lsa ValueError — tranzaksiya bekor qilinadi.
+Teri va astar (avvalgidek) omborda kamaytirilmaydi, faqat tekshiriladi.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from xomashyo.models import Xomashyo, XomashyoCategory, XomashyoVariant
+
+from .models import Ish, IshXomashyo, ProductVariant, TeriSarfi
+
+logger = logging.getLogger(__name__)
+
+class IshNatija:
+    """ish_qoshish natijasi — view / Excel xabarlari uchun"""
+
+    def __init__(self):
+        self.ish          = None
+        self.terilar      = []     # (xomashyo, variant, bitta_sarf, jami)
+        self.jami_teri    = Decimal('0')
+        self.astar        = None
+        self.astar_miqdor = Decimal('0')
+        self.kroy         = None   # zakatovka: ishlatilgan kroy
+        self.zakatovka    = None   # kosib: ishlatilgan zakatovka
+        self.padoj        = None
+        self.variant      = None   # kosib: mahsulot varianti
+        self.variant_yangi = False
+
+
+def _id(qiymat):
+    """Formadagi / Excel'dagi ID → int yoki None (bo'sh qator)"""
+    if qiymat in (None, ''):
+        return None
+    try:
+        return int(str(qiymat).strip())
+    except ValueError:
+        return None
+
+
+def _sarf(qiymat, default):
+    """Bitta mahsulot uchun sarf: kiritilgan bo'lsa o'sha, aks holda mahsulot default'i"""
+    if qiymat in (None, ''):
+        return default
+    try:
+        return Decimal(str(qiymat).strip())
+    except (ValueError, InvalidOperation):
+        logger.warning(f"Noto'g'ri sarf: {qiymat}")
+        return default
+
+
+def _kategoriya(xomashyo):
+    return xomashyo.category.name.lower()
+
+
+def _yetarli_emas(nomi, kerak, mavjud):
+    return ValueError(f"❌ Omborda yetarli {nomi} yo'q! Kerak: {kerak}, Mavjud: {mavjud}")
+
+
+def _kamaytirish(xomashyo, variant, n):
+    """Shartli UPDATE: qoldiq yetmasa (parallel ish olib qo'ygan) — ValueError"""
+    if variant:
+        soni = XomashyoVariant.objects.filter(pk=variant.pk, miqdori__gte=n).update(
+            miqdori=F('miqdori') - n,
+        )
+    else:
+        soni = Xomashyo.objects.filter(pk=xomashyo.pk, miqdori__gte=n).update(
+            miqdori=F('miqdori') - n, updated_at=timezone.now(),
+        )
+    if not soni:
+        raise ValueError(f"❌ {xomashyo.nomi} qoldig'i o'zgardi, ishni qaytadan kiriting!")
+
+
+def jarayon_qoshish(mahsulot, nomi, miqdor):
+    """
+    Mahsulotning jarayon omboriga (kroy / zakatovka / kosib, 'dona') miqdor qo'shish;
+    xomashyo yo'q bo'lsa yaratiladi. Natija: jarayon Xomashyo'si.
+    """
+    category, _ = XomashyoCategory.objects.get_or_create(
+        name=nomi, defaults={'turi': 'process'},
+    )
+    xomashyo = Xomashyo.objects.filter(
+        mahsulot=mahsulot, category=category, olchov_birligi='dona',
+    ).first()
+    if xomashyo:
+        Xomashyo.objects.filter(pk=xomashyo.pk).update(
+            miqdori=F('miqdori') + miqdor, updated_at=timezone.now(),
+        )
+        return xomashyo
+    return Xomashyo.objects.create(
+        mahsulot=mahsulot,
+        category=category,
+        nomi=f"{mahsulot.nomi} - {nomi.title()}",
+        miqdori=miqdor,
+        olchov_birligi='dona',
+        holati='active',
+    )
+
+
+def _ish_xomashyo(ish, xomashyo, miqdor, variant=None):
+    """IshXomashyo.save bilan bir xil birlik_narx (bulk_create save'ni chaqirmaydi)"""
+    return IshXomashyo(
+        ish=ish,
+        xomashyo=xomashyo,
+        variant=variant,
+        miqdor=miqdor,
+        birlik_narx=variant.narxi if variant else xomashyo.narxi,
+    )
+
+
+@transaction.atomic
+def ish_qoshish(ishchi, mahsulot, soni, sana, tanlov=None):
+    """
+    Ishchi turiga qarab ish yaratadi va xomashyo harakatlarini yozadi.
+    tanlov — modul docstring'idagi kalitlar (kerakli turlari uchun).
+    """
+    tanlov = tanlov or {}
+    turi = ishchi.turi.nomi.lower() if ishchi.turi else None
+    if not turi:
+        raise ValueError("❌ Ishchi turi ko'rsatilmagan!")
+    if soni < 1:
+        raise ValueError("❌ Son 1 dan katta bo'lishi kerak!")
+
+    soni_d   = Decimal(soni)
+    mustaqil = bool(tanlov.get('mustaqil'))
+
+    terilar = [
+        (_id(t.get('xomashyo_id')), _id(t.get('variant_id')), t.get('sarf'))
+        for t in tanlov.get('terilar') or ()
+    ]
+    terilar = [t for t in terilar if t[0]]
+    astar   = tanlov.get('astar') or {}
+    astar_id, astar_variant_id = _id(astar.get('xomashyo_id')), _id(astar.get('variant_id'))
+
+    if turi in ('kroy', 'rezak'):
+        if not terilar:
+            raise ValueError(f"❌ {turi.title()} uchun kamida bitta teri tanlanishi kerak!")
+        kerak_idlar = [t[0] for t in terilar] + [astar_id]
+        variant_idlar = [t[1] for t in terilar] + [astar_variant_id]
+    elif turi == 'zakatovka':
+        if not mustaqil and not _id(tanlov.get('kroy_id')):
+            raise ValueError(
+                "❌ Kroy xomashyosi tanlanmagan! "
+                "'Mustaqil ish' belgisini yoqing yoki kroy xomashyosini tanlang."
+            )
+        kerak_idlar = [] if mustaqil else [_id(tanlov.get('kroy_id'))]
+        variant_idlar = []
+    elif turi == 'kosib':
+        if not _id(tanlov.get('padoj_id')):
+            raise ValueError("❌ Kosib uchun padoj tanlanishi kerak!")
+        if not mustaqil and not _id(tanlov.get('zakatovka_id')):
+            raise ValueError(
+                "❌ Zakatovka xomashyosi tanlanmagan! "
+                "'Mustaqil ish' belgisini yoqing yoki zakatovka xomashyosini tanlang."
+            )
+        kerak_idlar = [_id(tanlov.get('padoj_id'))] + ([] if mustaqil else [_id(tanlov.get('zakatovka_id'))])
+        variant_idlar = [_id(tanlov.get('padoj_variant_id'))]
+    else:
+        kerak_idlar, variant_idlar = [], []
+
+    # ── 1. Xomashyo va variantlar — bittadan so'rov ──
+    xomashyolar = (
+        Xomashyo.objects.select_related('category')
+        .in_bulk([i for i in kerak_idlar if i])
+    )
+    variantlar = XomashyoVariant.objects.in_bulk([i for i in variant_idlar if i])
+
+    def xomashyo_ol(pk, kategoriya=None, jarayon=False, nomi='Xomashyo'):
+        xom = xomashyolar.get(pk)
+        if (
+            xom is None or xom.holati != 'active'
+            or (kategoriya and _kategoriya(xom) != kategoriya)
+            or (jarayon and xom.category.turi != 'process')
+        ):
+            raise ValueError(f"❌ ID {pk} bilan {nomi.lower()} topilmadi!")
+        return xom
+
+    def variant_ol(pk, xomashyo):
+        variant = variantlar.get(pk) if pk else None
+        if pk and (variant is None or variant.xomashyo_id != xomashyo.pk):
+            logger.warning(f"Variant {pk} topilmadi")
+            return None
+        return variant
+
+    def ish_yaratish(variant=None):
+        # Tekshiruvlardan keyin — xato bo'lsa ortiqcha INSERT / ROLLBACK yo'q
+        natija.ish = Ish.objects.create(
+            ishchi=ishchi, mahsulot=mahsulot, soni=soni, status='yangi', sana=sana, variant=variant,
+        )
+        return natija.ish
+
+    natija = IshNatija()
+    qatorlar = []   # IshXomashyo
+
+    # ── KROY / REZAK: terilar + ixtiyoriy astar, kroy jarayoni ──
+    if turi in ('kroy', 'rezak'):
+        # 2. Xotirada tekshirish — bir teri / variant bir necha qatorda bo'lsa jami
+        kerak = defaultdict(Decimal)
+        for teri_id, variant_id, sarf in terilar:
+            teri    = xomashyo_ol(teri_id, 'teri', nomi='Teri')
+            variant = variant_ol(variant_id, teri)
+            bitta   = _sarf(sarf, mahsulot.teri_sarfi)
+            jami    = bitta * soni
+            if jami <= 0:
+                raise ValueError(f"❌ {teri.nomi} sarfi 0 dan katta bo'lishi kerak!")
+            natija.terilar.append((teri, variant, bitta, jami))
+            natija.jami_teri += jami
+            kerak[(teri, variant)] += jami
+
+        astar_variant = None
+        if astar_id:
+            natija.astar = xomashyo_ol(astar_id, 'astar', nomi='Astar')
+            natija.astar_miqdor = _sarf(astar.get('sarf'), mahsulot.astar_sarfi) * soni
+            if natija.astar_miqdor > 0:
+                astar_variant = variant_ol(astar_variant_id, natija.astar)
+                kerak[(natija.astar, astar_variant)] += natija.astar_miqdor
+
+        for (xom, variant), jami in kerak.items():
+            mavjud = variant.miqdori if variant else xom.miqdori
+            if mavjud < jami:
+                nomi = f"{xom.nomi} ({variant.rang})" if variant else xom.nomi
+                raise _yetarli_emas(nomi, jami, mavjud)
+
+        # 3. TeriSarfi / IshXomashyo — bulk_create
+        ish = ish_yaratish()
+        hozir = timezone.now()
+        TeriSarfi.objects.bulk_create([
+            TeriSarfi(ish=ish, ishchi=ishchi, xomashyo=teri, variant=variant, miqdor=jami, sana=hozir)
+            for teri, variant, _, jami in natija.terilar
+        ])
+        qatorlar += [_ish_xomashyo(ish, teri, jami, variant) for teri, variant, _, jami in natija.terilar]
+        if natija.astar and natija.astar_miqdor > 0:
+            qatorlar.append(_ish_xomashyo(ish, natija.astar, natija.astar_miqdor, astar_variant))
+
+        qatorlar.append(_ish_xomashyo(ish, jarayon_qoshish(mahsulot, 'kroy', soni_d), soni_d))
+
+    # ── ZAKATOVKA: kroy jarayonidan oladi, zakatovka jarayoniga qo'shadi ──
+    elif turi == 'zakatovka':
+        if not mustaqil:
+            natija.kroy = xomashyo_ol(_id(tanlov['kroy_id']), 'kroy', jarayon=True, nomi='Kroy xomashyosi')
+            if natija.kroy.miqdori < soni:
+                raise ValueError(
+                    f"❌ Yetarli kroy xomashyo yo'q! Kerak: {soni}, Mavjud: {natija.kroy.miqdori}"
+                )
+        ish = ish_yaratish()
+        if natija.kroy:
+            _kamaytirish(natija.kroy, None, soni_d)
+            qatorlar.append(_ish_xomashyo(ish, natija.kroy, soni_d))
+
+        qatorlar.append(_ish_xomashyo(ish, jarayon_qoshish(mahsulot, 'zakatovka', soni_d), soni_d))
+
+    # ── KOSIB: padoj (+ zakatovka), mahsulot varianti, kosib jarayoni ──
+    elif turi == 'kosib':
+        natija.padoj = xomashyo_ol(_id(tanlov['padoj_id']), nomi='Padoj')
+        padoj_id = _id(tanlov.get('padoj_variant_id'))
+        padoj_variant = variantlar.get(padoj_id) if padoj_id else None
+        if padoj_id and (padoj_variant is None or padoj_variant.xomashyo_id != natija.padoj.pk):
+            raise ValueError("❌ Xomashyo varianti topilmadi!")
+        mavjud = padoj_variant.miqdori if padoj_variant else natija.padoj.miqdori
+        if mavjud < soni:
+            nomi = f"{natija.padoj.nomi} ({padoj_variant.rang})" if padoj_variant else natija.padoj.nomi
+            raise _yetarli_emas(nomi, soni, mavjud)
+
+        if not mustaqil:
+            natija.zakatovka = xomashyo_ol(_id(tanlov['zakatovka_id']), 'zakatovka', nomi='Zakatovka')
+            if natija.zakatovka.mahsulot_id != mahsulot.pk:
+                raise ValueError(f"❌ {natija.zakatovka.nomi} — boshqa mahsulot zakatovkasi!")
+            if natija.zakatovka.miqdori < soni:
+                raise ValueError(
+                    f"❌ Yetarli zakatovka yo'q! Kerak: {soni}, Mavjud: {natija.zakatovka.miqdori}"
+                )
+
+        variant_id = tanlov.get('mahsulot_variant_id')
+        if variant_id and variant_id != 'new':
+            natija.variant = ProductVariant.objects.filter(id=_id(variant_id), product=mahsulot).first()
+            if natija.variant is None:
+                raise ValueError("❌ Mahsulot varianti topilmadi!")
+        else:
+            natija.variant, natija.variant_yangi = ProductVariant.objects.get_or_create(
+                product=mahsulot,
+                rang=tanlov.get('variant_rang', ''),
+                razmer=tanlov.get('variant_razmer', ''),
+                defaults={'stock': 0, 'price': mahsulot.narxi},
+            )
+
+        # variant stock'iga soni Ish.save da qo'shiladi (Product.soni bilan birga)
+        ish = ish_yaratish(natija.variant)
+        if natija.zakatovka:
+            _kamaytirish(natija.zakatovka, None, soni_d)
+            qatorlar.append(_ish_xomashyo(ish, natija.zakatovka, soni_d))
+
+        _kamaytirish(natija.padoj, padoj_variant, soni_d)
+        qatorlar.append(_ish_xomashyo(ish, natija.padoj, soni_d, padoj_variant))
+
+        qatorlar.append(_ish_xomashyo(ish, jarayon_qoshish(mahsulot, 'kosib', soni_d), soni_d))
+
+    # ── PARDOZ va boshqalar — faqat Ish ──
+    else:
+        ish_yaratish()
+
+    IshXomashyo.objects.bulk_create(qatorlar)
+    return natija
@@ -0,0 +1,149 @@
+# crm/management/commands/check_query_plans.py
+"""
+Asosiy ro'yxat / hisobot so'rovlarining bajarilish rejasini tekshiradi.
+
+Har bir so'rov view'lardagi bilan bir xil filtr va tartibda quriladi, so'ng
+EXPLAIN QUERY PLAN (SQLite) yoki EXPLAIN (PostgreSQL, enable_seqscan=off)
+bilan rejasi olinadi. Biror jadval indekssiz to'liq skan qilinsa — buyruq
+xato bilan tugaydi (CI'da indeks yo'qolgani / so'rov buzilgani darhol ko'rinadi).
+
+    python manage.py check_query_plans
+    python manage.py check_query_plans -v 2          # rejalarni ham chiqarish
+    python manage.py check_query_plans --faqat sotuv  # nomida 'sotuv' borlari
+
+Xuddi shu so'rovlar crm/tests.py da ham tekshiriladi (manage.py test crm).
+"""
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from analytics.metrics import davr
+from crm.models import Chiqim, Ish, Kirim, Sotuv, ValyutaKurs, Xaridor
+from crm.sahifalash import KursorPaginator
+from xomashyo.models import XomashyoHarakat
+
+# SQLite: "SCAN crm_sotuv" — indekssiz; "SCAN ... USING INDEX" — indeks bo'ylab
+SQLITE_SKAN   = re.compile(r'\bSCAN (\w+)(?: AS \w+)?\s*$')
+POSTGRES_SKAN = re.compile(r'Seq Scan on (\w+)')
+SQLITE_SARALASH = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def sorovlar():
+    """(nomi, queryset) — view'lardagi issiq so'rovlar"""
+    bugun = timezone.localdate()
+    hafta = bugun - timedelta(days=7)
+    kursor = KursorPaginator(Sotuv.objects.all(), 50, 'sana')._shart(timezone.now(), 10 ** 6, kichik=True)
+
+    return [
+        # ── Sotuv ──
+        ('sotuv: royxat',
+         Sotuv.objects.select_related('xaridor').order_by('-sana', '-pk')[:51]),
+        ('sotuv: keyingi sahifa',
+         Sotuv.objects.select_related('xaridor').filter(kursor).order_by('-sana', '-pk')[:51]),
+        ('sotuv: holat + davr',
+         Sotuv.objects.filter(tolov_holati='qisman').filter(davr('sana__date', hafta, bugun)).order_by('-sana')),
+        ('sotuv: kunlik rollup',
+         Sotuv.objects.filter(davr('sana__date', bugun, bugun))
+         .values('tolov_holati').annotate(s=Sum('yakuniy_summa'), n=Count('id')).order_by()),
+        ('sotuv: xaridor qarzlari (FIFO)',
+         Sotuv.objects.filter(xaridor_id=1).exclude(tolov_holati='tolandi').order_by('sana')),
+
+        # ── Kirim ──
+        ('kirim: royxat',
+         Kirim.objects.select_related('xaridor', 'sotuv').order_by('-sana', '-pk')[:51]),
+        ('kirim: kunlik rollup',
+         Kirim.objects.filter(davr('sana__date', bugun, bugun)).values_list('summa', 'summa_usd')),
+        ('kirim: xaridor tarixi',
+         Kirim.objects.filter(xaridor_id=1).select_related('sotuv').order_by('-sana')),
+        ('kirim: sotuv to\'lovlari',
+         Kirim.objects.filter(sotuv_id=1).values_list('summa').order_by()),
+
+        # ── Chiqim ──
+        ('chiqim: royxat',
+         Chiqim.objects.select_related('category').order_by('-created', '-pk')[:51]),
+        ('chiqim: kunlik rollup',
+         Chiqim.objects.filter(created=bugun)
+         .values('category').annotate(s=Sum('price'), n=Count('id')).order_by()),
+
+        # ── Ish ──
+        ('ish: ishchi yangi ishlari',
+         Ish.objects.filter(ishchi_id=1, status='yangi').values_list('narxi')),
+        ('ish: yangi ishlar jami',
+         Ish.objects.filter(status='yangi').values_list('narxi')),
+
+        # ── Xomashyo ──
+        ('xomashyo: qarzdor kirimlar',
+         XomashyoHarakat.objects.filter(harakat_turi='kirim', tolov_holati__in=['tolanmagan', 'qisman'])
+         .select_related('xomashyo', 'yetkazib_beruvchi').order_by('-sana')),
+        ('xomashyo: yetkazib beruvchi qarzlari',
+         XomashyoHarakat.objects.filter(
+             yetkazib_beruvchi_id=1, harakat_turi='kirim', tolov_holati__in=['tolanmagan', 'qisman'],
+         ).order_by('sana', 'id')),
+        ('xomashyo: davr kirimlari',
+         XomashyoHarakat.objects.filter(harakat_turi='kirim', sana__gte=hafta, sana__lte=bugun)
+         .values_list('jami_narx_uzs')),
+
+        # ── Boshqalar ──
+        ('xaridor: qarz bo\'yicha',
+         Xaridor.objects.order_by('-jami_qarz')[:50]),
+        ('valyuta: kurs',
+         ValyutaKurs.objects.filter(valyuta='USD', sana__lte=bugun).order_by('-sana')[:1]),
+    ]
+
+
+def reja(qs):
+    """So'rovning bajarilish rejasi (matn)"""
+    if connection.vendor == 'postgresql':
+        # Kichik jadvalda Seq Scan arzonroq — indeks umuman ishlatilishi mumkinligini tekshiramiz
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return qs.explain()
+    return qs.explain()
+
+
+def skanlar(matn):
+    """Rejada indekssiz to'liq skan qilingan jadvallar"""
+    if connection.vendor == 'postgresql':
+        return POSTGRES_SKAN.findall(matn)
+    return [m.group(1) for m in map(SQLITE_SKAN.search, matn.splitlines()) if m]
+
+
+class Command(BaseCommand):
+    help = "Issiq so'rovlar rejasini tekshiradi — to'liq skan bo'lsa xato bilan tugaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--faqat', help="Faqat nomida shu matn bor so'rovlar")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.stdout.write(self.style.WARNING(f"⚠️ {connection.vendor} uchun reja tekshiruvi yo'q"))
+            return
+
+        tanlangan = [
+            (nomi, qs) for nomi, qs in sorovlar()
+            if not options['faqat'] or options['faqat'] in nomi
+        ]
+        xatolar = []
+        for nomi, qs in tanlangan:
+            matn = reja(qs)
+            skan = skanlar(matn)
+
+            if skan:
+                xatolar.append(nomi)
+                self.stdout.write(self.style.ERROR(f"❌ {nomi}: to'liq skan — {', '.join(skan)}"))
+            elif SQLITE_SARALASH in matn:
+                self.stdout.write(self.style.WARNING(f"⚠️ {nomi}: indeks, lekin alohida saralash"))
+            else:
+                self.stdout.write(f"✅ {nomi}")
+
+            if options['verbosity'] > 1:
+                self.stdout.write('    ' + matn.replace('\n', '\n    '))
+
+        if xatolar:
+            raise CommandError(f"{len(xatolar)} ta so'rov to'liq skanga tushdi: {', '.join(xatolar)}")
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(tanlangan)} ta so'rov rejasi indeks bilan"))
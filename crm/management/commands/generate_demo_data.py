@@ -0,0 +1,52 @@
+# crm/management/commands/generate_demo_data.py
+"""
+Joriy bazaga izchil demo ma'lumot yozadi (crm/demo.py) — benchmark va
+check_query_plans uchun real hajmdagi fixture (URL budjet testlari — crm/tests.py).
+
+    python manage.py generate_demo_data                  # ~2000 ish, ~1000 sotuv
+    python manage.py generate_demo_data --scale 20       # ~40 000 ish, ~20 000 sotuv
+    python manage.py generate_demo_data --scale 5 --kunlar 730 --seed 7
+
+Hammasi bitta tranzaksiyada bulk_create bilan yoziladi. Oxirida ombor
+qoldiqlari va to'lov balanslari bazadan qayta hisoblanib tekshiriladi —
+mos kelmasa buyruq xato bilan tugaydi (tranzaksiya bekor qilinadi).
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from crm.demo import DemoYaratuvchi
+
+
+class Command(BaseCommand):
+    help = "Izchil demo ma'lumot (ish, sotuv, kirim, xomashyo, to'lovlar) — bulk_create bilan"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1, help="Hajm ko'paytiruvchisi (default 1)")
+        parser.add_argument('--kunlar', type=int, default=365, help="Necha kunlik tarix (default 365)")
+        parser.add_argument('--seed', type=int, default=0, help="Tasodifiy son urug'i (bir xil seed — bir xil ma'lumot)")
+        parser.add_argument('--tekshirmaslik', action='store_true',
+                            help="Qoldiq / balans tekshiruvini o'tkazib yuborish")
+
+    def handle(self, *args, **options):
+        yaratuvchi = DemoYaratuvchi(scale=options['scale'], kunlar=options['kunlar'], seed=options['seed'])
+        boshi = time.perf_counter()
+
+        with transaction.atomic():
+            natija = yaratuvchi.yaratish()
+            sekund = time.perf_counter() - boshi
+
+            if not options['tekshirmaslik']:
+                xatolar = yaratuvchi.tekshirish()
+                if xatolar:
+                    for xato in xatolar[:20]:
+                        self.stdout.write(self.style.ERROR(f"❌ {xato}"))
+                    raise CommandError(f"{len(xatolar)} ta qoldiq / balans mos kelmadi — ma'lumot yozilmadi")
+
+        for nomi, soni in natija.items():
+            self.stdout.write(f"  {nomi:<15} {soni:>8}")
+        tekshiruv = '' if options['tekshirmaslik'] else ", qoldiq va balanslar mos"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {sum(natija.values())} ta yozuv {sekund:.1f} s da yaratildi{tekshiruv}"
+        ))
@@ -0,0 +1,69 @@
+# crm/management/commands/ish_narxlarini_hisoblash.py
+"""
+Ish.narxi ni ishbay narx tarixidan (ProductRate) qayta hisoblash — orqa sana
+bilan narx kiritilganda yoki xato narx tuzatilganda.
+
+    python manage.py ish_narxlarini_hisoblash                    # barcha ochiq (status='yangi') ishlar
+    python manage.py ish_narxlarini_hisoblash --dan 2026-10-01 --gacha 2026-10-31
+    python manage.py ish_narxlarini_hisoblash --quruq            # faqat farqni ko'rsatish
+    python manage.py ish_narxlarini_hisoblash --yopilganlar      # oyligi yopilganlar ham (ehtiyot!)
+
+Faqat narxi o'zgargan qatorlar bulk_update bilan yoziladi (save() chaqirilmaydi);
+ochiq ishlar farqi ishchi hisobiga (Ishchi.joriy_hisob) bitta UPDATE bilan qo'shiladi.
+"""
+from collections import defaultdict
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from crm import narxlar
+from crm.models import Ish, Ishchi
+
+PARTIYA = 1000
+
+
+class Command(BaseCommand):
+    help = "Ish.narxi ni ish sanasida amal qilgan ishbay narx bilan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dan', type=date.fromisoformat, default=None)
+        parser.add_argument('--gacha', type=date.fromisoformat, default=None)
+        parser.add_argument('--yopilganlar', action='store_true',
+                            help="status='yopilgan' ishlarni ham (yopilgan oylik bilan mos kelmay qoladi)")
+        parser.add_argument('--quruq', action='store_true', help="Yozmasdan, faqat hisobot")
+
+    def handle(self, *args, **options):
+        qs = Ish.objects.all()
+        if not options['yopilganlar']:
+            qs = qs.filter(status='yangi')
+        if options['dan']:
+            qs = qs.filter(sana__gte=options['dan'])
+        if options['gacha']:
+            qs = qs.filter(sana__lte=options['gacha'])
+
+        korildi, ozgardi, farq = 0, [], 0
+        hisob = defaultdict(lambda: defaultdict(int))
+        for pk, mahsulot_id, ishchi_id, sana, soni, eski, status in (
+            qs.order_by('pk')
+            .values_list('pk', 'mahsulot_id', 'ishchi_id', 'sana', 'soni', 'narxi', 'status')
+            .iterator(chunk_size=PARTIYA)
+        ):
+            korildi += 1
+            turi = narxlar.ishchi_turi(ishchi_id)
+            if turi not in narxlar.USTUNLAR or soni is None:
+                continue
+            yangi = narxlar.narx(mahsulot_id, turi, sana) * int(soni)
+            if yangi != eski:
+                ozgardi.append(Ish(pk=pk, narxi=yangi))
+                farq += yangi - (eski or 0)
+                if status == 'yangi':
+                    hisob[ishchi_id]['joriy_hisob'] += yangi - (eski or 0)
+
+        self.stdout.write(f"Ko'rildi: {korildi}, narxi o'zgaradi: {len(ozgardi)}, jami farq: {farq:+,} so'm")
+        if options['quruq'] or not ozgardi:
+            return
+        with transaction.atomic():
+            Ish.objects.bulk_update(ozgardi, ['narxi'], batch_size=PARTIYA)
+            Ishchi.hisobni_siljitish(hisob)
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(ozgardi)} ta ish narxi yangilandi"))
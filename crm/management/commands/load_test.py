@@ -0,0 +1,118 @@
+# crm/management/commands/load_test.py
+"""
+Ishlayotgan serverga parallel kassir / ishlab chiqarish yuklamasi (crm/yuklama.py).
+
+    python manage.py runserver --noreload          # yoki gunicorn config.wsgi -w 4
+    python manage.py load_test                     # 8 oqim, 30 s
+    python manage.py load_test --oqimlar 32 --davomiylik 120 --natija yuklama.json
+    python manage.py load_test --aralash sotuv=1,kirim=1 --sorovlar 500
+
+Buyruq server bilan bir xil sozlamalar va bazada ishga tushiriladi (id'lar,
+sessiya va oxiridagi tekshiruv bazadan). Bazada ma'lumot bo'lmasa avval
+generate_demo_data. Qoldiq / balans mos kelmasa buyruq xato bilan tugaydi.
+"""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.yuklama import ARALASH, TOIFALAR, Manba, Yuklama, sessiya_yaratish, surat, tekshirish
+
+
+def aralash_parse(qiymat):
+    """'sotuv=4,kirim=1' → {'sotuv': 4, 'sotuv_item': 0, 'kirim': 1, 'ish': 0}"""
+    natija = dict.fromkeys(ARALASH, 0)
+    for qism in filter(None, qiymat.split(',')):
+        nomi, _, vazn = qism.partition('=')
+        nomi = nomi.strip()
+        if nomi not in natija:
+            raise CommandError(f"Noma'lum ssenariy: {nomi} (mumkin: {', '.join(ARALASH)})")
+        try:
+            natija[nomi] = int(vazn or 1)
+        except ValueError:
+            raise CommandError(f"Vazn butun son bo'lishi kerak: {qism}")
+    if not any(natija.values()):
+        raise CommandError("Kamida bitta ssenariy vazni 0 dan katta bo'lishi kerak")
+    return natija
+
+
+class Command(BaseCommand):
+    help = "Parallel sotuv / kirim / ish yuklamasi: p50/p95/p99, throughput, qulf xatolari va invariantlar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help="Server manzili")
+        parser.add_argument('--oqimlar', type=int, default=8, help="Parallel mijozlar (default 8)")
+        parser.add_argument('--davomiylik', type=float, default=30, help="Soniya (default 30)")
+        parser.add_argument('--sorovlar', type=int, help="Jami so'rovlar chegarasi (davomiylikdan oldin tugasa)")
+        parser.add_argument('--aralash', default=','.join(f'{k}={v}' for k, v in ARALASH.items()),
+                            help="Ssenariy vaznlari, masalan sotuv=4,sotuv_item=2,kirim=3,ish=3")
+        parser.add_argument('--foydalanuvchi', default='yuklama',
+                            help="Staff foydalanuvchi (yo'q bo'lsa parolsiz yaratiladi)")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--natija', help="Hisobotni JSON faylga yozish")
+        parser.add_argument('--tekshirmaslik', action='store_true', help="Qoldiq / balans tekshiruvisiz")
+
+    def handle(self, *args, **options):
+        aralash = aralash_parse(options['aralash'])
+        manba = Manba()
+        yetishmaydi = manba.yetishmaydi(aralash)
+        if yetishmaydi:
+            raise CommandError(
+                f"Bazada yetishmaydi: {', '.join(yetishmaydi)} — avval: python manage.py generate_demo_data"
+            )
+
+        user, yaratildi = get_user_model().objects.get_or_create(
+            username=options['foydalanuvchi'], defaults={'is_staff': True},
+        )
+        if yaratildi:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        elif not (user.is_staff or user.is_superuser):
+            raise CommandError(f"{user.username} staff emas — view'lar is_admin talab qiladi")
+
+        oldin = surat()
+        yuklama = Yuklama(options['url'], sessiya_yaratish(user), manba, aralash, seed=options['seed'])
+        self.stdout.write(
+            f"▶ {options['url']} — {options['oqimlar']} oqim, "
+            f"{options['sorovlar'] or '∞'} so'rov / {options['davomiylik']:g} s"
+        )
+        hisobot = yuklama.ishga_tushirish(options['oqimlar'], options['davomiylik'], options['sorovlar'])
+
+        self._jadval(hisobot)
+
+        xatolar = []
+        if not options['tekshirmaslik']:
+            chiqarilgan = None if hisobot['ochilmadi'] else dict(yuklama.chiqarilgan)
+            xatolar = tekshirish(oldin, chiqarilgan)
+            hisobot['invariant_xatolari'] = xatolar
+            if chiqarilgan is None:
+                self.stdout.write(self.style.WARNING(
+                    f"⚠ {hisobot['ochilmadi']} ta javobda messages cookie ochilmadi (SECRET_KEY farqli?) — "
+                    "variant qoldig'i tekshirilmadi"
+                ))
+
+        if options['natija']:
+            with open(options['natija'], 'w', encoding='utf-8') as f:
+                json.dump(hisobot, f, ensure_ascii=False, indent=2)
+
+        if xatolar:
+            for xato in xatolar[:20]:
+                self.stdout.write(self.style.ERROR(f"❌ {xato}"))
+            raise CommandError(f"{len(xatolar)} ta qoldiq / balans mos kelmadi")
+        if not options['tekshirmaslik']:
+            self.stdout.write(self.style.SUCCESS("✅ Qoldiq va balanslar mos"))
+
+    def _jadval(self, hisobot):
+        ustunlar = ('soni',) + TOIFALAR + ('p50', 'p95', 'p99', 'max', 'rps')
+        self.stdout.write(f"{'ssenariy':<12}" + ''.join(f"{u:>9}" for u in ustunlar))
+        qatorlar = list(hisobot['ssenariylar'].items()) + [('JAMI', hisobot['jami'])]
+        for nomi, q in qatorlar:
+            self.stdout.write(f"{nomi:<12}" + ''.join(f"{q[u]:>9}" for u in ustunlar))
+        self.stdout.write(f"{hisobot['soniya']} s, vaqtlar ms da")
+
+        jami = hisobot['jami']
+        qulf = jami['qulf']
+        stil = self.style.ERROR if qulf or jami['server'] else self.style.SUCCESS
+        self.stdout.write(stil(f"qulf (database is locked / deadlock): {qulf}, 5xx: {jami['server']}"))
+        for x in hisobot['xatolar'][:10]:
+            self.stdout.write(f"  {x['soni']:>5} × [{x['ssenariy']}/{x['toifa']}] {x['matn']}")
@@ -0,0 +1,62 @@
+# crm/management/commands/mahsulot_soni_tekshirish.py
+"""
+Product.soni siljishini aniqlash (va tuzatish).
+
+Product.soni endi qayta yig'ilmaydi — kosib Ish save / delete va sotuvlar
+uni farq bilan siljitadi (Product.adjust_quantities). To'g'ri qiymat —
+variantlar qoldig'i yig'indisi (Σ ProductVariant.stock). queryset.update(),
+qo'lda tahrir yoki tashqi import bilan siljigan mahsulotlarni shu buyruq topadi:
+
+    python manage.py mahsulot_soni_tekshirish              # faqat hisobot (siljish bo'lsa — xato kodi)
+    python manage.py mahsulot_soni_tekshirish --tuzatish   # siljiganlarini qayta hisoblash
+    python manage.py mahsulot_soni_tekshirish --id 3 --id 7
+
+Cron (har kecha):  0 3 * * *  python manage.py mahsulot_soni_tekshirish --tuzatish
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from crm.models import Product, ProductVariant
+
+
+def siljiganlar(product_ids=None):
+    """[(pk, nomi, soni, kutilgan)] — Product.soni != Σ variant.stock bo'lganlari, bitta so'rov"""
+    jami = (
+        ProductVariant.objects.filter(product=models.OuterRef('pk'))
+        .order_by().values('product')
+        .annotate(total=models.Sum('stock'))
+        .values('total')
+    )
+    qs = Product.objects.annotate(kutilgan=Coalesce(models.Subquery(jami), 0))
+    if product_ids:
+        qs = qs.filter(pk__in=product_ids)
+    qs = qs.exclude(soni=models.F('kutilgan')).order_by('pk')
+    return list(qs.values_list('pk', 'nomi', 'soni', 'kutilgan'))
+
+
+class Command(BaseCommand):
+    help = "Product.soni ni variantlar qoldig'i bilan solishtiradi (--tuzatish — qayta hisoblaydi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', dest='ids', type=int, action='append',
+                            help="Faqat shu mahsulot(lar) uchun (bir necha marta berish mumkin)")
+        parser.add_argument('--tuzatish', action='store_true',
+                            help="Siljigan mahsulotlarni Σ variant.stock ga tenglash")
+
+    def handle(self, *args, **options):
+        topildi = siljiganlar(options['ids'])
+        if not topildi:
+            self.stdout.write(self.style.SUCCESS("✅ Product.soni barcha mahsulotlarda mos"))
+            return
+
+        self.stdout.write(f"{'id':>6}  {'mahsulot':<30}{'soni':>10}{'kutilgan':>10}{'farq':>10}")
+        for pk, nomi, soni, kutilgan in topildi:
+            farq = (soni or 0) - kutilgan
+            self.stdout.write(f"{pk:>6}  {nomi[:30]:<30}{soni if soni is not None else '—':>10}{kutilgan:>10}{farq:>+10}")
+
+        if options['tuzatish']:
+            Product.update_total_quantities([pk for pk, *_ in topildi])
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(topildi)} ta mahsulot soni tuzatildi"))
+        else:
+            raise CommandError(f"{len(topildi)} ta mahsulotda Product.soni siljigan (--tuzatish bilan tuzating)")
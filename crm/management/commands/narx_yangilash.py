@@ -0,0 +1,69 @@
+# crm/management/commands/narx_yangilash.py
+"""
+Ishbay narxlarni ommaviy yangilash (ProductRate, crm/narxlar.py).
+
+    python manage.py narx_yangilash --turi kosib --foiz 10                 # barcha mahsulot, bugundan +10%
+    python manage.py narx_yangilash --turi kroy --narx 12000 --mahsulot 3 --mahsulot 5
+    python manage.py narx_yangilash --turi pardoz --foiz -5 --sana 2026-11-01
+    python manage.py narx_yangilash --boshlangich    # tarixi yo'q mahsulotlar: Product.narx_* → jadval
+
+Yangi narx --sana dan (default — bugun) amal qiladi; shu sanagacha bo'lgan
+ishlar eski narxda qoladi. Hammasi bitta bulk upsert.
+"""
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from crm import narxlar
+from crm.models import Product
+
+
+class Command(BaseCommand):
+    help = "Ishbay narxlarni ommaviy yangilash (foiz yoki aniq narx, amal qilish sanasi bilan)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turi', choices=list(narxlar.USTUNLAR), help="Ishchi turi")
+        parser.add_argument('--foiz', type=Decimal, help="Joriy narxga nisbatan o'zgarish, %%")
+        parser.add_argument('--narx', type=int, help="Aniq narx (1 dona)")
+        parser.add_argument('--mahsulot', dest='mahsulotlar', type=int, action='append',
+                            help="Faqat shu mahsulot(lar) (bir necha marta berish mumkin)")
+        parser.add_argument('--sana', type=date.fromisoformat, default=None,
+                            help="Amal qilish sanasi YYYY-MM-DD (default — bugun)")
+        parser.add_argument('--boshlangich', action='store_true',
+                            help="Narx tarixi yo'q mahsulotlar uchun Product.narx_* dan boshlang'ich narxlar")
+
+    def handle(self, *args, **options):
+        if options['boshlangich']:
+            soni = narxlar.boshlangich_narxlar(options['mahsulotlar'])
+            self.stdout.write(self.style.SUCCESS(f"✅ {soni} ta boshlang'ich narx yozildi"))
+            return
+
+        turi = options['turi']
+        if not turi:
+            raise CommandError("--turi kerak")
+        if (options['foiz'] is None) == (options['narx'] is None):
+            raise CommandError("--foiz yoki --narx dan bittasini bering")
+
+        sana = options['sana'] or timezone.localdate()
+        product_ids = Product.objects.values_list('pk', flat=True)
+        if options['mahsulotlar']:
+            product_ids = product_ids.filter(pk__in=options['mahsulotlar'])
+
+        qiymatlar = {}
+        for pk in product_ids:
+            if options['narx'] is not None:
+                yangi = options['narx']
+            else:
+                eski = Decimal(narxlar.narx(pk, turi, sana))
+                yangi = int((eski * (1 + options['foiz'] / 100)).quantize(Decimal('1'), ROUND_HALF_UP))
+            qiymatlar[(pk, turi)] = max(yangi, 0)
+
+        if not qiymatlar:
+            raise CommandError("Mahsulot topilmadi")
+        soni = narxlar.narxlarni_ornatish(qiymatlar, sana)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {soni} ta mahsulot uchun {turi} narxi {sana.isoformat()} dan yangilandi"
+        ))
+        self.stdout.write("Oldin kiritilgan ishlar uchun: manage.py ish_narxlarini_hisoblash --dan " + sana.isoformat())
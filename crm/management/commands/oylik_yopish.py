@@ -0,0 +1,57 @@
+# crm/management/commands/oylik_yopish.py
+"""
+Oy oxiri: barcha ochiq oyliklarni bitta partiyada yopish (crm/oylik_xizmati.py).
+
+    python manage.py oylik_yopish --quruq                 # faqat hisob (hech narsa yozilmaydi)
+    python manage.py oylik_yopish                         # berilgan = hisoblangan
+    python manage.py oylik_yopish --avans-ayirish         # berilgan = hisoblangan − aktiv avans
+    python manage.py oylik_yopish --id 3 --id 7 --izoh "Oktyabr"
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from crm import oylik_xizmati
+
+
+class Command(BaseCommand):
+    help = "Ochiq oyliklarni bitta tranzaksiyada yopadi (--quruq — faqat hisob)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', dest='ids', type=int, action='append',
+                            help="Faqat shu ishchi(lar) (bir necha marta berish mumkin)")
+        parser.add_argument('--avans-ayirish', action='store_true',
+                            help="Berilgan summa — avanslardan keyingi naqd")
+        parser.add_argument('--sana', type=date.fromisoformat, default=None,
+                            help="Oylik / chiqim sanasi YYYY-MM-DD (default — bugun)")
+        parser.add_argument('--izoh', default='')
+        parser.add_argument('--quruq', action='store_true', help="Yozmasdan, faqat hisobot")
+
+    def handle(self, *args, **options):
+        qatorlar = oylik_xizmati.oylik_hisobi(options['ids'])
+        if not qatorlar:
+            raise CommandError("Yopiladigan ochiq oylik yo'q")
+
+        avans_ayirish = options['avans_ayirish']
+        self.stdout.write(f"{'id':>6}  {'ishchi':<28}{'ishlar':>8}{'hisoblangan':>14}{'avans':>12}{'berilgan':>14}")
+        for q in qatorlar:
+            ism = f"{q.ishchi.ism} {q.ishchi.familiya}"
+            self.stdout.write(
+                f"{q.ishchi.pk:>6}  {ism[:28]:<28}{q.ishlar_soni:>8}"
+                f"{q.hisoblangan:>14,}{q.avans:>12,}{q.berilgan(avans_ayirish):>14,}"
+            )
+        self.stdout.write(
+            f"Jami: {len(qatorlar)} ishchi, hisoblangan {sum(q.hisoblangan for q in qatorlar):,}, "
+            f"berilgan {sum(q.berilgan(avans_ayirish) for q in qatorlar):,} so'm"
+        )
+        if options['quruq']:
+            return
+
+        try:
+            run = oylik_xizmati.oylik_yopish(
+                {q.ishchi.pk: None for q in qatorlar},
+                sana=options['sana'], izoh=options['izoh'], avans_ayirish=avans_ayirish,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"✅ {run.ishchilar_soni} ta ishchining oyligi yopildi (#{run.pk})"))
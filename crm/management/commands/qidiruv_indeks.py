@@ -0,0 +1,24 @@
+# crm/management/commands/qidiruv_indeks.py
+"""
+Xaridor / sotuv qidiruv indeksini (crm/qidiruv.py) noldan quradi.
+
+    python manage.py qidiruv_indeks
+"""
+from django.core.management.base import BaseCommand
+
+from crm.qidiruv import qayta_qurish
+
+
+class Command(BaseCommand):
+    help = "Xaridor va sotuvlar qidiruv indeksini qayta quradi"
+
+    def handle(self, *args, **options):
+        natija = qayta_qurish()
+        if natija is None:
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Joriy DB uchun qidiruv indeksi yo'q (SQLite / PostgreSQL kerak) — icontains ishlatiladi"
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Indeks qurildi: {natija['xaridor']} ta xaridor, {natija['sotuv']} ta sotuv"
+        ))
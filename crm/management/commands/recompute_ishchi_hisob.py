@@ -0,0 +1,25 @@
+# crm/management/commands/recompute_ishchi_hisob.py
+"""
+Ishchi hisobi maydonlarini (joriy_hisob, joriy_soni, joriy_avans,
+jami_tolangan) Ish / Avans / Oyliklar dan qayta quradi. Odatda save/delete
+ularni farq bilan o'zi yangilaydi; bu buyruq — migratsiyadan keyin yoki
+queryset.update() / import bilan to'g'ridan-to'g'ri o'zgartirilgan ma'lumotlar uchun.
+
+    python manage.py recompute_ishchi_hisob
+    python manage.py recompute_ishchi_hisob --id 3 --id 7
+"""
+from django.core.management.base import BaseCommand
+
+from crm.models import Ishchi
+
+
+class Command(BaseCommand):
+    help = "Ishchi hisobi maydonlarini ish, avans va oyliklardan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', dest='ids', type=int, action='append',
+                            help="Faqat shu ishchi(lar) uchun (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        soni = Ishchi.hisobni_yangilash(options['ids'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {soni} ta ishchi hisobi yangilandi"))
@@ -0,0 +1,25 @@
+# crm/management/commands/recompute_xaridor_stats.py
+"""
+Xaridor statistikasi maydonlarini (jami_xarid, xaridlar_soni, jami_qarz,
+oxirgi_xarid_sana) sotuvlardan qayta quradi. Odatda Sotuv save / post_delete
+ularni commit'dan keyin o'zi yangilaydi; bu buyruq — migratsiyadan keyin yoki
+queryset.update() bilan to'g'ridan-to'g'ri o'zgartirilgan ma'lumotlar uchun.
+
+    python manage.py recompute_xaridor_stats
+    python manage.py recompute_xaridor_stats --id 12 --id 15
+"""
+from django.core.management.base import BaseCommand
+
+from crm.models import Xaridor
+
+
+class Command(BaseCommand):
+    help = "Xaridor statistikasi maydonlarini sotuvlardan qayta hisoblaydi"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--id', dest='ids', type=int, action='append',
+                            help="Faqat shu xaridor(lar) uchun (bir necha marta berish mumkin)")
+
+    def handle(self, *args, **options):
+        soni = Xaridor.statistikani_yangilash(options['ids'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {soni} ta xaridor statistikasi yangilandi"))
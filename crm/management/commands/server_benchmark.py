@@ -0,0 +1,131 @@
+# crm/management/commands/server_benchmark.py
+"""
+Runtime'larni solishtirish: har bir rejimda serverni ko'tarib, bir xil
+yuklamani (crm/yuklama.py) beradi va throughput / kechikishni yonma-yon chiqaradi.
+
+    python manage.py server_benchmark                                  # hamma rejimlar
+    python manage.py server_benchmark --rejimlar runserver,gthread --oqimlar 32
+    python manage.py server_benchmark --aralash sahifa=3,statik=1,sotuv=1,kirim=1
+
+Rejimlar:
+    runserver  — Dockerfile'dagi eski usul (manage.py runserver --insecure)
+    gunicorn   — compose'dagi eski usul (config.wsgi, 1 ta sync worker)
+    gthread    — config/gunicorn.conf.py (default)
+    uvicorn    — config/gunicorn.conf.py, GUNICORN_WORKER_CLASS=uvicorn (config.asgi)
+
+Server'lar joriy muhit (.env) bilan ishga tushadi; faqat bind va
+ALLOWED_HOSTS (127.0.0.1 qo'shiladi) almashtiriladi.
+"""
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from crm.yuklama import Manba, Yuklama, sessiya_yaratish
+
+from .load_test import aralash_parse
+
+REJIMLAR = ('runserver', 'gunicorn', 'gthread', 'uvicorn')
+
+
+def _buyruq(rejim, port):
+    """Rejim → (argv, qo'shimcha env)"""
+    manzil = f'127.0.0.1:{port}'
+    if rejim == 'runserver':
+        return [sys.executable, 'manage.py', 'runserver', '--noreload', '--insecure', manzil], {}
+    if rejim == 'gunicorn':
+        return ['gunicorn', 'config.wsgi:application', '--bind', manzil], {}
+    env = {'GUNICORN_BIND': manzil}
+    if rejim == 'uvicorn':
+        env['GUNICORN_WORKER_CLASS'] = 'uvicorn'
+    return ['gunicorn', '-c', 'config/gunicorn.conf.py'], env
+
+
+def _port_kutish(port, jarayon, soniya=30):
+    tugash = time.monotonic() + soniya
+    while time.monotonic() < tugash:
+        if jarayon.poll() is not None:
+            return False
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = "runserver / gunicorn / gthread / uvicorn throughput va kechikishini solishtirish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rejimlar', default=','.join(REJIMLAR))
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--oqimlar', type=int, default=16)
+        parser.add_argument('--davomiylik', type=float, default=20)
+        parser.add_argument('--aralash', default='sahifa=3,statik=1',
+                            help="crm/yuklama.py ssenariy vaznlari (load_test bilan bir xil)")
+        parser.add_argument('--foydalanuvchi', default='yuklama')
+
+    def handle(self, *args, **options):
+        rejimlar = [r for r in options['rejimlar'].split(',') if r]
+        for r in rejimlar:
+            if r not in REJIMLAR:
+                raise CommandError(f"Noma'lum rejim: {r} (mumkin: {', '.join(REJIMLAR)})")
+        aralash = aralash_parse(options['aralash'])
+        manba = Manba()
+        yetishmaydi = manba.yetishmaydi(aralash)
+        if yetishmaydi:
+            raise CommandError(f"Bazada yetishmaydi: {', '.join(yetishmaydi)}")
+
+        user, yaratildi = get_user_model().objects.get_or_create(
+            username=options['foydalanuvchi'], defaults={'is_staff': True},
+        )
+        if yaratildi:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        sessionid = sessiya_yaratish(user)
+
+        hostlar = [h for h in settings.ALLOWED_HOSTS if h] + ['127.0.0.1']
+        port = options['port']
+        natijalar = {}
+        for rejim in rejimlar:
+            argv, env = _buyruq(rejim, port)
+            if argv[0] == 'gunicorn' and not shutil.which('gunicorn'):
+                self.stdout.write(self.style.WARNING(f"⚠ {rejim}: gunicorn o'rnatilmagan — o'tkazib yuborildi"))
+                continue
+
+            jarayon = subprocess.Popen(
+                argv, cwd=settings.BASE_DIR,
+                env={**os.environ, **env, 'ALLOWED_HOSTS': ','.join(hostlar)},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                if not _port_kutish(port, jarayon):
+                    self.stdout.write(self.style.ERROR(f"❌ {rejim}: server ishga tushmadi"))
+                    continue
+                self.stdout.write(f"▶ {rejim} ...")
+                yuklama = Yuklama(f'http://127.0.0.1:{port}', sessionid, manba, aralash)
+                natijalar[rejim] = yuklama.ishga_tushirish(options['oqimlar'], options['davomiylik'])
+            finally:
+                jarayon.send_signal(signal.SIGTERM)
+                try:
+                    jarayon.wait(timeout=35)
+                except subprocess.TimeoutExpired:
+                    jarayon.kill()
+                    jarayon.wait()
+
+        if not natijalar:
+            raise CommandError("Birorta rejim ishlamadi")
+
+        ustunlar = ('soni', 'ok', 'qulf', 'xato', 'server', 'p50', 'p95', 'p99', 'rps')
+        self.stdout.write(f"{'rejim':<12}" + ''.join(f"{u:>9}" for u in ustunlar))
+        for rejim, hisobot in natijalar.items():
+            q = hisobot['jami']
+            self.stdout.write(f"{rejim:<12}" + ''.join(f"{q[u]:>9}" for u in ustunlar))
+        self.stdout.write(f"{options['oqimlar']} oqim × {options['davomiylik']:g} s, vaqtlar ms da")
@@ -0,0 +1,62 @@
+# crm/management/commands/snapshot_yangilash.py
+"""
+SQLite snapshot — bitta serverli o'rnatishda hisobot view'lari uchun replika
+(settings: DB_SNAPSHOT_PATH, config/routers.py).
+
+    python manage.py snapshot_yangilash            # bir marta
+    python manage.py snapshot_yangilash --har 60   # har 60 soniyada (systemd / supervisor ostida)
+
+Nusxa sqlite3 backup API bilan olinadi (WAL'dagi yozuvlar ham, izchil holat),
+vaqtinchalik faylga yozilib os.replace bilan almashtiriladi — ochiq
+ulanishlar eski faylni o'qishda davom etadi, yangilari yangi nusxani ko'radi.
+"""
+import os
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+def snapshot_olish(yol):
+    """default SQLite bazasini yol ga atomar nusxalaydi → soniya"""
+    boshi = time.perf_counter()
+    manba = connections['default']
+    manba.ensure_connection()
+
+    vaqtinchalik = f"{yol}.tmp"
+    if os.path.exists(vaqtinchalik):
+        os.remove(vaqtinchalik)
+    nusxa = sqlite3.connect(vaqtinchalik)
+    try:
+        manba.connection.backup(nusxa)
+        # Faqat o'qish (mode=ro) uchun: WAL -shm faylisiz ochilishi kerak
+        nusxa.execute('PRAGMA journal_mode=DELETE')
+    finally:
+        nusxa.close()
+    os.replace(vaqtinchalik, yol)
+    return time.perf_counter() - boshi
+
+
+class Command(BaseCommand):
+    help = "Hisobotlar uchun SQLite snapshot'ni yangilash (DB_SNAPSHOT_PATH)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--har', type=int, default=0,
+                            help="Har N soniyada qayta yangilash (0 — bir marta)")
+
+    def handle(self, *args, **options):
+        yol = getattr(settings, 'DB_SNAPSHOT_PATH', '')
+        if not yol:
+            raise CommandError("DB_SNAPSHOT_PATH sozlanmagan")
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError("Snapshot faqat SQLite uchun — PostgreSQL'da DB_REPLIKA_HOST ishlating")
+
+        while True:
+            sekund = snapshot_olish(yol)
+            self.stdout.write(self.style.SUCCESS(f"✅ {yol} yangilandi ({sekund:.2f} s)"))
+            if not options['har']:
+                break
+            connections['default'].close()
+            time.sleep(options['har'])
@@ -0,0 +1,82 @@
+# crm/management/commands/usd_kurs_yangilash.py
+"""
+USD kursini provayderdan olib ValyutaKurs jadvaliga yozadi.
+Cron orqali kuniga bir marta ishga tushirish kifoya:
+
+    python manage.py usd_kurs_yangilash                     # bugungi kurs
+    python manage.py usd_kurs_yangilash --sana 2025-03-14   # bitta kun
+    python manage.py usd_kurs_yangilash --kunlar 30         # o'tgan 30 kun (bor kunlar o'tkaziladi)
+    python manage.py usd_kurs_yangilash --interval 3600     # fon jarayoni sifatida
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from crm.models import ValyutaKurs
+from crm.utils import kursni_yangilash
+
+
+def _sana(val):
+    if not val:
+        return None
+    try:
+        return date.fromisoformat(val)
+    except ValueError:
+        raise CommandError(f"Noto'g'ri sana: {val} (YYYY-MM-DD kutilgan)")
+
+
+class Command(BaseCommand):
+    help = "USD kursini yangilaydi (ValyutaKurs jadvali)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sana', help="Kurs sanasi (YYYY-MM-DD), default — bugun")
+        parser.add_argument('--kunlar', type=int, default=0,
+                            help="Oxirgi N kun uchun jadvalda yo'q kurslarni to'ldirish")
+        parser.add_argument('--interval', type=int, default=0,
+                            help="Berilsa — har N soniyada bugungi kursni qayta yangilaydi")
+
+    def handle(self, *args, **options):
+        if options['interval']:
+            self._davriy(options['interval'])
+            return
+
+        sana = _sana(options['sana']) or timezone.localdate()
+
+        if options['kunlar']:
+            self._toldirish(sana, options['kunlar'])
+            return
+
+        self._yangila(sana)
+
+    def _yangila(self, sana):
+        rate = kursni_yangilash(sana)
+        if rate:
+            self.stdout.write(self.style.SUCCESS(f"✅ {sana}: 1 USD = {rate} so'm"))
+        else:
+            self.stdout.write(self.style.WARNING(f"⚠️ {sana}: kurs olinmadi"))
+        return rate
+
+    def _toldirish(self, oxirgi, kunlar):
+        kerak = [oxirgi - timedelta(days=i) for i in range(kunlar)]
+        bor = set(
+            ValyutaKurs.objects
+            .filter(valyuta='USD', sana__in=kerak)
+            .values_list('sana', flat=True)
+        )
+        yozildi = sum(1 for d in sorted(kerak) if d not in bor and self._yangila(d))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {yozildi} ta kurs yozildi, {len(bor)} tasi avvaldan bor edi"
+        ))
+
+    def _davriy(self, interval):
+        self.stdout.write(f"USD kursi har {interval} soniyada yangilanadi (to'xtatish: Ctrl+C)")
+        try:
+            while True:
+                self._yangila(timezone.localdate())
+                close_old_connections()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
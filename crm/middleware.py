@@ -1,12 +1,24 @@
 """
 Security Middleware
-URL orqali kirish urinishlarini bloklash
+URL orqali kirish urinishlarini bloklash; SQL profillash (SqlProfilMiddleware);
+replika read-your-writes (ReplikaMiddleware)
 """
+import logging
+import time
+from contextlib import ExitStack
 
+from django.conf import settings
+from django.db import connections
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.urls import resolve
 
+from config.routers import KUTISH_COOKIE, REPLIKA
+
+from . import profil
+
+logger = logging.getLogger('crm.profil')
+
 
 class AdminOnlyMiddleware:
     """
@@ -94,4 +106,84 @@ class SecurityHeadersMiddleware:
         # Referrer policy
         response['Referrer-Policy'] = 'strict-origin-when-cross-origin'
         
-        return response
\ No newline at end of file
+        return response
+
+class SqlProfilMiddleware:
+    """
+    Request darajasidagi SQL profillash (crm/profil.py).
+
+    Yoqish: SQL_PROFIL = True (hamma request'lar) yoki staff foydalanuvchi
+    uchun 'X-Sql-Profil: 1' header. Javobga Server-Timing header qo'shiladi,
+    SQL_PROFIL_SEKIN_MS dan uzoq request'lar 'crm.profil' logger'iga yoziladi,
+    so'rovlar view bo'yicha SorovProfili jadvalida yig'iladi (admin).
+    AuthenticationMiddleware'dan keyin turishi kerak.
+    """
+
+    HEADER = 'HTTP_X_SQL_PROFIL'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _yoqilgan(self, request):
+        if getattr(settings, 'SQL_PROFIL', False):
+            return True
+        user = getattr(request, 'user', None)
+        return request.META.get(self.HEADER) == '1' and bool(user and user.is_staff)
+
+    def __call__(self, request):
+        if not self._yoqilgan(request):
+            return self.get_response(request)
+
+        yozuvchi = profil.SorovYozuvchi()
+        boshi = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(yozuvchi))
+            response = self.get_response(request)
+        jami_ms = (time.perf_counter() - boshi) * 1000
+
+        sql_ms = yozuvchi.jami_ms
+        response['Server-Timing'] = (
+            f'sql;dur={sql_ms:.1f};desc="{yozuvchi.soni} ta so\'rov", '
+            f'app;dur={max(jami_ms - sql_ms, 0):.1f}, total;dur={jami_ms:.1f}'
+        )
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match and match.view_name else request.path
+
+        if jami_ms >= profil.sozlama('SEKIN_MS', 500):
+            takrorlar = yozuvchi.takrorlar()
+            logger.warning(
+                "Sekin request %s %s (%s): %.0f ms, %d so'rov / %.0f ms SQL, takrorlangan: %d",
+                request.method, request.path, view, jami_ms, yozuvchi.soni, sql_ms,
+                sum(n - 1 for n in takrorlar.values()),
+            )
+
+        profil.buferga(view, yozuvchi)
+        return response
+
+
+class ReplikaMiddleware:
+    """
+    Read-your-writes (config/routers.py): yozuvchi request'dan keyin
+    REPLIKA_KUTISH soniyalik cookie qo'yiladi — shu vaqt ichida
+    faqat_oqish view'lari ham default bazadan o'qiydi. faqat_oqish bilan
+    belgilangan POST'lar (masalan PDF chek) cookie qo'ymaydi.
+    """
+
+    YOZUVCHI = frozenset({'POST', 'PUT', 'PATCH', 'DELETE'})
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method in self.YOZUVCHI
+            and not getattr(request, '_faqat_oqish', False)
+            and REPLIKA in settings.DATABASES
+        ):
+            response.set_cookie(
+                KUTISH_COOKIE, '1', max_age=settings.REPLIKA_KUTISH, httponly=True, samesite='Lax',
+            )
+        return response
@@ -3,10 +3,12 @@ from django.db import models,transaction
 from django.utils.timezone import now
 from django.core.exceptions import ValidationError
 from django.db.models import Sum,F
+from django.db.models.functions import Coalesce, Greatest
 from datetime import date
 from django.utils import timezone
 from xomashyo.models import Xomashyo,XomashyoHarakat,YetkazibBeruvchi
 from decimal import Decimal
+from collections import defaultdict
 from django.conf import settings
 
 
@@ -73,6 +75,34 @@ class Product(models.Model):
         """Mahsulotning umumiy miqdorini variantlar miqdorlari yig'indisiga moslab yangilash."""
         self.soni = self.variants.aggregate(total=models.Sum('stock'))['total'] or 0
         Product.objects.filter(pk=self.pk).update(soni=self.soni)
+
+    @staticmethod
+    def update_total_quantities(product_ids):
+        """Bir nechta mahsulot umumiy miqdorini bitta UPDATE bilan yangilash."""
+        jami = (
+            ProductVariant.objects.filter(product=models.OuterRef('pk'))
+            .values('product')
+            .annotate(total=models.Sum('stock'))
+            .values('total')
+        )
+        Product.objects.filter(pk__in=product_ids).update(
+            soni=Coalesce(models.Subquery(jami), 0)
+        )
+
+    @staticmethod
+    def adjust_quantities(deltalar):
+        """
+        {product_id: delta} — umumiy miqdorni bitta UPDATE ... CASE bilan siljitish
+        (kosib ishi qo'shilganda / o'zgarganda / o'chirilganda). Tarix uzunligiga
+        bog'liq emas; siljish tekshiruvi — manage.py mahsulot_soni_tekshirish.
+        """
+        deltalar = {pk: d for pk, d in deltalar.items() if d}
+        if not deltalar:
+            return 0
+        return Product.objects.filter(pk__in=list(deltalar)).update(soni=Greatest(
+            models.Case(*[models.When(pk=pk, then=F('soni') + d) for pk, d in deltalar.items()]),
+            0,
+        ))
         
     @property
     def total_stock(self):
@@ -82,18 +112,45 @@ class Product(models.Model):
     def __str__(self):
         return self.nomi
 
-    def get_price_for_category(self, category_name):
-        if category_name == "kosib":
-            return self.narx_kosib
-        elif category_name == "zakatovka":
-            return self.narx_zakatovka
-        elif category_name == "kroy":
-            return self.narx_kroy
-        elif category_name == "pardoz":
-            return self.narx_pardoz
-        elif category_name == "rezak":
-            return self.narx_rezak
-        
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        from .narxlar import USTUNLAR
+        if set(USTUNLAR.values()) <= set(field_names):
+            obj._asl_narxlar = {u: getattr(obj, u) for u in USTUNLAR.values()}
+        return obj
+
+    def _bazadagi_narxlar(self):
+        """narx_* ning bazadagi (yuklangandagi) qiymatlari; yangi mahsulot — None"""
+        from .narxlar import USTUNLAR
+        if self._state.adding:
+            return None
+        if hasattr(self, '_asl_narxlar'):
+            return self._asl_narxlar
+        return Product.objects.filter(pk=self.pk).values(*USTUNLAR.values()).first()
+
+    def save(self, *args, **kwargs):
+        from . import narxlar
+        asl = self._bazadagi_narxlar()
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        ustunlar = set(narxlar.USTUNLAR.values())
+        if update_fields is None or set(update_fields) & ustunlar:
+            # narx_* — joriy narx nusxasi; formada o'zgargani ProductRate tarixiga yoziladi
+            ozgarganlar = {
+                u for u in ustunlar & set(update_fields or ustunlar)
+                if asl is None or (getattr(self, u) or 0) != (asl[u] or 0)
+            }
+            narxlar.ustunlardan(self, ozgarganlar)
+        self._asl_narxlar = {u: getattr(self, u) for u in ustunlar}
+
+    def get_price_for_category(self, category_name, sana=None):
+        """Ishchi turi uchun sana da amal qilgan ishbay narx (crm/narxlar.py)"""
+        from . import narxlar
+        if category_name not in narxlar.USTUNLAR:
+            return None
+        return narxlar.narx(self.pk, category_name, sana)
+
 class ProductVariant(models.Model):
     TYPECHOICES = [
         ("dona","Dona"),
@@ -159,6 +216,65 @@ class ProductVariant(models.Model):
         super().delete(*args, **kwargs)
         product.update_total_quantity()
 
+    # ── Qoldiq (stock) harakatlari ───────────────────────────────
+    # Hammasi bitta shartli UPDATE: qulf (select_for_update) kerak emas,
+    # tekshiruv va ayirish bitta SQL ichida — parallel sotuvlar manfiy
+    # qoldiqqa olib kelmaydi. Natija — yangilangan qatorlar soni
+    # (reserve uchun 0 — qoldiq yetmadi). self.stock yangilanmaydi.
+
+    def reserve(self, n):
+        """stock dan n ta band qilish: UPDATE ... SET stock = stock - n WHERE stock >= n"""
+        return ProductVariant.objects.filter(pk=self.pk, stock__gte=n).update(stock=F('stock') - n)
+
+    def release(self, n):
+        """stock ga n ta qaytarish (sotuv bekor qilinganda, ishlab chiqarishdan kirim)"""
+        return ProductVariant.objects.filter(pk=self.pk).update(stock=F('stock') + n)
+
+    def adjust(self, delta):
+        """delta > 0 — qaytarish, delta < 0 — band qilish"""
+        if delta < 0:
+            return self.reserve(-delta)
+        return self.release(delta)
+
+    @staticmethod
+    def reserve_many(miqdorlar):
+        """
+        {variant_id: n} — barchasini bitta UPDATE ... CASE bilan band qilish.
+        Natija — yangilangan qatorlar soni; len(miqdorlar) dan kam bo'lsa
+        qaysidir variantda qoldiq yetmagan (chaqiruvchi tranzaksiyani bekor qilsin).
+        """
+        if not miqdorlar:
+            return 0
+        shart = models.Q()
+        for pk, n in miqdorlar.items():
+            shart |= models.Q(pk=pk, stock__gte=n)
+        return ProductVariant.objects.filter(shart).update(stock=models.Case(*[
+            models.When(pk=pk, then=F('stock') - n) for pk, n in miqdorlar.items()
+        ]))
+
+    @staticmethod
+    def release_many(miqdorlar):
+        """{variant_id: n} — barchasini bitta UPDATE ... CASE bilan qaytarish"""
+        if not miqdorlar:
+            return 0
+        return ProductVariant.objects.filter(pk__in=list(miqdorlar)).update(stock=models.Case(*[
+            models.When(pk=pk, then=F('stock') + n) for pk, n in miqdorlar.items()
+        ]))
+
+    @staticmethod
+    def adjust_many(deltalar):
+        """
+        {variant_id: delta} — bitta UPDATE ... CASE, 0 dan pastga tushmaydi
+        (kosib ishi tahrirlanganda / o'chirilganda; Product.adjust_quantities kabi).
+        """
+        deltalar = {pk: d for pk, d in deltalar.items() if d}
+        if not deltalar:
+            return 0
+        return ProductVariant.objects.filter(pk__in=list(deltalar)).update(stock=Greatest(
+            models.Case(*[models.When(pk=pk, then=F('stock') + d) for pk, d in deltalar.items()]),
+            0,
+        ))
+
 class IshchiCategory(models.Model):
     nomi = models.CharField(max_length=50, verbose_name="Nomi")
 
@@ -169,21 +285,131 @@ class IshchiCategory(models.Model):
     def __str__(self):
         return self.nomi
 
-class Oyliklar(models.Model):
+class ProductRate(models.Model):
+    """
+    Ishbay narx: mahsulot × ishchi turi, valid_from sanasidan boshlab amal qiladi.
+    Ish.narxi ish sanasida amal qilgan narx bilan hisoblanadi (crm/narxlar.py).
+    """
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name='narxlar', verbose_name="Mahsulot"
+    )
+    ishchi_category = models.ForeignKey(
+        IshchiCategory, on_delete=models.CASCADE, related_name='narxlar', verbose_name="Ishchi turi"
+    )
+    narx = models.IntegerField(default=0, verbose_name="Narx (1 dona)")
+    valid_from = models.DateField(default=date.today, verbose_name="Amal qilish sanasi")
+
+    class Meta:
+        verbose_name = "Ishbay narx"
+        verbose_name_plural = "Ishbay narxlar"
+        ordering = ['product', 'ishchi_category', '-valid_from']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product', 'ishchi_category', 'valid_from'], name='uniq_productrate_sana',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product} | {self.ishchi_category} | {self.narx} ({self.valid_from})"
+
+class IshchiHisobiMixin:
+    """
+    Ishchi hisobiga (Ishchi.joriy_* / jami_tolangan) ulush qo'shadigan modellar.
+    save — bazadagi ulush ayirilib yangisi qo'shiladi (bitta UPDATE ... F());
+    delete — crm/signals.py (pre_delete). HISOB_HOLATI — ulushni belgilovchi
+    maydonlar, hisob_hissasi(holat, ishora) → {ishchi_id: {maydon: delta}}.
+    """
+    HISOB_HOLATI = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        obj = super().from_db(db, field_names, values)
+        # .only() / .defer() bilan o'qilgan bo'lsa — bazadagi holat noma'lum (None)
+        obj._asl_hisob = obj.hisob_holati() if set(cls.HISOB_HOLATI) <= set(field_names) else None
+        return obj
+
+    def hisob_holati(self):
+        return tuple(getattr(self, f) for f in self.HISOB_HOLATI)
+
+    def bazadagi_holat(self):
+        """save / delete'gacha bazadagi holat; noma'lum bo'lsa bazadan o'qiladi"""
+        if self._state.adding or self.pk is None:
+            return None
+        holat = getattr(self, '_asl_hisob', None)
+        if holat is None:
+            holat = type(self)._base_manager.filter(pk=self.pk).values_list(*self.HISOB_HOLATI).first()
+        return holat
+
+    def hisob_farqi(self, eski, yangi):
+        deltalar = defaultdict(lambda: defaultdict(int))
+        for holat, ishora in ((yangi, 1), (eski, -1)):
+            for ishchi_id, m in self.hisob_hissasi(holat, ishora).items():
+                for maydon, d in m.items():
+                    deltalar[ishchi_id][maydon] += d
+        return deltalar
+
+    def save(self, *args, **kwargs):
+        eski = self.bazadagi_holat()
+        yangi = self.hisob_holati()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            Ishchi.hisobni_siljitish(self.hisob_farqi(eski, yangi))
+        self._asl_hisob = yangi
+
+
+class PayrollRun(models.Model):
+    """
+    Oylik yopish partiyasi (crm/oylik_xizmati.py): bir yoki bir nechta ishchining
+    oyligi bitta tranzaksiyada yopiladi — Oyliklar / Chiqim shu yozuvga bog'lanadi.
+    """
+    sana             = models.DateField(default=now, verbose_name="Sana")
+    created_at       = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan")
+    created_by       = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Yopgan"
+    )
+    ishchilar_soni   = models.PositiveIntegerField(default=0, verbose_name="Ishchilar soni")
+    jami_hisoblangan = models.BigIntegerField(default=0, verbose_name="Jami hisoblangan")
+    jami_avans       = models.BigIntegerField(default=0, verbose_name="Jami avans")
+    jami_berilgan    = models.BigIntegerField(default=0, verbose_name="Jami berilgan")
+    izoh             = models.CharField(max_length=255, blank=True, verbose_name="Izoh")
+
+    class Meta:
+        verbose_name = "Oylik yopish"
+        verbose_name_plural = "Oylik yopishlar"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.sana} — {self.ishchilar_soni} ishchi, {self.jami_berilgan:,} so'm"
+
+class Oyliklar(IshchiHisobiMixin, models.Model):
     sana = models.DateField(default=now, verbose_name="Sana")
     ishchi = models.ForeignKey(
         'Ishchi', on_delete=models.CASCADE, related_name='oyliklar', verbose_name="Ishchi"
     )
+    run = models.ForeignKey(
+        PayrollRun, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='oyliklar', verbose_name="Oylik yopish"
+    )
     oylik = models.IntegerField(null=True, verbose_name="Oylik")
     yopilgan = models.BooleanField(default=False, verbose_name="Yopilgan")
     hisoblangan = models.IntegerField(null=True, verbose_name="Hisoblangan oylik") 
 
  
 
+    HISOB_HOLATI = ('ishchi_id', 'oylik')
+
     class Meta:
         verbose_name = "Oylik"
         verbose_name_plural = "Oyliklar"
 
+    @staticmethod
+    def hisob_hissasi(holat, ishora=1):
+        """Berilgan oylik → ishchining jami_tolangan"""
+        if not holat or not holat[0] or not holat[1]:
+            return {}
+        ishchi_id, oylik = holat
+        return {ishchi_id: {'jami_tolangan': ishora * oylik}}
+
 
     def __str__(self):
         return f"{self.ishchi.ism} - {self.sana} - {self.oylik}"
@@ -221,6 +447,15 @@ class Ishchi(models.Model):
     is_active = models.BooleanField(default=True, verbose_name="Faol")
     eski_ishlar = models.ForeignKey(EskiIsh, on_delete=models.CASCADE, related_name='ishchilar', null=True, blank=True, verbose_name="Eski ishlar")
 
+    # === Hisob (Ish / Avans / Oyliklar save/delete da farq bilan siljiydi) ===
+    # Qayta qurish: python manage.py recompute_ishchi_hisob
+    joriy_hisob = models.BigIntegerField(default=0, editable=False, verbose_name="Joriy hisoblangan (so'm)")
+    joriy_soni = models.IntegerField(default=0, editable=False, verbose_name="Joriy ishlar (dona)")
+    joriy_avans = models.BigIntegerField(default=0, editable=False, verbose_name="Aktiv avans (so'm)")
+    jami_tolangan = models.BigIntegerField(default=0, editable=False, verbose_name="Jami to'langan oylik (so'm)")
+
+    HISOB_MAYDONLARI = ('joriy_hisob', 'joriy_soni', 'joriy_avans', 'jami_tolangan')
+
     class Meta:
         verbose_name = "Xodim"
         verbose_name_plural = "Xodimlar"
@@ -228,11 +463,66 @@ class Ishchi(models.Model):
     def __str__(self):
         return f"{self.ism} {self.familiya}"
 
+    def save(self, *args, **kwargs):
+        # Forma / admin eski nusxadagi hisobni qayta yozib yubormasin — uni faqat
+        # hisobni_siljitish / hisobni_yangilash (UPDATE ... F()) o'zgartiradi
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.attname for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in self.HISOB_MAYDONLARI
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def qoldiq(self):
+        """Avanslardan keyin beriladigan (manfiy — avans hisoblangandan ko'p)"""
+        return self.joriy_hisob - self.joriy_avans
+
     def umumiy_oylik(self):
-        umumiy_summa = sum(
-            ish.narxi for ish in self.ishlar.filter(status='yangi')
+        return self.joriy_hisob
+
+    @staticmethod
+    def hisobni_siljitish(deltalar):
+        """
+        {ishchi_id: {maydon: delta}} — hisob maydonlarini bitta UPDATE ... CASE
+        bilan siljitish (Product.adjust_quantities kabi; tarix uzunligiga bog'liq emas).
+        """
+        deltalar = {pk: {k: d for k, d in m.items() if d} for pk, m in deltalar.items() if pk}
+        deltalar = {pk: m for pk, m in deltalar.items() if m}
+        if not deltalar:
+            return 0
+        maydonlar = {k for m in deltalar.values() for k in m}
+        return Ishchi.objects.filter(pk__in=list(deltalar)).update(**{
+            maydon: models.Case(
+                *[models.When(pk=pk, then=F(maydon) + m[maydon]) for pk, m in deltalar.items() if maydon in m],
+                default=F(maydon),
+                output_field=Ishchi._meta.get_field(maydon),
+            )
+            for maydon in maydonlar
+        })
+
+    @staticmethod
+    def hisobni_yangilash(ishchi_ids=None):
+        """
+        Hisob maydonlarini Ish / Avans / Oyliklar dan qayta hisoblaydi — bitta
+        UPDATE (korrelyatsiyalangan subquery'lar bilan). ishchi_ids berilmasa — barchasi.
+        """
+        def _sq(model, maydon, **filtr):
+            return Coalesce(models.Subquery(
+                model.objects.filter(ishchi=models.OuterRef('pk'), **filtr)
+                .order_by().values('ishchi')
+                .annotate(v=Sum(maydon)).values('v')
+            ), 0)
+
+        qs = Ishchi.objects.all()
+        if ishchi_ids is not None:
+            qs = qs.filter(pk__in=list(ishchi_ids))
+        return qs.update(
+            joriy_hisob=_sq(Ish, 'narxi', status='yangi'),
+            joriy_soni=_sq(Ish, 'soni', status='yangi'),
+            joriy_avans=_sq(Avans, 'amount', is_active=True),
+            jami_tolangan=_sq(Oyliklar, 'oylik'),
         )
-        return umumiy_summa
 
     @staticmethod
     def ishlar_soni():
@@ -389,7 +679,7 @@ class IshXomashyo(models.Model):
                     # Oddiy xomashyo miqdorini kamaytirish
                     self.xomashyo.save(update_fields=['miqdori', 'updated_at'])
 
-class Ish(models.Model):
+class Ish(IshchiHisobiMixin, models.Model):
     STATUS_CHOICES = [
         ('yangi','Yangi'),
         ('yopilgan','Yopilgan'),
@@ -402,6 +692,12 @@ class Ish(models.Model):
     ishchi = models.ForeignKey(
         Ishchi, on_delete=models.CASCADE, null=True,blank=True, related_name='ishlar', verbose_name="Ishchi"
     )
+    # Kosib ishi qoldig'i qo'shilgan variant (ish_qoshish). Tahrir / o'chirishda shu
+    # variant stock'i ham siljiydi — Product.soni = Σ variant.stock buzilmaydi
+    variant = models.ForeignKey(
+        'ProductVariant', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='ishlar', verbose_name="Mahsulot varianti"
+    )
 
     # Xomashyolar bilan bog'lanish (Through model orqali)
     xomashyolar = models.ManyToManyField(
@@ -411,35 +707,117 @@ class Ish(models.Model):
         verbose_name="Xomashyolar"
     )
     
+    HISOB_HOLATI = ('ishchi_id', 'narxi', 'soni', 'status')
+
     class Meta:
         verbose_name = "Ish"
         verbose_name_plural = "Ishlar"
+        indexes = [
+            # status='yangi' (+ ishchi) bo'yicha oylik hisoblari — narxi indeksdan o'qiladi
+            models.Index(fields=['status', 'ishchi', 'narxi'], name='ish_status_ishchi_idx'),
+        ]
 
     def __str__(self):
         return self.mahsulot.nomi
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        ish = super().from_db(db, field_names, values)
+        # Qoldiq siljishi uchun bazadagi holat (save'da eski hissa ayiriladi).
+        # Ishchi turi ham shu paytda olinadi: keyin turi o'zgarsa, eski hissa
+        # baribir qo'shilgandagi tur bo'yicha qaytariladi
+        ish._asl = ish._holat()
+        return ish
+
+    def _holat(self):
+        """(mahsulot_id, variant_id, soni, ishchi turi) — mahsulot hissasi uchun"""
+        from . import narxlar
+        d = self.__dict__
+        ishchi_id = d.get('ishchi_id')
+        turi = narxlar.ishchi_turi(ishchi_id) if ishchi_id else None
+        return (d.get('mahsulot_id'), d.get('variant_id'), d.get('soni'), turi)
+
+    def is_kosib(self):
+        # ishchi.turi FK yuklanmaydi — ishchi → turi xaritasi narxlar keshida
+        from . import narxlar
+        return narxlar.ishchi_turi(self.ishchi_id) == "kosib"
+
+    @staticmethod
+    def _hissa(holat):
+        """_holat() → {(mahsulot_id, variant_id): soni}; kosib bo'lmasa {}"""
+        if not holat:
+            return {}
+        mahsulot_id, variant_id, soni, turi = holat
+        if not mahsulot_id or not soni or turi != "kosib":
+            return {}
+        return {(mahsulot_id, variant_id): int(soni)}
+
+    def mahsulot_hissasi(self):
+        """{(mahsulot_id, variant_id): soni} — kosib ishi ombor qoldig'iga qo'shadigan son"""
+        return self._hissa(self._holat())
+
+    def bazadagi_hissasi(self):
+        """mahsulot_hissasi — bazadan o'qilgan (save'gacha) holat bo'yicha"""
+        return self._hissa(getattr(self, '_asl', None))
+
+    @staticmethod
+    def qoldiqni_siljitish(deltalar):
+        """
+        {(mahsulot_id, variant_id): delta} — variantli ish: variant stock siljiydi va
+        Product.soni variantlardan qayta yig'iladi (bitta UPDATE). Variantsiz ish
+        (admin'da qo'lda kiritilgan / eski yozuv) — faqat Product.soni siljiydi.
+        """
+        variantlar, mahsulotlar, jami = defaultdict(int), set(), defaultdict(int)
+        for (mahsulot_id, variant_id), delta in deltalar.items():
+            if not delta:
+                continue
+            if variant_id:
+                variantlar[variant_id] += delta
+                mahsulotlar.add(mahsulot_id)
+            else:
+                jami[mahsulot_id] += delta
+        if variantlar:
+            ProductVariant.adjust_many(variantlar)
+            Product.update_total_quantities(mahsulotlar)
+        Product.adjust_quantities(jami)
+
+    @staticmethod
+    def hisob_hissasi(holat, ishora=1):
+        """
+        (ishchi_id, narxi, soni, status) → {ishchi_id: {maydon: qiymat}} — ochiq
+        (status='yangi') ishning ishchi hisobidagi ulushi; holat None bo'lsa {}.
+        """
+        if not holat:
+            return {}
+        ishchi_id, narxi, soni, status = holat
+        if not ishchi_id or status != 'yangi':
+            return {}
+        return {ishchi_id: {'joriy_hisob': ishora * (narxi or 0), 'joriy_soni': ishora * (soni or 0)}}
+
     def save(self, *args, **kwargs):
-        if self.ishchi and self.ishchi.turi:
-            if self.ishchi.turi.nomi == "kosib":
-                self.narxi = self.mahsulot.narx_kosib * int(self.soni)
-            elif self.ishchi.turi.nomi == "zakatovka":
-                self.narxi = self.mahsulot.narx_zakatovka * int(self.soni)
-            elif self.ishchi.turi.nomi == "kroy":
-                self.narxi = self.mahsulot.narx_kroy * int(self.soni)
-            elif self.ishchi.turi.nomi == "pardoz":
-                self.narxi = self.mahsulot.narx_pardoz * int(self.soni)
-            elif self.ishchi.turi.nomi == "rezak":
-                self.narxi = self.mahsulot.narx_rezak * int(self.soni)
-                
-        super().save(*args, **kwargs)
-        if self.ishchi and self.ishchi.turi and self.ishchi.turi.nomi == "kosib":
-            from django.db.models import Sum
-            jami = self.__class__.objects.filter(
-                mahsulot=self.mahsulot,
-                ishchi__turi__nomi="kosib"
-            ).aggregate(Sum('soni'))['soni__sum'] or 0
-            self.mahsulot.soni = jami
-            self.mahsulot.save()
+        # Ishbay narx — ish sanasida amal qilgan ProductRate (crm/narxlar.py, keshdan)
+        from . import narxlar
+        narxi = narxlar.ish_narxi(self)
+        if narxi is not None:
+            self.narxi = narxi
+
+        # Variant boshqa mahsulotniki bo'lib qolsa (mahsulot almashtirildi) — bog'lanish uziladi
+        asl = getattr(self, '_asl', None)
+        mahsulot_almashdi = not asl or asl[0] != self.mahsulot_id
+        if self.variant_id and mahsulot_almashdi and self.variant.product_id != self.mahsulot_id:
+            self.variant = None
+
+        # Variant stock / Product.soni — butun tarixni qayta yig'ish o'rniga farq (F() bilan)
+        deltalar = defaultdict(int)
+        for kalit, soni in self.mahsulot_hissasi().items():
+            deltalar[kalit] += soni
+        for kalit, soni in self.bazadagi_hissasi().items():
+            deltalar[kalit] -= soni
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)   # + ishchi hisobi (IshchiHisobiMixin)
+            self.qoldiqni_siljitish(deltalar)
+        self._asl = self._holat()
             
 
 
@@ -490,6 +868,9 @@ class Chiqim(models.Model):
         verbose_name = "Chiqim"
         verbose_name_plural = "Chiqimlar"
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['created', 'id'], name='chiqim_created_idx'),
+        ]
 
 
 class ChiqimItem(models.Model):
@@ -568,13 +949,57 @@ class Xaridor(models.Model):
     izoh = models.TextField(blank=True, null=True, verbose_name="Izoh")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Yaratilgan sana")
 
+    # === Statistika (Sotuv save / post_delete da, commit'dan keyin yangilanadi) ===
+    # Qayta qurish: python manage.py recompute_xaridor_stats
+    jami_xarid = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False,
+        verbose_name="Jami xarid (so'm)"
+    )
+    xaridlar_soni = models.PositiveIntegerField(default=0, editable=False, verbose_name="Xaridlar soni")
+    jami_qarz = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0, editable=False,
+        verbose_name="Jami qarz (so'm)"
+    )
+    oxirgi_xarid_sana = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Oxirgi xarid")
+
     class Meta:
         verbose_name = "Xaridor"
         verbose_name_plural = "Xaridorlar"
+        indexes = [
+            models.Index(fields=['-jami_qarz'], name='xaridor_jami_qarz_idx'),
+            models.Index(fields=['-jami_xarid'], name='xaridor_jami_xarid_idx'),
+        ]
 
     def __str__(self):
         return self.ism
 
+    @staticmethod
+    def statistikani_yangilash(xaridor_ids=None):
+        """
+        jami_xarid / xaridlar_soni / jami_qarz / oxirgi_xarid_sana ni sotuvlardan
+        qayta hisoblaydi — bitta UPDATE (korrelyatsiyalangan subquery'lar bilan).
+        xaridor_ids berilmasa — barcha xaridorlar.
+        """
+        D0 = models.Value(Decimal('0'))
+        sotuvlar = Sotuv.objects.filter(xaridor=models.OuterRef('pk')).order_by().values('xaridor')
+
+        def _sq(ifoda):
+            return models.Subquery(sotuvlar.annotate(v=ifoda).values('v'))
+
+        qarz = Greatest(
+            F('yakuniy_summa') - F('tolangan_summa'), D0,
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+        qs = Xaridor.objects.all()
+        if xaridor_ids is not None:
+            qs = qs.filter(pk__in=list(xaridor_ids))
+        return qs.update(
+            jami_xarid=Coalesce(_sq(Sum('jami_summa')), D0),
+            xaridlar_soni=Coalesce(_sq(models.Count('id')), 0),
+            jami_qarz=Coalesce(_sq(Sum(qarz)), D0),
+            oxirgi_xarid_sana=_sq(models.Max('sana')),
+        )
+
 class Sotuv(models.Model):
     """Asosiy sotuv - bir xaridor uchun bir to'liq buyurtma"""
     xaridor = models.ForeignKey(
@@ -636,10 +1061,37 @@ class Sotuv(models.Model):
         verbose_name = "Sotuv"
         verbose_name_plural = "Sotuvlar"
         ordering = ['-sana']
+        indexes = [
+            # (sana, id) — ro'yxat va kursor sahifalash; qolganlari — holat / xaridor filtrlari
+            models.Index(fields=['sana', 'id'], name='sotuv_sana_idx'),
+            models.Index(fields=['tolov_holati', 'sana'], name='sotuv_holat_sana_idx'),
+            models.Index(fields=['xaridor', 'sana'], name='sotuv_xaridor_sana_idx'),
+        ]
 
     def __str__(self):
         return f"#{self.id} - {self.xaridor.ism} - {self.yakuniy_summa} so'm"
 
+    # Xaridor statistikasiga ta'sir qiluvchi maydonlar
+    XARIDOR_STAT_MAYDONLARI = {'xaridor', 'jami_summa', 'yakuniy_summa', 'tolangan_summa', 'sana'}
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        stat_ozgardi = update_fields is None or bool(self.XARIDOR_STAT_MAYDONLARI & set(update_fields))
+
+        eski_xaridor_id = None
+        if self.pk and stat_ozgardi and (update_fields is None or 'xaridor' in update_fields):
+            eski_xaridor_id = Sotuv.objects.filter(pk=self.pk).values_list('xaridor_id', flat=True).first()
+
+        super().save(*args, **kwargs)
+
+        if stat_ozgardi:
+            # Har bir qator (update_summa) uchun emas — tranzaksiyada bir marta (crm/navbat.py)
+            from .navbat import commitdan_keyin
+            ids = {self.xaridor_id}
+            if eski_xaridor_id:
+                ids.add(eski_xaridor_id)
+            commitdan_keyin('xaridor_statistika', Xaridor.statistikani_yangilash, ids)
+
     @property
     def qarz_summa(self):
         """Hozirgi qarz miqdori"""
@@ -729,6 +1181,21 @@ class SotuvItem(models.Model):
     def __str__(self):
         return f"{self.variant} - {self.miqdor} ta - {self.narx} so'm"
 
+    def narxni_ogirish(self, usd_kurs):
+        """Yangi item: USD da kiritilgan narxni so'mga o'girish, narx_usd ni to'ldirish"""
+        if self.narx_turi == 'usd' and usd_kurs > 0:
+            self.narx_usd = Decimal(str(self.narx))
+            self.narx = round(self.narx_usd * usd_kurs, 2)
+            self.narx_turi = 'uzs'
+        elif usd_kurs > 0:
+            self.narx_usd = round(Decimal(str(self.narx)) / usd_kurs, 4)
+
+    def jami_hisoblash(self, usd_kurs):
+        self.jami = Decimal(str(self.narx)) * Decimal(str(self.miqdor))
+        if usd_kurs > 0:
+            self.jami_usd = round(self.jami / usd_kurs, 4)
+        else:
+            self.jami_usd = Decimal('0')
 
     def save(self, *args, **kwargs):
         from django.db import transaction
@@ -755,67 +1222,36 @@ class SotuvItem(models.Model):
 
         # --- 2. Narx konversiyasi FAQAT yangi item uchun ---
         if is_new:
-            if self.narx_turi == 'usd' and usd_kurs > 0:
-                self.narx_usd = Decimal(str(self.narx))
-                self.narx = round(self.narx_usd * usd_kurs, 2)
-                self.narx_turi = 'uzs'
-            elif usd_kurs > 0:
-                self.narx_usd = round(Decimal(str(self.narx)) / usd_kurs, 4)
+            self.narxni_ogirish(usd_kurs)
 
         # --- 3. Jami summalarni hisoblash (har doim) ---
-        self.jami = Decimal(str(self.narx)) * Decimal(str(self.miqdor))
-        if usd_kurs > 0:
-            self.jami_usd = round(self.jami / usd_kurs, 4)
-        else:
-            self.jami_usd = Decimal('0')
+        self.jami_hisoblash(usd_kurs)
 
-        # --- 4. Stock tekshirish ---
-        if is_new:
-            if self.variant.stock < self.miqdor:
+        # --- 4. Stock: shartli UPDATE (tekshiruv va ayirish bitta SQL da) ---
+        miqdor_farqi = self.miqdor - old_miqdor
+        with transaction.atomic():
+            if miqdor_farqi and not self.variant.adjust(-miqdor_farqi):
+                self.variant.refresh_from_db(fields=['stock'])
                 raise ValueError(
                     f"Omborda yetarli {self.variant} yo'q! "
-                    f"Mavjud: {self.variant.stock} ta, Kerak: {self.miqdor} ta"
+                    f"Mavjud: {self.variant.stock} ta, Kerak: {miqdor_farqi} ta"
                 )
-        else:
-            miqdor_farqi = self.miqdor - old_miqdor
-            if miqdor_farqi > 0:
-                if self.variant.stock < miqdor_farqi:
-                    raise ValueError(
-                        f"Omborda yetarli {self.variant} yo'q! "
-                        f"Mavjud: {self.variant.stock} ta"
-                    )
-
-        # --- 5. Asosiy saqlash ---
-        super().save(*args, **kwargs)
 
-        # --- 6. Stockni yangilash ---
+            # --- 5. Asosiy saqlash ---
+            super().save(*args, **kwargs)
+
+            # --- 6. Mahsulot umumiy miqdori va sotuv summasi ---
+            self.mahsulot.update_total_quantity()
+            self.sotuv.update_summa()
+
+    def delete(self, *args, **kwargs):
+        from django.db import transaction
         with transaction.atomic():
-            self.variant.refresh_from_db()
-            if is_new:
-                self.variant.stock = F('stock') - self.miqdor
-            else:
-                miqdor_farqi = self.miqdor - old_miqdor
-                if miqdor_farqi > 0:
-                    self.variant.stock = F('stock') - miqdor_farqi
-                elif miqdor_farqi < 0:
-                    self.variant.stock = F('stock') + abs(miqdor_farqi)
-            self.variant.save()
-            self.variant.refresh_from_db()
-
-        # --- 7. Mahsulot umumiy miqdori va sotuv summasi ---
-        self.mahsulot.update_total_quantity()
-        self.sotuv.update_summa()
-    
-        def delete(self, *args, **kwargs):
-            from django.db import transaction
-            with transaction.atomic():
-                self.variant.stock = F('stock') + self.miqdor
-                self.variant.save()
-                self.variant.refresh_from_db()
-                self.mahsulot.update_total_quantity()
-                sotuv = self.sotuv
-                super().delete(*args, **kwargs)
-                sotuv.update_summa()
+            self.variant.release(self.miqdor)
+            self.mahsulot.update_total_quantity()
+            sotuv = self.sotuv
+            super().delete(*args, **kwargs)
+            sotuv.update_summa()
 
 class Kirim(models.Model):
     """Sotuv to'lovlari (bir sotuv uchun bir nechta to'lov bo'lishi mumkin)"""
@@ -855,6 +1291,10 @@ class Kirim(models.Model):
         verbose_name = "Kirim"
         verbose_name_plural = "Kirimlar"
         ordering = ['-sana']
+        indexes = [
+            models.Index(fields=['sana', 'id'], name='kirim_sana_idx'),
+            models.Index(fields=['xaridor', 'sana'], name='kirim_xaridor_sana_idx'),
+        ]
 
     def __str__(self):
         return f"{self.sana} - {self.summa} so'm ({self.xaridor.ism})"
@@ -875,6 +1315,8 @@ class Kirim(models.Model):
     def _update_sotuv_tolangan(self):
         """Sotuvning tolangan_summa va holatini yangilash"""
         sotuv = self.sotuv
+        if sotuv is None:
+            return
         jami_tolangan = sotuv.kirimlar.aggregate(
             total=Sum('summa')
         )['total'] or Decimal('0')
@@ -884,14 +1326,59 @@ class Kirim(models.Model):
         sotuv.save(update_fields=['tolangan_summa', 'tolov_holati', 'updated_at'])
 
     def delete(self, *args, **kwargs):
-        sotuv = self.sotuv
-        super().delete(*args, **kwargs)
-        self._update_sotuv_tolangan.__func__(self)  # sotuv ni qayta hisoblash
-        # To'g'ri usul:
-        jami_tolangan = sotuv.kirimlar.aggregate(total=Sum('summa'))['total'] or Decimal('0')
-        sotuv.tolangan_summa = jami_tolangan
-        sotuv._update_tolov_holati()
-        sotuv.save(update_fields=['tolangan_summa', 'tolov_holati', 'updated_at'])
+        natija = super().delete(*args, **kwargs)
+        self._update_sotuv_tolangan()  # sotuv ni qayta hisoblash
+        return natija
+
+class ValyutaKurs(models.Model):
+    """Kunlik valyuta kursi (CBU). crm.utils.get_usd_rate shu jadvaldan o'qiydi."""
+    valyuta = models.CharField(max_length=3, default='USD', verbose_name="Valyuta")
+    sana = models.DateField(verbose_name="Sana")
+    rate = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Kurs (so'm)")
+    manba = models.CharField(max_length=50, blank=True, verbose_name="Manba")
+    yangilangan = models.DateTimeField(auto_now=True, verbose_name="Yangilangan")
+
+    class Meta:
+        verbose_name = "Valyuta kursi"
+        verbose_name_plural = "Valyuta kurslari"
+        ordering = ['-sana']
+        constraints = [
+            models.UniqueConstraint(fields=['valyuta', 'sana'], name='uniq_valyuta_kurs_sana'),
+        ]
+
+    def __str__(self):
+        return f"{self.sana} — 1 {self.valyuta} = {self.rate:,.2f} so'm"
+
+
+class SorovProfili(models.Model):
+    """View bo'yicha issiq SQL so'rovlar (crm/profil.py yig'adi, admin'da ko'rinadi)"""
+    view = models.CharField(max_length=200, verbose_name="View")
+    barmoq_izi = models.CharField(max_length=32, verbose_name="Barmoq izi")
+    sql = models.TextField(verbose_name="SQL")
+    joy = models.CharField(max_length=300, blank=True, verbose_name="Chaqirilgan joy")
+    soni = models.PositiveIntegerField(default=0, verbose_name="Bajarilgan")
+    takror = models.PositiveIntegerField(
+        default=0, verbose_name="Takror",
+        help_text="Bitta so'rov (request) ichida qayta bajarilgan marta (N+1 belgisi)",
+    )
+    jami_ms = models.FloatField(default=0, verbose_name="Jami (ms)")
+    max_ms = models.FloatField(default=0, verbose_name="Eng uzoq (ms)")
+    oxirgi = models.DateTimeField(auto_now=True, verbose_name="Oxirgi marta")
+
+    class Meta:
+        verbose_name = "SQL profili"
+        verbose_name_plural = "SQL profillari"
+        ordering = ['-jami_ms']
+        constraints = [
+            models.UniqueConstraint(fields=['view', 'barmoq_izi'], name='uniq_sorov_profili'),
+        ]
+
+    def __str__(self):
+        return f"{self.view} — {self.sql[:60]}"
+
+    @property
+    def ortacha_ms(self):
+        return self.jami_ms / self.soni if self.soni else 0
 
 class Feature(models.Model):
     name = models.CharField(max_length=300)
@@ -899,16 +1386,28 @@ class Feature(models.Model):
     def __str__(self):
         return self.name
       
-class Avans(models.Model):
+class Avans(IshchiHisobiMixin, models.Model):
     
     is_active =  models.BooleanField(default=True,null=True,blank=True, verbose_name="Aktivmi")
     amount = models.PositiveIntegerField()
     ishchi =  models.ForeignKey(Ishchi,on_delete=models.PROTECT)
     created = models.DateField(default=timezone.now)    
     ended = models.DateField(null=True,blank=True,verbose_name="yopilgan sana")
+
+    HISOB_HOLATI = ('ishchi_id', 'amount', 'is_active')
     
     def __str__(self):
         return f"{self.ishchi.ism} {self.amount}"
+
+    @staticmethod
+    def hisob_hissasi(holat, ishora=1):
+        """Aktiv avans → ishchining joriy_avans"""
+        if not holat:
+            return {}
+        ishchi_id, amount, is_active = holat
+        if not ishchi_id or not is_active or not amount:
+            return {}
+        return {ishchi_id: {'joriy_avans': ishora * amount}}
     
 
 class TeriSarfi(models.Model):
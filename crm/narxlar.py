@@ -0,0 +1,277 @@
+# crm/narxlar.py
+"""
+Ishbay narxlar (ProductRate) — mahsulot × ishchi turi × amal qilish sanasi.
+
+Ish.save narxni shu yerdan oladi: jarayon ichidagi matritsa
+{(product_id, turi): [(valid_from, narx), ...]} va {ishchi_id: turi} dan
+lug'at bo'yicha qidiruv — Product / Ishchi / IshchiCategory FK'lari yuklanmaydi.
+Ish narxi Ish.sana da amal qilgan narx bilan hisoblanadi, shuning uchun
+eski ishlarni tarix bo'yicha qayta hisoblash mumkin:
+
+    python manage.py narx_yangilash --turi kosib --foiz 10            # bugundan +10%
+    python manage.py narx_yangilash --turi kroy --narx 12000 --mahsulot 3 --sana 2026-11-01
+    python manage.py narx_yangilash --boshlangich                     # Product.narx_* → jadval
+    python manage.py ish_narxlarini_hisoblash --dan 2026-10-01        # Ish.narxi ni tarixdan
+
+Kesh: matritsa jarayon ichida, lekin versiyasi umumiy keshda (CACHES['default']):
+narx / ishchi turi o'zgarsa commit'dan keyin versiya oshadi va barcha worker'lar
+keyingi qidiruvda matritsani qayta o'qiydi (bitta so'rov). NARX_KESH_TTL —
+versiya kaliti yo'qolgan holat uchun zaxira; LocMemCache'da versiya faqat
+o'z jarayonida ko'rinadi, boshqa worker'lar TTL'dan keyin yangilanadi.
+Product.narx_* ustunlari — joriy narxning nusxasi (admin forma, import/export):
+  * formada o'zgartirilgan ustun bugundan amal qiladigan ProductRate yozadi
+    (o'zgarmagan ustunlar tarixga tegmaydi — kelajak sanali narx bekor bo'lmaydi);
+  * kelajak sanali narx kuni kelganda nusxa matritsa qayta o'qilganda yangilanadi;
+  * narx tarixi yo'q mahsulot (jadval hali to'ldirilmagan) — narx ustundan olinadi.
+"""
+import bisect
+import threading
+import time
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+# Ishchi turi → Product ustuni (nusxa)
+USTUNLAR = {
+    'kosib'     : 'narx_kosib',
+    'zakatovka' : 'narx_zakatovka',
+    'kroy'      : 'narx_kroy',
+    'rezak'     : 'narx_rezak',
+    'pardoz'    : 'narx_pardoz',
+}
+
+# Tarixi yo'q birinchi narx — orqa sana bilan kiritilgan ishlar ham narxlansin
+BOSHLANGICH = date(2000, 1, 1)
+
+
+# ─────────────────────────────────────────────────────────────────
+# JARAYON ICHIDAGI KESH
+# ─────────────────────────────────────────────────────────────────
+
+_kesh = {'narxlar': None, 'turlar': None, 'ustunlar': None, 'versiya': None, 'muddat': 0.0}
+_kesh_lock = threading.Lock()
+
+VERSIYA_KALITI = 'narxlar:v'
+
+
+def _ttl():
+    return getattr(settings, 'NARX_KESH_TTL', 30)
+
+
+def _amaldagi(narxlar, ustunlar, product_id, turi, sana):
+    sanalar, qiymatlar = narxlar.get((product_id, turi), ((), ()))
+    i = bisect.bisect_right(sanalar, sana)
+    if i:
+        return qiymatlar[i - 1]
+    # Tarix yo'q yoki sana birinchi narxdan oldin — Product.narx_* nusxasi
+    return ustunlar.get(product_id, {}).get(turi, 0)
+
+
+def _yuklash():
+    from .models import Ishchi, Product, ProductRate
+
+    narxlar = {}
+    for product_id, turi, valid_from, narx in (
+        ProductRate.objects.order_by('valid_from')
+        .values_list('product_id', 'ishchi_category__nomi', 'valid_from', 'narx')
+    ):
+        sanalar, qiymatlar = narxlar.setdefault((product_id, turi), ([], []))
+        sanalar.append(valid_from)
+        qiymatlar.append(narx)
+    turlar = dict(Ishchi.objects.values_list('pk', 'turi__nomi'))
+
+    ustunlar = {
+        p['pk']: {turi: p[ustun] or 0 for turi, ustun in USTUNLAR.items()}
+        for p in Product.objects.values('pk', *USTUNLAR.values())
+    }
+    # Kuni kelgan kelajak sanali narxlar — nusxa ustunlarini shu yerda yangilaymiz
+    bugun = timezone.localdate()
+    tarixlilar = {product_id for product_id, _ in narxlar}
+    for product_id in tarixlilar & ustunlar.keys():
+        joriy = {turi: _amaldagi(narxlar, ustunlar, product_id, turi, bugun) for turi in USTUNLAR}
+        if joriy != ustunlar[product_id]:
+            Product.objects.filter(pk=product_id).update(
+                **{USTUNLAR[turi]: qiymat for turi, qiymat in joriy.items()}
+            )
+            ustunlar[product_id] = joriy
+    return narxlar, turlar, ustunlar
+
+
+def _versiya():
+    return cache.get_or_set(VERSIYA_KALITI, 1, None)
+
+
+def _oshir():
+    try:
+        cache.incr(VERSIYA_KALITI)
+    except ValueError:
+        # Kalit yo'q (kesh tozalangan / LRU chiqarib yuborgan)
+        cache.set(VERSIYA_KALITI, 2, None)
+
+
+def _matritsa():
+    versiya = _versiya()
+    with _kesh_lock:
+        if (_kesh['narxlar'] is not None and _kesh['versiya'] == versiya
+                and _kesh['muddat'] > time.monotonic()):
+            return _kesh['narxlar'], _kesh['turlar'], _kesh['ustunlar']
+    narxlar, turlar, ustunlar = _yuklash()
+    with _kesh_lock:
+        _kesh.update(
+            narxlar=narxlar, turlar=turlar, ustunlar=ustunlar,
+            versiya=versiya, muddat=time.monotonic() + _ttl(),
+        )
+    return narxlar, turlar, ustunlar
+
+
+def eskirtirish():
+    """
+    Narx / ishchi turi o'zgardi — o'z jarayonida darhol, boshqa worker'larda
+    commit'dan keyin (umumiy versiya oshadi) matritsa qayta o'qiladi.
+    Versiya commit'dan oldin oshirilsa, boshqa worker eski ma'lumotni yangi
+    versiya bilan keshlab qo'yishi mumkin edi.
+    """
+    with _kesh_lock:
+        _kesh.update(narxlar=None, turlar=None, ustunlar=None, versiya=None, muddat=0.0)
+    transaction.on_commit(_oshir)
+
+
+def _sana(qiymat):
+    if qiymat is None:
+        return timezone.localdate()
+    if isinstance(qiymat, datetime):
+        return timezone.localdate(qiymat) if timezone.is_aware(qiymat) else qiymat.date()
+    if isinstance(qiymat, str):
+        return date.fromisoformat(qiymat[:10])
+    return qiymat
+
+
+# ─────────────────────────────────────────────────────────────────
+# QIDIRUV
+# ─────────────────────────────────────────────────────────────────
+
+def narx(product_id, turi, sana=None):
+    """
+    sana da amal qilgan bitta dona narxi; tarixi yo'q mahsulot uchun
+    Product.narx_* ustuni, u ham bo'lmasa 0
+    """
+    narxlar, _, ustunlar = _matritsa()
+    if product_id not in ustunlar and (product_id, turi) not in narxlar:
+        # Kesh yuklangandan keyin qo'shilgan mahsulot
+        from .models import Product
+        qatori = Product.objects.filter(pk=product_id).values(*USTUNLAR.values()).first() or {}
+        ustunlar = {product_id: {t: qatori.get(u) or 0 for t, u in USTUNLAR.items()}}
+    return _amaldagi(narxlar, ustunlar, product_id, turi, _sana(sana))
+
+
+def ishchi_turi(ishchi_id):
+    """Ishchi turi nomi (IshchiCategory.nomi) yoki None"""
+    if ishchi_id is None:
+        return None
+    turlar = _matritsa()[1]
+    if ishchi_id not in turlar:
+        # Kesh yuklangandan keyin qo'shilgan ishchi
+        from .models import Ishchi
+        turi = Ishchi.objects.filter(pk=ishchi_id).values_list('turi__nomi', flat=True).first()
+        with _kesh_lock:
+            if _kesh['turlar'] is turlar:
+                turlar[ishchi_id] = turi
+        return turi
+    return turlar[ishchi_id]
+
+
+def ish_narxi(ish):
+    """Ish.narxi = soni × narx; turi noma'lum bo'lsa None (narxi o'zgarmaydi)"""
+    turi = ishchi_turi(ish.ishchi_id)
+    if turi not in USTUNLAR or ish.soni is None:
+        return None
+    return narx(ish.mahsulot_id, turi, ish.sana) * int(ish.soni)
+
+
+# ─────────────────────────────────────────────────────────────────
+# YOZISH
+# ─────────────────────────────────────────────────────────────────
+
+@transaction.atomic
+def narxlarni_ornatish(qiymatlar, valid_from=None):
+    """
+    {(product_id, turi): narx} — bitta bulk upsert (product, turi, valid_from bo'yicha).
+    Bugun amal qiladiganlari Product.narx_* nusxasiga ham yoziladi (bitta bulk_update).
+    Natija: yozilgan ProductRate soni.
+    """
+    from .models import IshchiCategory, ProductRate
+
+    valid_from = _sana(valid_from)
+    kategoriyalar = dict(
+        IshchiCategory.objects.filter(nomi__in={t for _, t in qiymatlar})
+        .values_list('nomi', 'pk')
+    )
+    yozuvlar = [
+        ProductRate(product_id=product_id, ishchi_category_id=kategoriyalar[turi],
+                    narx=int(qiymat), valid_from=valid_from)
+        for (product_id, turi), qiymat in qiymatlar.items()
+        if turi in kategoriyalar
+    ]
+    ProductRate.objects.bulk_create(
+        yozuvlar, update_conflicts=True,
+        unique_fields=['product', 'ishchi_category', 'valid_from'], update_fields=['narx'],
+    )
+    eskirtirish()
+    ustunlarni_yangilash({product_id for product_id, _ in qiymatlar})
+    return len(yozuvlar)
+
+
+def ustunlarni_yangilash(product_ids):
+    """Product.narx_* ← bugun amal qilayotgan narx (nusxa; save() chaqirilmaydi)"""
+    from .models import Product
+
+    mahsulotlar = list(Product.objects.filter(pk__in=product_ids).only('pk', *USTUNLAR.values()))
+    ozgardi = []
+    for p in mahsulotlar:
+        yangi = {ustun: narx(p.pk, turi) for turi, ustun in USTUNLAR.items()}
+        if any(getattr(p, u) != v for u, v in yangi.items()):
+            for u, v in yangi.items():
+                setattr(p, u, v)
+            ozgardi.append(p)
+    Product.objects.bulk_update(ozgardi, list(USTUNLAR.values()), batch_size=500)
+    return len(ozgardi)
+
+
+def ustunlardan(mahsulot, ozgarganlar=()):
+    """
+    Product.save: tarixi yo'q mahsulot — barcha narx_* ustunlari BOSHLANGICH dan;
+    tarixi bor — faqat o'zgartirilgan ustunlar (ozgarganlar: ustun nomlari)
+    bugundan amal qiladigan ProductRate bo'ladi. Joriy narx bilan solishtirilmaydi:
+    nusxa hali yangilanmagan kelajak sanali narxni bekor qilib qo'ymaslik uchun.
+    """
+    from .models import ProductRate
+
+    if not ProductRate.objects.filter(product=mahsulot).exists():
+        qiymatlar = {(mahsulot.pk, turi): getattr(mahsulot, ustun) or 0 for turi, ustun in USTUNLAR.items()}
+        narxlarni_ornatish(qiymatlar, BOSHLANGICH)
+        return
+    qiymatlar = {
+        (mahsulot.pk, turi): getattr(mahsulot, ustun) or 0
+        for turi, ustun in USTUNLAR.items()
+        if ustun in ozgarganlar
+    }
+    if qiymatlar:
+        narxlarni_ornatish(qiymatlar, timezone.localdate())
+
+
+def boshlangich_narxlar(product_ids=None):
+    """Narx tarixi yo'q mahsulotlar uchun Product.narx_* → ProductRate (BOSHLANGICH dan)"""
+    from .models import Product
+
+    qs = Product.objects.filter(narxlar__isnull=True)
+    if product_ids is not None:
+        qs = qs.filter(pk__in=list(product_ids))
+    qiymatlar = {
+        (p['pk'], turi): p[ustun] or 0
+        for p in qs.values('pk', *USTUNLAR.values())
+        for turi, ustun in USTUNLAR.items()
+    }
+    return narxlarni_ornatish(qiymatlar, BOSHLANGICH) if qiymatlar else 0
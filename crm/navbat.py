@@ -0,0 +1,42 @@
+# crm/navbat.py
+"""
+Commit'dan keyingi yig'ma ishlar — bitta tranzaksiyada bir marta.
+
+Sotuv ichida har bir qator saqlanganda (update_summa → Sotuv.save) xaridor
+statistikasi, kunlik yig'ma va dashboard keshi qayta hisoblanardi — qatorlar
+soni marta. Bu yerda qiymatlar (xaridor id'lari, kunlar) nomi bo'yicha
+to'planadi va commit'dan keyin bitta chaqiruv bilan bajariladi:
+
+    commitdan_keyin('xaridor_statistika', Xaridor.statistikani_yangilash, {xaridor_id})
+
+Tranzaksiyadan tashqarida (autocommit) — darhol. Tranzaksiya bekor qilinsa
+navbat ham yo'qoladi (on_commit bilan birga). Chaqiruvlar idempotent bo'lishi
+shart: savepoint bekor qilinganda ham to'plamda qolgan qiymat ortiqcha qayta
+hisoblanadi, xolos.
+"""
+from django.db import transaction
+
+
+def commitdan_keyin(nomi, fn, qiymatlar, using=None):
+    """fn(to'plam) — joriy tranzaksiya commit bo'lgach bir marta, barcha qiymatlar bilan"""
+    ulanish = transaction.get_connection(using)
+    if not ulanish.in_atomic_block:
+        fn(set(qiymatlar))
+        return
+
+    navbat = ulanish.__dict__.setdefault('_commitdan_keyin', {})
+    mavjud = navbat.get(nomi)
+    # Rollback on_commit ro'yxatini tozalaydi — callback u yerda bo'lmasa, navbat eskirgan
+    if mavjud and any(cb is mavjud[0] for _, cb, *_ in ulanish.run_on_commit):
+        mavjud[1].update(qiymatlar)
+        return
+
+    toplam = set(qiymatlar)
+
+    def _bajarish():
+        if navbat.get(nomi, (None,))[0] is _bajarish:
+            del navbat[nomi]
+        fn(toplam)
+
+    navbat[nomi] = (_bajarish, toplam)
+    transaction.on_commit(_bajarish, using=using)
@@ -0,0 +1,166 @@
+# crm/oylik_xizmati.py
+"""
+Oylik yopish — bir yoki barcha ochiq ishchilar bitta partiyada (PayrollRun).
+
+Avval oylik har bir ishchi uchun alohida yopilardi (Ish.narxi Python'da
+yig'ilib, Oyliklar / Chiqim / ChiqimItem bittadan yaratilar, signal esa
+har Chiqim uchun Tranzaksiya yozardi). Oy oxirida bu — har bir ishchini
+bosib chiqish. Bu yerda:
+
+    1. hisob: ochiq ishchilar + Σ Ish.narxi (status='yangi') + Σ aktiv avans —
+       bitta so'rov (subquery'lar bilan, JOIN ko'payishisiz)
+    2. Oyliklar / Chiqim / ChiqimItem / Tranzaksiya — bulk_create
+       (kunlik chiqim yig'masi va dashboard keshi — commit'dan keyin)
+    3. Ish, Avans, Ishchi (hisobi bilan) — to'plamli UPDATE'lar
+
+hammasi bitta tranzaksiyada; xato bo'lsa hech narsa yozilmaydi.
+Quruq hisob (preview) — faqat 1-qadam:
+
+    qatorlar = oylik_hisobi()
+    run = oylik_yopish({q.ishchi.pk: None for q in qatorlar}, foydalanuvchi=request.user)
+
+CLI: python manage.py oylik_yopish [--quruq]
+"""
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Avans, Chiqim, ChiqimItem, ChiqimTuri, Ish, Ishchi, Oyliklar, PayrollRun
+
+
+class OylikQator:
+    """Bitta ishchining oylik hisobi"""
+
+    def __init__(self, ishchi, hisoblangan, avans, ishlar_soni):
+        self.ishchi      = ishchi
+        self.hisoblangan = hisoblangan   # Σ Ish.narxi (status='yangi')
+        self.avans       = avans         # Σ aktiv avans
+        self.ishlar_soni = ishlar_soni
+
+    @property
+    def naqd(self):
+        """Avanslardan keyin qo'lga beriladigani"""
+        return max(self.hisoblangan - self.avans, 0)
+
+    def berilgan(self, avans_ayirish=False):
+        return self.naqd if avans_ayirish else self.hisoblangan
+
+
+def _yigindi(model, maydon, ifoda, **filtr):
+    return Coalesce(models.Subquery(
+        model.objects.filter(ishchi=models.OuterRef('pk'), **filtr)
+        .order_by().values('ishchi')
+        .annotate(jami=ifoda(maydon))
+        .values('jami')
+    ), 0)
+
+
+def oylik_hisobi(ishchi_ids=None):
+    """
+    Oyligi ochiq ishchilar hisobi — bitta so'rov. ishchi_ids berilmasa barcha
+    faol ishchilar. Natija: [OylikQator] (ism bo'yicha).
+    """
+    qs = Ishchi.objects.filter(is_oylik_open=True)
+    qs = qs.filter(pk__in=list(ishchi_ids)) if ishchi_ids is not None else qs.filter(is_active=True)
+    qs = qs.select_related('turi').annotate(
+        hisob_summa=_yigindi(Ish, 'narxi', models.Sum, status='yangi'),
+        hisob_soni=_yigindi(Ish, 'pk', models.Count, status='yangi'),
+        hisob_avans=_yigindi(Avans, 'amount', models.Sum, is_active=True),
+    ).order_by('ism', 'familiya')
+    return [OylikQator(i, i.hisob_summa, i.hisob_avans, i.hisob_soni) for i in qs]
+
+
+def _tranzaksiyalar(chiqimlar, ishchilar, foydalanuvchi):
+    """bulk_create signal chaqirmaydi — Tranzaksiya budget/signals.py dagi xarita bilan"""
+    from budget.models import Tranzaksiya
+
+    Tranzaksiya.objects.bulk_create([
+        Tranzaksiya(chiqim=c, **Tranzaksiya.chiqim_maydonlari(c, ishchi=ishchi, foydalanuvchi=foydalanuvchi))
+        for c, ishchi in zip(chiqimlar, ishchilar)
+    ], batch_size=500)
+
+
+def _analytics_yangilash(sana):
+    # bulk_create analytics signallarini ham chetlab o'tadi — kunlik chiqim yig'masi
+    # va dashboard keshi commit'dan keyin qo'lda yangilanadi
+    from analytics.kesh import kesh_eskirtirish
+    from analytics.rollups import chiqim_kunini_yangilash
+
+    chiqim_kunini_yangilash(sana)
+    kesh_eskirtirish(sana)
+
+
+@transaction.atomic
+def oylik_yopish(berilganlar, foydalanuvchi=None, sana=None, izoh='', avans_ayirish=False):
+    """
+    {ishchi_id: berilgan_summa | None} — oyliklarni bitta partiyada yopadi.
+    None — hisoblangan summa (avans_ayirish=True bo'lsa avanslardan keyingi naqd).
+    Oyligi allaqachon yopilgan ishchilar tashlab ketiladi; birortasi qolmasa ValueError.
+    Natija: PayrollRun.
+    """
+    sana = sana or timezone.now().date()
+    # Ishchi qatorlari qulflanadi (PostgreSQL) — yopish davomida ularga yangi Ish qo'shilmaydi
+    ids = list(
+        Ishchi.objects.select_for_update()
+        .filter(pk__in=list(berilganlar), is_oylik_open=True)
+        .values_list('pk', flat=True)
+    )
+    if not ids:
+        raise ValueError("❌ Yopiladigan ochiq oylik yo'q")
+
+    qatorlar = oylik_hisobi(ids)
+    summalar = {}
+    for q in qatorlar:
+        berilgan = berilganlar[q.ishchi.pk]
+        summalar[q.ishchi.pk] = q.berilgan(avans_ayirish) if berilgan is None else max(int(berilgan), 0)
+
+    run = PayrollRun.objects.create(
+        sana=sana, created_by=foydalanuvchi, izoh=izoh[:255],
+        ishchilar_soni=len(qatorlar),
+        jami_hisoblangan=sum(q.hisoblangan for q in qatorlar),
+        jami_avans=sum(q.avans for q in qatorlar),
+        jami_berilgan=sum(summalar.values()),
+    )
+    Oyliklar.objects.bulk_create([
+        Oyliklar(
+            ishchi=q.ishchi, run=run, sana=sana, yopilgan=True,
+            hisoblangan=q.hisoblangan, oylik=summalar[q.ishchi.pk],
+        )
+        for q in qatorlar
+    ], batch_size=500)
+
+    tolanadi = [q for q in qatorlar if summalar[q.ishchi.pk] > 0]
+    if tolanadi:
+        oylik_turi = ChiqimTuri.objects.filter(name__iexact='oylik').first()
+        chiqimlar = Chiqim.objects.bulk_create([
+            Chiqim(
+                name=f"{q.ishchi.ism} {q.ishchi.familiya} — oylik ({sana.strftime('%m.%Y')})",
+                category=oylik_turi, price=summalar[q.ishchi.pk],
+                created=sana, created_by=foydalanuvchi,
+            )
+            for q in tolanadi
+        ], batch_size=500)
+        ChiqimItem.objects.bulk_create([
+            ChiqimItem(
+                chiqim=c, item_turi='oylik',
+                name=f"{q.ishchi.ism} {q.ishchi.familiya} oyligi", price_uzs=c.price,
+            )
+            for c, q in zip(chiqimlar, tolanadi)
+        ], batch_size=500)
+        _tranzaksiyalar(chiqimlar, [q.ishchi for q in tolanadi], foydalanuvchi)
+        transaction.on_commit(lambda: _analytics_yangilash(sana))
+
+    Ish.objects.filter(ishchi_id__in=ids, status='yangi').update(status='yopilgan')
+    Avans.objects.filter(ishchi_id__in=ids, is_active=True).update(is_active=False, ended=sana)
+    # Ishchi hisobi: ochiq ish va avanslar qolmadi (qatorlar qulflangan) — nol;
+    # update() auto_now'ni to'ldirmaydi — sana qo'lda
+    Ishchi.objects.filter(pk__in=ids).update(
+        is_oylik_open=False, oylik_yopilgan_sana=timezone.now().date(),
+        joriy_hisob=0, joriy_soni=0, joriy_avans=0,
+        jami_tolangan=models.Case(
+            *[models.When(pk=pk, then=models.F('jami_tolangan') + summa) for pk, summa in summalar.items() if summa],
+            default=models.F('jami_tolangan'),
+            output_field=models.BigIntegerField(),
+        ),
+    )
+    return run
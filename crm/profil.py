@@ -0,0 +1,180 @@
+# crm/profil.py
+"""
+So'rov (request) darajasidagi SQL profillash.
+
+crm.middleware.SqlProfilMiddleware har bir profillangan request uchun
+SorovYozuvchi'ni connection.execute_wrapper sifatida o'rnatadi: har bir SQL
+vaqti, barmoq izi (parametrlarsiz, IN-ro'yxatlar qisqartirilgan shakli) va
+loyiha ichidagi chaqirilgan joyi yoziladi.
+
+Natijalar jarayon ichidagi buferda (view, barmoq izi) bo'yicha yig'iladi va
+har SQL_PROFIL_FLUSH soniyada SorovProfili jadvaliga yoziladi. Jadvalda har
+bir view uchun faqat SQL_PROFIL_TOP ta eng og'ir so'rov, oxirgi
+SQL_PROFIL_OYNA_SOAT soat ichidagilari saqlanadi — admin'da "view bo'yicha
+issiq so'rovlar" hisoboti.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+_BOSHLIQ    = re.compile(r'\s+')
+_IN_ROYXAT  = re.compile(r'\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_RAQAM      = re.compile(r'\b\d+\b')
+
+# Chaqiruv joyi qidirilganda o'tkazib yuboriladigan fayllar (profillashning o'zi ham)
+_ICHKI = (
+    '/django/', '/site-packages/', '/dist-packages/',
+    __file__, os.path.join(os.path.dirname(__file__), 'middleware.py'),
+)
+
+
+def sozlama(nomi, default):
+    return getattr(settings, f'SQL_PROFIL_{nomi}', default)
+
+
+def barmoq_izi(sql):
+    """SQL → (normal shakl, md5): qiymatlar va IN-ro'yxat uzunligi farqi e'tiborga olinmaydi"""
+    normal = _BOSHLIQ.sub(' ', sql).strip()
+    normal = _IN_ROYXAT.sub('(...)', normal)
+    normal = _RAQAM.sub('?', normal)
+    return normal, hashlib.md5(normal.encode()).hexdigest()
+
+
+def chaqiruv_joyi():
+    """Stekdagi birinchi loyiha kodi freymi → 'crm/views.py:123 (get_queryset)'"""
+    asos = os.path.join(str(settings.BASE_DIR), '')
+    frame = sys._getframe(2)
+    while frame is not None:
+        fayl = frame.f_code.co_filename
+        if fayl.startswith(asos) and not any(s in fayl for s in _ICHKI):
+            return f"{fayl[len(asos):]}:{frame.f_lineno} ({frame.f_code.co_name})"
+        frame = frame.f_back
+    return ''
+
+
+class SorovYozuvchi:
+    """connection.execute_wrapper — bitta request'dagi barcha SQL'lar"""
+
+    def __init__(self):
+        self.sorovlar = []   # (barmoq_izi, normal_sql, ms, joy)
+
+    def __call__(self, execute, sql, params, many, context):
+        boshi = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - boshi) * 1000
+            normal, izi = barmoq_izi(sql)
+            self.sorovlar.append((izi, normal, ms, chaqiruv_joyi()))
+
+    @property
+    def soni(self):
+        return len(self.sorovlar)
+
+    @property
+    def jami_ms(self):
+        return sum(s[2] for s in self.sorovlar)
+
+    def takrorlar(self):
+        """Barmoq izi → request ichida necha marta (faqat 1 dan ko'p bo'lganlari)"""
+        sanoq = Counter(s[0] for s in self.sorovlar)
+        return {izi: n for izi, n in sanoq.items() if n > 1}
+
+
+# ─────────────────────────────────────────────────────────────────
+# JARAYON ICHIDAGI BUFER → SorovProfili
+# ─────────────────────────────────────────────────────────────────
+
+_bufer = {}
+_bufer_lock = threading.Lock()
+_oxirgi_yozish = [time.monotonic()]
+
+
+def buferga(view, yozuvchi):
+    """Request natijasini buferga qo'shadi; vaqti kelgan bo'lsa jadvalga yozadi"""
+    takrorlar = yozuvchi.takrorlar()
+    with _bufer_lock:
+        for izi, normal, ms, joy in yozuvchi.sorovlar:
+            b = _bufer.setdefault((view, izi), {
+                'sql': normal, 'joy': joy, 'soni': 0, 'takror': 0, 'jami_ms': 0.0, 'max_ms': 0.0,
+            })
+            b['soni']    += 1
+            b['jami_ms'] += ms
+            b['max_ms']   = max(b['max_ms'], ms)
+        for izi, n in takrorlar.items():
+            _bufer[(view, izi)]['takror'] += n - 1
+
+        vaqti_keldi = time.monotonic() - _oxirgi_yozish[0] >= sozlama('FLUSH', 30)
+        if not vaqti_keldi:
+            return
+        yigilgan = dict(_bufer)
+        _bufer.clear()
+        _oxirgi_yozish[0] = time.monotonic()
+
+    jadvalga_yozish(yigilgan)
+
+
+@transaction.atomic
+def jadvalga_yozish(yigilgan):
+    """{(view, izi): statistika} → SorovProfili (qo'shib boriladi), so'ng eskilar va top-N dan tashqarisi o'chiriladi"""
+    from .models import SorovProfili
+
+    if not yigilgan:
+        return
+    viewlar = {v for v, _ in yigilgan}
+    mavjud = {
+        (p.view, p.barmoq_izi): p
+        for p in SorovProfili.objects.filter(
+            view__in=viewlar, barmoq_izi__in={izi for _, izi in yigilgan},
+        )
+    }
+
+    yangilar, yangilanganlar = [], []
+    hozir = timezone.now()
+    for (view, izi), b in yigilgan.items():
+        p = mavjud.get((view, izi))
+        if p is None:
+            yangilar.append(SorovProfili(
+                view=view[:200], barmoq_izi=izi, sql=b['sql'], joy=b['joy'][:300],
+                soni=b['soni'], takror=b['takror'], jami_ms=b['jami_ms'], max_ms=b['max_ms'],
+            ))
+            continue
+        p.soni    += b['soni']
+        p.takror  += b['takror']
+        p.jami_ms += b['jami_ms']
+        p.max_ms   = max(p.max_ms, b['max_ms'])
+        p.joy      = b['joy'][:300] or p.joy
+        p.oxirgi   = hozir
+        yangilanganlar.append(p)
+
+    SorovProfili.objects.bulk_create(yangilar, ignore_conflicts=True)
+    SorovProfili.objects.bulk_update(yangilanganlar, ['soni', 'takror', 'jami_ms', 'max_ms', 'joy', 'oxirgi'])
+
+    # Aylanma oyna: eski yozuvlar va har bir view'da top-N dan tashqarisi
+    SorovProfili.objects.filter(oxirgi__lt=hozir - timedelta(hours=sozlama('OYNA_SOAT', 24))).delete()
+    top = sozlama('TOP', 20)
+    ortiqcha = []
+    for view in viewlar:
+        ortiqcha += list(
+            SorovProfili.objects.filter(view=view).order_by('-jami_ms').values_list('pk', flat=True)[top:]
+        )
+    if ortiqcha:
+        SorovProfili.objects.filter(pk__in=ortiqcha).delete()
+
+
+def buferni_yozish():
+    """Buferdagi hamma narsani hoziroq jadvalga yozadi (test / buyruqlar uchun)"""
+    with _bufer_lock:
+        yigilgan = dict(_bufer)
+        _bufer.clear()
+        _oxirgi_yozish[0] = time.monotonic()
+    jadvalga_yozish(yigilgan)
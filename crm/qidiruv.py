@@ -0,0 +1,312 @@
+# crm/qidiruv.py
+"""
+Xaridor va sotuvlar uchun qidiruv indeksi.
+
+`ism__icontains` / `LIKE '%x%'` har safar butun jadvalni skan qiladi. Bu yerda
+alohida indeks jadvali yuritiladi (signal orqali sinxron — crm/signals.py):
+
+  * SQLite     — FTS5 virtual jadval, trigram tokenizer
+  * PostgreSQL — oddiy jadval + pg_trgm GIN indeks
+  * boshqa DB  — indeks yo'q, qidirish() None qaytaradi (chaqiruvchi eski
+                 icontains filtriga qaytadi)
+
+Indeks matni normallashtiriladi: kichik harf, o'zbekcha apostrof variantlari
+(ʻ ‘ ’ `) bitta ' ga, telefon — faqat raqamlar. Qidiruv avval qism-satr
+(prefiks ham) bo'yicha, natija kam bo'lsa — trigram o'xshashligi bo'yicha
+(xato yozilgan ism uchun) ishlaydi.
+
+    ids = qidirish('abdulla', 'xaridor')       # → [12, 5, ...] yoki None
+    python manage.py qidiruv_indeks            # indeksni noldan qurish
+"""
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, IntegerField, When
+
+logger = logging.getLogger(__name__)
+
+# tur → rowid qoldig'i (rowid = obj_id * len(TURLAR) + kod)
+TURLAR = {
+    'xaridor' : 0,
+    'sotuv'   : 1,
+}
+
+JADVAL = 'crm_qidiruv'
+
+# Trigram o'xshashligi chegarasi (so'rov trigramlarining qancha qismi matnda bo'lsin)
+OXSHASHLIK = 0.5
+
+_APOSTROF = str.maketrans({'ʻ': "'", '‘': "'", '’': "'", '`': "'", 'ʼ': "'"})
+
+
+# ─────────────────────────────────────────────────────────────────
+# NORMALLASH VA HUJJAT MATNI
+# ─────────────────────────────────────────────────────────────────
+
+def normallash(matn):
+    matn = (matn or '').translate(_APOSTROF).casefold()
+    return ' '.join(re.findall(r"[\w']+", matn))
+
+
+def raqamlar(matn):
+    return re.sub(r'\D', '', matn or '')
+
+
+def sorov_sozlari(q):
+    """So'rov → qidiruv so'zlari. Faqat raqam/telefon belgilaridan iborat bo'lsa — bitta raqamlar qatori"""
+    q = (q or '').strip()
+    if q and re.fullmatch(r'[\d\s+\-()]+', q):
+        return [raqamlar(q)] if raqamlar(q) else []
+    return normallash(q).split()
+
+
+def trigramlar(matn):
+    matn = f' {matn} '
+    return {matn[i:i + 3] for i in range(len(matn) - 2)}
+
+
+def xaridor_matni(xaridor):
+    return ' '.join(filter(None, [
+        normallash(xaridor.ism),
+        raqamlar(xaridor.telefon),
+        normallash(xaridor.manzil),
+        normallash(xaridor.izoh),
+    ]))
+
+
+def sotuv_matni(sotuv):
+    return ' '.join(filter(None, [str(sotuv.pk), normallash(sotuv.izoh)]))
+
+
+def _rowid(tur, obj_id):
+    return int(obj_id) * len(TURLAR) + TURLAR[tur]
+
+
+# ─────────────────────────────────────────────────────────────────
+# BACKENDLAR
+# ─────────────────────────────────────────────────────────────────
+
+class SqliteIndeks:
+    """FTS5 (trigram tokenizer) — qism-satr va trigram OR bo'yicha qidiruv"""
+
+    def jadval_sql(self):
+        return f"CREATE VIRTUAL TABLE IF NOT EXISTS {JADVAL} USING fts5(matn, tokenize='trigram')"
+
+    def yozish(self, cursor, qatorlar):
+        cursor.executemany(f"INSERT OR REPLACE INTO {JADVAL}(rowid, matn) VALUES (%s, %s)", qatorlar)
+
+    def ochirish(self, cursor, rowid):
+        cursor.execute(f"DELETE FROM {JADVAL} WHERE rowid = %s", [rowid])
+
+    def tozalash(self, cursor):
+        cursor.execute(f"DELETE FROM {JADVAL}")
+
+    @staticmethod
+    def _ibora(soz):
+        return '"' + soz.replace('"', '""') + '"'
+
+    def aniq(self, cursor, sozlar, kod, limit):
+        """Har bir so'z matnda qism-satr sifatida bo'lishi kerak (3 belgidan qisqasi — LIKE)"""
+        uzun  = [s for s in sozlar if len(s) >= 3]
+        qisqa = [s for s in sozlar if len(s) < 3]
+
+        shartlar, params = [f"rowid %% {len(TURLAR)} = %s"], [kod]
+        if uzun:
+            shartlar.append(f"{JADVAL} MATCH %s")
+            params.append(' AND '.join(self._ibora(s) for s in uzun))
+        for s in qisqa:
+            shartlar.append("matn LIKE %s")
+            params.append(f'%{s}%')
+
+        tartib = "ORDER BY rank" if uzun else ""
+        cursor.execute(
+            f"SELECT rowid, matn FROM {JADVAL} WHERE {' AND '.join(shartlar)} {tartib} LIMIT %s",
+            params + [limit],
+        )
+        return cursor.fetchall()
+
+    def taxminiy(self, cursor, sorov, kod, limit):
+        """Kamida bitta trigrami mos keladigan matnlar, bm25 bo'yicha (saralash keyin Python'da)"""
+        trig = [t for t in trigramlar(sorov) if t.strip() == t]
+        if not trig:
+            return []
+        cursor.execute(
+            f"SELECT rowid, matn FROM {JADVAL} "
+            f"WHERE {JADVAL} MATCH %s AND rowid %% {len(TURLAR)} = %s ORDER BY rank LIMIT %s",
+            [' OR '.join(self._ibora(t) for t in trig), kod, limit],
+        )
+        return cursor.fetchall()
+
+
+class PostgresIndeks:
+    """pg_trgm: ILIKE (GIN trigram indeks bilan) va word_similarity (<% operatori)"""
+
+    def jadval_sql(self):
+        return (
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm;"
+            f"CREATE TABLE IF NOT EXISTS {JADVAL} (rowid bigint PRIMARY KEY, matn text NOT NULL);"
+            f"CREATE INDEX IF NOT EXISTS {JADVAL}_trgm ON {JADVAL} USING gin (matn gin_trgm_ops);"
+        )
+
+    def yozish(self, cursor, qatorlar):
+        cursor.executemany(
+            f"INSERT INTO {JADVAL}(rowid, matn) VALUES (%s, %s) "
+            f"ON CONFLICT (rowid) DO UPDATE SET matn = EXCLUDED.matn",
+            qatorlar,
+        )
+
+    def ochirish(self, cursor, rowid):
+        cursor.execute(f"DELETE FROM {JADVAL} WHERE rowid = %s", [rowid])
+
+    def tozalash(self, cursor):
+        cursor.execute(f"TRUNCATE {JADVAL}")
+
+    def aniq(self, cursor, sozlar, kod, limit):
+        cursor.execute(
+            f"SELECT rowid, matn FROM {JADVAL} "
+            f"WHERE rowid %% {len(TURLAR)} = %s AND matn ILIKE ALL(%s) "
+            f"ORDER BY length(matn) LIMIT %s",
+            [kod, [f'%{s}%' for s in sozlar], limit],
+        )
+        return cursor.fetchall()
+
+    def taxminiy(self, cursor, sorov, kod, limit):
+        cursor.execute(
+            f"SELECT rowid, matn FROM {JADVAL} "
+            f"WHERE rowid %% {len(TURLAR)} = %s AND %s <%% matn "
+            f"ORDER BY word_similarity(%s, matn) DESC LIMIT %s",
+            [kod, sorov, sorov, limit],
+        )
+        return cursor.fetchall()
+
+
+BACKENDLAR = {
+    'sqlite'     : SqliteIndeks,
+    'postgresql' : PostgresIndeks,
+}
+
+_tayyor = set()
+
+
+def _backend():
+    """Joriy DB uchun indeks backendi (jadval yo'q bo'lsa yaratiladi); mos kelmasa — None"""
+    if not getattr(settings, 'QIDIRUV_INDEKS', True):
+        return None
+    cls = BACKENDLAR.get(connection.vendor)
+    if cls is None:
+        return None
+    backend = cls()
+    kalit = (connection.alias, str(connection.settings_dict['NAME']))
+    if kalit not in _tayyor:
+        with connection.cursor() as cursor:
+            yangi = JADVAL not in connection.introspection.table_names(cursor)
+            for sql in filter(None, backend.jadval_sql().split(';')):
+                cursor.execute(sql)
+        _tayyor.add(kalit)
+        if yangi:
+            _toldirish(backend)
+    return backend
+
+
+# ─────────────────────────────────────────────────────────────────
+# INDEKSNI YANGILASH
+# ─────────────────────────────────────────────────────────────────
+
+def indekslash(tur, obj):
+    backend = _backend()
+    if backend is None:
+        return
+    matn = xaridor_matni(obj) if tur == 'xaridor' else sotuv_matni(obj)
+    with connection.cursor() as cursor:
+        backend.yozish(cursor, [(_rowid(tur, obj.pk), matn)])
+
+
+def indeksdan_ochirish(tur, obj_id):
+    backend = _backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.ochirish(cursor, _rowid(tur, obj_id))
+
+
+def _toldirish(backend):
+    from .models import Sotuv, Xaridor
+
+    natija = {}
+    with connection.cursor() as cursor:
+        backend.tozalash(cursor)
+        for tur, qs, matn in (
+            ('xaridor', Xaridor.objects.only('id', 'ism', 'telefon', 'manzil', 'izoh'), xaridor_matni),
+            ('sotuv',   Sotuv.objects.only('id', 'izoh'),                          sotuv_matni),
+        ):
+            qatorlar = [(_rowid(tur, obj.pk), matn(obj)) for obj in qs.iterator(chunk_size=2000)]
+            backend.yozish(cursor, qatorlar)
+            natija[tur] = len(qatorlar)
+    return natija
+
+
+def qayta_qurish():
+    """Indeksni noldan quradi → {'xaridor': n, 'sotuv': n}; backend yo'q bo'lsa None"""
+    backend = _backend()
+    if backend is None:
+        return None
+    return _toldirish(backend)
+
+
+# ─────────────────────────────────────────────────────────────────
+# QIDIRISH
+# ─────────────────────────────────────────────────────────────────
+
+def qidirish(q, tur, limit=50):
+    """
+    So'rov bo'yicha obyekt id'lari (moslik tartibida).
+    Indeks mavjud bo'lmagan DB'da None — chaqiruvchi icontains ga qaytsin.
+    """
+    backend = _backend()
+    if backend is None:
+        return None
+
+    sozlar = sorov_sozlari(q)
+    if not sozlar:
+        return []
+    kod = TURLAR[tur]
+
+    with connection.cursor() as cursor:
+        qatorlar = backend.aniq(cursor, sozlar, kod, limit)
+
+        sorov = ' '.join(sozlar)
+        if len(qatorlar) < limit and len(sorov) >= 4:
+            # Xato yozilgan so'rov: trigramlarining kamida OXSHASHLIK qismi mos kelganlar
+            bor = {r for r, _ in qatorlar}
+            q_trig = trigramlar(sorov)
+            taxminiy = []
+            for rowid, matn in backend.taxminiy(cursor, sorov, kod, limit * 5):
+                if rowid in bor:
+                    continue
+                ulush = len(q_trig & trigramlar(matn)) / len(q_trig)
+                if ulush >= OXSHASHLIK:
+                    taxminiy.append((ulush, rowid, matn))
+            taxminiy.sort(key=lambda x: -x[0])
+            qatorlar = list(qatorlar) + [(r, m) for _, r, m in taxminiy[:limit - len(qatorlar)]]
+
+    return [rowid // len(TURLAR) for rowid, _ in qatorlar]
+
+
+def moslik_tartibi(ids):
+    """id'lar ro'yxati tartibini saqlovchi order_by ifodasi"""
+    return Case(
+        *[When(pk=pk, then=i) for i, pk in enumerate(ids)],
+        default=len(ids), output_field=IntegerField(),
+    )
+
+
+def jadval_yaratish(sender=None, using='default', **kwargs):
+    """post_migrate: indeks jadvali yo'q bo'lsa yaratib, to'ldiradi"""
+    if using != connection.alias:
+        return
+    try:
+        _backend()
+    except Exception as e:
+        logger.warning("Qidiruv indeksini yaratib bo'lmadi: %s", e)
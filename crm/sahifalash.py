@@ -0,0 +1,200 @@
+# crm/sahifalash.py
+"""
+Keyset (kursor) sahifalash — ListView'lar uchun.
+
+Django Paginator har sahifada COUNT(*) va OFFSET ishlatadi: chuqur sahifalar
+O(offset), har ochilishda butun filtrlangan jadval sanaladi. Bu yerda sahifa
+oxirgi ko'rilgan (maydon, id) juftligidan keyin keladigan N ta qator sifatida
+olinadi — har qanday chuqurlikda bir xil tezlik, COUNT umuman yo'q yoki
+(taxminiy_jami = True bo'lsa) qisqa muddat keshlangan.
+
+    class KirimListView(KursorSahifalashMixin, AdminRequiredMixin, ListView):
+        ordering = ['-sana']
+        paginate_by = 50
+
+Shablon: {% include 'partials/kursor_sahifalash.html' %}
+Tartib maydoni kursor_maydonlari'da bo'lmasa — oddiy Paginator ishlaydi.
+"""
+import base64
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db.models import Q
+from django.utils.http import urlencode
+
+KEYINGI = 'n'
+OLDINGI = 'p'
+
+
+def _kodla(yonalish, qiymat, pk):
+    xom = json.dumps([yonalish, qiymat, pk], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(xom).decode().rstrip('=')
+
+
+def _ochish(kursor):
+    try:
+        xom = base64.urlsafe_b64decode(kursor + '=' * (-len(kursor) % 4))
+        yonalish, qiymat, pk = json.loads(xom)
+        if yonalish in (KEYINGI, OLDINGI):
+            return yonalish, qiymat, int(pk)
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+class KursorPaginator:
+    """(maydon, id) bo'yicha tartiblangan queryset uchun kursor paginator"""
+
+    def __init__(self, queryset, per_page, maydon, teskari=True, jami_timeout=None):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.maydon = maydon
+        self.teskari = teskari
+        self.jami_timeout = jami_timeout
+        self._field = queryset.model._meta.get_field(maydon)
+
+    @property
+    def count(self):
+        """Taxminiy jami (keshdan); jami_timeout berilmagan bo'lsa — None (sanalmaydi)"""
+        if self.jami_timeout is None:
+            return None
+        try:
+            sql, params = self.queryset.order_by().query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        kalit = 'sahifalash:jami:' + hashlib.md5(repr((sql, params)).encode()).hexdigest()
+        return cache.get_or_set(kalit, self.queryset.order_by().count, self.jami_timeout)
+
+    def _tartib(self, teskari):
+        belgi = '-' if teskari else ''
+        return (f'{belgi}{self.maydon}', f'{belgi}pk')
+
+    def _shart(self, qiymat, pk, kichik):
+        """(maydon, id) < (qiymat, pk) yoki > — birinchi shart indeks oralig'ini beradi"""
+        m = self.maydon
+        if kichik:
+            return Q(**{f'{m}__lte': qiymat}) & (Q(**{f'{m}__lt': qiymat}) | Q(pk__lt=pk))
+        return Q(**{f'{m}__gte': qiymat}) & (Q(**{f'{m}__gt': qiymat}) | Q(pk__gt=pk))
+
+    def _kursor(self, yonalish, obj):
+        return _kodla(yonalish, self._field.value_to_string(obj), obj.pk)
+
+    def sahifa(self, kursor, params=None, kursor_param='kursor'):
+        ochilgan = _ochish(kursor) if kursor else None
+        if ochilgan:
+            yonalish, qiymat, pk = ochilgan
+            try:
+                qiymat = self._field.to_python(qiymat)
+            except ValidationError:
+                ochilgan = None
+
+        n = self.per_page
+        if not ochilgan:
+            rows = list(self.queryset.order_by(*self._tartib(self.teskari))[:n + 1])
+            oldingi_bor, keyingi_bor = False, len(rows) > n
+            rows = rows[:n]
+        elif yonalish == KEYINGI:
+            qs = self.queryset.filter(self._shart(qiymat, pk, kichik=self.teskari))
+            rows = list(qs.order_by(*self._tartib(self.teskari))[:n + 1])
+            oldingi_bor, keyingi_bor = True, len(rows) > n
+            rows = rows[:n]
+        else:
+            # Orqaga: teskari tartibda n+1 ta olib, ro'yxatni aylantiramiz
+            qs = self.queryset.filter(self._shart(qiymat, pk, kichik=not self.teskari))
+            rows = list(qs.order_by(*self._tartib(not self.teskari))[:n + 1])
+            oldingi_bor, keyingi_bor = len(rows) > n, True
+            rows = rows[:n][::-1]
+
+        return KursorSahifa(
+            rows, self,
+            keyingi=self._kursor(KEYINGI, rows[-1]) if keyingi_bor and rows else None,
+            oldingi=self._kursor(OLDINGI, rows[0]) if oldingi_bor and rows else None,
+            params=params, kursor_param=kursor_param,
+        )
+
+
+class KursorSahifa:
+    """Page obyektiga o'xshash: has_next/has_previous + tayyor URL'lar"""
+
+    number = None
+
+    def __init__(self, object_list, paginator, keyingi, oldingi, params=None, kursor_param='kursor'):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.keyingi_kursor = keyingi
+        self.oldingi_kursor = oldingi
+
+        # Filtr parametrlari saqlanadi, eski 'page' va kursor tashlanadi
+        self._params = [
+            (k, v)
+            for k, qiymatlar in (params.lists() if params is not None else [])
+            if k not in ('page', kursor_param)
+            for v in qiymatlar
+        ]
+        self._kursor_param = kursor_param
+
+    def _url(self, kursor=None):
+        params = list(self._params)
+        if kursor:
+            params.append((self._kursor_param, kursor))
+        return '?' + urlencode(params)
+
+    @property
+    def birinchi_url(self):
+        return self._url()
+
+    @property
+    def keyingi_url(self):
+        return self._url(self.keyingi_kursor) if self.keyingi_kursor else None
+
+    @property
+    def oldingi_url(self):
+        return self._url(self.oldingi_kursor) if self.oldingi_kursor else None
+
+    def has_next(self):
+        return self.keyingi_kursor is not None
+
+    def has_previous(self):
+        return self.oldingi_kursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, i):
+        return self.object_list[i]
+
+
+class KursorSahifalashMixin:
+    """
+    MultipleObjectMixin.paginate_queryset o'rniga keyset sahifalash.
+    Queryset bitta kursor_maydonlari'dagi maydon bo'yicha tartiblangan bo'lishi kerak.
+    """
+    kursor_maydonlari = ('sana',)
+    kursor_param = 'kursor'
+    # True — paginator.count (shablonda "N ta topildi") jami_timeout soniya keshlanadi
+    taxminiy_jami = False
+    jami_timeout = 60
+
+    def paginate_queryset(self, queryset, page_size):
+        tartib = list(queryset.query.order_by or queryset.model._meta.ordering)
+        if len(tartib) != 1 or not isinstance(tartib[0], str) or tartib[0].lstrip('-') not in self.kursor_maydonlari:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = KursorPaginator(
+            queryset, page_size,
+            maydon=tartib[0].lstrip('-'),
+            teskari=tartib[0].startswith('-'),
+            jami_timeout=self.jami_timeout if self.taxminiy_jami else None,
+        )
+        page = paginator.sahifa(
+            self.request.GET.get(self.kursor_param), self.request.GET, self.kursor_param,
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -0,0 +1,83 @@
+# crm/signals.py
+"""
+Qidiruv indeksini (crm/qidiruv.py) Xaridor / Sotuv o'zgarishlari bilan sinxron saqlash;
+kosib Ish o'chirilganda variant qoldig'i va Product.soni dan, Ish / Avans / Oyliklar
+o'chirilganda ishchi hisobidan ayirish; Sotuv o'chirilganda xaridor statistikasini
+qayta hisoblash (commit'dan keyin); narx / ishchi turi o'zgarganda ishbay narx
+keshini (crm/narxlar.py) eskirtirish.
+
+Ulanish: crm/apps.py → CrmConfig.ready() ichida import qilinadi.
+"""
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete
+
+from . import narxlar, qidiruv
+from .models import Ishchi, Xaridor
+from .navbat import commitdan_keyin
+
+# model → (qidiruv turi, indeks matniga kiruvchi maydonlar)
+INDEKS_MAYDONLARI = {
+    'crm.Xaridor' : ('xaridor', {'ism', 'telefon', 'manzil', 'izoh'}),
+    'crm.Sotuv'   : ('sotuv',   {'izoh'}),
+}
+
+
+def indeksni_yangilash(sender, instance, update_fields=None, **kwargs):
+    tur, maydonlar = INDEKS_MAYDONLARI[sender._meta.label]
+    # update_summa() va h.k. — matn maydonlari o'zgarmagan
+    if update_fields is not None and not maydonlar & set(update_fields):
+        return
+    qidiruv.indekslash(tur, instance)
+
+
+def indeksdan_ochirish(sender, instance, **kwargs):
+    tur, _ = INDEKS_MAYDONLARI[sender._meta.label]
+    qidiruv.indeksdan_ochirish(tur, instance.pk)
+
+
+for _label in INDEKS_MAYDONLARI:
+    post_save.connect(indeksni_yangilash, sender=_label, dispatch_uid=f'qidiruv_save_{_label}')
+    post_delete.connect(indeksdan_ochirish, sender=_label, dispatch_uid=f'qidiruv_delete_{_label}')
+
+
+def ish_ochirildi(sender, instance, **kwargs):
+    # post_delete — admin'dagi ommaviy o'chirish va CASCADE'da ham keladi
+    sender.qoldiqni_siljitish({kalit: -soni for kalit, soni in instance.bazadagi_hissasi().items()})
+
+
+post_delete.connect(ish_ochirildi, sender='crm.Ish', dispatch_uid='ish_mahsulot_soni')
+
+
+def sotuv_ochirildi(sender, instance, **kwargs):
+    # post_delete — sotuv_bekor_qilish, ommaviy o'chirish va Xaridor CASCADE'da ham keladi
+    commitdan_keyin('xaridor_statistika', Xaridor.statistikani_yangilash, {instance.xaridor_id})
+
+
+post_delete.connect(sotuv_ochirildi, sender='crm.Sotuv', dispatch_uid='sotuv_xaridor_statistika')
+
+
+def hisobdan_ayirish(sender, instance, **kwargs):
+    # pre_delete — bazadagi holat hali o'qilishi mumkin; o'chirish bilan bitta tranzaksiyada
+    Ishchi.hisobni_siljitish(sender.hisob_hissasi(instance.bazadagi_holat(), -1))
+
+
+for _label in ('crm.Ish', 'crm.Avans', 'crm.Oyliklar'):
+    pre_delete.connect(hisobdan_ayirish, sender=_label, dispatch_uid=f'ishchi_hisob_{_label}')
+
+
+def narx_ozgardi(sender, instance, **kwargs):
+    # Admin inline / qo'lda tahrir; narxlarni_ornatish (bulk) keshni o'zi eskirtiradi
+    narxlar.eskirtirish()
+    narxlar.ustunlarni_yangilash([instance.product_id])
+
+
+def ishchi_ozgardi(sender, **kwargs):
+    narxlar.eskirtirish()
+
+
+post_save.connect(narx_ozgardi, sender='crm.ProductRate', dispatch_uid='narx_save')
+post_delete.connect(narx_ozgardi, sender='crm.ProductRate', dispatch_uid='narx_delete')
+for _label in ('crm.Ishchi', 'crm.IshchiCategory'):
+    post_save.connect(ishchi_ozgardi, sender=_label, dispatch_uid=f'narx_turi_save_{_label}')
+    post_delete.connect(ishchi_ozgardi, sender=_label, dispatch_uid=f'narx_turi_delete_{_label}')
+
+post_migrate.connect(qidiruv.jadval_yaratish, dispatch_uid='qidiruv_jadval')
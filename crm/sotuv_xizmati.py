@@ -0,0 +1,128 @@
+# crm/sotuv_xizmati.py
+"""
+Ko'p qatorli sotuvni yig'ish.
+
+SotuvItem.save() har bir qator uchun variantni qayta o'qiydi, stockni
+alohida yangilaydi, Product.soni va Sotuv summasini qayta hisoblaydi
+(~10 so'rov / qator). Ulgurji buyurtmada qatorlar soni 50+ bo'lishi
+mumkin, shuning uchun bu yerda hammasi to'plam bilan bajariladi:
+
+    1. variantlar bitta so'rovda (in_bulk)
+    2. qoldiq xotirada tekshiriladi (bir variant bir necha qatorda bo'lsa — jami)
+    3. SotuvItem'lar bitta bulk_create bilan
+    4. stock bitta shartli UPDATE ... CASE bilan kamaytiriladi
+       (ProductVariant.reserve_many — qulfsiz, manfiy qoldiq bo'lmaydi)
+    5. Product.soni har bir mahsulot uchun bir marta (bitta UPDATE)
+    6. Sotuv summasi bir marta
+
+    with transaction.atomic():
+        sotuv_yigish(sotuv, [
+            {'variant_id': 3, 'miqdor': 10, 'narx': 250000, 'narx_turi': 'uzs'},
+            ...
+        ])
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import Product, ProductVariant, SotuvItem
+
+
+def _qator(row):
+    """Frontend qatori → (variant_id, miqdor, narx, narx_turi)"""
+    try:
+        miqdor = int(row['miqdor'])
+        narx   = Decimal(str(row['narx']))
+        return int(row['variant_id']), miqdor, narx, row.get('narx_turi') or 'uzs'
+    except (KeyError, TypeError, ValueError, ArithmeticError):
+        raise ValueError(f"Noto'g'ri mahsulot qatori: {row}")
+
+
+def _yetarli_emas(variant, mavjud, kerak):
+    return ValueError(
+        f"Omborda yetarli {variant} yo'q! "
+        f"Mavjud: {mavjud} ta, Kerak: {kerak} ta"
+    )
+
+
+@transaction.atomic
+def sotuv_yigish(sotuv, qatorlar):
+    """
+    Saqlangan sotuvga qatorlarni qo'shadi, stockni kamaytiradi va summani yangilaydi.
+    Qoldiq yetmasa ValueError — tranzaksiya butunlay bekor qilinadi.
+    Natija: yaratilgan SotuvItem'lar ro'yxati.
+    """
+    qatorlar = [_qator(r) for r in qatorlar]
+    if not qatorlar:
+        raise ValueError('Kamida bitta mahsulot kerak!')
+
+    for _, miqdor, _, _ in qatorlar:
+        if miqdor <= 0:
+            raise ValueError("Miqdor 0 dan katta bo'lishi kerak!")
+
+    kerak = defaultdict(int)
+    for variant_id, miqdor, _, _ in qatorlar:
+        kerak[variant_id] += miqdor
+
+    # ── 1. Variantlar — bitta so'rov (qulfsiz: 4-qadamdagi UPDATE shartli) ──
+    variantlar = (
+        ProductVariant.objects
+        .only('id', 'product_id', 'stock')
+        .in_bulk(list(kerak))
+    )
+    topilmadi = set(kerak) - set(variantlar)
+    if topilmadi:
+        raise ValueError(f"Variant topilmadi: {', '.join(map(str, sorted(topilmadi)))}")
+
+    # ── 2. Qoldiqni xotirada tekshirish ──
+    for variant_id, jami in kerak.items():
+        variant = variantlar[variant_id]
+        if (variant.stock or 0) < jami:
+            raise _yetarli_emas(variant, variant.stock or 0, jami)
+
+    # ── 3. SotuvItem'lar ──
+    usd_kurs = Decimal(str(sotuv.usd_kurs)) if sotuv.usd_kurs else Decimal('0')
+    items = []
+    for variant_id, miqdor, narx, narx_turi in qatorlar:
+        variant = variantlar[variant_id]
+        item = SotuvItem(
+            sotuv=sotuv,
+            mahsulot_id=variant.product_id,
+            variant=variant,
+            miqdor=miqdor,
+            narx=narx,
+            narx_turi=narx_turi,
+        )
+        item.narxni_ogirish(usd_kurs)
+        item.jami_hisoblash(usd_kurs)
+        items.append(item)
+    SotuvItem.objects.bulk_create(items)
+
+    # ── 4. Stock — bitta shartli UPDATE (WHERE stock >= n) ──
+    if ProductVariant.reserve_many(kerak) != len(kerak):
+        # 2-qadamdan keyin parallel sotuv qoldiqni kamaytirgan
+        raise ValueError("Omborda qoldiq o'zgardi, sotuvni qaytadan kiriting!")
+
+    # ── 5. Mahsulot umumiy miqdori va sotuv summasi — bir martadan ──
+    Product.update_total_quantities({v.product_id for v in variantlar.values()})
+    sotuv.update_summa()
+
+    return items
+
+
+@transaction.atomic
+def sotuv_bekor_qilish(sotuv):
+    """
+    Sotuvni o'chiradi: barcha qatorlar stocki bitta UPDATE bilan qaytariladi,
+    Product.soni bir marta yangilanadi; itemlar va kirimlar CASCADE bilan o'chadi.
+    """
+    qaytarish = defaultdict(int)
+    mahsulotlar = set()
+    for variant_id, mahsulot_id, miqdor in sotuv.items.values_list('variant_id', 'mahsulot_id', 'miqdor'):
+        qaytarish[variant_id] += miqdor
+        mahsulotlar.add(mahsulot_id)
+
+    ProductVariant.release_many(qaytarish)
+    Product.update_total_quantities(mahsulotlar)
+    sotuv.delete()
@@ -0,0 +1,735 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from budget.models import Tranzaksiya
+from crm import narxlar, utils
+from crm.demo import demo_yaratish
+from crm.management.commands.check_query_plans import reja, skanlar, sorovlar
+from crm.models import (
+    Avans, Chiqim, ChiqimItem, Ish, Ishchi, IshchiCategory, Oyliklar, PayrollRun, Product, ProductRate, ProductVariant,
+    Sotuv, ValyutaKurs, Xaridor,
+)
+from crm.oylik_xizmati import oylik_yopish
+from crm.sotuv_xizmati import sotuv_bekor_qilish, sotuv_yigish
+
+# So'rov → rejada bo'lishi shart bo'lgan indeks (crm/models.py Meta.indexes)
+KUTILGAN_INDEKSLAR = {
+    'sotuv: royxat'              : 'sotuv_sana_idx',
+    'sotuv: holat + davr'        : 'sotuv_holat_sana_idx',
+    'kirim: royxat'              : 'kirim_sana_idx',
+    'chiqim: royxat'             : 'chiqim_created_idx',
+    'ish: ishchi yangi ishlari'  : 'ish_status_ishchi_idx',
+    "xaridor: qarz bo'yicha"     : 'xaridor_jami_qarz_idx',
+}
+
+
+@skipUnlessDBFeature('supports_explaining_query_execution')
+class SorovRejalariTest(TestCase):
+    """check_query_plans dagi issiq so'rovlar indekssiz to'liq skanga tushmasin"""
+
+    def setUp(self):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest(f"{connection.vendor} uchun reja tekshiruvi yo'q")
+        self.rejalar = {nomi: reja(qs) for nomi, qs in sorovlar()}
+
+    def test_toliq_skan_yoq(self):
+        for nomi, matn in self.rejalar.items():
+            with self.subTest(nomi):
+                self.assertEqual(skanlar(matn), [], matn)
+
+    def test_indekslar_ishlatiladi(self):
+        for nomi, indeks in KUTILGAN_INDEKSLAR.items():
+            with self.subTest(nomi):
+                self.assertIn(indeks, self.rejalar[nomi])
+
+
+# ─────────────────────────────────────────────────────────────────
+# URL SO'ROVLAR BUDJETI
+# ─────────────────────────────────────────────────────────────────
+
+NAMESPACELAR = ('main', 'xomashyo', 'analytics', 'budget')
+
+# Har bir URL uchun: SQL so'rovlar soni, DB vaqti (so'rovlar yig'indisi) va umumiy vaqt (ms).
+# Vaqt budjetlari ataylab keng — CI mashinasida ham barqaror, lekin N+1 yoki
+# to'liq skan qaytsa oshib ketadi
+STANDART_BUDJET = {'sorovlar': 30, 'db_ms': 500, 'ms': 1500}
+
+# URL kwarg → qaysi obyekt id'si qo'yiladi (eng ko'p bog'langan obyekt — og'ir holat)
+KWARG_OBYEKTLARI = {
+    'sotuv_id'    : 'crm.Sotuv',
+    'item_id'     : 'crm.SotuvItem',
+    'variant_id'  : 'crm.ProductVariant',
+    'mahsulot_id' : 'crm.Product',
+    'ishchi_id'   : 'crm.Ishchi',
+    'chiqim_id'   : 'crm.Chiqim',
+    'xomashyo_id' : 'xomashyo.Xomashyo',
+    'yb_id'       : 'xomashyo.YetkazibBeruvchi',
+    'harakat_id'  : 'xomashyo.XomashyoHarakat',
+}
+
+# <pk> — URL nomiga qarab
+PK_OBYEKTLARI = {
+    'main:oylik_yopish'         : 'crm.Ishchi',
+    'main:yangi_oy'             : 'crm.Ishchi',
+    'main:employee_detail'      : 'crm.Ishchi',
+    'main:ishchi_delete'        : 'crm.Ishchi',
+    'main:ishchi_update'        : 'crm.Ishchi',
+    'main:ishchi_chek'          : 'crm.Ishchi',
+    'main:sotuv_detail'         : 'crm.Sotuv',
+    'main:xaridor_detail'       : 'crm.Xaridor',
+    'main:xaridor_tahrirlash'   : 'crm.Xaridor',
+    'main:xaridor_umumiy_chek'  : 'crm.Xaridor',
+    'xomashyo:xomashyo_detail'  : 'xomashyo.Xomashyo',
+    'budget:detail'             : 'budget.Byudjet',
+    'budget:update'             : 'budget.Byudjet',
+    'budget:limit_add'          : 'budget.Byudjet',
+    'budget:limit_delete'       : 'budget.ByudjetLimit',
+}
+
+# Ko'p bog'langan qatorlari bo'yicha tanlanadigan modellar
+BOGLANISHLAR = {
+    'crm.Ishchi'                : 'ishlar',
+    'crm.Sotuv'                 : 'items',
+    'crm.Xaridor'               : 'sotuvlar',
+    'xomashyo.Xomashyo'         : 'xomashyoharakat',
+    'xomashyo.YetkazibBeruvchi' : 'xomashyoharakat',
+}
+
+
+def _obyekt_idlari():
+    """Model → id: iloji boricha ko'p bog'langan qatorlari bor obyekt"""
+    idlar = {}
+    for label in set(KWARG_OBYEKTLARI.values()) | set(PK_OBYEKTLARI.values()):
+        model = apps.get_model(label)
+        qs = model.objects.order_by('pk')
+        if label in BOGLANISHLAR:
+            qs = model.objects.annotate(_n=Count(BOGLANISHLAR[label])).order_by('-_n', 'pk')
+        idlar[label] = qs.values_list('pk', flat=True).first()
+    return idlar
+
+
+def _nomlangan_urllar():
+    """(to'liq nomi, marshrut kwarg'lari) — NAMESPACELAR dagi barcha nomlangan URL'lar"""
+    natija = {}
+    for resolver in get_resolver().url_patterns:
+        if not isinstance(resolver, URLResolver) or resolver.namespace not in NAMESPACELAR:
+            continue
+        for pattern in resolver.url_patterns:
+            if getattr(pattern, 'name', None):
+                kwarglar = list(getattr(pattern.pattern, 'converters', {}))
+                natija.setdefault(f'{resolver.namespace}:{pattern.name}', kwarglar)
+    return sorted(natija.items())
+
+
+def _urllar(nomi, kwarglar, idlar):
+    """URL nomi → [(yorliq, url), ...]; obyekt topilmasa — bo'sh ro'yxat"""
+    from analytics.views import BLOKLAR
+
+    qiymatlar, variantlar = {}, [{}]
+    for k in kwarglar:
+        if k == 'blok':
+            variantlar = [{**v, k: q} for v in variantlar for q in BLOKLAR]
+            continue
+        label = PK_OBYEKTLARI.get(nomi) if k == 'pk' else KWARG_OBYEKTLARI.get(k)
+        if label is None or idlar.get(label) is None:
+            return []
+        qiymatlar[k] = idlar[label]
+    return [
+        (f"{nomi} [{', '.join(map(str, v.values()))}]" if v else nomi, reverse(nomi, kwargs={**qiymatlar, **v}))
+        for v in variantlar
+    ]
+
+
+@override_settings(USD_KURS_PROVIDER='crm.utils.StubKursProvider', USD_KURS_FON_YANGILASH=False)
+class UrlBudjetTest(TestCase):
+    """
+    Demo ma'lumot (crm/demo.py) ustida barcha nomlangan URL'lar admin sifatida
+    GET qilinadi: 500 bo'lmasin va SQL so'rovlar soni budjetdan oshmasin
+    (N+1 qaytib kelsa darhol ko'rinadi).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        demo_yaratish(scale=1, kunlar=60)
+        cls.admin = get_user_model().objects.create_superuser('budjet_admin', 'budjet@example.com', None)
+        cls.idlar = _obyekt_idlari()
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        # PDF render odatda alohida pool oqimida (crm/asinxron.py); in-memory SQLite test
+        # bazasida ochiq test tranzaksiyasi boshqa oqim ulanishini qulflaydi — shu oqimda
+        for joy in ('crm.views.pdf_tayyorlash', 'chek.pdf_tayyorlash'):
+            patcher = mock.patch(joy, lambda fn, *args: sync_to_async(fn)(*args))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _get(self, url):
+        """Bitta GET → (response, so'rovlar soni, DB ms, umumiy ms); o'zgarishlar bekor qilinadi"""
+        cache.clear()
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as ctx:
+                boshi = time.perf_counter()
+                response = self.client.get(url)
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                umumiy = (time.perf_counter() - boshi) * 1000
+            transaction.set_rollback(True)
+        db = sum(float(q['time']) for q in ctx.captured_queries) * 1000
+        return response, len(ctx.captured_queries), db, umumiy
+
+    def test_sorovlar_budjeti(self):
+        budjet = STANDART_BUDJET
+        tekshirildi = 0
+        for nomi, kwarglar in _nomlangan_urllar():
+            for yorliq, url in _urllar(nomi, kwarglar, self.idlar):
+                with self.subTest(yorliq):
+                    response, soni, db, umumiy = self._get(url)
+                    olchov = f"{url}: {soni} so'rov, DB {db:.1f} ms, umumiy {umumiy:.1f} ms"
+                    self.assertLess(response.status_code, 500, olchov)
+                    self.assertLessEqual(soni, budjet['sorovlar'], olchov)
+                    self.assertLessEqual(db, budjet['db_ms'], olchov)
+                    self.assertLessEqual(umumiy, budjet['ms'], olchov)
+                tekshirildi += 1
+        self.assertGreater(tekshirildi, 0)
+
+
+# ─────────────────────────────────────────────────────────────────
+# YORDAMCHILAR
+# ─────────────────────────────────────────────────────────────────
+
+def _mahsulot(nomi='Etik', **narxlar_):
+    return Product.objects.create(nomi=nomi, narxi=100000, **narxlar_)
+
+
+def _ishchi(turi='kosib', ism='Ali'):
+    kategoriya, _ = IshchiCategory.objects.get_or_create(nomi=turi)
+    return Ishchi.objects.create(ism=ism, familiya='Valiyev', maosh=0, telefon='', turi=kategoriya)
+
+
+class KeshliTestCase(TestCase):
+    """narxlar matritsasi jarayon keshida — har test toza holatdan"""
+
+    def setUp(self):
+        narxlar.eskirtirish()
+
+
+# ─────────────────────────────────────────────────────────────────
+# ISHBAY NARXLAR (crm/narxlar.py)
+# ─────────────────────────────────────────────────────────────────
+
+class NarxlarTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.bugun = timezone.localdate()
+        self.ertaga = self.bugun + timedelta(days=1)
+        self.ishchi = _ishchi('kosib')
+        self.mahsulot = _mahsulot(narx_kosib=1000)
+
+    def test_yangi_mahsulot_tarixi_boshlangichdan(self):
+        self.assertEqual(
+            list(ProductRate.objects.filter(product=self.mahsulot, ishchi_category__nomi='kosib')
+                 .values_list('valid_from', 'narx')),
+            [(narxlar.BOSHLANGICH, 1000)],
+        )
+
+    def test_nomini_tahrirlash_kelajak_narxni_bekor_qilmaydi(self):
+        narxlar.narxlarni_ornatish({(self.mahsulot.pk, 'kosib'): 2000}, self.ertaga)
+        soni = ProductRate.objects.count()
+
+        p = Product.objects.get(pk=self.mahsulot.pk)
+        p.nomi = 'Etik (yangi)'
+        p.save()
+
+        self.assertEqual(ProductRate.objects.count(), soni)
+        self.assertEqual(narxlar.narx(p.pk, 'kosib'), 1000)
+        self.assertEqual(narxlar.narx(p.pk, 'kosib', self.ertaga), 2000)
+
+    def test_kuni_kelgan_narxni_tahrir_bekor_qilmaydi(self):
+        # Kelajak sanali narx kuni keldi, Product.narx_kosib hali eski nusxa (1000)
+        ProductRate.objects.bulk_create([ProductRate(
+            product=self.mahsulot, ishchi_category=self.ishchi.turi,
+            narx=3000, valid_from=self.bugun - timedelta(days=1),
+        )])
+        p = Product.objects.get(pk=self.mahsulot.pk)
+        p.nomi = 'Etik (yangi)'
+        p.save()
+
+        narxlar.eskirtirish()
+        self.assertEqual(narxlar.narx(p.pk, 'kosib'), 3000)
+        self.assertFalse(ProductRate.objects.filter(product=p, valid_from=self.bugun).exists())
+
+    def test_ozgargan_ustun_bugundan_yoziladi(self):
+        narxlar.narxlarni_ornatish({(self.mahsulot.pk, 'kosib'): 2000}, self.ertaga)
+
+        p = Product.objects.get(pk=self.mahsulot.pk)
+        p.narx_kosib = 1500
+        p.save()
+
+        self.assertEqual(narxlar.narx(p.pk, 'kosib'), 1500)
+        self.assertEqual(narxlar.narx(p.pk, 'kosib', self.ertaga), 2000)
+        self.assertFalse(ProductRate.objects.filter(product=p, ishchi_category__nomi='zakatovka',
+                                                    valid_from=self.bugun).exists())
+
+    def test_kuni_kelgan_narx_ustunga_kochiriladi(self):
+        # Kecha amal qila boshlagan narx — signalsiz yozilgan (kelajak sanali narx kuni keldi)
+        ProductRate.objects.bulk_create([ProductRate(
+            product=self.mahsulot, ishchi_category=self.ishchi.turi,
+            narx=3000, valid_from=self.bugun - timedelta(days=1),
+        )])
+        narxlar.eskirtirish()
+
+        self.assertEqual(narxlar.narx(self.mahsulot.pk, 'kosib'), 3000)
+        self.mahsulot.refresh_from_db()
+        self.assertEqual(self.mahsulot.narx_kosib, 3000)
+
+    def test_tarixsiz_mahsulot_ustundan_narxlanadi(self):
+        # Jadval hali to'ldirilmagan baza: Product.save chaqirilmagan mahsulot
+        p = Product.objects.bulk_create([Product(nomi='Tufli', narxi=1, narx_kosib=700)])[0]
+        narxlar.eskirtirish()
+
+        ish = Ish.objects.create(mahsulot=p, ishchi=self.ishchi, soni=3, status='yangi', sana=self.bugun)
+        self.assertEqual(ish.narxi, 2100)
+
+
+# ─────────────────────────────────────────────────────────────────
+# OMBOR QOLDIG'I (ProductVariant.reserve*, crm/sotuv_xizmati.py)
+# ─────────────────────────────────────────────────────────────────
+
+class QoldiqTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.mahsulot = _mahsulot()
+        self.qora = ProductVariant.objects.create(product=self.mahsulot, rang='qora', stock=5)
+        self.jigar = ProductVariant.objects.create(product=self.mahsulot, rang='jigarrang', stock=3)
+        Product.update_total_quantities([self.mahsulot.pk])
+        self.sotuv = Sotuv.objects.create(xaridor=Xaridor.objects.create(ism='Vali'))
+
+    def _qoldiqlar(self):
+        self.mahsulot.refresh_from_db()
+        return (
+            dict(ProductVariant.objects.filter(product=self.mahsulot).values_list('rang', 'stock')),
+            self.mahsulot.soni,
+        )
+
+    def _qator(self, variant, miqdor, narx=100000):
+        return {'variant_id': variant.pk, 'miqdor': miqdor, 'narx': narx}
+
+    def test_reserve_yetmasa_rad_etadi(self):
+        self.assertEqual(self.qora.reserve(6), 0)
+        self.assertEqual(self.qora.reserve(5), 1)
+        self.assertEqual(self._qoldiqlar()[0], {'qora': 0, 'jigarrang': 3})
+
+    def test_reserve_many_yetmagan_variant_sanalmaydi(self):
+        # Chaqiruvchi natija < len(miqdorlar) bo'lsa tranzaksiyani bekor qiladi
+        self.assertEqual(ProductVariant.reserve_many({self.qora.pk: 2, self.jigar.pk: 4}), 1)
+        self.assertEqual(ProductVariant.release_many({self.qora.pk: 2}), 1)
+        self.assertEqual(self._qoldiqlar()[0], {'qora': 5, 'jigarrang': 3})
+
+    def test_sotuv_yigish_qoldiq_va_jami_soni(self):
+        sotuv_yigish(self.sotuv, [self._qator(self.qora, 2), self._qator(self.jigar, 3, 150000)])
+
+        self.assertEqual(self._qoldiqlar(), ({'qora': 3, 'jigarrang': 0}, 3))
+        self.sotuv.refresh_from_db()
+        self.assertEqual(self.sotuv.jami_summa, 650000)
+
+    def test_sotuv_yigish_yetmasa_hech_narsa_yozilmaydi(self):
+        # Bir variant ikki qatorda — jami (3 + 3) qoldiqdan (5) oshadi
+        with self.assertRaises(ValueError):
+            sotuv_yigish(self.sotuv, [self._qator(self.qora, 3), self._qator(self.qora, 3)])
+
+        self.assertEqual(self._qoldiqlar(), ({'qora': 5, 'jigarrang': 3}, 8))
+        self.assertFalse(self.sotuv.items.exists())
+
+    def test_sotuv_bekor_qilish_qoldiqni_qaytaradi(self):
+        sotuv_yigish(self.sotuv, [self._qator(self.qora, 4), self._qator(self.jigar, 1)])
+        self.assertEqual(self._qoldiqlar(), ({'qora': 1, 'jigarrang': 2}, 3))
+
+        sotuv_bekor_qilish(self.sotuv)
+
+        self.assertEqual(self._qoldiqlar(), ({'qora': 5, 'jigarrang': 3}, 8))
+        self.assertFalse(Sotuv.objects.filter(pk=self.sotuv.pk).exists())
+
+
+# ─────────────────────────────────────────────────────────────────
+# KOSIB ISHI → VARIANT QOLDIG'I VA Product.soni
+# ─────────────────────────────────────────────────────────────────
+
+class IshQoldiqTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.kosib = _ishchi('kosib')
+        self.mahsulot = _mahsulot()
+        self.variant = ProductVariant.objects.create(product=self.mahsulot, rang='qora', stock=0)
+
+    def _ish(self, soni=5, **kwargs):
+        maydonlar = {'mahsulot': self.mahsulot, 'ishchi': self.kosib, 'variant': self.variant, **kwargs}
+        return Ish.objects.create(soni=soni, status='yangi', sana=timezone.localdate(), **maydonlar)
+
+    def _qoldiq(self):
+        self.variant.refresh_from_db()
+        self.mahsulot.refresh_from_db()
+        return self.variant.stock, self.mahsulot.soni
+
+    def test_yaratish_tahrir_ochirish(self):
+        ish = self._ish(5)
+        self.assertEqual(self._qoldiq(), (5, 5))
+
+        ish = Ish.objects.get(pk=ish.pk)
+        ish.soni = 2
+        ish.save()
+        self.assertEqual(self._qoldiq(), (2, 2))
+
+        ish.soni = 7
+        ish.save()
+        self.assertEqual(self._qoldiq(), (7, 7))
+
+        Ish.objects.get(pk=ish.pk).delete()
+        self.assertEqual(self._qoldiq(), (0, 0))
+
+    def test_ommaviy_ochirish(self):
+        self._ish(3)
+        self._ish(4)
+        self.assertEqual(self._qoldiq(), (7, 7))
+
+        Ish.objects.filter(mahsulot=self.mahsulot).delete()
+        self.assertEqual(self._qoldiq(), (0, 0))
+
+    def test_kosib_emas_ish_qoldiqqa_tegmaydi(self):
+        ish = self._ish(5, ishchi=_ishchi('zakatovka', ism='Vali'))
+        ish.soni = 8
+        ish.save()
+        self.assertEqual(self._qoldiq(), (0, 0))
+
+    def test_ishchi_turi_ozgarsa_eski_hissa_qaytariladi(self):
+        ish = self._ish(5)
+        ish = Ish.objects.get(pk=ish.pk)
+
+        # Ishchi zakatovkaga o'tkazildi — yuklangan ish hali kosib hissasini eslaydi
+        self.kosib.turi = IshchiCategory.objects.create(nomi='zakatovka')
+        self.kosib.save()
+        ish.delete()
+
+        self.assertEqual(self._qoldiq(), (0, 0))
+
+    def test_variantsiz_ish_faqat_product_soni(self):
+        ish = self._ish(4, variant=None)
+        self.assertEqual(self._qoldiq(), (0, 4))
+
+        ish.soni = 1
+        ish.save()
+        self.assertEqual(self._qoldiq(), (0, 1))
+
+
+# ─────────────────────────────────────────────────────────────────
+# ISHCHI HISOBI (IshchiHisobiMixin, Ishchi.hisobni_siljitish)
+# ─────────────────────────────────────────────────────────────────
+
+class IshchiHisobiTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ali = _ishchi('kosib')
+        self.vali = _ishchi('kosib', ism='Vali')
+        self.mahsulot = _mahsulot(narx_kosib=1000)
+
+    def _ish(self, ishchi, soni, mahsulot=None):
+        return Ish.objects.create(
+            mahsulot=mahsulot or self.mahsulot, ishchi=ishchi, soni=soni,
+            status='yangi', sana=timezone.localdate(),
+        )
+
+    def _hisob(self, ishchi):
+        """Siljitilgan hisob — qayta hisoblangani (hisobni_yangilash) bilan bir xil bo'lishi shart"""
+        maydonlar = Ishchi.HISOB_MAYDONLARI
+        siljitilgan = Ishchi.objects.values_list(*maydonlar).get(pk=ishchi.pk)
+        Ishchi.hisobni_yangilash([ishchi.pk])
+        self.assertEqual(siljitilgan, Ishchi.objects.values_list(*maydonlar).get(pk=ishchi.pk))
+        return dict(zip(maydonlar, siljitilgan))
+
+    def test_ish_yaratish_tahrir_ochirish(self):
+        ish = self._ish(self.ali, 3)
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 3000)
+        self.assertEqual(self._hisob(self.ali)['joriy_soni'], 3)
+
+        ish = Ish.objects.get(pk=ish.pk)
+        ish.soni = 5
+        ish.save()
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 5000)
+
+        # Boshqa ishchiga o'tkazildi
+        ish.ishchi = self.vali
+        ish.save()
+        self.assertEqual(self._hisob(self.ali)['joriy_soni'], 0)
+        self.assertEqual(self._hisob(self.vali)['joriy_soni'], 5)
+
+        # Yopilgan ish joriy hisobga kirmaydi
+        ish.status = 'yopilgan'
+        ish.save()
+        self.assertEqual(self._hisob(self.vali)['joriy_hisob'], 0)
+
+        ish.status = 'yangi'
+        ish.save()
+        Ish.objects.get(pk=ish.pk).delete()
+        self.assertEqual(self._hisob(self.vali)['joriy_hisob'], 0)
+
+    def test_ish_ommaviy_va_cascade_ochirish(self):
+        boshqa = _mahsulot('Tufli', narx_kosib=500)
+        self._ish(self.ali, 2)
+        self._ish(self.ali, 4, mahsulot=boshqa)
+        self._ish(self.vali, 1)
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 4000)
+
+        # Mahsulot o'chirilsa uning ishlari CASCADE bilan ketadi
+        boshqa.delete()
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 2000)
+
+        Ish.objects.filter(mahsulot=self.mahsulot).delete()
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 0)
+        self.assertEqual(self._hisob(self.vali)['joriy_soni'], 0)
+
+    def test_avans(self):
+        avans = Avans.objects.create(ishchi=self.ali, amount=700)
+        Avans.objects.create(ishchi=self.ali, amount=300)
+        self.assertEqual(self._hisob(self.ali)['joriy_avans'], 1000)
+
+        avans = Avans.objects.get(pk=avans.pk)
+        avans.amount = 900
+        avans.save()
+        self.assertEqual(self._hisob(self.ali)['joriy_avans'], 1200)
+
+        # Yopilgan avans aktiv hisobdan chiqadi
+        avans.is_active = False
+        avans.save()
+        self.assertEqual(self._hisob(self.ali)['joriy_avans'], 300)
+
+        Avans.objects.filter(ishchi=self.ali).delete()
+        self.assertEqual(self._hisob(self.ali)['joriy_avans'], 0)
+
+    def test_oyliklar(self):
+        oylik = Oyliklar.objects.create(ishchi=self.ali, oylik=50000)
+        self.assertEqual(self._hisob(self.ali)['jami_tolangan'], 50000)
+
+        oylik = Oyliklar.objects.get(pk=oylik.pk)
+        oylik.oylik = 45000
+        oylik.save()
+        self.assertEqual(self._hisob(self.ali)['jami_tolangan'], 45000)
+
+        # PayrollRun o'chirilsa oylik qoladi (SET_NULL) — hisob o'zgarmaydi
+        oylik.run = PayrollRun.objects.create()
+        oylik.save()
+        oylik.run.delete()
+        self.assertEqual(self._hisob(self.ali)['jami_tolangan'], 45000)
+
+        Oyliklar.objects.get(pk=oylik.pk).delete()
+        self.assertEqual(self._hisob(self.ali)['jami_tolangan'], 0)
+
+    def test_forma_eski_nusxasi_hisobni_yozib_yubormaydi(self):
+        eski = Ishchi.objects.get(pk=self.ali.pk)
+        self._ish(self.ali, 3)
+
+        eski.telefon = '+998901234567'
+        eski.save()
+        self.assertEqual(self._hisob(self.ali)['joriy_hisob'], 3000)
+
+
+# ─────────────────────────────────────────────────────────────────
+# OYLIK YOPISH (crm/oylik_xizmati.py)
+# ─────────────────────────────────────────────────────────────────
+
+class OylikYopishTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin = get_user_model().objects.create_superuser('oylik_admin', 'oylik@example.com', None)
+        self.mahsulot = _mahsulot(narx_kosib=1000)
+        self.ali = _ishchi('kosib')
+        self.vali = _ishchi('kosib', ism='Vali')
+        self.sami = _ishchi('kosib', ism='Sami')   # ochiq ishi yo'q — 0 so'm
+        for ishchi, soni in ((self.ali, 3), (self.vali, 2)):
+            Ish.objects.create(mahsulot=self.mahsulot, ishchi=ishchi, soni=soni,
+                               status='yangi', sana=timezone.localdate())
+        Avans.objects.create(ishchi=self.ali, amount=1000)
+        self.idlar = [self.ali.pk, self.vali.pk, self.sami.pk]
+
+    def _yopish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return oylik_yopish(dict.fromkeys(self.idlar), foydalanuvchi=self.admin, avans_ayirish=True)
+
+    def test_jami_summalar_va_partiya(self):
+        run = self._yopish()
+
+        self.assertEqual(
+            (run.ishchilar_soni, run.jami_hisoblangan, run.jami_avans, run.jami_berilgan),
+            (3, 5000, 1000, 4000),
+        )
+        self.assertEqual(
+            dict(Oyliklar.objects.filter(run=run).values_list('ishchi_id', 'oylik')),
+            {self.ali.pk: 2000, self.vali.pk: 2000, self.sami.pk: 0},
+        )
+        self.assertFalse(Oyliklar.objects.filter(run__isnull=True).exists())
+
+        # 0 so'mlik oylik uchun chiqim yozilmaydi
+        chiqimlar = Chiqim.objects.all()
+        self.assertEqual(sorted(c.price for c in chiqimlar), [2000, 2000])
+        self.assertEqual(
+            sorted(ChiqimItem.objects.filter(item_turi='oylik').values_list('chiqim_id', 'price_uzs')),
+            sorted((c.pk, c.price) for c in chiqimlar),
+        )
+
+    def test_tranzaksiya_chiqim_maydonlari_bilan_bir_xil(self):
+        self._yopish()
+
+        maydonlar = ('manba', 'ishchi', 'foydalanuvchi', 'summa_uzs', 'summa_usd', 'nomi', 'kategoriya', 'sana')
+        ishchilar = {f"{i.ism} {i.familiya}": i for i in (self.ali, self.vali)}
+        chiqimlar = list(Chiqim.objects.all())
+        self.assertEqual(Tranzaksiya.objects.count(), len(chiqimlar))
+        for c in chiqimlar:
+            with self.subTest(c.name):
+                ishchi = ishchilar[c.name.split(' — ')[0]]
+                kutilgan = Tranzaksiya.chiqim_maydonlari(c, ishchi=ishchi, foydalanuvchi=self.admin)
+                t = Tranzaksiya.objects.get(chiqim=c)
+                self.assertEqual({m: getattr(t, m) for m in maydonlar}, kutilgan)
+
+    def test_hisob_nolga_tushadi(self):
+        self._yopish()
+
+        hisob = {
+            pk: rest for pk, *rest in Ishchi.objects.filter(pk__in=self.idlar).values_list(
+                'pk', 'joriy_hisob', 'joriy_soni', 'joriy_avans', 'jami_tolangan', 'is_oylik_open',
+            )
+        }
+        self.assertEqual(hisob, {
+            self.ali.pk : [0, 0, 0, 2000, False],
+            self.vali.pk: [0, 0, 0, 2000, False],
+            self.sami.pk: [0, 0, 0, 0, False],
+        })
+        self.assertFalse(Ish.objects.filter(status='yangi').exists())
+        self.assertFalse(Avans.objects.filter(is_active=True).exists())
+
+        # Qayta hisoblash ham shu natijani beradi
+        Ishchi.hisobni_yangilash(self.idlar)
+        self.assertEqual(
+            list(Ishchi.objects.filter(pk__in=self.idlar).order_by('pk').values_list('joriy_hisob', 'jami_tolangan')),
+            [(0, 2000), (0, 2000), (0, 0)],
+        )
+
+        with self.assertRaises(ValueError):
+            self._yopish()
+
+
+# ─────────────────────────────────────────────────────────────────
+# USD KURSI (crm/utils.py)
+# ─────────────────────────────────────────────────────────────────
+
+@override_settings(USD_KURS_PROVIDER='crm.utils.StubKursProvider', USD_KURS_XATO_TTL=0)
+class UsdKursTest(TestCase):
+
+    def setUp(self):
+        utils.kesh_tozalash()
+        self.addCleanup(utils.kesh_tozalash)
+        patcher = mock.patch('crm.utils._fonda_yangilash')
+        self.fonda = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.bugun = timezone.localdate()
+
+    def _kurs(self, kun, rate):
+        ValyutaKurs.objects.create(valyuta='USD', sana=self.bugun - timedelta(days=kun), rate=rate)
+
+    def test_otgan_sana_kursi_fonda_olinadi_eskisi_qisqa_keshlanadi(self):
+        self._kurs(10, 12000)
+        sana = self.bugun - timedelta(days=3)
+
+        self.assertEqual(utils.get_usd_rate(sana), 12000)
+        self.fonda.assert_called_once_with(sana)
+
+        # Fon oqimi o'sha kungi kursni yozdi — eski kurs keshda qolib ketmaydi
+        self._kurs(3, 12100)
+        self.assertEqual(utils.get_usd_rate(sana), 12100)
+
+    def test_aniq_sana_kursi_fonsiz(self):
+        self._kurs(3, 12100)
+        self.assertEqual(utils.get_usd_rate(self.bugun - timedelta(days=3)), 12100)
+        self.fonda.assert_not_called()
+
+    def test_kelajak_sana_uchun_provayderga_chiqilmaydi(self):
+        self._kurs(0, 12200)
+        self.assertEqual(utils.get_usd_rate(self.bugun + timedelta(days=2)), 12200)
+        self.fonda.assert_not_called()
+
+
+# ─────────────────────────────────────────────────────────────────
+# XARIDOR STATISTIKASI (Sotuv → commit'dan keyin, crm/navbat.py)
+# ─────────────────────────────────────────────────────────────────
+
+class XaridorStatistikaTest(KeshliTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.xaridor = Xaridor.objects.create(ism='Vali')
+        mahsulot = _mahsulot()
+        self.variantlar = [
+            ProductVariant.objects.create(product=mahsulot, rang=rang, stock=10)
+            for rang in ('qora', 'jigarrang', 'oq')
+        ]
+
+    def _sotuv(self):
+        sotuv = Sotuv.objects.create(xaridor=self.xaridor)
+        sotuv_yigish(sotuv, [{'variant_id': v.pk, 'miqdor': 2, 'narx': 1000} for v in self.variantlar])
+        return sotuv
+
+    def _statistika(self):
+        self.xaridor.refresh_from_db()
+        return self.xaridor.xaridlar_soni, self.xaridor.jami_xarid, self.xaridor.jami_qarz
+
+    def test_bir_tranzaksiyada_bir_marta(self):
+        with mock.patch.object(Xaridor, 'statistikani_yangilash', wraps=Xaridor.statistikani_yangilash) as yangilash:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    self._sotuv()
+                    self._sotuv()
+                # Commit'gacha hisoblanmaydi
+                yangilash.assert_not_called()
+
+        yangilash.assert_called_once_with({self.xaridor.pk})
+        self.assertEqual(self._statistika(), (2, 12000, 12000))
+
+    def test_ommaviy_ochirish_va_bekor_qilish(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            birinchi = self._sotuv()
+            self._sotuv()
+        self.assertEqual(self._statistika(), (2, 12000, 12000))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sotuv_bekor_qilish(birinchi)
+        self.assertEqual(self._statistika(), (1, 6000, 6000))
+
+        # queryset.delete() Sotuv.delete() ni chaqirmaydi — post_delete orqali
+        with self.captureOnCommitCallbacks(execute=True):
+            Sotuv.objects.filter(xaridor=self.xaridor).delete()
+        self.assertEqual(self._statistika(), (0, 0, 0))
+
+    def test_rollback_navbatni_tozalaydi(self):
+        with mock.patch.object(Xaridor, 'statistikani_yangilash') as yangilash:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(ValueError), transaction.atomic():
+                    self._sotuv()
+                    raise ValueError
+                self._sotuv()
+
+        yangilash.assert_called_once_with({self.xaridor.pk})
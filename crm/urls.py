@@ -10,6 +10,7 @@ app_name = "main"
 urlpatterns = [
     path('', views.HomeView.as_view(), name='home'),
     path('oylik_yopish/<int:pk>/', views.oylik_yopish, name='oylik_yopish'),
+    path('oylik_yopish/', views.OylikYopishView.as_view(), name='oylik_yopish_hammasi'),
     path('yangi_oy_boshlash/<int:pk>/',views.yangi_oy_boshlash, name='yangi_oy'),
     
     path("employees/",views.EmployeeView.as_view(),name="employee"),
@@ -71,7 +72,8 @@ urlpatterns = [
     path('api/mahsulot/<int:mahsulot_id>/kroy-xomashyolar/', 
         checker.get_kroy_xomashyolar_api, 
         name='get_kroy_xomashyolar'),
-    path('api/usd-kurs/',views.get_usd_kurs,name="usd_kurs")
+    path('api/usd-kurs/',views.get_usd_kurs,name="usd_kurs"),
+    path('api/xaridor-qidiruv/', views.xaridor_qidiruv, name="xaridor_qidiruv")
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 
@@ -1,16 +1,229 @@
+"""
+USD kursi xizmati.
+
+So'rov yo'lida tarmoqqa chiqilmaydi: kurs avval jarayon ichidagi TTL keshdan,
+so'ng ValyutaKurs jadvalidan (berilgan sanagacha bo'lgan eng so'nggi kurs,
+bo'lmasa — undan keyingi eng yaqin kurs, jadval bo'sh bo'lsa — USD_KURS_ZAXIRA)
+olinadi. Kerakli kurs jadvalda bo'lmasa provayderga fon oqimida chiqiladi;
+muvaffaqiyatsiz urinish USD_KURS_XATO_TTL soniya takrorlanmaydi.
+Jadval kunlik yangilanadi:
+
+    python manage.py usd_kurs_yangilash              # bugungi kurs
+    python manage.py usd_kurs_yangilash --kunlar 30  # o'tgan 30 kun
+
+Provayder sozlamadan almashtiriladi (masalan, internetsiz muhit uchun):
+
+    USD_KURS_PROVIDER=crm.utils.StubKursProvider
+    USD_KURS_STUB=12650
+
+Async view'lar (ASGI) uchun aget_usd_rate — get_usd_rate'ning o'zi, oqimda
+chaqiriladi (tarmoqqa chiqmaydi, faqat kesh + bitta jadval so'rovi).
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
 import requests
-from decimal import Decimal
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# ─────────────────────────────────────────────────────────────────
+# PROVAYDERLAR
+# ─────────────────────────────────────────────────────────────────
+
+class CbuKursProvider:
+    """cbu.uz arxiv API — sana berilsa o'sha kungi kurs"""
+    nomi = 'cbu.uz'
+    URL = 'https://cbu.uz/uz/arkhiv-kursov-valyut/json/USD/'
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def kurs(self, sana=None):
+        url = self.URL if sana is None else f'{self.URL}{sana.isoformat()}/'
+        try:
+            response = requests.get(url, timeout=self.timeout)
+            data = response.json()
+            if data:
+                return Decimal(str(data[0]['Rate']))
+        except Exception as e:
+            logger.warning("CBU kursini olishda xato (%s): %s", sana or 'bugun', e)
+        return None
+
+
+class StubKursProvider:
+    """Tarmoqsiz muhit / demo uchun — sozlamadagi qat'iy kurs"""
+    nomi = 'stub'
+
+    def kurs(self, sana=None):
+        try:
+            return Decimal(str(getattr(settings, 'USD_KURS_STUB', '12500')))
+        except InvalidOperation:
+            return None
+
+
+def get_provider():
+    path = getattr(settings, 'USD_KURS_PROVIDER', 'crm.utils.CbuKursProvider')
+    return import_string(path)()
+
+
+# ─────────────────────────────────────────────────────────────────
+# JARAYON ICHIDAGI TTL KESH
+# ─────────────────────────────────────────────────────────────────
+
+_kesh = {}
+_kesh_lock = threading.Lock()
+_fon_lock = threading.Lock()
+_xatolar = {}   # sana → shu vaqtgacha provayderga qayta chiqilmaydi (monotonic)
+
+
+def _ttl():
+    return getattr(settings, 'USD_KURS_TTL', 600)
+
+
+def _xato_ttl():
+    return getattr(settings, 'USD_KURS_XATO_TTL', 60)
+
+
+def _keshdan(sana):
+    with _kesh_lock:
+        qiymat = _kesh.get(sana)
+    if qiymat and qiymat[1] > time.monotonic():
+        return qiymat[0]
+    return None
 
-def get_usd_rate():
-    """CBU dan USD kursini olish"""
+
+def _keshga(sana, rate, ttl=None):
+    with _kesh_lock:
+        _kesh[sana] = (rate, time.monotonic() + (_ttl() if ttl is None else ttl))
+
+
+def kesh_tozalash():
+    with _kesh_lock:
+        _kesh.clear()
+        _xatolar.clear()
+
+
+# ─────────────────────────────────────────────────────────────────
+# JADVAL BILAN ISHLASH
+# ─────────────────────────────────────────────────────────────────
+
+def _sana(val):
+    if val is None:
+        return timezone.localdate()
+    if isinstance(val, datetime):
+        return timezone.localdate(val) if timezone.is_aware(val) else val.date()
+    return val
+
+
+def kursni_yangilash(sana=None, provider=None):
+    """
+    Provayderdan kursni olib ValyutaKurs jadvaliga yozadi.
+    Natija: kurs (Decimal) yoki None (olinmadi).
+    """
+    from crm.models import ValyutaKurs
+
+    sana = _sana(sana)
+    provider = provider or get_provider()
+    rate = provider.kurs(None if sana == timezone.localdate() else sana)
+    if not rate:
+        return None
+
+    ValyutaKurs.objects.update_or_create(
+        valyuta='USD', sana=sana,
+        defaults={'rate': rate, 'manba': getattr(provider, 'nomi', '')},
+    )
+    _keshga(sana, rate)
+    return rate
+
+
+def _fonda_yangilash(sana):
+    """
+    Sana kursi jadvalda yo'q — so'rovni kutdirmasdan fon oqimida olib keladi.
+    Muvaffaqiyatsiz bo'lsa USD_KURS_XATO_TTL davomida qayta urinilmaydi.
+    """
+    if not getattr(settings, 'USD_KURS_FON_YANGILASH', True):
+        return
+    with _kesh_lock:
+        if _xatolar.get(sana, 0) > time.monotonic():
+            return
+    if not _fon_lock.acquire(blocking=False):
+        return  # boshqa oqim allaqachon yangilayapti
+
+    def _ish():
+        rate = None
+        try:
+            rate = kursni_yangilash(sana)
+        except Exception as e:
+            logger.warning("USD kursini fonda yangilashda xato: %s", e)
+        finally:
+            if not rate:
+                with _kesh_lock:
+                    _xatolar[sana] = time.monotonic() + _xato_ttl()
+            close_old_connections()
+            _fon_lock.release()
+
+    threading.Thread(target=_ish, daemon=True).start()
+
+
+def _zaxira_kurs():
     try:
-        response = requests.get(
-            'https://cbu.uz/uz/arkhiv-kursov-valyut/json/USD/',
-            timeout=5
-        )
-        data = response.json()
-        if data:
-            return Decimal(str(data[0]['Rate']))
-    except Exception:
-        pass
-    return Decimal('0')
\ No newline at end of file
+        return Decimal(str(getattr(settings, 'USD_KURS_ZAXIRA', '0')))
+    except InvalidOperation:
+        return Decimal('0')
+
+
+def get_usd_rate(sana=None):
+    """
+    Berilgan sanadagi (default — bugun) USD kursi.
+    Orqaga sanalangan Kirim / XomashyoHarakat uchun o'sha kungi kurs qaytadi.
+    Provayderni hech qachon kutmaydi; kurs umuman topilmasa — USD_KURS_ZAXIRA
+    (default Decimal('0')).
+    """
+    from crm.models import ValyutaKurs
+
+    sana = _sana(sana)
+
+    rate = _keshdan(sana)
+    if rate:
+        return rate
+
+    kurslar = ValyutaKurs.objects.filter(valyuta='USD').values_list('sana', 'rate')
+    row = kurslar.filter(sana__lte=sana).order_by('-sana').first()
+
+    if row:
+        kurs_sanasi, rate = row
+        if kurs_sanasi < sana:
+            # O'sha kungi kurs jadvalda yo'q (bugungisi hali olinmagan yoki orqaga
+            # sanalangan yozuv) — oldingi kun kursi qaytadi va qisqa muddat keshlanadi,
+            # aniq sananiki fonda olinadi (kelajak sana uchun kurs hali yo'q)
+            if sana <= timezone.localdate():
+                _fonda_yangilash(sana)
+            _keshga(sana, rate, _xato_ttl())
+        else:
+            _keshga(sana, rate)
+        return rate
+
+    # Jadvalda bu sanagacha kurs yo'q (birinchi ishga tushirish yoki juda eski sana) —
+    # eng yaqin keyingi kurs (yoki zaxira) qaytadi, o'sha kungi kurs fonda olinadi
+    _fonda_yangilash(sana)
+    row = kurslar.filter(sana__gt=sana).order_by('sana').first()
+    rate = row[1] if row else _zaxira_kurs()
+    if rate:
+        _keshga(sana, rate, _xato_ttl())
+    return rate
+
+
+# ─────────────────────────────────────────────────────────────────
+# ASYNC (ASGI view'lari uchun)
+# ─────────────────────────────────────────────────────────────────
+
+aget_usd_rate = sync_to_async(get_usd_rate)
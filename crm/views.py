@@ -7,19 +7,33 @@ from django.contrib import messages
 from django.db.models import Sum, Count, Q, F, ExpressionWrapper,DecimalField
 from django.http import JsonResponse,HttpResponse
 from datetime import date, timedelta,datetime
-from decimal import Decimal,InvalidOperation
+from decimal import Decimal
 from django.utils import timezone
 from django.db import transaction
-import traceback
 import json
 from crm import models as m
-from crm.models import Chiqim, ChiqimTuri,IshXomashyo
-from xomashyo.models import Xomashyo, YetkazibBeruvchi,XomashyoCategory,XomashyoVariant
+from crm.models import Chiqim, ChiqimTuri
+from xomashyo.models import Xomashyo, YetkazibBeruvchi
 import logging
-from .utils import get_usd_rate
+from .utils import aget_usd_rate, get_usd_rate
+from .asinxron import pdf_tayyorlash
+from .ish_xizmati import ish_qoshish
+from .sotuv_xizmati import sotuv_bekor_qilish, sotuv_yigish
+from . import oylik_xizmati
+from . import qidiruv
+from .sahifalash import KursorSahifalashMixin
+from analytics.metrics import Metrika, davr, hisobla
+from config.routers import faqat_oqish
 
 logger = logging.getLogger(__name__)
 
+# Ro'yxat sahifalarida qidiruv indeksidan olinadigan eng ko'p natija
+QIDIRUV_LIMIT = 500
+
+# Xodim sahifasida ko'rsatiladigan oxirgi ishlar / avanslar (jami — ishchi hisobidan)
+ISHLAR_LIMIT = 100
+AVANSLAR_LIMIT = 30
+
 
 def is_admin(user):
     return user.is_authenticated and (user.is_staff or user.is_superuser)
@@ -128,56 +142,16 @@ def oylik_yopish(request, pk):
         except (ValueError, TypeError):
             berilgan = 0
 
-        with transaction.atomic():
-            # Aktiv ishlarni oldindan id-lar bilan lock qilamiz
-            ishlari = m.Ish.objects.filter(
-                ishchi=ishchi,
-                status='yangi'          # ← shu qiymat modelingizda to'g'ri ekanligini tekshiring
-            ).select_for_update()
-
-            # ✅ FIX #1: values_list bilan hisoblash — queryset baholanadi va list'ga aylanadi
-            narxlar = list(ishlari.values_list('narxi', flat=True))
-            hisoblangan = sum(narxlar)
-
-            # Avanslarni yopish
-            aktiv_avanslar = m.Avans.objects.filter(ishchi=ishchi, is_active=True)
-            aktiv_avanslar.update(is_active=False, ended=timezone.now().date())
-
-            # ✅ FIX #2: hisoblangan = view'da hisoblangan summa, oylik = admin bergan summa
-            m.Oyliklar.objects.create(
-                ishchi=ishchi,
-                hisoblangan=hisoblangan,   # ← joriy hisoblangan (formula bo'yicha)
-                oylik=berilgan,            # ← admin qo'lda kiritgan
-                yopilgan=True,
-            )
-
-            # ✅ FIX #1: update — to'g'ridan-to'g'ri DB'da yangilaydi, Python loop emas
-            m.Ish.objects.filter(
-                ishchi=ishchi,
-                status='yangi'
-            ).update(status='yopilgan')
-
-            if berilgan > 0:
-                oylik_turi = m.ChiqimTuri.objects.filter(name__iexact='oylik').first()
-                chiqim = m.Chiqim.objects.create(
-                    name=f"{ishchi.ism} {ishchi.familiya} — oylik ({timezone.now().strftime('%m.%Y')})",
-                    category=oylik_turi,
-                    price=berilgan,
-                    created_by=request.user,
-                )
-                m.ChiqimItem.objects.create(
-                    chiqim=chiqim,
-                    item_turi='oylik',
-                    name=f"{ishchi.ism} {ishchi.familiya} oyligi",
-                    price_uzs=berilgan,     # berilgan
-                )
-
-            ishchi.is_oylik_open = False
-            ishchi.save()
+        try:
+            run = oylik_xizmati.oylik_yopish({ishchi.pk: berilgan}, foydalanuvchi=request.user)
+        except ValueError:
+            # Parallel so'rov allaqachon yopgan
+            messages.warning(request, 'Oylik allaqachon yopilgan!')
+            return redirect('main:employee_detail', pk=pk)
 
         messages.success(
             request,
-            f'✅ Oylik yopildi! Hisoblangan: {hisoblangan:,} so\'m | Berilgan: {berilgan:,} so\'m'
+            f'✅ Oylik yopildi! Hisoblangan: {run.jami_hisoblangan:,} so\'m | Berilgan: {run.jami_berilgan:,} so\'m'
         )
 
     return redirect('main:employee_detail', pk=pk)
@@ -200,6 +174,54 @@ def yangi_oy_boshlash(request, pk):
 
     return redirect('main:employee_detail', pk=pk)
 
+
+class OylikYopishView(AdminRequiredMixin, View):
+    """Barcha ochiq oyliklar — GET: quruq hisob (preview), POST: tanlanganlarni bitta partiyada yopish"""
+    template_name = 'oylik_yopish.html'
+
+    def get(self, request, *args, **kwargs):
+        qatorlar = oylik_xizmati.oylik_hisobi()
+        return render(request, self.template_name, {
+            'qatorlar': qatorlar,
+            'jami_hisoblangan': sum(q.hisoblangan for q in qatorlar),
+            'jami_avans': sum(q.avans for q in qatorlar),
+            'jami_naqd': sum(q.naqd for q in qatorlar),
+            'oxirgi_yopishlar': m.PayrollRun.objects.select_related('created_by')[:10],
+            'is_admin': True,
+        })
+
+    def post(self, request, *args, **kwargs):
+        berilganlar = {}
+        try:
+            for pk in request.POST.getlist('ishchi'):
+                summa = request.POST.get(f'berilgan_{pk}', '').replace(' ', '')
+                berilganlar[int(pk)] = int(summa) if summa else None
+        except ValueError:
+            messages.error(request, "❌ Berilgan summa noto'g'ri kiritilgan")
+            return redirect('main:oylik_yopish_hammasi')
+
+        if not berilganlar:
+            messages.warning(request, 'Hech bir ishchi tanlanmagan')
+            return redirect('main:oylik_yopish_hammasi')
+
+        try:
+            run = oylik_xizmati.oylik_yopish(
+                berilganlar,
+                foydalanuvchi=request.user,
+                izoh=request.POST.get('izoh', ''),
+                avans_ayirish=bool(request.POST.get('avans_ayirish')),
+            )
+        except ValueError as e:
+            messages.warning(request, str(e))
+            return redirect('main:oylik_yopish_hammasi')
+
+        messages.success(
+            request,
+            f'✅ {run.ishchilar_soni} ta ishchining oyligi yopildi! '
+            f'Hisoblangan: {run.jami_hisoblangan:,} so\'m | Berilgan: {run.jami_berilgan:,} so\'m'
+        )
+        return redirect('main:oylik_yopish_hammasi')
+
 # ==================== EMPLOYEES ====================
 
 class EmployeeView(LoginRequiredMixin, ListView):
@@ -209,7 +231,7 @@ class EmployeeView(LoginRequiredMixin, ListView):
     login_url = 'account_login'
     
     def get_queryset(self):
-        return m.Ishchi.objects.all().order_by('ism', 'familiya')
+        return m.Ishchi.objects.select_related('turi').order_by('ism', 'familiya')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -219,8 +241,9 @@ class EmployeeView(LoginRequiredMixin, ListView):
 
 
 class EmployeeCreateView(AdminRequiredMixin, CreateView):
+    """Ishchilar ro'yxatidagi modal forma POST qiladi — alohida sahifasi yo'q"""
     model = m.Ishchi
-    template_name = 'employees.html'
+    http_method_names = ['post']
     fields = ['ism', 'familiya', 'maosh', 'telefon', 'turi', 'is_oylik_open', 'yangi_oylik']
     success_url = reverse_lazy("main:employee")
     
@@ -228,9 +251,15 @@ class EmployeeCreateView(AdminRequiredMixin, CreateView):
         messages.success(self.request, '✅ Yangi ishchi qo\'shildi!')
         return super().form_valid(form)
 
+    def form_invalid(self, form):
+        for xatolar in form.errors.values():
+            messages.error(self.request, f"❌ {' '.join(xatolar)}")
+        return redirect(self.success_url)
+
 
 class EmployeeDeleteView(AdminRequiredMixin, DeleteView):
     model = m.Ishchi
+    http_method_names = ['post']
     success_url = reverse_lazy("main:employee")
     
     def post(self, request, *args, **kwargs):
@@ -266,18 +295,17 @@ class EmployeeDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         ishchi = self.object
 
-        hisoblangan = ishchi.umumiy_oylik()
-
-        avanslar = m.Avans.objects.filter(ishchi=ishchi).order_by('-created')
-        aktiv_avanslar = avanslar.filter(is_active=True)
-        total_avans = aktiv_avanslar.aggregate(Sum('amount'))['amount__sum'] or 0
-
+        # Summalar — ishchi hisobidan (Ish / Avans save'da siljiydi), ro'yxatlar — oxirgilari
         context['oy_stat'] = ishchi.oy_mahsulotlar()
-        context['ish_soni'] = m.Ish.objects.filter(ishchi=ishchi, status='yangi').aggregate(total=Sum('soni'))
-        context['ishlar'] = m.Ish.objects.filter(ishchi=ishchi, status='yangi')
-        context['avanslar'] = avanslar
-        context['hisoblangan'] = hisoblangan
-        context['total_avans'] = total_avans
+        context['ish_soni'] = {'total': ishchi.joriy_soni}
+        context['ishlar'] = (
+            m.Ish.objects.filter(ishchi=ishchi, status='yangi')
+            .select_related('mahsulot').order_by('-sana', '-pk')[:ISHLAR_LIMIT]
+        )
+        context['avanslar'] = m.Avans.objects.filter(ishchi=ishchi).order_by('-created', '-pk')[:AVANSLAR_LIMIT]
+        context['hisoblangan'] = ishchi.joriy_hisob
+        context['total_avans'] = ishchi.joriy_avans
+        context['qolgan'] = ishchi.qoldiq
         context['is_admin'] = is_admin(self.request.user)
         return context
 
@@ -289,6 +317,10 @@ class ProductsView(LoginRequiredMixin, ListView):
     template_name = "product_list.html"
     context_object_name = "products"
     login_url = 'account_login'
+
+    def get_queryset(self):
+        # kategoriya nomi va total_stock (variants.all()) — kartalar uchun bitta so'rovda
+        return super().get_queryset().select_related('category').prefetch_related('variants')
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -336,8 +368,7 @@ class IshQoshishView(AdminRequiredMixin,View):
         return render(request, self.template_name, context)
 
     def post(self, request, *args, **kwargs):
-        logger.info("post")
-        """POST so'rov - ish yaratish"""
+        """POST so'rov - ish yaratish (crm/ish_xizmati.py)"""
         ishchi_id = request.POST.get('ishchi')
         mahsulot_id = request.POST.get('mahsulot')
         soni = request.POST.get('soni')
@@ -345,678 +376,132 @@ class IshQoshishView(AdminRequiredMixin,View):
         mustaqil_ish = request.POST.get('mustaqil_ish') == 'on'
 
         try:
-            with transaction.atomic():
-                ishchi = m.Ishchi.objects.select_related('turi').get(id=ishchi_id)
-                mahsulot = m.Product.objects.get(id=mahsulot_id)
-                soni_int = int(soni)
-
-                if soni_int < 1:
-                    raise ValueError("❌ Son 1 dan katta bo'lishi kerak!")
-
-                # Ish sanasini tekshirish
-                if ish_sanasi:
-                    try:
-                        ish_sana_obj = datetime.strptime(ish_sanasi, '%Y-%m-%d').date()
-                    except ValueError:
-                        raise ValueError("❌ Sana formati noto'g'ri!")
-                else:
-                    ish_sana_obj = datetime.now().date()
-
-                ishchi_turi = ishchi.turi.nomi.lower() if ishchi.turi else None
-                if not ishchi_turi:
-                    raise ValueError("❌ Ishchi turi ko'rsatilmagan!")
-
-                # ============================================================
-                # ZAKATOVKA
-                # ============================================================
-                if ishchi_turi == 'zakatovka':
-                    kroy_xomashyo_id = request.POST.get('kroy_xomashyo')
-
-                    # Mustaqil ish - kroy xomashyosiz
-                    if mustaqil_ish:
-                        ish = m.Ish.objects.create(
-                            ishchi=ishchi,
-                            mahsulot=mahsulot,
-                            soni=soni_int,
-                            status='yangi',
-                            sana=ish_sana_obj
-                        )
-
-                        # Faqat zakatovka jarayon xomashyo yaratish
-                        zakatovka_xomashyo = self._get_or_create_jarayon_xomashyo(
-                            mahsulot=mahsulot,
-                            category_name='zakatovka',
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=zakatovka_xomashyo,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        messages.warning(
-                            request,
-                            f"⚠️ MUSTAQIL ISH: {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Zakatovka) "
-                            f"kroy xomashyosiz qo'shildi!\n"
-                            f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-                        )
-
-                    # Standart ish - kroy xomashyo bilan
-                    else:
-                        if not kroy_xomashyo_id:
-                            raise ValueError(
-                                "❌ Kroy xomashyosi tanlanmagan! "
-                                "'Mustaqil ish' belgisini yoqing yoki kroy xomashyosini tanlang."
-                            )
-
-                        kroy_xomashyo = Xomashyo.objects.get(
-                            id=kroy_xomashyo_id,
-                            category__name__iexact='kroy',
-                            category__turi='process',
-                            holati='active'
-                        )
-
-                        if kroy_xomashyo.miqdori < soni_int:
-                            raise ValueError(
-                                f"❌ Yetarli kroy xomashyo yo'q! "
-                                f"Kerak: {soni_int}, Mavjud: {kroy_xomashyo.miqdori}"
-                            )
-
-                        ish = m.Ish.objects.create(
-                            ishchi=ishchi,
-                            mahsulot=mahsulot,
-                            soni=soni_int,
-                            status='yangi',
-                            sana=ish_sana_obj
-                        )
-
-                        # Kroy xomashyo chiqimi
-                        kroy_xomashyo.miqdori -= Decimal(soni_int)
-                        kroy_xomashyo.save(update_fields=['miqdori', 'updated_at'])
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=kroy_xomashyo,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        # Zakatovka jarayon xomashyo
-                        zakatovka_xomashyo = self._get_or_create_jarayon_xomashyo(
-                            mahsulot=mahsulot,
-                            category_name='zakatovka',
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=zakatovka_xomashyo,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        messages.success(
-                            request,
-                            f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Zakatovka) qo'shildi!\n"
-                            f"🔶 Ishlatildi: {kroy_xomashyo.nomi} (-{soni_int} dona)\n"
-                            f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-                        )
-
-                # ============================================================
-                # KROY VA REZAK - TeriSarfi bilan
-                # ============================================================
-
-                elif ishchi_turi in ['kroy', 'rezak']:
-                    # Multiple teri sarflarini olish
-                    teri_xomashyo_ids = request.POST.getlist('teri_xomashyo[]')
-                    teri_variant_ids = request.POST.getlist('teri_variant[]')
-                    teri_sarfi_customs = request.POST.getlist('teri_sarfi_custom[]')
-
-                    # ============================================================
-                    # KRITIK FIX: Bo'sh stringlarni filtrlash
-                    # ============================================================
-                    # Bo'sh ID'larni olib tashlash
-                    teri_xomashyo_ids = [x.strip() for x in teri_xomashyo_ids if x and x.strip()]
-                    
-                    # Bo'sh variant ID'larni None ga aylantirish (muhim!)
-                    teri_variant_ids = [
-                        x.strip() if x and x.strip() else None 
-                        for x in teri_variant_ids
-                    ]
-                    
-                    # Astar (yagona)
-                    astar_xomashyo_id = request.POST.get('astar_xomashyo', '').strip() or None
-                    astar_variant_id = request.POST.get('astar_variant', '').strip() or None
-                    astar_sarfi_custom = request.POST.get('astar_sarfi_custom', '').strip() or None
-
-                    # Validatsiya
-                    if not teri_xomashyo_ids:
-                        raise ValueError(f"❌ {ishchi_turi.title()} uchun kamida bitta teri tanlanishi kerak!")
-
-                    # Teri sarflarini tayyorlash
-                    teri_sarflar = []
-                    jami_teri_sarfi = Decimal('0')
-
-                    for i, teri_id in enumerate(teri_xomashyo_ids):
-                        if not teri_id:
-                            continue
-
-                        try:
-                            teri_xomashyo = Xomashyo.objects.get(
-                                id=teri_id,
-                                category__name__iexact='teri',
-                                holati='active'
-                            )
-                        except Xomashyo.DoesNotExist:
-                            raise ValueError(f"❌ ID {teri_id} bilan teri topilmadi!")
-
-                        # ============================================================
-                        # KRITIK: Variant - None tekshiruvi
-                        # ============================================================
-                        teri_variant = None
-                        if i < len(teri_variant_ids) and teri_variant_ids[i] is not None:
-                            try:
-                                teri_variant = XomashyoVariant.objects.get(
-                                    id=teri_variant_ids[i],
-                                    xomashyo=teri_xomashyo
-                                )
-                            except (XomashyoVariant.DoesNotExist, ValueError):
-                                logger.warning(f"Variant {teri_variant_ids[i]} topilmadi")
-                                teri_variant = None
-
-                        # Sarfni hisoblash
-                        teri_sarfi_bitta = mahsulot.teri_sarfi
-                        if i < len(teri_sarfi_customs):
-                            custom_sarf = teri_sarfi_customs[i]
-                            if custom_sarf and custom_sarf.strip():
-                                try:
-                                    teri_sarfi_bitta = Decimal(custom_sarf)
-                                except (ValueError, InvalidOperation):
-                                    logger.warning(f"Noto'g'ri sarf: {custom_sarf}")
-
-                        teri_sarfi_jami = teri_sarfi_bitta * soni_int
-
-                        if teri_sarfi_jami <= 0:
-                            raise ValueError(f"❌ {teri_xomashyo.nomi} sarfi 0 dan katta bo'lishi kerak!")
-
-                        # Miqdorni tekshirish
-                        if teri_variant:
-                            if teri_variant.miqdori < teri_sarfi_jami:
-                                raise ValueError(
-                                    f"❌ {teri_xomashyo.nomi} ({teri_variant.rang}) variantida "
-                                    f"yetarli miqdor yo'q! Kerak: {teri_sarfi_jami}, Mavjud: {teri_variant.miqdori}"
-                                )
-                        else:
-                            if teri_xomashyo.miqdori < teri_sarfi_jami:
-                                raise ValueError(
-                                    f"❌ Omborda yetarli {teri_xomashyo.nomi} yo'q! "
-                                    f"Kerak: {teri_sarfi_jami}, Mavjud: {teri_xomashyo.miqdori}"
-                                )
-
-                        teri_sarflar.append({
-                            'xomashyo': teri_xomashyo,
-                            'variant': teri_variant,  # None yoki XomashyoVariant
-                            'miqdor': teri_sarfi_jami,
-                            'bitta_sarf': teri_sarfi_bitta
-                        })
-
-                        jami_teri_sarfi += teri_sarfi_jami
-
-                    # ============================================================
-                    # ASTAR (ixtiyoriy)
-                    # ============================================================
-                    astar_sarfi = Decimal('0')
-                    astar_xomashyo = None
-                    astar_variant = None
-
-                    if astar_xomashyo_id:
-                        try:
-                            astar_xomashyo = Xomashyo.objects.get(
-                                id=astar_xomashyo_id,
-                                category__name__iexact='astar',
-                                holati='active'
-                            )
-
-                            if astar_sarfi_custom:
-                                try:
-                                    astar_sarfi = Decimal(astar_sarfi_custom) * soni_int
-                                except (ValueError, InvalidOperation):
-                                    astar_sarfi = mahsulot.astar_sarfi * soni_int
-                            else:
-                                astar_sarfi = mahsulot.astar_sarfi * soni_int
-
-                            if astar_sarfi > 0:
-                                # KRITIK: Variant None tekshiruvi
-                                if astar_variant_id:
-                                    try:
-                                        astar_variant = XomashyoVariant.objects.get(
-                                            id=astar_variant_id,
-                                            xomashyo=astar_xomashyo
-                                        )
-                                        if astar_variant.miqdori < astar_sarfi:
-                                            raise ValueError(
-                                                f"❌ Astar variantida yetarli miqdor yo'q! "
-                                                f"Kerak: {astar_sarfi}, Mavjud: {astar_variant.miqdori}"
-                                            )
-                                    except (XomashyoVariant.DoesNotExist, ValueError) as e:
-                                        if "yetarli" in str(e):
-                                            raise
-                                        logger.warning(f"Astar variant topilmadi: {astar_variant_id}")
-                                        astar_variant = None
-                                
-                                if not astar_variant:
-                                    if astar_xomashyo.miqdori < astar_sarfi:
-                                        raise ValueError(
-                                            f"❌ Omborda yetarli {astar_xomashyo.nomi} yo'q! "
-                                            f"Kerak: {astar_sarfi}, Mavjud: {astar_xomashyo.miqdori}"
-                                        )
-                        except Xomashyo.DoesNotExist:
-                            raise ValueError(f"❌ ID {astar_xomashyo_id} bilan astar topilmadi!")
-
-                    # ============================================================
-                    # ISH YARATISH
-                    # ============================================================
-                    ish = m.Ish.objects.create(
-                        ishchi=ishchi,
-                        mahsulot=mahsulot,
-                        soni=soni_int,
-                        status='yangi',
-                        sana=ish_sana_obj
-                    )
-                    logger.info(" creating Ish ")
-
-                    # ============================================================
-                    # TERI SARFLARINI YOZISH
-                    # ============================================================
-                    teri_sarfi_messages = []
-                    for sarf in teri_sarflar:
-                        # TeriSarfi - KRITIK: timezone.now() ishlatish
-                        m.TeriSarfi.objects.create(
-                            ish=ish,
-                            ishchi=ishchi,
-                            xomashyo=sarf['xomashyo'],
-                            miqdor=sarf['miqdor'],
-                            sana=timezone.now()  # datetime.now() emas!
-                        )
-                        logger.info(" creating teri terisarfi ")
-
-                        # IshXomashyo
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=sarf['xomashyo'],
-                            miqdor=sarf['miqdor']
-                        )
-                        logger.info(" creating teri Ishxomashyo ")
-
-                        variant_info = f" ({sarf['variant'].rang})" if sarf['variant'] else ""
-                        teri_sarfi_messages.append(
-                            f"   • {sarf['xomashyo'].nomi}{variant_info}: "
-                            f"{sarf['bitta_sarf']} × {soni_int} = {sarf['miqdor']} Dm"
-                        )
-
-                    # ============================================================
-                    # ASTAR CHIQIMI
-                    # ============================================================
-                    if astar_xomashyo and astar_sarfi > 0:
-                        # if astar_variant:
-                        #     astar_variant.miqdori -= astar_sarfi
-                        #     astar_variant.save(update_fields=['miqdori'])
-                        # else:
-                        #     astar_xomashyo.miqdori -= astar_sarfi
-                        #     astar_xomashyo.save(update_fields=['miqdori', 'updated_at'])
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=astar_xomashyo,
-                            variant=astar_variant,  # None OK
-                            miqdor=astar_sarfi
-                        )
-                        logger.info(" creating Ishxomashyo ")
-                    # ============================================================
-                    # KROY JARAYON XOMASHYO
-                    # ============================================================
-                    kroy_xomashyo = self._get_or_create_jarayon_xomashyo(
-                        mahsulot=mahsulot,
-                        category_name='kroy',
-                        miqdor=Decimal(soni_int),
-                    )
-
-                    IshXomashyo.objects.create(
-                        ish=ish,
-                        xomashyo=kroy_xomashyo,
-                        variant=None,  # Jarayon - variant yo'q
-                        miqdor=Decimal(soni_int)
-                    )
-                    logger.info("creating ishxomashyo kroy ")
-
-                    # Success message
-                    success_msg = (
-                        f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} ({ishchi_turi.title()}) qo'shildi!\n\n"
-                        f"📊 Teri sarflari ({len(teri_sarflar)} ta):\n"
-                    )
-                    success_msg += '\n'.join(teri_sarfi_messages)
-                    success_msg += f"\n\n🔢 Jami teri sarfi: {jami_teri_sarfi} Dm"
-
-                    if astar_xomashyo and astar_sarfi > 0:
-                        success_msg += f"\n🔶 Astar: {astar_xomashyo.nomi} (-{astar_sarfi} Dm)"
-
-                    success_msg += f"\n📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-
-                    messages.success(request, success_msg)
-
-
-                # ============================================================
-                # KOSIB
-                # ============================================================
-                elif ishchi_turi == 'kosib':
-                    zakatovka_xomashyo_id = request.POST.get('zakatovka_xomashyo')
-                    padoj_xomashyo_id = request.POST.get('padoj_xomashyo')
-                    padoj_variant_id = request.POST.get('padoj_variant')
-                    mahsulot_variant_id = request.POST.get('mahsulot_variant')
-                    variant_rang = request.POST.get('variant_rang', '')
-                    variant_razmer = request.POST.get('variant_razmer', '')
-
-                    if not padoj_xomashyo_id:
-                        raise ValueError("❌ Kosib uchun padoj tanlanishi kerak!")
-
-                    # Mustaqil ish - zakatovka xomashyosiz
-                    if mustaqil_ish:
-                        # PADOJ
-                        padoj = Xomashyo.objects.get(
-                            id=padoj_xomashyo_id,
-                            holati='active'
-                        )
-
-                        padoj_variant = None
-                        if padoj_variant_id:
-                            padoj_variant = XomashyoVariant.objects.get(
-                                id=padoj_variant_id,
-                                xomashyo=padoj
-                            )
-                            if padoj_variant.miqdori < soni_int:
-                                raise ValueError(
-                                    f"❌ Padoj variantida yetarli miqdor yo'q! "
-                                    f"Kerak: {soni_int}, Mavjud: {padoj_variant.miqdori}"
-                                )
-                            padoj_variant.miqdori -= Decimal(soni_int)
-                            padoj_variant.save(update_fields=['miqdori'])
-                        else:
-                            if padoj.miqdori < soni_int:
-                                raise ValueError(
-                                    f"❌ Yetarli {padoj.nomi} yo'q! "
-                                    f"Kerak: {soni_int}, Mavjud: {padoj.miqdori}"
-                                )
-                            padoj.miqdori -= Decimal(soni_int)
-                            padoj.save(update_fields=['miqdori', 'updated_at'])
-
-                        # ISH YARATISH
-                        ish = m.Ish.objects.create(
-                            ishchi=ishchi,
-                            mahsulot=mahsulot,
-                            soni=soni_int,
-                            status='yangi',
-                            sana=ish_sana_obj
-                        )
-
-                        # PADOJ CHIQIMI
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=padoj,
-                            variant=padoj_variant,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        # PRODUCT VARIANT
-                        if mahsulot_variant_id and mahsulot_variant_id != 'new':
-                            variant = m.ProductVariant.objects.get(id=mahsulot_variant_id)
-                            variant.stock += soni_int
-                            variant.save()
-                            variant_info = f"{variant.rang} - {variant.razmer}"
-                        else:
-                            variant, created = m.ProductVariant.objects.get_or_create(
-                                product=mahsulot,
-                                rang=variant_rang,
-                                razmer=variant_razmer,
-                                defaults={
-                                    'stock': soni_int,
-                                    'price': mahsulot.narxi
-                                }
-                            )
-                            if not created:
-                                variant.stock += soni_int
-                                variant.save()
-                            variant_info = f"🆕 {variant_rang or 'Rangsiz'} - {variant_razmer or 'Razmersiz'}"
-
-                        # KOSIB JARAYON XOMASHYO
-                        kosib_xomashyo = self._get_or_create_jarayon_xomashyo(
-                            mahsulot=mahsulot,
-                            category_name='kosib',
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=kosib_xomashyo,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        mahsulot.refresh_from_db()
-
-                        messages.warning(
-                            request,
-                            f"⚠️ MUSTAQIL ISH: {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Kosib) "
-                            f"zakatovka xomashyosiz qo'shildi!\n"
-                            f"🎨 Variant: {variant_info}\n"
-                            f"🔶 {padoj.nomi}: -{soni_int} dona\n"
-                            f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-                        )
-
-                    # Standart ish - zakatovka bilan
-                    else:
-                        if not zakatovka_xomashyo_id:
-                            raise ValueError(
-                                "❌ Zakatovka xomashyosi tanlanmagan! "
-                                "'Mustaqil ish' belgisini yoqing yoki zakatovka xomashyosini tanlang."
-                            )
-
-                        # ZAKATOVKA
-                        zakatovka = Xomashyo.objects.get(
-                            id=zakatovka_xomashyo_id,
-                            category__name__iexact='zakatovka',
-                            mahsulot=mahsulot,
-                            holati='active'
-                        )
-
-                        if zakatovka.miqdori < soni_int:
-                            raise ValueError(
-                                f"❌ Yetarli zakatovka yo'q! "
-                                f"Kerak: {soni_int}, Mavjud: {zakatovka.miqdori}"
-                            )
-
-                        # PADOJ
-                        padoj = Xomashyo.objects.get(
-                            id=padoj_xomashyo_id,
-                            holati='active'
-                        )
-
-                        padoj_variant = None
-                        if padoj_variant_id:
-                            padoj_variant = XomashyoVariant.objects.get(
-                                id=padoj_variant_id,
-                                xomashyo=padoj
-                            )
-                            if padoj_variant.miqdori < soni_int:
-                                raise ValueError(
-                                    f"❌ Padoj variantida yetarli miqdor yo'q! "
-                                    f"Kerak: {soni_int}, Mavjud: {padoj_variant.miqdori}"
-                                )
-                            padoj_variant.miqdori -= Decimal(soni_int)
-                            padoj_variant.save(update_fields=['miqdori'])
-                        else:
-                            if padoj.miqdori < soni_int:
-                                raise ValueError(
-                                    f"❌ Yetarli {padoj.nomi} yo'q! "
-                                    f"Kerak: {soni_int}, Mavjud: {padoj.miqdori}"
-                                )
-                            padoj.miqdori -= Decimal(soni_int)
-                            padoj.save(update_fields=['miqdori', 'updated_at'])
-
-                        # ISH YARATISH
-                        ish = m.Ish.objects.create(
-                            ishchi=ishchi,
-                            mahsulot=mahsulot,
-                            soni=soni_int,
-                            status='yangi',
-                            sana=ish_sana_obj
-                        )
-
-                        # ZAKATOVKA CHIQIMI
-                        zakatovka.miqdori -= Decimal(soni_int)
-                        zakatovka.save(update_fields=['miqdori', 'updated_at'])
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=zakatovka,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        # PADOJ CHIQIMI
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=padoj,
-                            variant=padoj_variant,
-                            miqdor=Decimal(soni_int)
-                        )
+            ishchi = m.Ishchi.objects.select_related('turi').get(id=ishchi_id)
+            mahsulot = m.Product.objects.get(id=mahsulot_id)
+            soni_int = int(soni)
 
-                        # PRODUCT VARIANT
-                        if mahsulot_variant_id and mahsulot_variant_id != 'new':
-                            variant = m.ProductVariant.objects.get(id=mahsulot_variant_id)
-                            variant.stock += soni_int
-                            variant.save()
-                            variant_info = f"{variant.rang} - {variant.razmer}"
-                        else:
-                            variant, created = m.ProductVariant.objects.get_or_create(
-                                product=mahsulot,
-                                rang=variant_rang,
-                                razmer=variant_razmer,
-                                defaults={
-                                    'stock': soni_int,
-                                    'price': mahsulot.narxi
-                                }
-                            )
-                            if not created:
-                                variant.stock += soni_int
-                                variant.save()
-                            variant_info = f"🆕 {variant_rang or 'Rangsiz'} - {variant_razmer or 'Razmersiz'}"
-
-                        # KOSIB JARAYON XOMASHYO
-                        kosib_xomashyo = self._get_or_create_jarayon_xomashyo(
-                            mahsulot=mahsulot,
-                            category_name='kosib',
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        IshXomashyo.objects.create(
-                            ish=ish,
-                            xomashyo=kosib_xomashyo,
-                            miqdor=Decimal(soni_int)
-                        )
-
-                        mahsulot.refresh_from_db()
-
-                        messages.success(
-                            request,
-                            f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Kosib) qo'shildi!\n"
-                            f"🎨 Variant: {variant_info}\n"
-                            f"🔶 Zakatovka: -{soni_int} dona\n"
-                            f"🔶 {padoj.nomi}: -{soni_int} dona\n"
-                            f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-                        )
-
-                # ============================================================
-                # PARDOZ VA BOSHQALAR
-                # ============================================================
-                else:
-                    ish = m.Ish.objects.create(
-                        ishchi=ishchi,
-                        mahsulot=mahsulot,
-                        soni=soni_int,
-                        status='yangi',
-                        sana=ish_sana_obj
-                    )
-
-                    messages.success(
-                        request,
-                        f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} qo'shildi!\n"
-                        f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
-                    )
-                    
+            # Ish sanasini tekshirish
+            if ish_sanasi:
+                try:
+                    ish_sana_obj = datetime.strptime(ish_sanasi, '%Y-%m-%d').date()
+                except ValueError:
+                    raise ValueError("❌ Sana formati noto'g'ri!")
+            else:
+                ish_sana_obj = datetime.now().date()
+
+            # Kroy / rezak: bir nechta teri qatori (bo'sh qatorlarni servis tashlaydi)
+            teri_variant_ids = request.POST.getlist('teri_variant[]')
+            teri_sarfi_customs = request.POST.getlist('teri_sarfi_custom[]')
+            terilar = [
+                {
+                    'xomashyo_id': teri_id,
+                    'variant_id': teri_variant_ids[i] if i < len(teri_variant_ids) else None,
+                    'sarf': teri_sarfi_customs[i] if i < len(teri_sarfi_customs) else None,
+                }
+                for i, teri_id in enumerate(request.POST.getlist('teri_xomashyo[]'))
+            ]
 
+            natija = ish_qoshish(ishchi, mahsulot, soni_int, ish_sana_obj, {
+                'terilar':             terilar,
+                'astar': {
+                    'xomashyo_id': request.POST.get('astar_xomashyo'),
+                    'variant_id':  request.POST.get('astar_variant'),
+                    'sarf':        request.POST.get('astar_sarfi_custom'),
+                },
+                'kroy_id':             request.POST.get('kroy_xomashyo'),
+                'zakatovka_id':        request.POST.get('zakatovka_xomashyo'),
+                'padoj_id':            request.POST.get('padoj_xomashyo'),
+                'padoj_variant_id':    request.POST.get('padoj_variant'),
+                'mahsulot_variant_id': request.POST.get('mahsulot_variant'),
+                'variant_rang':        request.POST.get('variant_rang', ''),
+                'variant_razmer':      request.POST.get('variant_razmer', ''),
+                'mustaqil':            mustaqil_ish,
+            })
+            self._xabar(request, natija, ishchi, mahsulot, soni_int, ish_sana_obj, mustaqil_ish)
 
         except m.Ishchi.DoesNotExist:
             messages.error(request, "❌ Ishchi topilmadi!")
         except m.Product.DoesNotExist:
             messages.error(request, "❌ Mahsulot topilmadi!")
-        except Xomashyo.DoesNotExist:
-            messages.error(request, "❌ Xomashyo topilmadi!")
-        except XomashyoVariant.DoesNotExist:
-            messages.error(request, "❌ Xomashyo varianti topilmadi!")
         except ValueError as e:
             messages.error(request, str(e))
-        except Exception as e:
-            messages.error(request, f"❌ Xatolik: {str(e)}")
-            print(traceback.format_exc())
         except Exception as e:
             logger.exception("IshQoshishView POST error")  # <-- traceback bilan log
             messages.error(request, f"❌ Xatolik: {str(e)}")
-            print(traceback.format_exc())
-            
+
         return redirect('main:ish_qoshish')
 
     @staticmethod
-    def _get_or_create_jarayon_xomashyo(
-        mahsulot: m.Product,
-        category_name: str,
-        miqdor: Decimal,
-        rang: str = None
-    ) -> Xomashyo:
-        """Jarayon xomashyosini yaratish/yangilash"""
-        category, _ = XomashyoCategory.objects.get_or_create(
-            name=category_name,
-            defaults={'turi': 'process'}
-        )
-
-        filters = {
-            'mahsulot': mahsulot,
-            'category': category,
-            'olchov_birligi': 'dona'
-        }
-
-        if rang:
-            filters['rang'] = rang
+    def _xabar(request, natija, ishchi, mahsulot, soni_int, ish_sana_obj, mustaqil_ish):
+        """Ishchi turiga qarab muvaffaqiyat xabari"""
+        ishchi_turi = ishchi.turi.nomi.lower()
+        sana_info = f"📅 Sana: {ish_sana_obj.strftime('%d.%m.%Y')}"
+
+        if ishchi_turi == 'zakatovka':
+            if mustaqil_ish:
+                messages.warning(
+                    request,
+                    f"⚠️ MUSTAQIL ISH: {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Zakatovka) "
+                    f"kroy xomashyosiz qo'shildi!\n{sana_info}"
+                )
+            else:
+                messages.success(
+                    request,
+                    f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Zakatovka) qo'shildi!\n"
+                    f"🔶 Ishlatildi: {natija.kroy.nomi} (-{soni_int} dona)\n{sana_info}"
+                )
 
-        xomashyo = Xomashyo.objects.filter(**filters).first()
+        elif ishchi_turi in ['kroy', 'rezak']:
+            teri_sarfi_messages = [
+                f"   • {teri.nomi}{f' ({variant.rang})' if variant else ''}: "
+                f"{bitta} × {soni_int} = {jami} Dm"
+                for teri, variant, bitta, jami in natija.terilar
+            ]
+            success_msg = (
+                f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} ({ishchi_turi.title()}) qo'shildi!\n\n"
+                f"📊 Teri sarflari ({len(natija.terilar)} ta):\n"
+            )
+            success_msg += '\n'.join(teri_sarfi_messages)
+            success_msg += f"\n\n🔢 Jami teri sarfi: {natija.jami_teri} Dm"
+            if natija.astar and natija.astar_miqdor > 0:
+                success_msg += f"\n🔶 Astar: {natija.astar.nomi} (-{natija.astar_miqdor} Dm)"
+            success_msg += f"\n{sana_info}"
+            messages.success(request, success_msg)
+
+        elif ishchi_turi == 'kosib':
+            variant = natija.variant
+            if request.POST.get('mahsulot_variant') in (None, '', 'new'):
+                variant_info = f"🆕 {variant.rang or 'Rangsiz'} - {variant.razmer or 'Razmersiz'}"
+            else:
+                variant_info = f"{variant.rang} - {variant.razmer}"
+            if mustaqil_ish:
+                messages.warning(
+                    request,
+                    f"⚠️ MUSTAQIL ISH: {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Kosib) "
+                    f"zakatovka xomashyosiz qo'shildi!\n"
+                    f"🎨 Variant: {variant_info}\n"
+                    f"🔶 {natija.padoj.nomi}: -{soni_int} dona\n{sana_info}"
+                )
+            else:
+                messages.success(
+                    request,
+                    f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} (Kosib) qo'shildi!\n"
+                    f"🎨 Variant: {variant_info}\n"
+                    f"🔶 Zakatovka: -{soni_int} dona\n"
+                    f"🔶 {natija.padoj.nomi}: -{soni_int} dona\n{sana_info}"
+                )
 
-        if xomashyo:
-            xomashyo.miqdori += miqdor
-            xomashyo.save(update_fields=['miqdori', 'updated_at'])
         else:
-            xomashyo = Xomashyo.objects.create(
-                mahsulot=mahsulot,
-                category=category,
-                nomi=f"{mahsulot.nomi} - {category_name.title()}",
-                miqdori=miqdor,
-                olchov_birligi='dona',
-                holati='active',
-                rang=rang
+            messages.success(
+                request,
+                f"✅ {ishchi.ism}ga {mahsulot.nomi} x{soni_int} qo'shildi!\n{sana_info}"
             )
 
-        return xomashyo
-
 
 
 #  SOTUVLAR 
 
-class SotuvQoshish(AdminRequiredMixin, ListView):
+class SotuvQoshish(KursorSahifalashMixin, AdminRequiredMixin, ListView):
     """Sotuvlar ro'yxati"""
     model = m.Sotuv
     template_name = 'sotuv/sotuvlar.html'
@@ -1040,10 +525,10 @@ class SotuvQoshish(AdminRequiredMixin, ListView):
         # Sana filtri
         date_filter = self.request.GET.get('date')
         if date_filter == 'bugun':
-            queryset = queryset.filter(sana__date=date.today())
+            queryset = queryset.filter(davr('sana__date', date.today(), date.today()))
         elif date_filter == 'hafta':
             week_ago = date.today() - timedelta(days=7)
-            queryset = queryset.filter(sana__date__gte=week_ago)
+            queryset = queryset.filter(davr('sana__date', week_ago))
         elif date_filter == 'oy':
             queryset = queryset.filter(
                 sana__year=date.today().year,
@@ -1083,12 +568,14 @@ class SotuvQoshish(AdminRequiredMixin, ListView):
         
         return context
 
-class SotuvListView(AdminRequiredMixin, ListView):
+class SotuvListView(KursorSahifalashMixin, AdminRequiredMixin, ListView):
     """Sotuvlar ro'yxati - Filterlar va qidiruv bilan"""
     template_name = "sotuv/sotuv_list.html"
     model = m.Sotuv
     context_object_name = "sotuvlar"
     paginate_by = 20  # Har sahifada 20 ta
+    kursor_maydonlari = ('sana', 'yakuniy_summa')
+    taxminiy_jami = True  # "N ta sotuv topildi"
     
     def get_queryset(self):
         queryset = super().get_queryset().select_related('xaridor').prefetch_related(
@@ -1096,21 +583,31 @@ class SotuvListView(AdminRequiredMixin, ListView):
         )
         
         # 1. QIDIRUV
-        search = self.request.GET.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(id__icontains=search) |
-                Q(xaridor__ism__icontains=search) |
-                Q(xaridor__telefon__icontains=search)
-            )
+        search = self.request.GET.get('search', '').strip()
+        if search.startswith('#') and search[1:].isdigit():
+            # "#123" — aniq sotuv raqami
+            queryset = queryset.filter(pk=int(search[1:]))
+        elif search:
+            xaridor_ids = qidiruv.qidirish(search, 'xaridor', limit=QIDIRUV_LIMIT)
+            if xaridor_ids is None:
+                queryset = queryset.filter(
+                    Q(id__icontains=search) |
+                    Q(xaridor__ism__icontains=search) |
+                    Q(xaridor__telefon__icontains=search)
+                )
+            else:
+                shart = Q(xaridor_id__in=xaridor_ids) | Q(pk__in=qidiruv.qidirish(search, 'sotuv', limit=QIDIRUV_LIMIT))
+                if search.isdigit():
+                    shart |= Q(pk=int(search))
+                queryset = queryset.filter(shart)
         
         # 2. SANA FILTRI (tez filterlar)
         date_filter = self.request.GET.get('date')
         if date_filter == 'bugun':
-            queryset = queryset.filter(sana__date=date.today())
+            queryset = queryset.filter(davr('sana__date', date.today(), date.today()))
         elif date_filter == 'hafta':
             week_ago = date.today() - timedelta(days=7)
-            queryset = queryset.filter(sana__date__gte=week_ago)
+            queryset = queryset.filter(davr('sana__date', week_ago))
         elif date_filter == 'oy':
             queryset = queryset.filter(
                 sana__year=date.today().year,
@@ -1124,14 +621,14 @@ class SotuvListView(AdminRequiredMixin, ListView):
         if date_from:
             try:
                 date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(sana__date__gte=date_from_obj)
+                queryset = queryset.filter(davr('sana__date', date_from_obj))
             except ValueError:
                 pass
         
         if date_to:
             try:
                 date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(sana__date__lte=date_to_obj)
+                queryset = queryset.filter(davr('sana__date', None, date_to_obj))
             except ValueError:
                 pass
         
@@ -1177,36 +674,20 @@ class SotuvListView(AdminRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         today = date.today()
         
-        # Statistika - Bugun
-        bugungi_queryset = m.Sotuv.objects.filter(sana__date=today)
-        context['bugungi_sotuv'] = bugungi_queryset.aggregate(
-            Sum('yakuniy_summa')
-        )['yakuniy_summa__sum'] or 0
-        context['bugungi_soni'] = bugungi_queryset.count()
-        
-        # Statistika - Hafta
+        # Statistika — bugun / hafta / oy / jami: bitta aggregate()
         week_ago = today - timedelta(days=7)
-        haftalik_queryset = m.Sotuv.objects.filter(sana__date__gte=week_ago)
-        context['haftalik_sotuv'] = haftalik_queryset.aggregate(
-            Sum('yakuniy_summa')
-        )['yakuniy_summa__sum'] or 0
-        context['haftalik_soni'] = haftalik_queryset.count()
-        
-        # Statistika - Oy
-        oylik_queryset = m.Sotuv.objects.filter(
-            sana__year=today.year,
-            sana__month=today.month
-        )
-        context['oylik_sotuv'] = oylik_queryset.aggregate(
-            Sum('yakuniy_summa')
-        )['yakuniy_summa__sum'] or 0
-        context['oylik_soni'] = oylik_queryset.count()
-        
-        # Statistika - Jami
-        context['jami_sotuv'] = m.Sotuv.objects.aggregate(
-            Sum('yakuniy_summa')
-        )['yakuniy_summa__sum'] or 0
-        context['jami_soni'] = m.Sotuv.objects.count()
+        oy_q = Q(sana__year=today.year, sana__month=today.month)
+        stat = hisobla(m.Sotuv.objects.all(), [
+            Metrika('bugungi_sotuv',  'yakuniy_summa', davr('sana__date', today, today)),
+            Metrika('bugungi_soni',   q=davr('sana__date', today, today), tur='count'),
+            Metrika('haftalik_sotuv', 'yakuniy_summa', davr('sana__date', week_ago)),
+            Metrika('haftalik_soni',  q=davr('sana__date', week_ago), tur='count'),
+            Metrika('oylik_sotuv',    'yakuniy_summa', oy_q),
+            Metrika('oylik_soni',     q=oy_q, tur='count'),
+            Metrika('jami_sotuv',     'yakuniy_summa'),
+            Metrika('jami_soni',      tur='count'),
+        ])
+        context.update(stat)
         
         # Xaridorlar (filterlar uchun)
         context['xaridorlar'] = m.Xaridor.objects.all().order_by('ism')[:100]
@@ -1219,9 +700,45 @@ class SotuvDetailView(AdminRequiredMixin,DetailView):
    
 
 @login_required(login_url='login')
-def get_usd_kurs(request):
-    """Real-time USD kursini qaytarish"""
-    rate = get_usd_rate()
+def xaridor_qidiruv(request):
+    """Xaridor tanlash maydoni uchun avtoto'ldirish (?q=ism yoki telefon)"""
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({'success': True, 'natijalar': []})
+
+    ids = qidiruv.qidirish(q, 'xaridor', limit=15)
+    if ids is None:
+        xaridorlar = m.Xaridor.objects.filter(
+            Q(ism__icontains=q) | Q(telefon__icontains=q)
+        ).order_by('ism')[:15]
+    else:
+        xaridorlar = m.Xaridor.objects.filter(pk__in=ids).order_by(qidiruv.moslik_tartibi(ids))
+
+    return JsonResponse({
+        'success': True,
+        'natijalar': [
+            {
+                'id'      : x.id,
+                'ism'     : x.ism,
+                'telefon' : x.telefon or '',
+                'qarz'    : float(x.jami_qarz),
+            }
+            for x in xaridorlar.only('id', 'ism', 'telefon', 'jami_qarz')
+        ],
+    })
+
+
+@login_required(login_url='login')
+async def get_usd_kurs(request):
+    """USD kursi (ValyutaKurs jadvalidan); ?sana=YYYY-MM-DD berilsa — o'sha kungi kurs"""
+    sana = None
+    sana_str = request.GET.get('sana', '')[:10]
+    if sana_str:
+        try:
+            sana = datetime.strptime(sana_str, '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    rate = await aget_usd_rate(sana)
     return JsonResponse({
         'rate': str(rate),
         'formatted': f"{rate:,.2f}"
@@ -1299,46 +816,29 @@ def sotuv_qoshish(request):
                 sotuv._skip_kirim = True  # Kirimni keyinroq qo'shamiz
                 sotuv.save()
                 
-                # 4. Mahsulotlarni qo'shish
+                # 4. Mahsulotlarni qo'shish — barcha qatorlar bitta to'plamda
+                #    (stock, Product.soni va sotuv summasi shu yerda yangilanadi)
                 items_json = request.POST.get('items')
                 if not items_json:
                     variant_id = request.POST.get('mahsulot')
                     miqdor = request.POST.get('miqdor')
                     narx = request.POST.get('narx')
-                    narx_turi = request.POST.get('narx_turi', 'uzs')
-                    
+
                     if not all([variant_id, miqdor, narx]):
                         raise ValueError('Mahsulot, miqdor va narx majburiy!')
-                    
-                    variant = get_object_or_404(m.ProductVariant, id=variant_id)
-                    m.SotuvItem.objects.create(
-                        sotuv=sotuv,
-                        mahsulot=variant.product,
-                        variant=variant,
-                        miqdor=int(miqdor),
-                        narx=Decimal(str(narx)),
-                        narx_turi=narx_turi,
-                    )
+
+                    items = [{
+                        'variant_id': variant_id,
+                        'miqdor': miqdor,
+                        'narx': narx,
+                        'narx_turi': request.POST.get('narx_turi', 'uzs'),
+                    }]
                 else:
                     items = json.loads(items_json)
-                    for item in items:
-                        variant = get_object_or_404(m.ProductVariant, id=item['variant_id'])
-                        narx_turi = item.get('narx_turi', 'uzs')
-                        narx_val = Decimal(str(item['narx']))
-                        
-                        m.SotuvItem.objects.create(
-                            sotuv=sotuv,
-                            mahsulot=variant.product,
-                            variant=variant,
-                            miqdor=int(item['miqdor']),
-                            narx=narx_val,
-                            narx_turi=narx_turi,
-                        )
-                
-                # 5. Summani yangilash
-                sotuv.refresh_from_db()
-                
-                # 6. Kirimlarni yaratish (manual)
+
+                sotuv_yigish(sotuv, items)
+
+                # 5. Kirimlarni yaratish (manual)
                 if tolov_holati == 'tolandi':
                     m.Kirim.objects.create(
                         sotuv=sotuv,
@@ -1386,8 +886,13 @@ def sotuv_qoshish(request):
 
 @login_required(login_url='login')
 @user_passes_test(is_admin, login_url="login")
-def sotuv_pdf(request, sotuv_id):
-    """Sotuv PDF - USD narxlar va kirimlar ro'yxati bilan"""
+@faqat_oqish
+async def sotuv_pdf(request, sotuv_id):
+    """Sotuv PDF - USD narxlar va kirimlar ro'yxati bilan (render PDF pool'ida, crm/asinxron.py)"""
+    return await pdf_tayyorlash(_sotuv_pdf, request, sotuv_id)
+
+
+def _sotuv_pdf(request, sotuv_id):
     try:
         from reportlab.lib.pagesizes import A4
         from reportlab.lib import colors
@@ -1792,13 +1297,9 @@ def sotuv_ochirish(request, sotuv_id):
         try:
             with transaction.atomic():
                 sotuv = get_object_or_404(m.Sotuv, id=sotuv_id)
-                
-                # Itemlarni o'chirish (stock qaytariladi)
-                for item in sotuv.items.all():
-                    item.delete()
-                
-                # Sotuvni o'chirish
-                sotuv.delete()
+
+                # Stock qaytariladi, itemlar bilan birga o'chiriladi
+                sotuv_bekor_qilish(sotuv)
                 
                 messages.success(request, 'Sotuv o\'chirildi!')
                 
@@ -1826,7 +1327,7 @@ def get_variant_info(request, variant_id):
 # ==================== KIRIMLAR ====================
 
 
-class KirimListView(AdminRequiredMixin, ListView):
+class KirimListView(KursorSahifalashMixin, AdminRequiredMixin, ListView):
     """Kirimlar ro'yxati - yangilangan"""
     model = m.Kirim
     template_name = 'kirim_list.html'
@@ -1838,9 +1339,9 @@ class KirimListView(AdminRequiredMixin, ListView):
         queryset = super().get_queryset().select_related('xaridor', 'sotuv')
         date_filter = self.request.GET.get('date')
         if date_filter == 'bugun':
-            queryset = queryset.filter(sana__date=date.today())
+            queryset = queryset.filter(davr('sana__date', date.today(), date.today()))
         elif date_filter == 'hafta':
-            queryset = queryset.filter(sana__date__gte=date.today() - timedelta(days=7))
+            queryset = queryset.filter(davr('sana__date', date.today() - timedelta(days=7)))
         elif date_filter == 'oy':
             queryset = queryset.filter(
                 sana__year=date.today().year,
@@ -1852,18 +1353,12 @@ class KirimListView(AdminRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         today = date.today()
 
-        # Asosiy statistikalar
-        context['bugungi_kirim'] = m.Kirim.objects.filter(
-            sana__date=today
-        ).aggregate(Sum('summa'))['summa__sum'] or 0
-
-        context['oylik_kirim'] = m.Kirim.objects.filter(
-            sana__year=today.year, sana__month=today.month
-        ).aggregate(Sum('summa'))['summa__sum'] or 0
-
-        context['jami_kirim'] = m.Kirim.objects.aggregate(
-            Sum('summa')
-        )['summa__sum'] or 0
+        # Asosiy statistikalar — bitta aggregate()
+        context.update(hisobla(m.Kirim.objects.all(), [
+            Metrika('bugungi_kirim', 'summa', davr('sana__date', today, today)),
+            Metrika('oylik_kirim',   'summa', Q(sana__year=today.year, sana__month=today.month)),
+            Metrika('jami_kirim',    'summa'),
+        ]))
 
         # Umumiy qarz (barcha to'lanmagan + qisman sotuvlar)
         qarz_data = m.Sotuv.objects.exclude(
@@ -1938,14 +1433,6 @@ def kirim_qoshish(request):
                     messages.error(request, "Summa 0 dan katta bo'lishi kerak!")
                     return redirect('main:kirim_qoshish')
 
-                # USD kurs — ASLIY
-                try:
-                    usd_kurs = Decimal(str(usd_kurs_str)) if usd_kurs_str and usd_kurs_str != '0' else get_usd_rate()
-                except Exception:
-                    usd_kurs = get_usd_rate()
-                if not usd_kurs or usd_kurs == 0:
-                    usd_kurs = get_usd_rate()
-
                 # Sana — ASLIY
                 sana = timezone.now()
                 if sana_str:
@@ -1955,6 +1442,14 @@ def kirim_qoshish(request):
                     except Exception:
                         pass
 
+                # USD kurs — kiritilmagan bo'lsa kirim sanasidagi kurs
+                try:
+                    usd_kurs = Decimal(str(usd_kurs_str)) if usd_kurs_str and usd_kurs_str != '0' else None
+                except Exception:
+                    usd_kurs = None
+                if not usd_kurs:
+                    usd_kurs = get_usd_rate(sana)
+
                 # So'mga aylantirish — ASLIY
                 if valyuta == 'usd' and usd_kurs > 0:
                     summa_uzs = round(summa * usd_kurs, 2)
@@ -2096,32 +1591,48 @@ class XaridorListView(LoginRequiredMixin, ListView):
     ordering = ['-created_at']
     paginate_by = 50
     login_url = 'account_login'
-    
+
+    # ?sort=... → tartib (statistika maydonlari Xaridor jadvalining o'zida)
+    SARALASH = {
+        'yangi'  : ('-created_at',),
+        'xarid'  : ('-jami_xarid', '-created_at'),
+        'qarz'   : ('-jami_qarz', '-created_at'),
+        'soni'   : ('-xaridlar_soni', '-created_at'),
+        'oxirgi' : (F('oxirgi_xarid_sana').desc(nulls_last=True), '-created_at'),
+    }
+
+    def get_ordering(self):
+        return self.SARALASH.get(self.request.GET.get('sort'), self.SARALASH['yangi'])
+
     def get_queryset(self):
         queryset = super().get_queryset()
-        
-        search = self.request.GET.get('search')
+
+        search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                Q(ism__icontains=search) |
-                Q(telefon__icontains=search)
-            )
-        
+            ids = qidiruv.qidirish(search, 'xaridor', limit=QIDIRUV_LIMIT)
+            if ids is None:
+                queryset = queryset.filter(
+                    Q(ism__icontains=search) |
+                    Q(telefon__icontains=search)
+                )
+            else:
+                queryset = queryset.filter(pk__in=ids)
+                if self.request.GET.get('sort') not in self.SARALASH:
+                    queryset = queryset.order_by(qidiruv.moslik_tartibi(ids))
+
+        if self.request.GET.get('qarzdor'):
+            queryset = queryset.filter(jami_qarz__gt=0)
+
         return queryset
-    
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        xaridorlar = context['xaridorlar']
-        for xaridor in xaridorlar:
-            xaridor.jami_xarid = xaridor.sotuvlar.aggregate(
-                Sum('jami_summa')
-            )['jami_summa__sum'] or 0
-            xaridor.xaridlar_soni = xaridor.sotuvlar.count()
-        
+
         context['jami_xaridorlar'] = m.Xaridor.objects.count()
         context['is_admin'] = is_admin(self.request.user)
-        
+        context['sort'] = self.request.GET.get('sort') if self.request.GET.get('sort') in self.SARALASH else 'yangi'
+        context['qarzdor'] = bool(self.request.GET.get('qarzdor'))
+
         return context
 
 
@@ -2137,9 +1648,10 @@ class XaridorDetailView(LoginRequiredMixin, DetailView):
         xaridor = self.object
 
         # Sotuvlar (items bilan)
+        # variant.__str__ → variant.product.nomi
         context['sotuvlar'] = xaridor.sotuvlar.prefetch_related(
             'items__mahsulot',
-            'items__variant'
+            'items__variant__product'
         ).order_by('-sana')
 
         # Jami statistika
@@ -2150,7 +1662,7 @@ class XaridorDetailView(LoginRequiredMixin, DetailView):
         context['jami_xarid']    = agg['jami_summa']    or 0
         context['jami_tolangan'] = agg['jami_tolangan'] or 0
         context['umumiy_qarz']   = (agg['jami_summa'] or 0) - (agg['jami_tolangan'] or 0)
-        context['xaridlar_soni'] = xaridor.sotuvlar.count()
+        context['xaridlar_soni'] = xaridor.xaridlar_soni
 
         # Qarzli sotuvlar (to'lanmagan yoki qisman)
         context['qarzli_sotuvlar'] = xaridor.sotuvlar.exclude(
@@ -2234,13 +1746,14 @@ def xaridor_tahrirlash(request, pk):
 
 # ==================== CHIQIMLAR (XOMASHYO APP) ====================
 
-class ChiqimListView(AdminRequiredMixin, ListView):
+class ChiqimListView(KursorSahifalashMixin, AdminRequiredMixin, ListView):
     """Chiqimlar ro'yxati - FAQAT ADMIN"""
     model = Chiqim
     template_name = 'chiqim.html'
     context_object_name = 'chiqimlar'
     ordering = ['-created']
     paginate_by = 50
+    kursor_maydonlari = ('created',)
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
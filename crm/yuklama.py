@@ -0,0 +1,546 @@
+# crm/yuklama.py
+"""
+Yuklama (load) testi — bir vaqtda ishlayotgan kassirlar va ishlab chiqarish.
+
+Ishlayotgan server (runserver / gunicorn) ga HTTP orqali haqiqiy POST'lar
+yuboriladi — view, tranzaksiya va qulflar production'dagidek ishlaydi:
+
+    sotuv       main:sotuv_qoshish          — 1-3 qatorli sotuv (to'lovi bilan)
+    sotuv_item  main:sotuv_item_qoshish     — mavjud sotuvga qator (JSON javob)
+    kirim       main:kirim_qoshish          — taqsimlash_rejimi=1 (FIFO qarzlarga)
+    ish         main:ish_qoshish            — kroy / zakatovka / kosib / pardoz
+    sahifa      GET ro'yxat / hisobot sahifalari (SAHIFALAR)
+    statik      GET statik fayl (runtime / WhiteNoise solishtirish uchun)
+
+Buyruq server bilan BITTA bazaga ulanadi (lokal SQLite yoki Postgres):
+ssenariylar uchun id'lar bazadan olinadi, sessiya to'g'ridan-to'g'ri
+SessionStore'da yaratiladi, natijadan keyin esa qoldiq va balanslar bazadan
+qayta hisoblanadi. View'lar xatoni messages + redirect bilan qaytaradi,
+shuning uchun javobdagi 'messages' cookie'si ochib o'qiladi — SECRET_KEY
+server bilan bir xil bo'lishi kerak.
+
+Tekshiruvlar faqat test davomida yozilgan yozuvlarga (oldingi surat bilan farq):
+
+    sotuv:    yakuniy = Σ narx×miqdor − chegirma,  to'langan = Σ Kirim ≤ yakuniy
+    xaridor:  jami_qarz = Σ (yakuniy − to'langan)
+    variant:  stock = oldingi − sotilgan + kosib chiqargan ≥ 0
+    jarayon:  miqdori = oldingi + chiqargan bosqich − ishlatgan bosqich ≥ 0
+    padoj:    miqdori = oldingi − kosib ishlatgan ≥ 0
+
+Teri va astar qoldig'ini IshQoshishView kamaytirmaydi (TeriSarfi faqat
+hisobot uchun) — ular tekshirilmaydi.
+"""
+import http.client
+import json
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.messages import constants
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.db.models import Count, F, Max, Sum
+from django.http import HttpRequest
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from .demo import JARAYON
+
+SSENARIYLAR = ('sotuv', 'sotuv_item', 'kirim', 'ish', 'sahifa', 'statik')
+ARALASH     = {'sotuv': 4, 'sotuv_item': 2, 'kirim': 3, 'ish': 3, 'sahifa': 0, 'statik': 0}
+SAHIFALAR   = (
+    'main:home', 'main:sotuv_list', 'main:kirimlar', 'main:xaridorlar',
+    'analytics:analytics', 'xomashyo:jarayon_hisobot',
+)
+STATIK_FAYLLAR = ('admin/css/base.css', 'admin/js/core.js')
+ISH_TURLARI = {'kroy': 3, 'zakatovka': 3, 'kosib': 3, 'pardoz': 1}
+
+# Xato matnlari → toifa (birinchi mos kelgani)
+QULF_BELGILARI   = ('database is locked', 'deadlock', 'could not serialize', 'lock timeout')
+QOLDIQ_BELGILARI = ('yetarli', "qoldiq o'zgardi", 'qoldiq yetmadi')
+
+TOIFALAR = ('ok', 'rad', 'qulf', 'xato', 'server', 'ulanish')
+
+
+def foizli(qiymatlar, foiz):
+    """Saralangan ro'yxatdan percentil (eng yaqin daraja usuli)"""
+    if not qiymatlar:
+        return 0.0
+    i = max(0, min(len(qiymatlar) - 1, round(foiz / 100 * len(qiymatlar) + 0.5) - 1))
+    return qiymatlar[i]
+
+
+def xabarlarni_ochish(qiymat):
+    """'messages' cookie → [(level, matn)]; imzo mos kelmasa None"""
+    if not qiymat:
+        return []
+    xabarlar = CookieStorage(HttpRequest())._decode(qiymat)
+    if xabarlar is None:
+        return None
+    return [(x.level, str(x.message)) for x in xabarlar]
+
+
+def toifalash(status, xabarlar, javob=None):
+    """Bitta javob → (toifa, xato matni)"""
+    if status >= 500:
+        return 'server', f"HTTP {status}"
+    if status >= 400:
+        return 'xato', f"HTTP {status}"
+
+    matn = ''
+    if javob is not None and not javob.get('success'):
+        matn = javob.get('error') or 'success=false'
+    for level, xabar in xabarlar or []:
+        if level >= constants.ERROR:
+            matn = xabar
+            break
+    if not matn:
+        return 'ok', ''
+
+    kichik = matn.lower()
+    if any(b in kichik for b in QULF_BELGILARI):
+        return 'qulf', matn
+    if any(b in kichik for b in QOLDIQ_BELGILARI):
+        return 'rad', matn
+    return 'xato', matn
+
+
+# ─────────────────────────────────────────────────────────────────
+# BAZADAN MANBA VA SURAT
+# ─────────────────────────────────────────────────────────────────
+
+class Manba:
+    """Ssenariylar uchun id'lar — test boshida bir marta o'qiladi"""
+
+    def __init__(self):
+        from xomashyo.models import Xomashyo
+
+        from .models import Ishchi, ProductVariant, Sotuv, Xaridor
+
+        self.variantlar = list(
+            ProductVariant.objects.filter(stock__gt=0)
+            .values_list('pk', 'product_id', 'price')
+        )
+        self.xaridorlar = list(Xaridor.objects.values_list('pk', flat=True))
+        self.qarzdorlar = list(Xaridor.objects.filter(jami_qarz__gt=0).values_list('pk', flat=True))
+        self.sotuvlar = list(Sotuv.objects.order_by('-pk').values_list('pk', flat=True)[:200])
+
+        self.ishchilar = defaultdict(list)
+        for pk, turi in Ishchi.objects.filter(is_active=True, turi__isnull=False).values_list('pk', 'turi__nomi'):
+            self.ishchilar[turi.lower()].append(pk)
+
+        self.jarayon = {}   # (mahsulot_id, 'kroy' | 'zakatovka') → xomashyo_id
+        for pk, mahsulot_id, kategoriya in (
+            Xomashyo.objects.filter(category__turi='process', holati='active', mahsulot__isnull=False)
+            .values_list('pk', 'mahsulot_id', 'category__name')
+        ):
+            self.jarayon.setdefault((mahsulot_id, kategoriya.lower()), pk)
+
+        real = Xomashyo.objects.filter(holati='active').exclude(category__turi='process')
+        self.teri  = list(real.filter(category__name__iexact='teri').values_list('pk', flat=True))
+        self.padoj = list(real.filter(category__name__iexact='padoj', miqdori__gt=0).values_list('pk', flat=True))
+
+        self.mahsulot_variantlari = defaultdict(list)
+        for pk, product_id, _ in self.variantlar:
+            self.mahsulot_variantlari[product_id].append(pk)
+        self.mahsulotlar = sorted({p for _, p, _ in self.variantlar})
+
+        from django.contrib.staticfiles import finders
+        from django.templatetags.static import static
+        self.statik = [static(f) for f in STATIK_FAYLLAR if finders.find(f)]
+
+    def yetishmaydi(self, aralash):
+        """Tanlangan ssenariylar uchun yetishmaydigan ma'lumotlar ro'yxati"""
+        kerak = {
+            'sotuv':      [('variantlar', self.variantlar), ('xaridorlar', self.xaridorlar)],
+            'sotuv_item': [('variantlar', self.variantlar), ('sotuvlar', self.sotuvlar)],
+            'kirim':      [('qarzdor xaridorlar', self.qarzdorlar)],
+            'ish':        [('ishchilar', self.ishchilar), ('mahsulotlar', self.mahsulotlar)],
+            'sahifa':     [],
+            'statik':     [('statik fayl', self.statik)],
+        }
+        return [nomi for s, vazn in aralash.items() if vazn for nomi, bor in kerak[s] if not bor]
+
+
+def surat():
+    """Test oldidan holat: oxirgi id'lar va qoldiqlar"""
+    from xomashyo.models import Xomashyo
+
+    from .models import IshXomashyo, Kirim, ProductVariant, Sotuv, SotuvItem
+
+    return {
+        'sotuv':        Sotuv.objects.aggregate(m=Max('pk'))['m'] or 0,
+        'sotuv_item':   SotuvItem.objects.aggregate(m=Max('pk'))['m'] or 0,
+        'kirim':        Kirim.objects.aggregate(m=Max('pk'))['m'] or 0,
+        'ish_xomashyo': IshXomashyo.objects.aggregate(m=Max('pk'))['m'] or 0,
+        'stock':        dict(ProductVariant.objects.values_list('pk', 'stock')),
+        'miqdori':      dict(Xomashyo.objects.values_list('pk', 'miqdori')),
+    }
+
+
+def tekshirish(oldin, chiqarilgan):
+    """
+    Test davomida yozilganlarni bazadan qayta hisoblaydi → xatolar ro'yxati.
+    chiqarilgan — {variant_id: n}, muvaffaqiyatli kosib so'rovlari (mijoz tomonda
+    sanalgan); None bo'lsa variant qoldig'i tekshirilmaydi.
+    """
+    from xomashyo.models import Xomashyo
+
+    from .models import IshXomashyo, Kirim, ProductVariant, Sotuv, SotuvItem, Xaridor
+
+    xatolar = []
+
+    def solishtir(nomi, kutilgan, haqiqiy):
+        if kutilgan != haqiqiy:
+            xatolar.append(f"{nomi}: kutilgan {kutilgan}, bazada {haqiqiy}")
+
+    yangi_itemlar = SotuvItem.objects.filter(pk__gt=oldin['sotuv_item'])
+    yangi_kirimlar = Kirim.objects.filter(pk__gt=oldin['kirim'])
+
+    # ── Sotuv: qatorlar jami va to'lovlar ──
+    sotuv_ids = (
+        set(Sotuv.objects.filter(pk__gt=oldin['sotuv']).values_list('pk', flat=True))
+        | set(yangi_itemlar.values_list('sotuv_id', flat=True))
+        | set(yangi_kirimlar.exclude(sotuv__isnull=True).values_list('sotuv_id', flat=True))
+    )
+    sotuvlar = Sotuv.objects.filter(pk__in=sotuv_ids)
+    qator_jami = dict(
+        sotuvlar.values('pk').annotate(s=Sum(F('items__narx') * F('items__miqdor'))).values_list('pk', 's')
+    )
+    tolovlar = dict(sotuvlar.values('pk').annotate(s=Sum('kirimlar__summa')).values_list('pk', 's'))
+    for pk, yakuniy, chegirma, tolangan in sotuvlar.values_list('pk', 'yakuniy_summa', 'chegirma', 'tolangan_summa'):
+        solishtir(f"sotuv #{pk} jami", (qator_jami.get(pk) or 0) - chegirma, yakuniy)
+        solishtir(f"sotuv #{pk} to'langan", tolovlar.get(pk) or 0, tolangan)
+        if tolangan > yakuniy:
+            xatolar.append(f"sotuv #{pk} ortiqcha to'langan: {tolangan} > {yakuniy}")
+
+    # ── Xaridor qarzi ──
+    xaridor_ids = set(sotuvlar.values_list('xaridor_id', flat=True)) | set(
+        yangi_kirimlar.values_list('xaridor_id', flat=True)
+    )
+    for x in Xaridor.objects.filter(pk__in=xaridor_ids).prefetch_related('sotuvlar'):
+        qarz = sum((max(s.yakuniy_summa - s.tolangan_summa, 0) for s in x.sotuvlar.all()), Decimal('0'))
+        solishtir(f"xaridor #{x.pk} qarzi", qarz, x.jami_qarz)
+
+    # ── Variant qoldig'i ──
+    sotilgan = dict(yangi_itemlar.values('variant').annotate(s=Sum('miqdor')).values_list('variant', 's'))
+    variant_ids = set(sotilgan) | set(chiqarilgan or ())
+    for pk, stock in ProductVariant.objects.filter(pk__in=variant_ids).values_list('pk', 'stock'):
+        if chiqarilgan is not None:
+            kutilgan = oldin['stock'].get(pk, 0) - sotilgan.get(pk, 0) + chiqarilgan.get(pk, 0)
+            solishtir(f"variant #{pk} qoldig'i", kutilgan, stock)
+        if stock < 0:
+            xatolar.append(f"variant #{pk} qoldig'i manfiy: {stock}")
+
+    # ── Jarayon va padoj: oldingi ± yangi IshXomashyo ──
+    farq = defaultdict(Decimal)
+    for r in (
+        IshXomashyo.objects.filter(pk__gt=oldin['ish_xomashyo'], xomashyo__isnull=False, variant__isnull=True)
+        .values('xomashyo', 'xomashyo__category__name', 'xomashyo__category__turi', 'ish__ishchi__turi__nomi')
+        .annotate(s=Sum('miqdor')).order_by()
+    ):
+        kategoriya = (r['xomashyo__category__name'] or '').lower()
+        if r['xomashyo__category__turi'] == 'process' and kategoriya in JARAYON:
+            chiqaradi, _ = JARAYON[kategoriya]
+            farq[r['xomashyo']] += r['s'] if r['ish__ishchi__turi__nomi'] in chiqaradi else -r['s']
+        elif kategoriya == 'padoj':
+            farq[r['xomashyo']] -= r['s']
+    for pk, miqdori in Xomashyo.objects.filter(pk__in=list(farq)).values_list('pk', 'miqdori'):
+        solishtir(f"xomashyo #{pk} qoldig'i", oldin['miqdori'].get(pk, Decimal('0')) + farq[pk], miqdori)
+        if miqdori < 0:
+            xatolar.append(f"xomashyo #{pk} qoldig'i manfiy: {miqdori}")
+
+    # ── Takroriy jarayon xomashyo (get-or-create poygasi) ──
+    mahsulot_ids = Xomashyo.objects.filter(pk__in=list(farq), category__turi='process').values('mahsulot')
+    for r in (
+        Xomashyo.objects.filter(category__turi='process', mahsulot__in=mahsulot_ids)
+        .values('mahsulot', 'category').annotate(n=Count('pk')).filter(n__gt=1).order_by()
+    ):
+        xatolar.append(f"mahsulot #{r['mahsulot']} uchun {r['n']} ta bir xil jarayon xomashyo")
+
+    return xatolar
+
+
+# ─────────────────────────────────────────────────────────────────
+# HTTP MIJOZ
+# ─────────────────────────────────────────────────────────────────
+
+def sessiya_yaratish(user):
+    """Foydalanuvchi uchun login qilingan sessiya → sessionid (login formasiz)"""
+    from importlib import import_module
+
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+
+    sessiya = import_module(settings.SESSION_ENGINE).SessionStore()
+    sessiya[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    sessiya[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    sessiya[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    sessiya.create()
+    return sessiya.session_key
+
+
+class Mijoz:
+    """Bitta kassir / usta — o'z ulanishi (keep-alive) va cookie'lari bilan"""
+
+    def __init__(self, asos, sessionid):
+        qism = urlsplit(asos)
+        self.https = qism.scheme == 'https'
+        self.host = qism.netloc
+        self.prefiks = qism.path.rstrip('/')
+        self.csrf = get_random_string(32)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={sessionid}; {settings.CSRF_COOKIE_NAME}={self.csrf}"
+        self.ulanish = None
+
+    def _ulanish(self):
+        if self.ulanish is None:
+            sinf = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.ulanish = sinf(self.host, timeout=60)
+        return self.ulanish
+
+    def post(self, yol, maydonlar):
+        """→ (status, body, xabarlar, Location); xabarlar — ochilgan 'messages' cookie (None — ochilmadi)"""
+        return self._sorov('POST', yol, urlencode(maydonlar, doseq=True), {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': self.csrf,
+            'Referer': f"{'https' if self.https else 'http'}://{self.host}{self.prefiks}{yol}",
+        })
+
+    def get(self, yol):
+        return self._sorov('GET', yol, None, {'Accept-Encoding': 'gzip, br'})
+
+    def _sorov(self, method, yol, tana, sarlavhalar):
+        sarlavhalar['Cookie'] = self.cookie
+        try:
+            ulanish = self._ulanish()
+            ulanish.request(method, self.prefiks + yol, body=tana, headers=sarlavhalar)
+            javob = ulanish.getresponse()
+            body = javob.read()
+        except (OSError, http.client.HTTPException):
+            if self.ulanish is not None:
+                self.ulanish.close()
+            self.ulanish = None
+            raise
+
+        # messages cookie keyingi so'rovga yuborilmaydi — har javob alohida o'qiladi
+        xabarlar = []
+        for sarlavha in javob.headers.get_all('Set-Cookie') or []:
+            c = SimpleCookie()
+            c.load(sarlavha)
+            if CookieStorage.cookie_name in c:
+                xabarlar = xabarlarni_ochish(c[CookieStorage.cookie_name].value)
+        return javob.status, body, xabarlar, javob.headers.get('Location', '')
+
+
+# ─────────────────────────────────────────────────────────────────
+# SSENARIYLAR VA YUGURTIRISH
+# ─────────────────────────────────────────────────────────────────
+
+class Yuklama:
+    """N ta oqim — har biri o'z Mijoz'i bilan aralash ssenariylarni yuboradi"""
+
+    USD_KURS = '12700'   # get_usd_rate() tashqi API'ga chiqmasligi uchun har doim beriladi
+
+    def __init__(self, asos, sessionid, manba, aralash=None, seed=0):
+        self.asos = asos
+        self.sessionid = sessionid
+        self.manba = manba
+        self.aralash = {k: v for k, v in (aralash or ARALASH).items() if v > 0}
+        self.seed = seed
+        self.yollar = {
+            'sotuv': reverse('main:sotuv_qoshish'),
+            'kirim': reverse('main:kirim_qoshish'),
+            'ish':   reverse('main:ish_qoshish'),
+        }
+        self.natijalar = defaultdict(list)   # ssenariy → [(ms, toifa)]
+        self.xatolar = Counter()             # (ssenariy, toifa, matn) → soni
+        self.chiqarilgan = defaultdict(int)  # variant_id → kosib chiqargan (faqat 'ok')
+        self.ochilmadi = 0                   # messages cookie imzosi mos kelmagan javoblar
+        self.lock = threading.Lock()
+        self.soniya = 0.0
+
+    # ── So'rovlar ──
+    def _sotuv(self, rng):
+        m = self.manba
+        qatorlar = rng.sample(m.variantlar, min(len(m.variantlar), rng.randint(1, 3)))
+        items = [
+            {'variant_id': pk, 'miqdor': rng.randint(1, 2), 'narx': str(narx or 100000), 'narx_turi': 'uzs'}
+            for pk, _, narx in qatorlar
+        ]
+        holat = rng.choice(['tolandi', 'tolandi', 'qisman', 'tolanmadi'])
+        jami = sum(Decimal(i['narx']) * i['miqdor'] for i in items)
+        return self.yollar['sotuv'], {
+            'xaridor_turi':   'mavjud',
+            'xaridor':        rng.choice(m.xaridorlar),
+            'usd_kurs':       self.USD_KURS,
+            'tolov_holati':   holat,
+            'tolangan_summa': str((jami / 2).quantize(Decimal('1'))) if holat == 'qisman' else '0',
+            'items':          json.dumps(items),
+            'izoh':           'yuklama testi',
+        }, None
+
+    def _sotuv_item(self, rng):
+        pk, _, narx = rng.choice(self.manba.variantlar)
+        sotuv_id = rng.choice(self.manba.sotuvlar)
+        return reverse('main:sotuv_item_qoshish', args=[sotuv_id]), {
+            'variant_id': pk,
+            'miqdor':     1,
+            'narx':       str(narx or 100000),
+        }, None
+
+    def _kirim(self, rng):
+        return self.yollar['kirim'], {
+            'xaridor_id':        rng.choice(self.manba.qarzdorlar),
+            'summa':             rng.randrange(50_000, 500_000, 10_000),
+            'valyuta':           'uzs',
+            'usd_kurs':          self.USD_KURS,
+            'sana':              timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+            'taqsimlash_rejimi': '1',
+            'izoh':              'yuklama testi',
+        }, None
+
+    def _sahifa(self, rng):
+        return reverse(rng.choice(SAHIFALAR)), None, None
+
+    def _statik(self, rng):
+        return rng.choice(self.manba.statik), None, None
+
+    def _ish(self, rng):
+        m = self.manba
+        mumkin = {
+            'kroy':      bool(m.teri) and bool(m.ishchilar['kroy'] or m.ishchilar['rezak']),
+            'zakatovka': bool(m.ishchilar['zakatovka']),
+            'kosib':     bool(m.padoj) and bool(m.ishchilar['kosib']),
+            'pardoz':    bool(m.ishchilar['pardoz']),
+        }
+        turlar = [t for t in ISH_TURLARI if mumkin[t]] or ['pardoz']
+        turi = rng.choices(turlar, weights=[ISH_TURLARI[t] for t in turlar])[0]
+        mahsulot = rng.choice(m.mahsulotlar)
+        soni = rng.randint(1, 5)
+        maydonlar = {
+            'mahsulot':   mahsulot,
+            'soni':       soni,
+            'ish_sanasi': timezone.localdate().isoformat(),
+        }
+        chiqardi = None   # kosib: (variant_id, soni) — 'ok' bo'lsa stock'ka qo'shiladi
+
+        if turi == 'kroy':
+            maydonlar.update({
+                'ishchi':              rng.choice(m.ishchilar['kroy'] + m.ishchilar['rezak']),
+                'teri_xomashyo[]':     [rng.choice(m.teri)],
+                'teri_variant[]':      [''],
+                'teri_sarfi_custom[]': [''],
+            })
+        elif turi == 'zakatovka':
+            maydonlar['ishchi'] = rng.choice(m.ishchilar['zakatovka'])
+            kroy = m.jarayon.get((mahsulot, 'kroy'))
+            if kroy:
+                maydonlar['kroy_xomashyo'] = kroy
+            else:
+                maydonlar['mustaqil_ish'] = 'on'
+        elif turi == 'kosib':
+            variant_id = rng.choice(m.mahsulot_variantlari[mahsulot])
+            maydonlar.update({
+                'ishchi':           rng.choice(m.ishchilar['kosib']),
+                'padoj_xomashyo':   rng.choice(m.padoj),
+                'mahsulot_variant': variant_id,
+            })
+            zakatovka = m.jarayon.get((mahsulot, 'zakatovka'))
+            if zakatovka:
+                maydonlar['zakatovka_xomashyo'] = zakatovka
+            else:
+                maydonlar['mustaqil_ish'] = 'on'
+            chiqardi = (variant_id, soni)
+        else:
+            maydonlar['ishchi'] = rng.choice(m.ishchilar['pardoz'])
+
+        return self.yollar['ish'], maydonlar, chiqardi
+
+    # ── Oqimlar ──
+    def _bitta(self, mijoz, rng, ssenariy):
+        yol, maydonlar, chiqardi = getattr(self, f'_{ssenariy}')(rng)
+        boshi = time.perf_counter()
+        try:
+            if maydonlar is None:
+                status, body, xabarlar, joy = mijoz.get(yol)
+            else:
+                status, body, xabarlar, joy = mijoz.post(yol, maydonlar)
+        except (OSError, http.client.HTTPException) as e:
+            ms = (time.perf_counter() - boshi) * 1000
+            toifa, matn = 'ulanish', f"{type(e).__name__}: {e}"
+        else:
+            ms = (time.perf_counter() - boshi) * 1000
+            javob = None
+            if ssenariy == 'sotuv_item' and status == 200:
+                try:
+                    javob = json.loads(body)
+                except ValueError:
+                    javob = {'success': False, 'error': 'JSON emas'}
+            toifa, matn = toifalash(status, xabarlar, javob)
+            if toifa == 'ok' and status in (301, 302) and not xabarlar and 'login' in joy:
+                toifa, matn = 'xato', f"login sahifasiga yo'naltirildi: {joy}"
+
+        with self.lock:
+            self.natijalar[ssenariy].append((ms, toifa))
+            if matn:
+                self.xatolar[(ssenariy, toifa, matn.splitlines()[0][:160])] += 1
+            if xabarlar is None:
+                self.ochilmadi += 1
+            elif toifa == 'ok' and chiqardi:
+                self.chiqarilgan[chiqardi[0]] += chiqardi[1]
+
+    def _oqim(self, i, tugash, qolgan):
+        rng = random.Random(self.seed * 1000 + i)
+        mijoz = Mijoz(self.asos, self.sessionid)
+        nomlar, vaznlar = list(self.aralash), list(self.aralash.values())
+        while time.monotonic() < tugash:
+            with self.lock:
+                if qolgan[0] is not None:
+                    if qolgan[0] <= 0:
+                        break
+                    qolgan[0] -= 1
+            self._bitta(mijoz, rng, rng.choices(nomlar, weights=vaznlar)[0])
+
+    def ishga_tushirish(self, oqimlar=8, davomiylik=30, sorovlar=None):
+        """oqimlar ta parallel mijoz, davomiylik soniya yoki jami sorovlar ta so'rovgacha"""
+        boshi = time.monotonic()
+        tugash = boshi + davomiylik
+        qolgan = [sorovlar]
+        iplar = [threading.Thread(target=self._oqim, args=(i, tugash, qolgan), daemon=True) for i in range(oqimlar)]
+        for ip in iplar:
+            ip.start()
+        for ip in iplar:
+            ip.join()
+        self.soniya = time.monotonic() - boshi
+        return self.hisobot()
+
+    def hisobot(self):
+        """{'ssenariylar': {nomi: {...}}, 'jami': {...}, 'xatolar': [...]}"""
+        def qator(natijalar):
+            vaqtlar = sorted(ms for ms, _ in natijalar)
+            toifalar = Counter(t for _, t in natijalar)
+            return {
+                'soni':  len(natijalar),
+                **{t: toifalar.get(t, 0) for t in TOIFALAR},
+                'p50':   round(foizli(vaqtlar, 50), 1),
+                'p95':   round(foizli(vaqtlar, 95), 1),
+                'p99':   round(foizli(vaqtlar, 99), 1),
+                'max':   round(vaqtlar[-1], 1) if vaqtlar else 0.0,
+                'rps':   round(len(natijalar) / self.soniya, 1) if self.soniya else 0.0,
+            }
+
+        hammasi = [n for royxat in self.natijalar.values() for n in royxat]
+        return {
+            'soniya':      round(self.soniya, 1),
+            'ssenariylar': {s: qator(self.natijalar[s]) for s in SSENARIYLAR if s in self.natijalar},
+            'jami':        qator(hammasi),
+            'xatolar':     [
+                {'ssenariy': s, 'toifa': t, 'matn': matn, 'soni': n}
+                for (s, t, matn), n in self.xatolar.most_common()
+            ],
+            'ochilmadi':   self.ochilmadi,
+        }
@@ -217,6 +217,15 @@ class XomashyoHarakat(models.Model):
         verbose_name = "Xomashyo harakati"
         verbose_name_plural = "Xomashyo harakatlari"
         ordering = ['-sana']
+        indexes = [
+            models.Index(fields=['harakat_turi', 'sana'], name='xh_tur_sana_idx'),
+            # Qarzdor kirimlar: umumiy ro'yxat va yetkazib beruvchi bo'yicha (FIFO)
+            models.Index(fields=['harakat_turi', 'tolov_holati', 'sana'], name='xh_tur_holat_sana_idx'),
+            models.Index(
+                fields=['yetkazib_beruvchi', 'harakat_turi', 'tolov_holati', 'sana'],
+                name='xh_yb_tur_holat_idx',
+            ),
+        ]
 
     def __str__(self):
         nomi = self.xomashyo.nomi if self.xomashyo else '—'
@@ -10,7 +10,7 @@ app_name = "xomashyo"
 urlpatterns = [
     path('chiqimlar/', views.ChiqimListView.as_view(), name='chiqimlar'),
     path('chiqimlar/qoshish/', views.chiqim_qoshish, name='chiqim_qoshish'),
-    path('chiqimlar/<int:pk>/ochirish/', views.chiqim_ochirish, name='chiqim_ochirish'),
+    path('chiqimlar/<int:chiqim_id>/ochirish/', views.chiqim_ochirish, name='chiqim_ochirish'),
     path('chiqim-ochirish/<int:chiqim_id>/', views.chiqim_ochirish, name='chiqim_ochirish'),
     
     path('kirim-ochirish/<int:harakat_id>/', views.xomashyo_kirim_ochirish, name='xomashyo_kirim_ochirish'),
@@ -2,7 +2,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views.generic import ListView,DetailView,View
-from django.db.models import Sum,F,DecimalField, Q
+from django.db.models import Sum,F,DecimalField, Q, Window, Count
 from datetime import date,datetime
 import decimal
 from decimal import Decimal,ROUND_DOWN
@@ -12,10 +12,14 @@ from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, RowNumber
 from crm.models import Chiqim, ChiqimTuri,Ishchi,ChiqimItem
 from xomashyo.models import Xomashyo, XomashyoHarakat, YetkazibBeruvchi,XomashyoCategory,XomashyoVariant
 from crm.views import AdminRequiredMixin,is_admin
+from crm.utils import get_usd_rate
+from crm.sahifalash import KursorSahifalashMixin
+from analytics.metrics import Metrika, hisobla
+from config.routers import faqat_oqish
 import json
 
 def _parse_sana(sana_str):
@@ -49,29 +53,27 @@ def _xomashyo_to_dict(x):
 # LIST VIEW
 # ─────────────────────────────────────────────────────────────────
 
-class ChiqimListView(AdminRequiredMixin, ListView):
+class ChiqimListView(KursorSahifalashMixin, AdminRequiredMixin, ListView):
     model = Chiqim
     template_name = 'chiqim.html'
     context_object_name = 'chiqimlar'
     ordering = ['-created']
     paginate_by = 50
+    kursor_maydonlari = ('created',)
+
+    def get_queryset(self):
+        # Har bir chiqim qatoridagi element chiplari (c.itemlar.all)
+        return super().get_queryset().prefetch_related('itemlar')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         today = date.today()
 
-        context['bugungi_chiqim'] = Chiqim.objects.filter(
-            created=today
-        ).aggregate(Sum('price'))['price__sum'] or 0
-
-        context['oylik_chiqim'] = Chiqim.objects.filter(
-            created__year=today.year,
-            created__month=today.month,
-        ).aggregate(Sum('price'))['price__sum'] or 0
-
-        context['jami_chiqim'] = Chiqim.objects.aggregate(
-            Sum('price')
-        )['price__sum'] or 0
+        context.update(hisobla(Chiqim.objects.all(), [
+            Metrika('bugungi_chiqim', 'price', Q(created=today)),
+            Metrika('oylik_chiqim',   'price', Q(created__year=today.year, created__month=today.month)),
+            Metrika('jami_chiqim',    'price'),
+        ]))
 
         context['today_str'] = today.strftime('%Y-%m-%d')
 
@@ -156,6 +158,9 @@ def xomashyo_kirim_qoshish(request):
         usd_kurs = Decimal(usd_kurs_str) if usd_kurs_str else None
     except decimal.InvalidOperation:
         usd_kurs = None
+    if not usd_kurs:
+        # Kiritilmagan bo'lsa — kirim sanasidagi kurs (orqaga sanalangan kirim uchun ham)
+        usd_kurs = get_usd_rate(sana) or None
 
     try:
         rows = json.loads(request.POST.get('items', '[]'))
@@ -461,17 +466,13 @@ class XomashyolarListView(AdminRequiredMixin,ListView):
         if category_filter and category_filter != 'all':
             queryset = queryset.filter(category_id=category_filter)
 
-        # Har bir xomashyo uchun jami chiqimni qo'shish
-        xomashyolar_with_chiqim = []
-        for xomashyo in queryset:
-            jami_chiqim = XomashyoHarakat.objects.filter(
-                xomashyo=xomashyo,
-                harakat_turi='chiqim'
-            ).aggregate(total=Sum('miqdori'))['total'] or 0
-            xomashyo.jami_chiqim = jami_chiqim
-            xomashyolar_with_chiqim.append(xomashyo)
-
-        return xomashyolar_with_chiqim
+        # Har bir xomashyo uchun jami chiqim — bitta so'rovda (annotate)
+        return queryset.annotate(
+            jami_chiqim=Coalesce(
+                Sum('xomashyoharakat__miqdori', filter=Q(xomashyoharakat__harakat_turi='chiqim')),
+                Decimal('0'),
+            )
+        )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -502,7 +503,7 @@ class XomashyoDetailView(AdminRequiredMixin,DetailView):
 
         harakat_filter = self.request.GET.get('harakat')
         harakatlar = XomashyoHarakat.objects.filter(xomashyo=xomashyo).select_related(
-            'foydalanuvchi'
+            'foydalanuvchi', 'yetkazib_beruvchi'
         )
         if harakat_filter and harakat_filter != 'all':
             harakatlar = harakatlar.filter(harakat_turi=harakat_filter)
@@ -529,6 +530,7 @@ class XomashyoDetailView(AdminRequiredMixin,DetailView):
 
 @login_required(login_url="login")
 @user_passes_test(is_admin,login_url='login')
+@faqat_oqish
 def jarayon_xomashyo_hisobot(request):
     """
     Kroy, Zakatovka, Kosib kabi jarayon xomashyolari uchun hisob-kitob sahifasi
@@ -544,7 +546,7 @@ def jarayon_xomashyo_hisobot(request):
     # Asosiy query
     xomashyolar = Xomashyo.objects.filter(
         category__turi='process'
-    ).select_related('category', 'yetkazib_beruvchi')
+    ).select_related('category', 'yetkazib_beruvchi', 'mahsulot')
     
     if selected_category != 'all':
         xomashyolar = xomashyolar.filter(category_id=selected_category)
@@ -553,35 +555,41 @@ def jarayon_xomashyo_hisobot(request):
     jami_kirim = 0
     jami_chiqim = 0
     jami_qoldiq = 0
-    
-    for xomashyo in xomashyolar:
-        # Harakatlar query
-        harakatlar_query = XomashyoHarakat.objects.filter(
-            Q(xomashyo=xomashyo) | Q(xomashyo_variant__xomashyo=xomashyo)
+
+    # Barcha xomashyolar harakatlari bitta so'rovda (xomashyo bo'yicha guruhlanadi)
+    harakatlar_query = XomashyoHarakat.objects.filter(
+        Q(xomashyo__in=xomashyolar) | Q(xomashyo_variant__xomashyo__in=xomashyolar)
+    ).annotate(
+        egasi=Coalesce('xomashyo_id', 'xomashyo_variant__xomashyo_id')
+    )
+
+    if date_from:
+        harakatlar_query = harakatlar_query.filter(
+            sana__gte=datetime.strptime(date_from, '%Y-%m-%d')
         )
-        
-        if date_from:
-            harakatlar_query = harakatlar_query.filter(
-                sana__gte=datetime.strptime(date_from, '%Y-%m-%d')
-            )
-        if date_to:
-            harakatlar_query = harakatlar_query.filter(
-                sana__lte=datetime.strptime(date_to, '%Y-%m-%d')
-            )
-        
-        # Kirim va chiqim hisoblash
-        kirim = harakatlar_query.filter(
-            harakat_turi='kirim'
-        ).aggregate(
-            jami=Coalesce(Sum('miqdori'), 0, output_field=DecimalField())
-        )['jami']
-        
-        chiqim = harakatlar_query.filter(
-            harakat_turi='chiqim'
-        ).aggregate(
-            jami=Coalesce(Sum('miqdori'), 0, output_field=DecimalField())
-        )['jami']
-        
+    if date_to:
+        harakatlar_query = harakatlar_query.filter(
+            sana__lte=datetime.strptime(date_to, '%Y-%m-%d')
+        )
+
+    # Kirim va chiqim hisoblash
+    jamlar = {
+        (r['egasi'], r['harakat_turi']): r['jami']
+        for r in harakatlar_query.filter(harakat_turi__in=['kirim', 'chiqim'])
+        .values('egasi', 'harakat_turi').annotate(jami=Sum('miqdori')).order_by()
+    }
+
+    # Har bir xomashyoning oxirgi 5 ta harakati
+    oxirgilar = {}
+    for harakat in harakatlar_query.annotate(
+        tartib=Window(RowNumber(), partition_by=F('egasi'), order_by=F('sana').desc())
+    ).filter(tartib__lte=5).select_related('foydalanuvchi').order_by('egasi', 'tartib'):
+        oxirgilar.setdefault(harakat.egasi, []).append(harakat)
+
+    for xomashyo in xomashyolar:
+        kirim = jamlar.get((xomashyo.pk, 'kirim')) or Decimal('0')
+        chiqim = jamlar.get((xomashyo.pk, 'chiqim')) or Decimal('0')
+
         qoldiq = xomashyo.miqdori
         jami_summa = qoldiq * (xomashyo.narxi or 0)
         
@@ -591,7 +599,7 @@ def jarayon_xomashyo_hisobot(request):
             'chiqim': chiqim,
             'qoldiq': qoldiq,
             'jami_summa': jami_summa,
-            'oxirgi_harakatlar': harakatlar_query.order_by('-sana')[:5]
+            'oxirgi_harakatlar': oxirgilar.get(xomashyo.pk, [])
         })
         
         jami_kirim += kirim
@@ -626,15 +634,22 @@ class YetkazibBeruvchilarView(AdminRequiredMixin, ListView):
     context_object_name = 'yetkazib_beruvchilar'
  
     def get_queryset(self):
-        qs = YetkazibBeruvchi.objects.all().order_by('nomi')
-        for yb in qs:
-            harakatlar = XomashyoHarakat.objects.filter(
-                yetkazib_beruvchi=yb,
-                harakat_turi='kirim',
-                tolov_holati__in=['tolanmagan', 'qisman']
-            )
-            yb.jami_qarz_uzs = sum(h.qoldiq_uzs for h in harakatlar)
-        return qs
+        # Qarz (XomashyoHarakat.qoldiq_uzs yig'indisi) — bitta query, N+1 yo'q
+        qarzli = Q(
+            xomashyoharakat__harakat_turi='kirim',
+            xomashyoharakat__tolov_holati__in=['tolanmagan', 'qisman'],
+        )
+        return YetkazibBeruvchi.objects.annotate(
+            jami_qarz_uzs=Coalesce(
+                Sum(
+                    F('xomashyoharakat__jami_narx_uzs') - F('xomashyoharakat__tolangan_uzs'),
+                    filter=qarzli,
+                ),
+                Decimal('0'),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            ),
+            qarzli_harakatlar=Count('xomashyoharakat', filter=qarzli),
+        ).order_by('nomi')
  
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)